@@ -1,14 +1,21 @@
-from .siatu import SiatuAuto
+from .siatu import SiatuAuto, AnexosIncompletos
 from .urbano import UrbanoAuto
+from .urbano_api import UrbanoApiClient
 from .sisctm import SisctmAuto
+from .sisctm_ogc import SisctmOgcClient
+from .sisctm_mapa import RenderizadorMapa
 from .google import GoogleMapsAuto
 from .sigede import SigedeAuto
 from .relatorios import gerar_relatorio
 
 __all__ = [
     "SiatuAuto",
+    "AnexosIncompletos",
     "UrbanoAuto",
+    "UrbanoApiClient",
     "SisctmAuto",
+    "SisctmOgcClient",
+    "RenderizadorMapa",
     "GoogleMapsAuto",
     "gerar_relatorio",
     "SigedeAuto",
@@ -5,9 +5,9 @@ from selenium.webdriver.common.keys import Keys  # Import necessário para o ENT
 from selenium.webdriver.remote.webelement import WebElement
 from typing import Any, Optional        # modulo de tipagem
 
-from utils import logger
+from utils import logger, sem_bloqueio_rede
+from utils.esperas import esperar, elemento_presente, elemento_visivel, url_contem, alguma, rede_ociosa
 
-import time
 import os
 
 
@@ -106,12 +106,13 @@ class GoogleMapsAuto:
         try:
             self.driver.get(self.url)
             logger.info(f"Acessando Google Maps")
-            time.sleep(3)
+            esperar(self.driver, "GOOGLE abertura", elemento_visivel((By.CSS_SELECTOR, "input[name='q'], input#searchboxinput")), teto=3)
             return True
         except Exception as e:
             logger.error(f"Erro ao acessar o Google Maps: {e}")
             return
 
+    @sem_bloqueio_rede
     def navegar(self):
         """Navega até o endereço, muda para satélite, faz prints e Street View."""
         # =========================================================================
@@ -157,7 +158,12 @@ class GoogleMapsAuto:
         try:
             search_input.send_keys(Keys.ENTER)
             logger.info("Busca disparada via tecla ENTER")
-            time.sleep(5)
+            # Pronto quando aparece a lista de resultados ou o Maps vai direto para o local (/maps/place/)
+            esperar(
+                self.driver, "GOOGLE busca",
+                alguma(elemento_presente((By.CSS_SELECTOR, "a.hfpxzc")), url_contem("/maps/place/")),
+                teto=5,
+            )
         except Exception as e:
             logger.error(f"Erro ao enviar a tecla ENTER  para disparar a busca: {e}")
             return
@@ -170,7 +176,8 @@ class GoogleMapsAuto:
             if resultados:
                 logger.info(f"Múltiplos resultados encontrados ({len(resultados)}). Clicando no primeiro para fixar local.")
                 self._click(resultados[0])
-                time.sleep(4) # Espera carregar o painel lateral do local específico
+                # Espera carregar o painel lateral do local específico
+                esperar(self.driver, "GOOGLE painel do local", url_contem("/maps/place/"), elemento_visivel((By.TAG_NAME, "h1")), teto=4)
             else:
                 logger.info("Nenhuma lista detectada. O Maps parece ter ido direto para o ponto.")
         except Exception as e:
@@ -183,7 +190,7 @@ class GoogleMapsAuto:
             )
             self._click(satellite_button)
             logger.info("Visualização satélite ativada")
-            time.sleep(3)
+            esperar(self.driver, "GOOGLE satélite", rede_ociosa(), minimo=0.5, teto=3)   # Tiles do satélite baixados
         except Exception as e:
             logger.warning(f"Não foi possível ativar visualização satélite: {e}")
 
@@ -204,7 +211,8 @@ class GoogleMapsAuto:
             )
             self._click(street_view_button)
             logger.info("Street View ativado")
-            time.sleep(5)
+            # A URL do Street View traz o parâmetro de câmera ",3a," (ex: @-19.9,-43.9,3a,75y,90t)
+            esperar(self.driver, "GOOGLE street view", url_contem(",3a,"), rede_ociosa(), minimo=0.5, teto=5)
         except Exception as e:
             # input ("INPUT DE DEBUG. APERTE ENTER PARA CONTINUAR")
             logger.warning(f"Não foi possível clicar no Street View: {e}")
@@ -36,9 +36,11 @@ def gerar_relatorio(
     dados_sisctm=None,
     protocolo=None,
     ic_avulso = False,
+    sistemas_indisponiveis=None,
 ):
     """
     Gera um relatório PDF do Índice Cadastral com base nos dados fornecidos.
+    'sistemas_indisponiveis' lista os sistemas que não foram consultados (disjuntor aberto) - o relatório avisa no topo.
     """
     doc = SimpleDocTemplate(
         nome_pdf,
@@ -241,6 +243,14 @@ def gerar_relatorio(
 
     logger.info("Criando relatório PDF")
 
+    # Aviso de sistemas não consultados (indisponíveis durante a triagem, ver utils/disjuntor.py)
+    if sistemas_indisponiveis:
+        adicionar_secao(
+            "Atenção: sistemas indisponíveis",
+            "".join(f"<b>{sistema} indisponível</b> durante a triagem: os dados e documentos deste sistema "
+                    "não foram consultados para o Índice.<br/>" for sistema in sistemas_indisponiveis),
+        )
+
     # Seções
     # 1. SIGEDE / ORIGEM DA DEMANDA
     logger.info("Adicionando seção 1: SIGEDE/Origem do IC")
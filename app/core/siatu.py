@@ -1,14 +1,31 @@
 import os
-import time
 import re
 
-from utils import logger
+from utils import logger, sem_bloqueio_rede, definir_timeout_comando, rastreador_downloads
+from utils import http_direto_habilitado, descobrir_urls, sessao_http, baixar, baixar_em_paralelo, ErroDownloadHttp
+from utils.esperas import (
+    esperar,
+    pagina_carregada,
+    elemento_obsoleto,
+    janelas_abertas,
+    arquivo_novo,
+    arquivos_na_pasta,
+)
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+
+class AnexosIncompletos(Exception):
+    """Algum anexo encontrado não foi salvo (não começou ou não terminou de baixar) - os checkpoints deles já foram desfeitos."""
+
+    def __init__(self, baixados: int, encontrados: int, faltando):
+        super().__init__(f"{encontrados - baixados} de {encontrados} anexos não baixados: {', '.join(faltando)}")
+        self.baixados = baixados
+        self.encontrados = encontrados
+        self.faltando = list(faltando)
 
 
 class SiatuAuto:
@@ -30,6 +47,7 @@ class SiatuAuto:
         self.senha = senha
         self.pasta_download = pasta_download
         self.wait = WebDriverWait(self.driver, timeout=5)
+        self._http = None   # Sessão HTTP com os cookies do navegador (modo híbrido, ver utils/cliente_http.py)
 
     def _click(self, element):
         """
@@ -69,6 +87,20 @@ class SiatuAuto:
             logger.error("Erro no login: %s", e)
             raise
 
+    def sessao_valida(self) -> bool:
+        """
+        Checagem barata de sessão (usada pelo cofre de sessões): reabre o SIATU e confere se o menu
+        (iframe pós-login) aparece em poucos segundos, em vez do formulário de login.
+        """
+        try:
+            self.driver.get(self.url)
+            WebDriverWait(self.driver, 5).until(
+                EC.presence_of_element_located((By.NAME, "iframe"))
+            )
+            return True
+        except Exception:
+            return False
+
     def navegar(self):
         """
         Inicia a navegação até a página de consulta de índice cadastral.
@@ -104,43 +136,78 @@ class SiatuAuto:
                 raise
             return False
 
-    def planta_basica(self, indice_cadastral: str):
+    def _fechar_janelas_extras(self, janela_principal):
         """
-        Consulta índice e obtem a planta básica resumida (PDF).
+        Fecha todas as janelas além da principal e volta para ela."""
+        for janela in self.driver.window_handles:
+            if janela != janela_principal:
+                self.driver.switch_to.window(janela)
+                self.driver.close()
+        self.driver.switch_to.window(janela_principal)
+
+    def voltar_ao_menu(self):
         """
+        Devolve a sessão (já autenticada) à página de consulta de índice: usado antes de repetir um passo que falhou no meio."""
+        janela_principal = self.driver.window_handles[0]
+        self._fechar_janelas_extras(janela_principal)
+        self.driver.switch_to.default_content()
+        self.acessar()
+        if not self.navegar():
+            raise TimeoutException("Menu do SIATU não carregou ao voltar para a consulta")
+
+    def reabrir_consulta(self, indice_cadastral: str):
+        """
+        Como voltar_ao_menu(), mas já com o índice consultado (página da planta básica aberta)."""
+        self.voltar_ao_menu()
+        self.consultar_indice(indice_cadastral)
 
-        try:
-            logger.info("Iniciando download da PB: %s", indice_cadastral)
-
-            # Preenche índice cadastral
-            campo_indice = self.wait.until(
-                EC.presence_of_element_located((By.ID, "indiceCadastral"))
-            )
-            campo_indice.clear()
-            campo_indice.send_keys(indice_cadastral)
-            logger.info("Índice cadastral preenchido")
-
-            # Clica em exercício e aguarda a página recarregar
-            campo_exercicio = self.wait.until(
-                EC.presence_of_element_located((By.ID, "exercicio"))
+    def consultar_indice(self, indice_cadastral: str):
+        """
+        Consulta o índice (preenche, escolhe o exercício e abre a planta básica). Deixa a página pronta para
+        planta_basica(..., consultar=False) e download_anexos(...).
+        """
+        # Preenche índice cadastral
+        campo_indice = self.wait.until(
+            EC.presence_of_element_located((By.ID, "indiceCadastral"))
+        )
+        campo_indice.clear()
+        campo_indice.send_keys(indice_cadastral)
+        logger.info("Índice cadastral preenchido")
+
+        # Clica em exercício e aguarda a página recarregar
+        campo_exercicio = self.wait.until(
+            EC.presence_of_element_located((By.ID, "exercicio"))
+        )
+
+        # XXX: Diminui timeout devido ao travamento do SIATU em algumas ocasiões (só deste driver - ver utils/perfis.py)
+        definir_timeout_comando(self.driver, 10)
+
+        self._click(campo_exercicio)
+        logger.info("Exercício clicado")
+        esperar(self.driver, "SIATU exercício", elemento_obsoleto(campo_exercicio), pagina_carregada(), teto=2)
+
+        # Clica no botão "planta básica"
+        btn_planta = self.wait.until(
+            EC.element_to_be_clickable(
+                (By.XPATH, "//input[@type='submit' and @value='planta básica']")
             )
+        )
+        self._click(btn_planta)
+        logger.info("Botão 'planta básica' clicado")
+        esperar(self.driver, "SIATU planta básica", elemento_obsoleto(btn_planta), pagina_carregada(), teto=2)
+        return True
 
-            # XXX: Diminui timeout devido ao travamento do SIATU em algumas ocasiões
-            RemoteConnection.set_timeout(10)
+    def planta_basica(self, indice_cadastral: str, consultar: bool = True):
+        """
+        Consulta índice e obtem a planta básica resumida (PDF).
+        Com consultar=False, parte da página já aberta por consultar_indice(...).
+        """
 
-            self._click(campo_exercicio)
-            logger.info("Exercício clicado")
-            time.sleep(2)
+        try:
+            logger.info("Iniciando download da PB: %s", indice_cadastral)
 
-            # Clica no botão "planta básica"
-            btn_planta = self.wait.until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, "//input[@type='submit' and @value='planta básica']")
-                )
-            )
-            self._click(btn_planta)
-            logger.info("Botão 'planta básica' clicado")
-            time.sleep(2)
+            if consultar:
+                self.consultar_indice(indice_cadastral)
 
             # Links que podem existir
             links_xpaths = {
@@ -159,7 +226,7 @@ class SiatuAuto:
                     )
                     self._click(link)
                     logger.info(f"Link '{nome}' clicado")
-                    time.sleep(2)
+                    esperar(self.driver, "SIATU link PB", elemento_obsoleto(link), pagina_carregada(), teto=2)
 
                     # Após clicar no link, dispara o download
                     link_planta_resumida = self.wait.until(
@@ -171,10 +238,16 @@ class SiatuAuto:
                         )
                     )
 
+                    # Modo híbrido: o PDF vem por HTTP direto, sem abrir a janela de geração
+                    if self._baixar_pb_http(link_planta_resumida, nome):
+                        continue
+
                     janela_principal = self.driver.current_window_handle
+                    arquivos_antes = arquivos_na_pasta(self.pasta_download)
                     self._click(link_planta_resumida)
                     logger.info(f"Download da PB disparado após '{nome}'")
-                    time.sleep(2)
+                    # O PDF da PB é gerado numa janela nova: só fecha a janela depois que o download terminou
+                    esperar(self.driver, "SIATU geração PB", arquivo_novo(self.pasta_download, arquivos_antes), teto=2)
 
                     # Fecha qualquer janela nova aberta
                     janelas_atuais = self.driver.window_handles
@@ -184,7 +257,7 @@ class SiatuAuto:
                             self.driver.close()
 
                     self.driver.switch_to.window(janela_principal)
-                    time.sleep(2)
+                    esperar(self.driver, "SIATU retorno PB", pagina_carregada(), teto=2)
 
                 except TimeoutException:
                     logger.info(f"Link '{nome}' não encontrado, seguindo...")
@@ -203,13 +276,19 @@ class SiatuAuto:
             logger.error("Erro inesperado em planta_basica: %s", e)
             raise
 
-    def download_anexos(self, indice_cadastral: str):
+    def download_anexos(self, indice_cadastral: str, passos=None):
         """
         Faz o download dos arquivos da seção anexos (apenas PDFs) do Siatu.
+        Com 'passos' (utils/decorators.py), cada anexo é um passo retentável: só o anexo que falhou é repetido
+        e os anexos já baixados (numa tentativa anterior do fluxo) não são baixados de novo.
+
+        :return: (anexos salvos - nesta chamada ou, com 'passos', numa tentativa anterior -, anexos encontrados).
+        :raises AnexosIncompletos: Se algum anexo não começou ou não terminou de baixar - depois de desfazer o checkpoint
+                                   dele, para que uma nova tentativa do fluxo (@retry) baixe só os que faltam.
         """
 
-        # REVIEW: Normaliza timeout
-        RemoteConnection.set_timeout(120)
+        # REVIEW: Normaliza timeout (só deste driver)
+        definir_timeout_comando(self.driver, 120)
 
         try:
             logger.info(
@@ -223,74 +302,134 @@ class SiatuAuto:
             )
             self._click(link_anexos)
             logger.info("Link 'Anexos' clicado")
-            time.sleep(2)
+            esperar(self.driver, "SIATU anexos", elemento_obsoleto(link_anexos), pagina_carregada(), teto=2)
 
             # Janela principal
             janela_principal = self.driver.current_window_handle
 
             # Busca todos os PDFs na primeira tabela
-            anexos_pdf = self.driver.find_elements(
-                By.XPATH,
+            xpath_anexos = (
                 "//table[.//b[text()='Imagens anexadas']]/preceding::table[1]//tr/td[1]/a"
                 "[contains(@onclick, 'exibeDocumento') and "
-                "contains(translate(text(), 'PDF','pdf'), '.pdf')]",
+                "contains(translate(text(), 'PDF','pdf'), '.pdf')]"
             )
+            anexos_pdf = self.driver.find_elements(By.XPATH, xpath_anexos)
 
             if not anexos_pdf:
                 logger.info("Nenhum PDF disponível para download")
-                return 0
+                return 0, 0
 
             logger.info("Número de PDFs encontrados inicialmente: %d", len(anexos_pdf))
             qtd_anexos = 0
+            qtd_iniciados = 0
+            qtd_baixados = 0
+            faltando = []           # Nomes dos anexos que não começaram ou não terminaram de baixar
+
+            # Modo híbrido: todos os PDFs que der são baixados de uma vez por HTTP; o navegador só clica nos que faltarem
+            baixados_http = self._baixar_anexos_http(anexos_pdf, passos)
+
+            # Os downloads correm em paralelo: cada clique só espera o seu download COMEÇAR (ver utils/downloads.py)
+            downloads = rastreador_downloads(self.driver)
+            marca_inicial = downloads.marcar()
+            guids_por_passo = {}    # passo do anexo -> downloads iniciados por ele (para desfazer o checkpoint dos incompletos)
+            nomes_por_passo = {}
 
             for i, _ in enumerate(anexos_pdf, start=1):
                 # Refetch para evitar StaleElementReference (perda da referência dos dados)
-                anexos_pdf_refetch = self.driver.find_elements(
-                    By.XPATH,
-                    "//table[.//b[text()='Imagens anexadas']]/preceding::table[1]//tr/td[1]/a"
-                    "[contains(@onclick, 'exibeDocumento') and "
-                    "contains(translate(text(), 'PDF','pdf'), '.pdf')]",
-                )
+                anexos_pdf_refetch = self.driver.find_elements(By.XPATH, xpath_anexos)
 
                 if i - 1 >= len(anexos_pdf_refetch):
                     logger.warning("PDF %d não encontrado após refetch, pulando...", i)
+                    qtd_anexos += 1
+                    faltando.append(f"PDF {i}")
                     continue
 
-                anexo = anexos_pdf_refetch[i - 1]
-                nome_arquivo_raw = anexo.text.strip()
-                nome_arquivo = self._sanitize_filename(nome_arquivo_raw)
-                arquivo_caminho = os.path.join(self.pasta_download, nome_arquivo)
+                nome_arquivo_raw = anexos_pdf_refetch[i - 1].text.strip()
+                passo = f"anexo {i}: {nome_arquivo_raw}"
+                qtd_anexos += 1
 
-                logger.info("Processando PDF %d/%d", i, len(anexos_pdf))
-                self._click(anexo)
-                logger.info("Clique realizado no PDF")
+                if i in baixados_http:
+                    qtd_baixados += 1
+                    continue
+                if passos is not None and passos.concluido(passo):
+                    logger.info("PDF %d/%d já baixado numa tentativa anterior, pulando", i, len(anexos_pdf))
+                    qtd_baixados += 1
+                    continue
 
-                # Espera o download concluir
-                if self._esperar_download_concluir(arquivo_caminho, timeout=120):
-                    logger.info("Download concluído")
-                else:
+                def baixar_anexo(i=i, nome_arquivo_raw=nome_arquivo_raw):
+                    # Refetch a cada tentativa (a anterior pode ter recarregado a página)
+                    anexos_atuais = self.driver.find_elements(By.XPATH, xpath_anexos)
+                    if i - 1 >= len(anexos_atuais):
+                        raise TimeoutException(f"PDF {i} não encontrado após refetch")
+                    anexo = anexos_atuais[i - 1]
+                    logger.info("Processando PDF %d/%d", i, len(anexos_pdf))
+                    qtd_janelas = len(self.driver.window_handles)
+                    marca = downloads.marcar()
+                    self._click(anexo)
+                    logger.info("Clique realizado no PDF")
+
+                    iniciou = downloads.aguardar_inicio(marca, "SIATU início do anexo", teto=10)
+
+                    # O anexo abre numa janela nova: espera ela existir antes de fechar as janelas extras
+                    # (fechar a janela não interrompe o download, que pertence ao navegador)
+                    esperar(self.driver, "SIATU janela do anexo", janelas_abertas(qtd_janelas + 1), teto=1)
+                    # Fecha janelas extras e retorna para a janela principal
+                    self._fechar_janelas_extras(janela_principal)
+
+                    if not iniciou:
+                        raise TimeoutException(f"Download NÃO iniciado: {nome_arquivo_raw}")
+                    return [d.guid for d in downloads.iniciados(marca)]
+
+                try:
+                    if passos is None:
+                        guids = baixar_anexo()
+                    else:
+                        guids = passos.executar(passo, baixar_anexo,
+                                                reparar=lambda: self._fechar_janelas_extras(janela_principal))
+                except TimeoutException as e:
+                    # Um anexo que não baixa não interrompe os demais (a falta dele é lançada no fim)
+                    logger.warning("%s", e)
+                    faltando.append(nome_arquivo_raw)
+                    continue
+                qtd_iniciados += 1
+                guids_por_passo[passo] = guids
+                nomes_por_passo[passo] = nome_arquivo_raw
+
+            # Espera todos os downloads iniciados terminarem
+            if qtd_iniciados:
+                concluidos = downloads.aguardar(marca_inicial, "SIATU anexos", qtd=qtd_iniciados, teto=120)
+                for download in concluidos:
+                    logger.info("Download concluído: %s", download.nome)
+                if len(concluidos) < qtd_iniciados:
                     logger.warning(
-                        "Download NÃO concluído no tempo limite: %s", nome_arquivo_raw
+                        "Downloads NÃO concluídos no tempo limite: %d de %d",
+                        qtd_iniciados - len(concluidos),
+                        qtd_iniciados,
                     )
-
-                time.sleep(1)
-                # Fecha janelas extras
-                for janela in self.driver.window_handles:
-                    if janela != janela_principal:
-                        self.driver.switch_to.window(janela)
-                        self.driver.close()
-
-                # Retorna para a janela principal
-                self.driver.switch_to.window(janela_principal)
-
-                qtd_anexos += 1
+                    # Um anexo só fica "baixado" (checkpoint) se o download dele terminou: uma nova tentativa o baixa de novo
+                    guids_concluidos = {d.guid for d in concluidos}
+                    for passo, guids in guids_por_passo.items():
+                        if guids and not set(guids) <= guids_concluidos:
+                            if passos is not None:
+                                passos.desfazer(passo)
+                            faltando.append(nomes_por_passo[passo])
+                        else:
+                            qtd_baixados += 1
+                else:
+                    qtd_baixados += qtd_iniciados
 
             logger.info(
-                "Download de anexos finalizado. Total de PDFs processados: %d",
+                "Download de anexos finalizado. PDFs salvos: %d de %d",
+                qtd_baixados,
                 qtd_anexos,
             )
-            return qtd_anexos
+            if faltando:
+                raise AnexosIncompletos(qtd_baixados, qtd_anexos, faltando)
+            return qtd_baixados, qtd_anexos
 
+        except AnexosIncompletos as e:
+            logger.warning("%s", e)
+            raise
         except TimeoutException as e:
             logger.error("Timeout ao tentar baixar anexos: %s", e)
             raise
@@ -301,6 +440,63 @@ class SiatuAuto:
             logger.error("Erro inesperado em download_anexos: %s", e)
             raise
 
+    def _sessao_http(self):
+        """Sessão HTTP com os cookies atuais do navegador (criada uma vez por instância)."""
+        if self._http is None:
+            self._http = sessao_http(self.driver)
+        return self._http
+
+    def _baixar_pb_http(self, link_planta_resumida, nome: str) -> bool:
+        """
+        Baixa a Planta Básica Resumida direto pela URL do link (sem abrir a janela de geração).
+        Roda antes do próximo link de exercício: a PB é gerada a partir do exercício aberto na sessão.
+
+        :return: True se o PDF foi baixado; False para cair no clique pelo navegador.
+        """
+        if not http_direto_habilitado():
+            return False
+        url = descobrir_urls(self.driver, [link_planta_resumida])[0]
+        if not url:
+            return False
+        try:
+            caminho = baixar(self._sessao_http(), url, self.pasta_download, nome_padrao=f"Planta_Basica_{nome}.pdf")
+        except ErroDownloadHttp as e:
+            logger.warning(f"PB '{nome}' por HTTP falhou ({e}), usando o navegador.")
+            return False
+        logger.info(f"PB baixada por HTTP após '{nome}': {os.path.basename(caminho)}")
+        return True
+
+    def _baixar_anexos_http(self, anexos_pdf, passos=None) -> set:
+        """
+        Baixa por HTTP, ao mesmo tempo, os anexos cuja URL o navegador revelou (e que ainda não foram baixados).
+        Os baixados viram checkpoint em 'passos' como se tivessem sido clicados.
+
+        :return: Posições (1-based) dos anexos baixados - os demais seguem pelo clique no navegador.
+        """
+        if not http_direto_habilitado():
+            return set()
+        nomes = [anexo.text.strip() for anexo in anexos_pdf]
+        urls = descobrir_urls(self.driver, anexos_pdf)
+
+        pedidos = {}
+        for i, (nome_arquivo_raw, url) in enumerate(zip(nomes, urls), start=1):
+            if url and not (passos is not None and passos.concluido(f"anexo {i}: {nome_arquivo_raw}")):
+                pedidos[i] = (url, self.pasta_download, self._sanitize_filename(nome_arquivo_raw))
+        if not pedidos:
+            return set()
+
+        logger.info("Baixando %d de %d PDFs por HTTP direto", len(pedidos), len(anexos_pdf))
+        baixados = set()
+        for i, resultado in baixar_em_paralelo(self._sessao_http(), pedidos).items():
+            if isinstance(resultado, ErroDownloadHttp):
+                logger.warning("PDF %d por HTTP falhou (%s), usando o navegador", i, resultado)
+                continue
+            logger.info("Download concluído (HTTP): %s", os.path.basename(resultado))
+            if passos is not None:
+                passos.executar(f"anexo {i}: {nomes[i - 1]}", lambda: [])     # Checkpoint (sem downloads do navegador)
+            baixados.add(i)
+        return baixados
+
     def _capturar_dados_imovel(self):
         """
         Captura os dados do imóvel: Área Construída, Exercício, Patrimônio,
@@ -394,51 +590,7 @@ class SiatuAuto:
 
         return dados
 
-    def _esperar_download_concluir(self, caminho_arquivo, timeout=120):
-        """
-        Espera até que o arquivo seja completamente baixado na pasta de destino.
-        Funciona mesmo que o navegador use nomes temporários diferentes.
-        """
-        pasta = os.path.dirname(caminho_arquivo)
-        nome_base = self._sanitize_filename(os.path.basename(caminho_arquivo))
-        temporarios = (".crdownload", ".part", ".tmp")
-        inicio = time.time()
-
-        # Mapeia arquivos existentes e seus tamanhos
-        try:
-            arquivos_anteriores = {
-                f: os.path.getsize(os.path.join(pasta, f)) for f in os.listdir(pasta)
-            }
-        except FileNotFoundError:
-            arquivos_anteriores = {}
-
-        while True:
-            try:
-                arquivos_atuais = {
-                    f: os.path.getsize(os.path.join(pasta, f))
-                    for f in os.listdir(pasta)
-                }
-            except FileNotFoundError:
-                arquivos_atuais = {}
-
-            for f, tamanho in arquivos_atuais.items():
-                if f.endswith(temporarios):
-                    continue
-                sanitized = self._sanitize_filename(f)
-                # Detecta se é novo ou mudou de tamanho
-                if (
-                    sanitized == nome_base
-                    or (f not in arquivos_anteriores)
-                    or (arquivos_anteriores.get(f) != tamanho)
-                ):
-                    return True
-
-            if time.time() - inicio > timeout:
-                logger.warning("Timeout aguardando download: %s", caminho_arquivo)
-                return False
-
-            time.sleep(0.2)
-
+    @sem_bloqueio_rede
     def _print_alteracoes(self):
         try:
             # Clica na aba do menu "Alterações"
@@ -449,11 +601,11 @@ class SiatuAuto:
             alteracoes_link.click()
             logger.info("Aba 'Alterações' acessada com sucesso.")
 
-            time.sleep(2)
+            esperar(self.driver, "SIATU alterações", elemento_obsoleto(alteracoes_link), pagina_carregada(), teto=2)
 
             # Aumenta o zoom antes do print
             self.driver.execute_script("document.body.style.zoom='150%'")
-            time.sleep(1)
+            esperar(self.driver, "SIATU zoom", pagina_carregada(), minimo=0.3, teto=1)   # Respiro para o reflow do zoom
 
             # Print da tela
             screenshot_path = os.path.join(self.pasta_download, "alteracoes_siatu.png")
@@ -1,8 +1,16 @@
-import time
 import os
 import re
 
-from utils import logger
+from utils import logger, rastreador_downloads
+from utils import http_direto_habilitado, sessao_http, baixar_em_segundo_plano, ErroDownloadHttp
+from utils.esperas import (
+    esperar,
+    pagina_carregada,
+    elemento_presente,
+    elemento_visivel,
+    elemento_obsoleto,
+    xhr_ocioso,
+)
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -29,6 +37,7 @@ class SigedeAuto:
         self.senha = senha
         self.pasta_download = pasta_download
         self.wait = WebDriverWait(self.driver, timeout=5)
+        self._inteiro_teor = None   # (href, Future) do Inteiro Teor baixando por HTTP em segundo plano
 
     def _click(self, element):
         """
@@ -70,12 +79,27 @@ class SigedeAuto:
 
             logger.info("Login realizado com sucesso")
 
-            time.sleep(5)
+            # Pronto quando o CAS redireciona para a página inicial do SIGEDE (link do SisCop)
+            esperar(self.driver, "SIGEDE login", elemento_presente((By.XPATH, "//a[@href='/sigede/siscop']")), teto=5)
             return True
         except Exception as e:
             logger.error("Erro no login: %s", e)
             return False
 
+    def sessao_valida(self) -> bool:
+        """
+        Checagem barata de sessão (usada pelo cofre de sessões): reabre o SIGEDE e confere se o link
+        do SisCop (página pós-login) aparece em poucos segundos, em vez do formulário do CAS.
+        """
+        try:
+            self.driver.get(self.url)
+            WebDriverWait(self.driver, 5).until(
+                EC.presence_of_element_located((By.XPATH, "//a[@href='/sigede/siscop']"))
+            )
+            return True
+        except Exception:
+            return False
+
     def navegar(self, protocolo):
         """
         Navega até o módulo SisCop e realiza uma busca pelo protocolo fornecido.
@@ -96,7 +120,11 @@ class SigedeAuto:
                 )
             )
             self._click(siscop_btn)
-            time.sleep(3)
+            esperar(
+                self.driver, "SIGEDE SisCop",
+                elemento_obsoleto(siscop_btn), pagina_carregada(), elemento_presente((By.ID, "searchkey")),
+                teto=3,
+            )
 
             # Preenche o campo de pesquisa com o protocolo
             search_input = self.wait.until(
@@ -115,7 +143,12 @@ class SigedeAuto:
             self._click(pesquisar_btn)
             logger.info("Pesquisa realizada com sucesso")
 
-            time.sleep(5)
+            # Respiro mínimo para a requisição da pesquisa começar antes de checar se ela terminou
+            esperar(
+                self.driver, "SIGEDE pesquisa protocolo",
+                pagina_carregada(), xhr_ocioso(), elemento_presente((By.ID, "generic")),
+                minimo=0.5, teto=5,
+            )
             return True
 
         except (TimeoutException, NoSuchElementException) as e:
@@ -167,14 +200,24 @@ class SigedeAuto:
                     # Clica no link dentro da coluna Situação
                     link = cols[4].find_element(By.TAG_NAME, "a")
                     self._click(link)
-                    time.sleep(5)
+                    esperar(
+                        self.driver, "SIGEDE processo",
+                        elemento_obsoleto(link), pagina_carregada(),
+                        elemento_presente((By.XPATH, "//a[contains(text(),'Inteiro Teor')]")),
+                        teto=5,
+                    )
                     logger.info(
                         f"Processo com situação ({situacao}) encontrado e clicado"
                     )
 
+                    # Com o modo híbrido o Inteiro Teor baixa em segundo plano enquanto os índices são capturados
                     self._download_inteiro_teor()
-                    indices = self._captura_indices()
-                    self._busca_por_indices(indices)
+                    try:
+                        indices = self._captura_indices()
+                        self._busca_por_indices(indices)
+                    finally:
+                        # Mesmo se a captura falhar o download em segundo plano é recolhido (não fica órfão)
+                        self._concluir_inteiro_teor()
 
                     return indices
 
@@ -187,7 +230,11 @@ class SigedeAuto:
 
     def _download_inteiro_teor(self):
         """
-        Clica no botão 'Inteiro Teor' para disparar o download do PDF e aguarda sua conclusão.
+        Baixa o PDF do link 'Inteiro Teor'.
+
+        Modo híbrido (utils/cliente_http.py): o PDF é baixado direto do href, por HTTP com os cookies do navegador,
+        em segundo plano - o método retorna na hora e _concluir_inteiro_teor() espera o download no fim.
+        Sem o modo híbrido, clica no link e aguarda a conclusão do download no navegador.
         """
         try:
             logger.info("Iniciando download do Inteiro Teor")
@@ -199,29 +246,66 @@ class SigedeAuto:
                 )
             )
 
-            # Recupera o href para construir o nome do arquivo esperado
             href = link.get_attribute("href")
-            nome_arquivo = os.path.basename(href) + ".pdf"
-            caminho_arquivo = os.path.join(self.pasta_download, nome_arquivo)
-
-            # Clica no link para iniciar o download
-            self._click(link)
 
-            # Aguarda o download ser concluído
-            if self._esperar_download_concluir(caminho_arquivo):
-                logger.info("Download concluído")
-                return caminho_arquivo
-            else:
-                logger.warning(
-                    "Download não foi concluído dentro do tempo limite: %s",
-                    caminho_arquivo,
+            if http_direto_habilitado() and href and href.lower().startswith(("http://", "https://")):
+                futuro = baixar_em_segundo_plano(
+                    sessao_http(self.driver), href, self.pasta_download, nome_padrao="Inteiro_Teor.pdf"
                 )
+                self._inteiro_teor = (href, futuro)
+                logger.info("Download do Inteiro Teor iniciado por HTTP (em segundo plano)")
                 return None
 
+            return self._download_inteiro_teor_navegador(href, link)
+
+        except Exception as e:
+            logger.error("Erro ao tentar baixar o Inteiro Teor: %s", e)
+            return None
+
+    def _concluir_inteiro_teor(self):
+        """
+        Espera o Inteiro Teor que está baixando por HTTP em segundo plano. Se o download falhou, baixa pelo navegador.
+        """
+        if self._inteiro_teor is None:
+            return None
+        href, futuro = self._inteiro_teor
+        self._inteiro_teor = None
+        try:
+            caminho = futuro.result()
+            logger.info("Download concluído (HTTP): %s", os.path.basename(caminho))
+            return caminho
+        except ErroDownloadHttp as e:
+            logger.warning("Inteiro Teor por HTTP falhou (%s), usando o navegador.", e)
+        try:
+            return self._download_inteiro_teor_navegador(href)
         except Exception as e:
             logger.error("Erro ao tentar baixar o Inteiro Teor: %s", e)
             return None
 
+    def _download_inteiro_teor_navegador(self, href, link=None):
+        """
+        Dispara o download do Inteiro Teor no navegador (clique no link ou, sem ele, abrindo o href) e aguarda a conclusão.
+        """
+        # Dispara o download (a marca é tirada antes: só conta o download disparado aqui)
+        downloads = rastreador_downloads(self.driver)
+        marca = downloads.marcar()
+        if link is not None:
+            self._click(link)
+        else:
+            self.driver.get(href)   # O PDF é baixado (always_open_pdf_externally), a página atual não muda
+
+        # Aguarda o evento de conclusão do download (ver utils/downloads.py)
+        concluidos = downloads.aguardar(marca, "SIGEDE inteiro teor", teto=120)
+        if concluidos:
+            logger.info("Download concluído: %s", concluidos[0].nome)
+            return concluidos[0].caminho
+        else:
+            logger.warning(
+                "Download não foi concluído dentro do tempo limite: %s",
+                href,
+            )
+            return None
+
     def _captura_indices(self):
         """
         Captura todos os índices cadastrais da aba 'Índice Cadastral' e retorna como lista de strings.
@@ -239,7 +323,7 @@ class SigedeAuto:
                 )
             )
             self._click(aba)
-            time.sleep(1)
+            esperar(self.driver, "SIGEDE aba índices", elemento_visivel((By.ID, "indiceCadastral")), teto=1)
 
             # Localiza a tabela dentro da aba
             tab_panel = self.wait.until(
@@ -287,7 +371,11 @@ class SigedeAuto:
                 self._click(siscop_btn)
                 logger.info("Acessando SisCop")
 
-                time.sleep(3)
+                esperar(
+                    self.driver, "SIGEDE SisCop",
+                    elemento_obsoleto(siscop_btn), pagina_carregada(), elemento_presente((By.ID, "searchkey")),
+                    teto=3,
+                )
 
                 # Formata o índice
                 indice = (
@@ -318,7 +406,11 @@ class SigedeAuto:
                 search_input.clear()
                 search_input.send_keys(indice_formatado)
 
-                time.sleep(1)
+                esperar(
+                    self.driver, "SIGEDE digitação índice",
+                    lambda d: search_input.get_attribute("value") == indice_formatado,
+                    teto=1,
+                )
 
                 # Clica no botão pesquisar
                 logger.info("Clicando no botão pesquisar")
@@ -329,7 +421,7 @@ class SigedeAuto:
                 )
                 self._click(pesquisar_btn)
 
-                time.sleep(2)
+                esperar(self.driver, "SIGEDE pesquisa índice", pagina_carregada(), xhr_ocioso(), minimo=0.5, teto=2)
 
                 # Salva print da tela
                 screenshot_path = os.path.join(
@@ -344,51 +436,6 @@ class SigedeAuto:
             logger.error("Erro ao pesquisar índice cadastral: %s", e)
             return False
 
-    def _esperar_download_concluir(self, caminho_arquivo, timeout=120):
-        """
-        Espera até que o arquivo seja completamente baixado na pasta de destino.
-        Funciona mesmo que o navegador use nomes temporários diferentes.
-        """
-        pasta = os.path.dirname(caminho_arquivo)
-        nome_base = self._sanitize_filename(os.path.basename(caminho_arquivo))
-        temporarios = (".crdownload", ".part", ".tmp")
-        inicio = time.time()
-
-        # Mapeia arquivos existentes e seus tamanhos
-        try:
-            arquivos_anteriores = {
-                f: os.path.getsize(os.path.join(pasta, f)) for f in os.listdir(pasta)
-            }
-        except FileNotFoundError:
-            arquivos_anteriores = {}
-
-        while True:
-            try:
-                arquivos_atuais = {
-                    f: os.path.getsize(os.path.join(pasta, f))
-                    for f in os.listdir(pasta)
-                }
-            except FileNotFoundError:
-                arquivos_atuais = {}
-
-            for f, tamanho in arquivos_atuais.items():
-                if f.endswith(temporarios):
-                    continue
-                sanitized = self._sanitize_filename(f)
-                # Detecta se é novo ou mudou de tamanho
-                if (
-                    sanitized == nome_base
-                    or (f not in arquivos_anteriores)
-                    or (arquivos_anteriores.get(f) != tamanho)
-                ):
-                    return True
-
-            if time.time() - inicio > timeout:
-                logger.warning("Timeout aguardando download: %s", caminho_arquivo)
-                return False
-
-            time.sleep(0.2)
-
     def _sanitize_filename(self, nome):
         """Remove caracteres inválidos em nomes de arquivos no Windows."""
         return re.sub(r'[<>:"/\\|?*]', "_", nome)
@@ -1,5 +1,4 @@
 import traceback
-import time
 import os
 from typing import Dict, Optional, Any, List, Union, Iterable
 
@@ -17,7 +16,95 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 
-from utils import logger
+from utils import logger, sem_bloqueio_rede, sessao_http
+from utils.esperas import (
+    esperar,
+    pagina_carregada,
+    elemento_presente,
+    elemento_ausente,
+    elemento_estavel,
+    quasar_ocioso,
+    rede_ociosa,
+)
+from .sisctm_ogc import SisctmOgcClient, ErroOgcSisctm, descobrir_servicos, montar_endereco, servicos_sisctm
+from .sisctm_mapa import RenderizadorMapa, descobrir_vista, vistas_disponiveis
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------
+# Gancho no mapa OpenLayers (#olmap) para os prints: em vez de esperar um tempo fixo, o print é tirado quando o mapa dispara
+# 'rendercomplete' (todos os tiles da vista carregados e desenhados). O objeto ol.Map não é global no SISCTM (app Quasar/Vue),
+# então ele é procurado nas variáveis globais mais comuns e nos componentes Vue ligados ao #olmap e aos seus ancestrais.
+# ----------------------------------------------------------------------------------------------------------------------------------
+_JS_GANCHO_MAPA = """
+var estado = window.__autotriMapa;
+if (!estado) {
+    var ehMapa = function (o) {
+        return !!o && typeof o.getView === 'function' && typeof o.getLayers === 'function'
+            && typeof o.on === 'function' && typeof o.render === 'function';
+    };
+    var varrer = function (obj) {
+        if (!obj || typeof obj !== 'object') { return null; }
+        if (ehMapa(obj)) { return obj; }
+        for (var chave in obj) {
+            try { if (ehMapa(obj[chave])) { return obj[chave]; } } catch (e) {}
+        }
+        return null;
+    };
+    var procurar = function () {
+        var globais = [window.map, window.olMap, window.mapa];
+        for (var i = 0; i < globais.length; i++) { if (ehMapa(globais[i])) { return globais[i]; } }
+        for (var no = document.getElementById('olmap'); no; no = no.parentElement) {
+            for (var vm = no.__vue__; vm; vm = vm.$parent) {                        // Vue 2
+                var achado = varrer(vm) || varrer(vm.$data);
+                if (achado) { return achado; }
+            }
+            for (var c = no.__vueParentComponent; c; c = c.parent) {                // Vue 3
+                var achado3 = varrer(c.setupState) || varrer(c.ctx) || varrer(c.exposed) || varrer(c.data);
+                if (achado3) { return achado3; }
+            }
+        }
+        return null;
+    };
+    var mapa = procurar();
+    if (!mapa) { return false; }
+    estado = window.__autotriMapa = { mapa: mapa, renders: 0, pendentes: 0, erros: 0, fontesComErro: [] };
+    mapa.on('rendercomplete', function () { estado.renders++; });
+}
+var ligar = function (camada) {
+    var fonte = camada.getSource && camada.getSource();
+    if (!fonte || fonte.__autotri) { return; }
+    fonte.__autotri = true;
+    var fim = function () { estado.pendentes = Math.max(0, estado.pendentes - 1); };
+    var erro = function () { fim(); estado.erros++; if (estado.fontesComErro.indexOf(fonte) < 0) { estado.fontesComErro.push(fonte); } };
+    fonte.on('tileloadstart', function () { estado.pendentes++; });
+    fonte.on('tileloadend', fim);
+    fonte.on('tileloaderror', erro);
+    fonte.on('imageloadstart', function () { estado.pendentes++; });
+    fonte.on('imageloadend', fim);
+    fonte.on('imageloaderror', erro);
+};
+var percorrer = function (colecao) {
+    colecao.forEach(function (camada) {
+        if (camada.getLayers) { percorrer(camada.getLayers()); } else { ligar(camada); }
+    });
+};
+percorrer(estado.mapa.getLayers());      // Camadas novas (ex: ortofoto) são ligadas a cada preparação
+estado.renders = 0;
+estado.erros = 0;
+estado.fontesComErro = [];
+estado.mapa.render();
+return true;
+"""
+
+_JS_MAPA_RENDERIZADO = "var e = window.__autotriMapa; return !!e && e.renders > 0 && e.pendentes === 0;"
+_JS_ERROS_MAPA = "var e = window.__autotriMapa; return e ? e.erros : 0;"
+_JS_RECARREGAR_TILES_COM_ERRO = """
+var e = window.__autotriMapa;
+e.fontesComErro.forEach(function (fonte) { if (fonte.refresh) { fonte.refresh(); } });
+e.renders = 0; e.erros = 0; e.fontesComErro = [];
+e.mapa.render();
+"""
+MAX_RETENTATIVAS_VISTA = 2  # Vezes que uma vista com tiles em erro é recarregada antes do print
 
 
 class SisctmAuto:
@@ -45,6 +132,7 @@ class SisctmAuto:
         # WebDriverWait é instanciado aqui e usado como self.wait
         self.wait = WebDriverWait(self.driver, timeout=timeout)
         self.checar_popup = checar_popup 
+        self._ogc: Optional[SisctmOgcClient] = None     # Consulta pelos serviços do mapa (core/sisctm_ogc.py)
 
 
     def _click(self, element) -> None:
@@ -147,14 +235,37 @@ class SisctmAuto:
         return None
     
 
+    def acessar(self) -> bool:
+        """Abre a URL do SISCTM (tela de login do Keycloak ou o mapa, se a sessão já estiver autenticada)."""
+        try:
+            logger.info("Acessando o sistema 3: SISCTM")
+            self.driver.get(self.url)
+            return True
+        except Exception as e:
+            logger.error("Erro ao acessar o SISCTM: %s", e)
+            return False
+
+    def sessao_valida(self) -> bool:
+        """
+        Checagem barata de sessão (usada pelo cofre de sessões): reabre o SISCTM e confere se o mapa
+        (#olmap) é carregado em vez do formulário do Keycloak.
+        """
+        try:
+            self.driver.get(self.url)
+            WebDriverWait(self.driver, 10).until(
+                lambda d: d.find_elements(By.ID, "olmap") or d.find_elements(By.ID, "kc-form-servidor-login")
+            )
+            return bool(self.driver.find_elements(By.ID, "olmap"))
+        except Exception:
+            return False
+
     def login(self) -> bool:
-        """Realiza login no Keycloak PBH em páginas Vue.js."""
+        """Realiza login no Keycloak PBH em páginas Vue.js. Requer acessar() antes."""
         
         try:
             logger.info("Iniciando login no SISCTM")
-            self.driver.get(self.url)
 
-            time.sleep(3)
+            esperar(self.driver, "SISCTM formulário login", pagina_carregada(), elemento_presente((By.ID, "kc-form-servidor-login")), teto=3)
 
             # Espera o formulário completo aparecer
             self.wait.until(
@@ -185,8 +296,16 @@ class SisctmAuto:
             self.driver.execute_script("arguments[0].click();", btn_login)
             logger.info("Login realizado com sucesso")
 
-            time.sleep(10)  # NOTE: o site tem animação e demora pra terminar de carregar,
-                            # mas ter uma forma mais rápida que um sleep de 10 sec fixo pode ser bom (não sei se tem)
+            # NOTE: o site tem animação e demora pra terminar de carregar. Em vez de um sleep fixo de 10 s, espera o mapa
+            #       (#olmap) existir, o Quasar parar de mostrar indicadores de carregamento e o layout da página assentar.
+            esperar(
+                self.driver, "SISCTM pós-login",
+                elemento_presente((By.CSS_SELECTOR, "#olmap .ol-viewport")),
+                quasar_ocioso(),
+                rede_ociosa(),
+                elemento_estavel((By.ID, "olmap"), janela=0.5),
+                teto=10,
+            )
 
             # -----------------------------------------------------------
             # NOTE: Bloco de tratamento da Pop-up "Notas de Versão" - Estratégia "Fail Fast"
@@ -200,7 +319,7 @@ class SisctmAuto:
                        
             !!! A ROTINA ABAIXO SÓ ACONTECE SE A VARIÁVEL  'checar_popup' (que possui valor default) estiver definida no construtor !!!
             
-            -  Essa rotina acontece depois do time.sleep() acima de 10 segs. O pop-up certamente já apareceu 
+            -  Essa rotina acontece depois da espera pós-login acima (até 10 segs). O pop-up geralmente já apareceu 
             (geralmente é a primeira coisa a ser carregada).
             - Aí procuramos o pop-up e fechamos, e se não apareceu, seguimos.      
             
@@ -214,7 +333,7 @@ class SisctmAuto:
 
                     # 1. Procura pelo Checkbox específico da pop-up (via aria-label, que é estável)
                     # Define um timeout máximo de 3 segundos pra visibilidade do "Mostrar Novamente" checkbox no pop-up
-                    # NOTE: isso é mais uma dupla segurança - uma vez que já rolou 10 segs de sleep ao fim do login.
+                    # NOTE: isso é mais uma dupla segurança - uma vez que já rolou a espera pós-login (até 10 segs).
                     checkbox_popup = WebDriverWait(self.driver, 3).until(   
                         EC.visibility_of_element_located((
                             By.XPATH, 
@@ -228,7 +347,11 @@ class SisctmAuto:
                     if is_checked == "false":
                         self._click(checkbox_popup)
                         logger.info("Opção 'Não mostrar novamente' marcada.")
-                        time.sleep(0.5) # Breve respiro para a animação do check
+                        esperar(   # Breve respiro para a animação do check
+                            self.driver, "SISCTM check pop-up",
+                            lambda d: checkbox_popup.get_attribute("aria-checked") == "true",
+                            teto=0.5,
+                        )
                     
                     # 3. Fechar a Pop-up - Busca o ícone 'close' visível.
                     btn_fechar = self.driver.find_element(
@@ -282,7 +405,11 @@ class SisctmAuto:
             )
             self._click(btn_menu)
             logger.info("Menu expandido com sucesso")
-            time.sleep(1)
+            esperar(
+                self.driver, "SISCTM menu",
+                elemento_estavel((By.XPATH, "//div[contains(@class,'q-item__section') and contains(text(),'Fazenda')]")),
+                teto=1,
+            )
             
             # Clica no item Fazenda
             etapa = "selecionar Fazenda"
@@ -297,7 +424,7 @@ class SisctmAuto:
             )
             self._click(item_fazenda)
             logger.info("Item 'Fazenda' marcado")
-            time.sleep(0.5)
+            esperar(self.driver, "SISCTM item Fazenda", quasar_ocioso(), teto=0.5)
 
             # Desativa IDE-BHGeo
             etapa = "desativar IDE-BHGeo"
@@ -312,7 +439,7 @@ class SisctmAuto:
             )
             self._click(item_idebhgeo)
             logger.info("Item 'IDE-BHGeo' desativado")
-            time.sleep(0.5)
+            esperar(self.driver, "SISCTM item IDE-BHGeo", quasar_ocioso(), teto=0.5)
 
             # Abre camadas
             etapa = "abrir camadas"
@@ -327,7 +454,7 @@ class SisctmAuto:
             )
             self._click(btn_camadas)
             logger.info("Menu de camadas aberto")
-            time.sleep(1)
+            esperar(self.driver, "SISCTM menu camadas", elemento_estavel((By.XPATH, "//div[text()='Endereço']")), teto=1)
 
             # CAMADA ENDEREÇO
             etapa = "selecionar Endereço"
@@ -340,7 +467,11 @@ class SisctmAuto:
             )
             self._click(menu_endereco)
             logger.info("Menu 'Endereço' selecionado")
-            time.sleep(0.5)
+            esperar(
+                self.driver, "SISCTM camada Endereço",
+                elemento_estavel((By.XPATH, "//img[contains(@src,'FazendaEnderecoPBH')]"), janela=0.2),
+                teto=0.5,
+            )
 
             etapa = "marcar Endereço PBH"
             logger.debug("Localizando container da camada 'Endereço'...")
@@ -362,7 +493,7 @@ class SisctmAuto:
             )
             self._click(endereco_pbh_checkbox)
             logger.info("Camada 'Endereço PBH' marcada")
-            time.sleep(0.5)
+            esperar(self.driver, "SISCTM check Endereço PBH", quasar_ocioso(), teto=0.5)
 
             # CAMADA PARCELAMENTO DO SOLO
             etapa = "selecionar Parcelamento do Solo"
@@ -377,7 +508,11 @@ class SisctmAuto:
             )
             self._click(menu_parcelamento)
             logger.info("Menu 'Parcelamento do Solo' selecionado")
-            time.sleep(0.5)
+            esperar(
+                self.driver, "SISCTM camada Parcelamento",
+                elemento_estavel((By.XPATH, "//img[contains(@src,'FazendaLoteCP')]"), janela=0.2),
+                teto=0.5,
+            )
 
             etapa = "marcar Lote CP - ATIVO"
             logger.debug("Localizando container da camada 'Parcelamento do Solo'...")
@@ -399,7 +534,7 @@ class SisctmAuto:
             )
             self._click(lote_cp_checkbox)
             logger.info("Camada 'Lote CP - ATIVO' marcada")
-            time.sleep(0.5)
+            esperar(self.driver, "SISCTM check Lote CP", quasar_ocioso(), teto=0.5)
 
             # CAMADA TRIBUTÁRIO E FILTRO
             etapa = "selecionar Tributário"
@@ -412,7 +547,14 @@ class SisctmAuto:
             )
             self._click(camada_tributario)
             logger.info("Camada 'Tributário' selecionada")
-            time.sleep(0.5)
+            esperar(
+                self.driver, "SISCTM camada Tributário",
+                elemento_estavel(
+                    (By.XPATH, "//div[text()='Tributário']/ancestor::div[contains(@class,'q-tree__node')]//i[text()='more_vert']"),
+                    janela=0.2,
+                ),
+                teto=0.5,
+            )
 
             etapa = "abrir menu CTM GEO"
             logger.debug("Localizando container da camada 'Tributário'...")
@@ -486,12 +628,17 @@ class SisctmAuto:
             )
             self._click(btn_aplicar)
             logger.info("Filtro aplicado com sucesso")
-            time.sleep(5)
+            esperar(self.driver, "SISCTM aplicar filtro", quasar_ocioso(), rede_ociosa(), minimo=0.5, teto=5)
 
             etapa = "fechar janela filtro"
             self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
             logger.info("Janela do filtro fechada")
-            time.sleep(5)
+            # O mapa anima o zoom até o lote filtrado: respiro mínimo para a animação, depois espera os dados do mapa
+            esperar(
+                self.driver, "SISCTM fechar filtro",
+                elemento_ausente((By.XPATH, "//span[text()='Aplicar']")), quasar_ocioso(), rede_ociosa(),
+                minimo=1.0, teto=5,
+            )
 
             etapa = "clique centro do mapa"
             self._clique_centro_mapa()
@@ -509,6 +656,7 @@ class SisctmAuto:
             )
             return False
 
+    @sem_bloqueio_rede
     def _prints_aereo(self) -> None: 
         """
         Realiza a captura de tela do mapa em duas visualizações: Vetorial e Ortofoto.
@@ -518,10 +666,11 @@ class SisctmAuto:
         """
         
         # Print AEREO CTM
-        time.sleep(15)
+        self._esperar_mapa_renderizado("SISCTM mapa aéreo", teto=15)
         screenshot_path = os.path.join(self.pasta_download, "CTM_Aereo.png")
         self.driver.save_screenshot(screenshot_path)
         logger.info("Print da tela salvo")
+        descobrir_vista(self.driver, "aereo")   # Camadas do print, para as próximas imagens pelos serviços (core/sisctm_mapa.py)
 
         # Clica no elemento "BHMap"
         elemento_bhmap = self.wait.until(
@@ -534,7 +683,11 @@ class SisctmAuto:
         )
         self._click(elemento_bhmap)
         logger.info("Elemento 'BHMap' clicado")
-        time.sleep(2)
+        esperar(
+            self.driver, "SISCTM seletor de mapas",
+            elemento_estavel((By.XPATH, "//div[contains(@class,'ellipsis') and text()='Ortofoto 2015']")),
+            teto=2,
+        )
 
         # Seleciona a ortofoto 2015
         elemento_ortofoto = self.wait.until(
@@ -547,15 +700,54 @@ class SisctmAuto:
         )
         self._click(elemento_ortofoto)
         logger.info("Ortofoto selecionada")
-        time.sleep(10)
+        self._esperar_mapa_renderizado("SISCTM ortofoto", teto=10)
 
         # Print AEREO ORTO
         screenshot_path_orto = os.path.join(self.pasta_download, "CTM_Orto.png")
         self.driver.save_screenshot(screenshot_path_orto)
         logger.info("Print da tela salvo")
+        descobrir_vista(self.driver, "orto")
 
         return
 
+    def _esperar_mapa_renderizado(self, nome: str, teto: float) -> bool:
+        """
+        Espera o mapa OpenLayers terminar de desenhar a vista atual (evento 'rendercomplete', sem tiles pendentes).
+        Se algum tile der erro, recarrega só as fontes com erro e espera a mesma vista de novo (até MAX_RETENTATIVAS_VISTA vezes).
+        Se o objeto do mapa não for encontrado na página, cai para a espera por rede ociosa.
+
+        :param nome: Nome da espera (log e estatísticas).
+        :param teto: Segundos máximos de espera por tentativa.
+        :return: True se o mapa terminou de renderizar sem erros de tile.
+        """
+        try:
+            gancho = self.driver.execute_script(_JS_GANCHO_MAPA)
+        except WebDriverException as e:
+            logger.debug(f"Falha ao instalar o gancho no mapa OpenLayers: {e}")
+            gancho = False
+
+        if not gancho:
+            logger.debug("Mapa OpenLayers não encontrado na página - usando espera por rede ociosa.")
+            return esperar(self.driver, nome, quasar_ocioso(), rede_ociosa(), minimo=0.5, teto=teto)
+
+        for tentativa in range(MAX_RETENTATIVAS_VISTA + 1):
+            # Respiro mínimo: a troca de camada (Vue) pode chegar ao mapa depois do render() disparado pelo gancho
+            renderizado = esperar(
+                self.driver, nome,
+                lambda d: d.execute_script(_JS_MAPA_RENDERIZADO), quasar_ocioso(),
+                minimo=0.3, teto=teto,
+            )
+            erros = self.driver.execute_script(_JS_ERROS_MAPA)
+            if renderizado and not erros:
+                return True
+            if not erros or tentativa == MAX_RETENTATIVAS_VISTA:
+                break
+            logger.info(f"{erros} tile(s) do mapa com erro - recarregando a vista ({tentativa + 1}/{MAX_RETENTATIVAS_VISTA}).")
+            self.driver.execute_script(_JS_RECARREGAR_TILES_COM_ERRO)
+
+        logger.warning(f"Mapa não terminou de renderizar por completo antes do print ({nome}).")
+        return False
+
     def _clique_centro_mapa(self) -> None:
         """
         Clica no centro do mapa (elemento canva).
@@ -574,7 +766,7 @@ class SisctmAuto:
             action.move_to_element(viewport).click().perform()
             logger.info("Clique no centro do mapa realizado")
 
-            time.sleep(5)
+            esperar(self.driver, "SISCTM informações do lote", quasar_ocioso(), rede_ociosa(), minimo=0.5, teto=5)
 
         except NoSuchElementException as e:
             logger.error(f"Elemento do mapa não encontrado: {e}")
@@ -583,7 +775,63 @@ class SisctmAuto:
         except Exception as e:
             logger.error(f"Erro inesperado ao clicar no mapa: {e}")
 
-    def capturar_areas(self) -> Dict[str, Optional[str]]:
+    def _cliente_ogc(self) -> SisctmOgcClient:
+        """Cliente dos serviços do mapa com a sessão (cookies) deste navegador."""
+        if self._ogc is None:
+            self._ogc = SisctmOgcClient(sessao_http(self.driver))
+        return self._ogc
+
+    def capturar_por_servicos(self, indice_cadastral: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Triagem do lote só pelos serviços do mapa, sem tocar na interface: áreas e endereço (core/sisctm_ogc.py) e as
+        imagens CTM_Aereo.png / CTM_Orto.png (core/sisctm_mapa.py).
+
+        :param indice_cadastral: Índice do lote.
+        :return: O dicionário de capturar_areas(...), ou None se os serviços ainda não foram descobertos ou falharam
+                 (segue-se pela interface: ativar_camadas(...) e capturar_areas(...)).
+        """
+        if not vistas_disponiveis():
+            return None
+        try:
+            cliente = self._cliente_ogc()
+            resultado = cliente.consultar(indice_cadastral)
+            RenderizadorMapa(cliente.sessao).renderizar_lote(indice_cadastral, self.pasta_download)
+        except ErroOgcSisctm as e:
+            logger.warning(f"Triagem pelos serviços do mapa falhou ({e}) - seguindo pela interface.")
+            return None
+        logger.info(f"[SUCESSO] Lote triado pelos serviços do mapa (sem a interface): {resultado}")
+        return resultado
+
+    def capturar_areas(self, indice_cadastral: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """
+        Captura as áreas e o endereço do lote. Com o índice cadastral e os serviços do mapa já descobertos, consulta
+        direto os serviços (core/sisctm_ogc.py); senão, ou se a consulta falhar, lê o painel de Informações e
+        aproveita a leitura para (re)descobrir os serviços e os atributos de cada campo.
+
+        :param indice_cadastral: [OPCIONAL] Índice do lote (sem ele só o painel é lido).
+        :return: O dicionário de _ler_painel_informacoes(...).
+        """
+        if indice_cadastral and servicos_sisctm.completos:
+            try:
+                cliente = self._cliente_ogc()
+                if cliente.disponivel():
+                    resultado = cliente.consultar(indice_cadastral)
+                    logger.info(f"[SUCESSO] Áreas e endereço do lote pelos serviços do mapa: {resultado}")
+                    return resultado
+            except ErroOgcSisctm as e:
+                logger.warning(f"Consulta aos serviços do mapa falhou ({e}) - lendo o painel de Informações.")
+
+        lidos: Dict[str, Dict[str, str]] = {"iptu": {}, "lote_cp": {}}
+        resultado = self._ler_painel_informacoes(lidos)
+        if indice_cadastral and resultado:
+            try:
+                if descobrir_servicos(self.driver):
+                    self._cliente_ogc().aprender_campos(indice_cadastral, lidos)
+            except Exception as e:
+                logger.debug(f"Serviços do mapa do SISCTM não aprendidos: {e}")
+        return resultado
+
+    def _ler_painel_informacoes(self, lidos: Dict[str, Dict[str, str]]) -> Dict[str, Optional[str]]:
         """
         Captura dados tabulares exibidos no painel lateral de Informações apósa seleção de um lote no mapa.
         A rotina garante previamente o foco no painel de Informações e realiza extrações independentes por bloco funcional, 
@@ -594,6 +842,8 @@ class SisctmAuto:
       - Endereço formatado a partir dos campos disponíveis;
       - Lote CP - ATIVO (área informada).
         
+        :param lidos: Recebe os textos crus lidos em cada bloco ({"iptu": {...}, "lote_cp": {...}}, campos de
+                      CAMPOS_PADRAO em core/sisctm_ogc.py) - usados para aprender os atributos dos serviços do mapa.
         :return: Dicionário contendo os dados extraídos (ou None, em caso de falha total):
                  - 'iptu_ctm_geo_area': Área do IPTU.
                  - 'iptu_ctm_geo_area_terreno': Área do terreno.
@@ -653,7 +903,11 @@ class SisctmAuto:
                         lambda x: x.get_attribute("aria-expanded") == "true"
                     )
                     logger.info(f"{nome_item} ativado")
-                    time.sleep(3)
+                    esperar(
+                        self.driver, "SISCTM expandir painel",
+                        lambda d: item.find_elements(By.XPATH, ".//table//tr"), quasar_ocioso(),
+                        teto=3,
+                    )
                 else:
                     logger.info(f"{nome_item} já está ativo")
                 return item
@@ -678,6 +932,7 @@ class SisctmAuto:
                 )
                 valor = linha_area.text.strip()
                 resultado["iptu_ctm_geo_area"] = valor
+                lidos["iptu"]["area"] = valor
                 logger.info(f"[SUCESSO] Área Construída (IPTU): {valor}")
             except TimeoutException:
                 logger.warning("Não foi possível capturar área IPTU CTM GEO")
@@ -692,6 +947,7 @@ class SisctmAuto:
                 )
                 valor = linha_area_terreno.text.strip()
                 resultado["iptu_ctm_geo_area_terreno"] = valor
+                lidos["iptu"]["area_terreno"] = valor
                 logger.info(f"[SUCESSO] Área Terreno (IPTU): {valor}")
             except TimeoutException:
                 logger.warning("Não foi possível capturar AREA TERRENO")
@@ -717,14 +973,10 @@ class SisctmAuto:
                     except TimeoutException:
                         valores[chave] = ""
 
-                # Tratamento: Remove pontos do número do imóvel
-                valores["numero_imovel"] = valores["numero_imovel"].replace(".", "")
+                lidos["iptu"].update(valores)
 
-                # Monta o endereço no formato desejado
-                endereco = f"{valores['tipo_logradouro']} {valores['nome_logradouro']}, {valores['numero_imovel']}"
-                if valores["complemento"]:
-                    endereco += f" {valores['complemento']}"
-                endereco += f" - Belo Horizonte - MG, {valores['cep']}"
+                # Monta o endereço no formato desejado (sem os pontos do número do imóvel)
+                endereco = montar_endereco(valores)
 
                 resultado["endereco_ctmgeo"] = endereco
                 logger.info(f"[SUCESSO] Endereço montado: {endereco}")
@@ -754,6 +1006,7 @@ class SisctmAuto:
                     if len(colunas) >= 2:
                         valor: str = colunas[1].text.strip() 
                         resultado["lote_cp_ativo_area_informada"] = valor
+                        lidos["lote_cp"]["area_informada"] = valor
                         logger.info(f"[SUCESSO] Área Lote CP: {valor}")
                     else:
                          logger.warning("Não foi possível encontrar a coluna de valor na linha de área.")
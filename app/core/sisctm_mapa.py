@@ -0,0 +1,243 @@
+import io
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from PIL import Image, ImageDraw
+
+from utils import logger, http_direto_habilitado
+from .sisctm_ogc import (
+    JS_FONTES_MAPA,
+    ErroOgcSisctm,
+    ServicosSisctm,
+    SisctmOgcClient,
+    caixa_geometria,
+    servicos_sisctm,
+)
+
+'''
+==================================================================================================================================
+Imagens de evidência do mapa do SISCTM (CTM_Aereo.png e CTM_Orto.png) montadas direto dos serviços do mapa, sem navegador.
+
+Os prints eram save_screenshot(...) da tela inteira depois de filtrar o lote na interface, trocar o mapa base no seletor
+(BHMap -> Ortofoto 2015) e esperar todos os tiles desenharem - dezenas de segundos por IC, com o navegador ocupado.
+
+Agora cada vista é a pilha de camadas que estava visível no mapa na hora do print (descobrir_vista(...), chamada logo
+depois de cada print pela interface e guardada junto com os serviços do mapa em ServicosSisctm):
+
+    - camadas WMS:        uma requisição GetMap do enquadramento do lote;
+    - camadas em tiles:   os tiles (XYZ ou WMTS) que cobrem o enquadramento, baixados em paralelo e costurados;
+    - o lote:             o contorno da geometria do IPTU CTM GEO (WFS, core/sisctm_ogc.py) desenhado por cima - no lugar
+                          da camada filtrada pelo índice, que não é reaproveitada (o filtro é do IC do print).
+
+As imagens têm o tamanho dos prints (LARGURA x ALTURA), com o lote centralizado ocupando até FRACAO_LOTE da imagem.
+Só precisam da sessão HTTP autenticada (a mesma do SisctmOgcClient), sem nenhuma interação com a interface do mapa.
+Qualquer falha (vista não descoberta, resposta que não é imagem, tiles demais) levanta ErroOgcSisctm: o SisctmAuto tira
+os prints pela interface, como antes - e redescobre as vistas.
+==================================================================================================================================
+'''
+
+LARGURA, ALTURA = 1920, 1080    # Tamanho das imagens (o mesmo dos prints da tela)
+FRACAO_LOTE = 0.35              # Fração máxima da largura/altura da imagem ocupada pelo lote
+COR_CONTORNO = (255, 255, 0, 255)
+ESPESSURA_CONTORNO = 4
+MAX_TILES = 96                  # Tiles por camada: mais que isso indica grade/enquadramento errado
+MAX_TILES_PARALELOS = 8
+TEMPO_IMAGEM = 30               # Segundos para cada GetMap/tile
+
+# (vista, arquivo gerado) - na ordem dos prints da interface
+VISTAS = (
+    ("aereo", "CTM_Aereo.png"),
+    ("orto", "CTM_Orto.png"),
+)
+
+# Parâmetros de filtro: a camada com eles mostra só o IC do print e não serve para outros lotes
+PARAMETROS_FILTRO = {"CQL_FILTER", "FILTER", "FEATUREID"}
+
+
+def descobrir_vista(driver, vista: str, servicos: ServicosSisctm = servicos_sisctm) -> bool:
+    """
+    Guarda as camadas visíveis no mapa agora (logo depois do print da 'vista' pela interface).
+
+    :return: True se ao menos uma camada da vista pode ser montada pelos serviços.
+    """
+    try:
+        mapa = driver.execute_script(JS_FONTES_MAPA)
+    except Exception as e:
+        logger.debug(f"Não foi possível ler as camadas do mapa do SISCTM: {e}")
+        return False
+    if not mapa:
+        return False
+
+    fontes = []
+    for fonte in mapa.get("fontes") or []:
+        params = {chave.upper(): valor for chave, valor in (fonte.get("params") or {}).items()}
+        if not fonte.get("visivel") or not fonte.get("urls") or PARAMETROS_FILTRO & set(params):
+            continue
+        if fonte.get("opacidade") is not None and fonte["opacidade"] <= 0:     # Transparente: não aparece no print
+            continue
+        if fonte["tipo"] == "wms" or fonte.get("grade"):
+            fontes.append(fonte)
+    if not fontes:
+        return False
+    servicos.atualizar(crs=mapa.get("crs"), vistas={**(servicos.dados.get("vistas") or {}), vista: fontes})
+    logger.debug(f"Vista '{vista}' do mapa do SISCTM: {', '.join(f['titulo'] or f['camadas'] for f in fontes)}")
+    return True
+
+
+def vistas_disponiveis(servicos: ServicosSisctm = servicos_sisctm) -> bool:
+    """True se as imagens podem ser montadas pelos serviços (vistas descobertas, lote consultável, modo HTTP ligado)."""
+    vistas = servicos.dados.get("vistas") or {}
+    return http_direto_habilitado() and servicos.completos and all(vistas.get(vista) for vista, _arquivo in VISTAS)
+
+
+# ------------------------------------------------------------------------------------------- enquadramento
+class Enquadramento:
+    """Área do mapa coberta pela imagem: centro no lote, mesma resolução (unidades do CRS por pixel) nos dois eixos."""
+
+    def __init__(self, geometria: Dict[str, Any], largura: int = LARGURA, altura: int = ALTURA):
+        xmin, ymin, xmax, ymax = caixa_geometria(geometria)
+        self.largura, self.altura = largura, altura
+        cx, cy = (xmin + xmax) / 2, (ymin + ymax) / 2
+        self.resolucao = max((xmax - xmin) / (largura * FRACAO_LOTE), (ymax - ymin) / (altura * FRACAO_LOTE), 1e-9)
+        meia_largura, meia_altura = largura * self.resolucao / 2, altura * self.resolucao / 2
+        self.caixa = (cx - meia_largura, cy - meia_altura, cx + meia_largura, cy + meia_altura)
+
+    def pixel(self, x: float, y: float) -> Tuple[float, float]:
+        return (x - self.caixa[0]) / self.resolucao, (self.caixa[3] - y) / self.resolucao
+
+
+# ------------------------------------------------------------------------------------------- camadas
+def _url_tile(fonte: Dict[str, Any], z: int, coluna: int, linha: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(URL, parâmetros) de um tile XYZ ou WMTS (KVP ou REST) na grade descoberta."""
+    modelo = fonte["urls"][(coluna + linha) % len(fonte["urls"])]
+    matrizes = fonte["grade"].get("matrizes")
+    matriz = str(matrizes[z]) if matrizes else str(z)
+    wmts = fonte.get("wmts")
+    if not wmts:
+        return (modelo.replace("{z}", str(z)).replace("{x}", str(coluna)).replace("{y}", str(linha))
+                .replace("{-y}", str((1 << z) - 1 - linha))), None
+    if wmts.get("codificacao") == "REST":
+        for chave, valor in (("{TileMatrix}", matriz), ("{TileCol}", coluna), ("{TileRow}", linha),
+                             ("{Style}", wmts.get("estilo") or ""), ("{TileMatrixSet}", wmts.get("matriz") or "")):
+            modelo = modelo.replace(chave, str(valor))
+        return modelo, None
+    return modelo, {
+        "SERVICE": "WMTS", "REQUEST": "GetTile", "VERSION": "1.0.0", "LAYER": wmts["camada"],
+        "STYLE": wmts.get("estilo") or "", "TILEMATRIXSET": wmts["matriz"], "TILEMATRIX": matriz,
+        "TILEROW": linha, "TILECOL": coluna, "FORMAT": wmts.get("formato") or "image/png",
+    }
+
+
+class RenderizadorMapa:
+    """
+    Monta as imagens de evidência de um lote a partir das vistas descobertas (ServicosSisctm).
+
+    Parâmetros:
+        sessao (requests.Session): Sessão HTTP autenticada no SISCTM (sessao_http(driver)).
+    """
+
+    def __init__(self, sessao: requests.Session, servicos: ServicosSisctm = servicos_sisctm):
+        self.sessao = sessao
+        self.servicos = servicos
+
+    def _baixar_imagem(self, url: str, params: Optional[Dict[str, Any]], ausente_vazio: bool = False) -> Optional[Image.Image]:
+        """Imagem de um GetMap/tile. Com ausente_vazio, um tile inexistente (404) volta None em vez de falhar."""
+        try:
+            resposta = self.sessao.get(url, params=params, timeout=TEMPO_IMAGEM)
+            if ausente_vazio and resposta.status_code == 404:
+                return None
+            resposta.raise_for_status()
+            if not resposta.headers.get("Content-Type", "").lower().startswith("image/"):
+                raise ErroOgcSisctm(f"o serviço não devolveu uma imagem ({resposta.headers.get('Content-Type')})")
+            return Image.open(io.BytesIO(resposta.content)).convert("RGBA")
+        except (requests.RequestException, OSError) as e:
+            raise ErroOgcSisctm(f"imagem do mapa não baixada: {e}") from e
+
+    def _camada_wms(self, fonte: Dict[str, Any], quadro: Enquadramento) -> Image.Image:
+        params = {chave.upper(): valor for chave, valor in (fonte.get("params") or {}).items()}
+        params.update({
+            "SERVICE": "WMS", "VERSION": "1.1.1", "REQUEST": "GetMap", "SRS": self.servicos.crs,
+            "BBOX": ",".join(str(v) for v in quadro.caixa), "WIDTH": quadro.largura, "HEIGHT": quadro.altura,
+            "FORMAT": "image/png", "TRANSPARENT": "TRUE", "STYLES": params.get("STYLES", ""),
+        })
+        params.pop("CRS", None)
+        imagem = self._baixar_imagem(fonte["urls"][0], params)
+        return imagem.resize((quadro.largura, quadro.altura)) if imagem.size != (quadro.largura, quadro.altura) else imagem
+
+    def _camada_tiles(self, fonte: Dict[str, Any], quadro: Enquadramento) -> Image.Image:
+        grade = fonte["grade"]
+        resolucoes = grade["resolucoes"]
+        # Nível com resolução igual ou mais fina que a da imagem (ou o mais fino da grade)
+        z = next((i for i, r in enumerate(resolucoes) if r <= quadro.resolucao * 1.0001), len(resolucoes) - 1)
+        resolucao, (ox, oy) = resolucoes[z], grade["origens"][z][:2]
+        largura_tile, altura_tile = grade["tamanho"]
+        xmin, ymin, xmax, ymax = quadro.caixa
+        col0, col1 = math.floor((xmin - ox) / (largura_tile * resolucao)), math.floor((xmax - ox) / (largura_tile * resolucao))
+        lin0, lin1 = math.floor((oy - ymax) / (altura_tile * resolucao)), math.floor((oy - ymin) / (altura_tile * resolucao))
+        posicoes = [(c, l) for l in range(lin0, lin1 + 1) for c in range(col0, col1 + 1)]
+        if len(posicoes) > MAX_TILES:
+            raise ErroOgcSisctm(f"{len(posicoes)} tiles para a camada '{fonte.get('titulo')}' - grade inesperada")
+
+        with ThreadPoolExecutor(max_workers=MAX_TILES_PARALELOS, thread_name_prefix="tiles_sisctm") as executor:
+            tiles = list(executor.map(lambda p: self._baixar_imagem(*_url_tile(fonte, z, *p), ausente_vazio=True), posicoes))
+
+        mosaico = Image.new("RGBA", ((col1 - col0 + 1) * largura_tile, (lin1 - lin0 + 1) * altura_tile))
+        for (coluna, linha), tile in zip(posicoes, tiles):
+            if tile is not None:
+                mosaico.paste(tile.resize((largura_tile, altura_tile)), ((coluna - col0) * largura_tile, (linha - lin0) * altura_tile))
+        # Recorta o enquadramento no mosaico (cujo canto superior esquerdo é o do tile col0/lin0) e leva ao tamanho final
+        x0, y0 = ox + col0 * largura_tile * resolucao, oy - lin0 * altura_tile * resolucao
+        recorte = ((xmin - x0) / resolucao, (y0 - ymax) / resolucao, (xmax - x0) / resolucao, (y0 - ymin) / resolucao)
+        return mosaico.resize((quadro.largura, quadro.altura), Image.BILINEAR, box=recorte)
+
+    def _contorno(self, imagem: Image.Image, geometria: Dict[str, Any], quadro: Enquadramento) -> None:
+        desenho = ImageDraw.Draw(imagem)
+        tipo, coordenadas = geometria.get("type"), geometria.get("coordinates") or []
+        poligonos = [coordenadas] if tipo == "Polygon" else coordenadas if tipo == "MultiPolygon" else []
+        for poligono in poligonos:
+            for anel in poligono:
+                pontos = [quadro.pixel(x, y) for x, y, *_ in anel]
+                desenho.line(pontos + pontos[:1], fill=COR_CONTORNO, width=ESPESSURA_CONTORNO, joint="curve")
+
+    def renderizar(self, geometria: Dict[str, Any], vista: str, caminho: str) -> str:
+        """Monta a imagem de uma vista com o contorno do lote e grava em 'caminho' (PNG)."""
+        fontes = (self.servicos.dados.get("vistas") or {}).get(vista)
+        if not fontes:
+            raise ErroOgcSisctm(f"vista '{vista}' do mapa não descoberta")
+        quadro = Enquadramento(geometria)
+        imagem = Image.new("RGBA", (quadro.largura, quadro.altura), (255, 255, 255, 255))
+        for fonte in fontes:
+            opacidade = 1.0 if fonte.get("opacidade") is None else fonte["opacidade"]     # "opacidade": null no mapa = opaca
+            if opacidade <= 0:
+                continue
+            camada = self._camada_wms(fonte, quadro) if fonte["tipo"] == "wms" else self._camada_tiles(fonte, quadro)
+            if opacidade < 1:
+                camada.putalpha(camada.getchannel("A").point(lambda a: int(a * opacidade)))
+            imagem.alpha_composite(camada)
+        self._contorno(imagem, geometria, quadro)
+
+        temporario = caminho + ".part"
+        try:
+            imagem.convert("RGB").save(temporario, format="PNG")
+            os.replace(temporario, caminho)
+        except OSError as e:
+            raise ErroOgcSisctm(f"imagem do mapa não gravada: {e}") from e
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return caminho
+
+    def renderizar_lote(self, indice: str, pasta: str, geometria: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Grava CTM_Aereo.png e CTM_Orto.png do lote na pasta.
+
+        :param geometria: [OPCIONAL] Geometria do lote, se já consultada (senão vem do WFS do IPTU CTM GEO).
+        :return: Os caminhos das imagens.
+        :raises ErroOgcSisctm: Em qualquer falha.
+        """
+        if geometria is None:
+            geometria = SisctmOgcClient(self.sessao, self.servicos).feicao_lote(indice).get("geometry") or {}
+        return [self.renderizar(geometria, vista, os.path.join(pasta, arquivo)) for vista, arquivo in VISTAS]
@@ -0,0 +1,469 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from xml.sax.saxutils import escape
+
+import requests
+
+from utils import logger, parse_area, http_direto_habilitado
+from utils.pastas import pasta_dados
+
+'''
+==================================================================================================================================
+Consulta dos atributos do lote direto nos serviços OGC do mapa do SISCTM (WFS / WMS GetFeatureInfo), sem a interface.
+
+O SisctmAuto.capturar_areas(...) clicava no centro do mapa, expandia os painéis "IPTU CTM GEO" e "Lote CP - ATIVO" e lia
+linhas fixas da tabela (tr[24]..tr[28] para o endereço) - lento (esperas de vários segundos por painel/linha) e frágil
+(qualquer atributo novo na camada desloca as linhas). O mapa é OpenLayers sobre serviços OGC (GeoServer):
+
+    - IPTU CTM GEO: WFS GetFeature filtrado pelo índice cadastral (o mesmo atributo _INDICE_CADASTRAL do filtro da
+      interface) - CQL_FILTER e, se o servidor não aceitar, o filtro OGC padrão (FILTER). A geometria volta junto;
+    - Lote CP - ATIVO: WMS GetFeatureInfo num ponto interno do lote do IPTU (o equivalente ao clique no mapa).
+
+As URLs dos serviços e os nomes das camadas não são fixos no código: descobrir_servicos(...) lê as fontes das camadas do
+próprio mapa (objeto ol.Map encontrado pelo gancho dos prints, window.__autotriMapa) depois que a interface ativou as
+camadas. Os atributos de cada campo (ÁREA, AREA_TERRENO, logradouro...) partem de nomes padrão e são confirmados com
+aprender_campos(...): os valores lidos no painel pela interface são procurados entre os atributos devolvidos pelo serviço.
+Tudo fica em disco (ServicosSisctm, <pasta de dados>/sisctm/servicos_ogc.json) e vale para as próximas triagens.
+
+A interface continua sendo o caminho de referência: sem serviços descobertos, com o modo HTTP desligado
+(AUTOTRI_HTTP_DIRETO=0) ou em qualquer resposta inesperada (ErroOgcSisctm), o painel é lido como antes - e os serviços
+são (re)descobertos. AUTOTRI_SISCTM_OGC_URL aponta as consultas para outro servidor (ex: um servidor local de testes
+com as mesmas camadas).
+==================================================================================================================================
+'''
+
+VARIAVEL_OGC_URL = "AUTOTRI_SISCTM_OGC_URL"
+ARQUIVO_SERVICOS = "servicos_ogc.json"
+TEMPO_OGC = 15                  # Segundos para cada consulta aos serviços
+CRS_PADRAO = "EPSG:31983"       # SIRGAS 2000 / UTM 23S - usado se a projeção do mapa não foi descoberta
+ATRIBUTO_INDICE = "_INDICE_CADASTRAL"
+PIXELS_CONSULTA = 101           # Largura/altura da "imagem" do GetFeatureInfo (o ponto consultado é o pixel central)
+
+# Trechos do nome (ou título) de cada camada no mapa, sem acentos nem separadores - em ordem de preferência
+CAMADAS = {
+    "iptu": ("IPTUCTMGEO", "IPTUCTM", "IPTU"),
+    "lote_cp": ("LOTECPATIVO", "LOTECP"),
+}
+
+# Atributo de cada campo nas camadas (nomes padrão, substituídos pelos aprendidos em aprender_campos)
+CAMPOS_PADRAO = {
+    "iptu": {
+        "area": "ÁREA",
+        "area_terreno": "AREA_TERRENO",
+        "tipo_logradouro": "TIPO_LOGRADOURO",
+        "nome_logradouro": "NOME_LOGRADOURO",
+        "numero_imovel": "NUMERO_IMOVEL",
+        "complemento": "COMPLEMENTO",
+        "cep": "CEP",
+    },
+    "lote_cp": {
+        "area_informada": "AREA_INFORMADA",
+    },
+}
+
+# Fontes de todas as camadas do mapa, na ordem de desenho (requer o gancho _JS_GANCHO_MAPA de core/sisctm.py já instalado):
+# tipo, URLs, parâmetros WMS, visibilidade e opacidade efetivas (com as do grupo) e, nas fontes em tiles, a grade de tiles
+JS_FONTES_MAPA = """
+var e = window.__autotriMapa;
+if (!e) { return null; }
+var absoluta = function (u) { return /^https?:/i.test(u) || u.indexOf('{') >= 0 ? u : new URL(u, document.baseURI).href; };
+var fontes = [];
+var percorrer = function (colecao, visivel, opacidade) {
+    colecao.forEach(function (camada) {
+        var v = visivel && camada.getVisible(), o = opacidade * camada.getOpacity();
+        if (camada.getLayers) { percorrer(camada.getLayers(), v, o); return; }
+        var fonte = camada.getSource && camada.getSource();
+        if (!fonte) { return; }
+        var urls = fonte.getUrls ? fonte.getUrls() : null;
+        if (!urls && fonte.getUrl) { urls = [fonte.getUrl()]; }
+        var params = fonte.getParams ? fonte.getParams() : null;
+        var grade = null, g = !params && fonte.getTileGrid ? fonte.getTileGrid() : null;
+        if (g) {
+            var resolucoes = g.getResolutions(), tamanho = g.getTileSize(0);
+            grade = {
+                resolucoes: resolucoes,
+                origens: resolucoes.map(function (r, z) { return g.getOrigin(z); }),
+                tamanho: typeof tamanho === 'number' ? [tamanho, tamanho] : tamanho,
+                matrizes: g.getMatrixIds ? g.getMatrixIds() : null
+            };
+        }
+        fontes.push({
+            titulo: String(camada.get('title') || camada.get('name') || camada.get('nome') || ''),
+            visivel: v,
+            opacidade: o,
+            tipo: params ? 'wms' : (fonte.getLayer ? 'wmts' : 'xyz'),
+            urls: (urls || []).filter(function (u) { return typeof u === 'string'; }).map(absoluta),
+            camadas: params ? String(params.LAYERS || params.layers || '') : (fonte.getLayer ? String(fonte.getLayer()) : ''),
+            params: params,
+            grade: grade,
+            wmts: fonte.getLayer ? {
+                camada: fonte.getLayer(), matriz: fonte.getMatrixSet(), formato: fonte.getFormat(),
+                estilo: fonte.getStyle(), codificacao: fonte.getRequestEncoding()
+            } : null
+        });
+    });
+};
+percorrer(e.mapa.getLayers(), true, 1);
+return {crs: e.mapa.getView().getProjection().getCode(), fontes: fontes};
+"""
+
+
+class ErroOgcSisctm(Exception):
+    """A consulta aos serviços do mapa não pôde ser concluída - o SisctmAuto lê o painel pela interface."""
+
+
+# ------------------------------------------------------------------------------------------- serviços descobertos
+class ServicosSisctm:
+    """Serviços e camadas do mapa descobertos da interface, guardados em disco. Existe uma única instância (servicos_sisctm)."""
+
+    def __init__(self, caminho: Optional[str] = None):
+        self._caminho = caminho
+        self._dados: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def caminho(self) -> str:
+        return self._caminho or os.path.join(str(pasta_dados("sisctm")), ARQUIVO_SERVICOS)
+
+    @property
+    def dados(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._dados is None:
+                try:
+                    with open(self.caminho, encoding="utf-8") as f:
+                        self._dados = json.load(f)
+                except (OSError, ValueError):
+                    self._dados = {}
+            return self._dados
+
+    def atualizar(self, **novos: Any) -> None:
+        """Grava o que foi descoberto (o que não for informado continua como antes)."""
+        dados = dict(self.dados)
+        dados.update({chave: valor for chave, valor in novos.items() if valor})
+        with self._lock:
+            self._dados = dados
+            try:
+                temporario = self.caminho + ".tmp"
+                with open(temporario, "w", encoding="utf-8") as f:
+                    json.dump(dados, f, ensure_ascii=False, indent=2)
+                os.replace(temporario, self.caminho)
+            except OSError as e:
+                logger.warning(f"Não foi possível guardar os serviços do mapa do SISCTM: {e}")
+
+    @property
+    def crs(self) -> str:
+        return self.dados.get("crs") or CRS_PADRAO
+
+    def camada(self, chave: str) -> Optional[Dict[str, str]]:
+        """{"url": URL do WMS, "nome": nome da camada} de uma camada descoberta (a URL respeita AUTOTRI_SISCTM_OGC_URL)."""
+        camada = (self.dados.get("camadas") or {}).get(chave)
+        if not camada or not camada.get("nome"):
+            return None
+        url = os.environ.get(VARIAVEL_OGC_URL) or camada.get("url")
+        return {"url": url, "nome": camada["nome"]} if url else None
+
+    def campos(self, chave: str) -> Dict[str, str]:
+        """Atributo de cada campo da camada: os aprendidos por cima dos nomes padrão."""
+        return {**CAMPOS_PADRAO[chave], **(self.dados.get("campos") or {}).get(chave, {})}
+
+    @property
+    def completos(self) -> bool:
+        """True se as duas camadas (IPTU CTM GEO e Lote CP) já podem ser consultadas."""
+        return all(self.camada(chave) for chave in CAMADAS)
+
+
+servicos_sisctm = ServicosSisctm()
+
+
+def _normalizar(texto: Any) -> str:
+    """Maiúsculas, sem acentos e só letras/dígitos (para comparar nomes de camadas e de atributos)."""
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Z0-9]", "", sem_acento.upper())
+
+
+def descobrir_servicos(driver, servicos: ServicosSisctm = servicos_sisctm) -> bool:
+    """
+    Lê do mapa aberto (com as camadas já ativadas pela interface) as URLs WMS e os nomes das camadas IPTU CTM GEO e
+    Lote CP - ATIVO, além da projeção do mapa, e guarda em 'servicos'.
+
+    :return: True se as duas camadas foram encontradas.
+    """
+    try:
+        mapa = driver.execute_script(JS_FONTES_MAPA)
+    except Exception as e:
+        logger.debug(f"Não foi possível ler as fontes do mapa do SISCTM: {e}")
+        return False
+    if not mapa:
+        return False
+
+    # (nome da camada no serviço, nome normalizado, título normalizado, URL) de cada camada WMS do mapa
+    candidatas: List[Tuple[str, str, str, str]] = []
+    for fonte in mapa.get("fontes") or []:
+        if fonte.get("tipo") != "wms" or not fonte.get("urls"):
+            continue
+        for nome in filter(None, (n.strip() for n in fonte.get("camadas", "").split(","))):
+            candidatas.append((nome, _normalizar(nome.split(":")[-1]), _normalizar(fonte.get("titulo", "")), fonte["urls"][0]))
+
+    camadas: Dict[str, Dict[str, str]] = {}
+    for chave, trechos in CAMADAS.items():
+        for trecho in trechos:
+            achada = next((c for c in candidatas if trecho in c[1] or trecho in c[2]), None)
+            if achada:
+                camadas[chave] = {"url": achada[3], "nome": achada[0]}
+                break
+
+    servicos.atualizar(crs=mapa.get("crs"), camadas={**(servicos.dados.get("camadas") or {}), **camadas})
+    if len(camadas) < len(CAMADAS):
+        logger.debug(f"Camadas do SISCTM não encontradas entre as fontes do mapa: {set(CAMADAS) - set(camadas)}")
+        return False
+    logger.info(f"Serviços do mapa do SISCTM descobertos: {', '.join(c['nome'] for c in camadas.values())}")
+    return True
+
+
+# ------------------------------------------------------------------------------------------- geometria
+def _aneis_externos(geometria: Dict[str, Any]) -> List[List[List[float]]]:
+    """Anéis externos de um Polygon/MultiPolygon GeoJSON."""
+    tipo, coordenadas = geometria.get("type"), geometria.get("coordinates") or []
+    if tipo == "Polygon":
+        return coordenadas[:1]
+    if tipo == "MultiPolygon":
+        return [poligono[0] for poligono in coordenadas if poligono]
+    return []
+
+
+def caixa_geometria(geometria: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """(xmin, ymin, xmax, ymax) de uma geometria GeoJSON."""
+    pontos: List[List[float]] = []
+
+    def coletar(valor: Any) -> None:
+        if valor and isinstance(valor[0], (int, float)):
+            pontos.append(valor)
+        else:
+            for item in valor:
+                coletar(item)
+
+    coletar(geometria.get("coordinates") or [])
+    if not pontos:
+        raise ErroOgcSisctm("geometria do lote vazia")
+    xs, ys = [p[0] for p in pontos], [p[1] for p in pontos]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _ponto_interno(geometria: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    Um ponto garantidamente dentro do lote (o centroide de um lote em "L" pode cair fora dele): meio do trecho mais
+    largo da reta horizontal que corta o maior anel na metade da altura.
+    """
+    if geometria.get("type") == "Point":
+        return tuple(geometria["coordinates"][:2])
+    aneis = _aneis_externos(geometria)
+    if not aneis:
+        xmin, ymin, xmax, ymax = caixa_geometria(geometria)
+        return (xmin + xmax) / 2, (ymin + ymax) / 2
+
+    def area_caixa(anel):
+        xmin, ymin, xmax, ymax = caixa_geometria({"coordinates": anel})
+        return (xmax - xmin) * (ymax - ymin)
+
+    anel = max(aneis, key=area_caixa)
+    xmin, ymin, xmax, ymax = caixa_geometria({"coordinates": anel})
+    y = (ymin + ymax) / 2
+    cruzamentos = sorted(
+        x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        for (x1, y1, *_), (x2, y2, *_) in zip(anel, anel[1:] + anel[:1])
+        if (y1 > y) != (y2 > y)
+    )
+    trechos = list(zip(cruzamentos[0::2], cruzamentos[1::2]))
+    if not trechos:
+        return (xmin + xmax) / 2, y
+    inicio, fim = max(trechos, key=lambda t: t[1] - t[0])
+    return (inicio + fim) / 2, y
+
+
+# ------------------------------------------------------------------------------------------- atributos
+def _chave_atributo(propriedades: Dict[str, Any], atributo: str) -> Optional[str]:
+    """Chave do atributo nas propriedades (nome exato ou o mesmo nome sem acentos/maiúsculas/separadores), ou None."""
+    if atributo in propriedades:
+        return atributo
+    alvo = _normalizar(atributo)
+    return next((chave for chave in propriedades if _normalizar(chave) == alvo), None)
+
+
+def _texto(valor: Any) -> str:
+    """Valor do atributo como o painel da interface o exibe."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _mesmo_valor(lido: str, valor: Any) -> bool:
+    """True se o valor do atributo é o texto lido no painel (mesmo texto, mesmo número ou mesmos dígitos)."""
+    texto = _texto(valor)
+    if not texto:
+        return False
+    if " ".join(lido.split()).casefold() == " ".join(texto.split()).casefold():
+        return True
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        numero = parse_area(lido)
+        if numero is not None and abs(numero - float(valor)) < 0.005:
+            return True
+    digitos = re.sub(r"\D", "", lido)
+    return bool(digitos) and digitos == re.sub(r"\D", "", texto)
+
+
+def montar_endereco(valores: Dict[str, str]) -> str:
+    """Endereço no formato do relatório a partir dos campos do IPTU CTM GEO (tipo e nome do logradouro, número...)."""
+    numero = valores.get("numero_imovel", "").replace(".", "")
+    endereco = f"{valores.get('tipo_logradouro', '')} {valores.get('nome_logradouro', '')}, {numero}"
+    if valores.get("complemento"):
+        endereco += f" {valores['complemento']}"
+    return endereco + f" - Belo Horizonte - MG, {valores.get('cep', '')}"
+
+
+# ------------------------------------------------------------------------------------------- cliente
+def _url_wfs(url_wms: str) -> str:
+    """O WFS do mesmo servidor: .../wms -> .../wfs no GeoServer (o endpoint .../ows atende os dois)."""
+    partes = urlsplit(url_wms)
+    caminho = re.sub(r"/wms$", "/wfs", partes.path.rstrip("/"), flags=re.IGNORECASE)
+    return urlunsplit((partes.scheme, partes.netloc, caminho, partes.query, ""))
+
+
+class SisctmOgcClient:
+    """
+    Consulta das camadas IPTU CTM GEO e Lote CP - ATIVO pelos serviços OGC descobertos (ServicosSisctm).
+
+    Parâmetros:
+        sessao (requests.Session): Sessão HTTP autenticada (sessao_http(driver) do navegador logado no SISCTM, ou uma
+            sessão simples contra um servidor de testes).
+    """
+
+    def __init__(self, sessao: requests.Session, servicos: ServicosSisctm = servicos_sisctm):
+        self.sessao = sessao
+        self.servicos = servicos
+
+    def disponivel(self) -> bool:
+        return http_direto_habilitado() and self.servicos.completos
+
+    def _consultar(self, url: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        """GET num serviço OGC que deve responder GeoJSON (uma ServiceException em XML conta como falha)."""
+        try:
+            resposta = self.sessao.get(url, params=parametros, timeout=TEMPO_OGC)
+            resposta.raise_for_status()
+            dados = resposta.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ErroOgcSisctm(f"consulta a {urlsplit(url).netloc} falhou: {e}") from e
+        if not isinstance(dados, dict) or not isinstance(dados.get("features"), list):
+            raise ErroOgcSisctm("resposta do serviço sem a lista de feições")
+        return dados
+
+    def feicao_lote(self, indice: str) -> Dict[str, Any]:
+        """Feição (GeoJSON) do IPTU CTM GEO do índice cadastral, por WFS GetFeature filtrado."""
+        camada = self.servicos.camada("iptu")
+        if not camada:
+            raise ErroOgcSisctm("camada IPTU CTM GEO não descoberta")
+        base = {
+            "service": "WFS", "version": "1.0.0", "request": "GetFeature", "typeName": camada["nome"],
+            "outputFormat": "application/json", "srsName": self.servicos.crs, "maxFeatures": 5,
+        }
+        filtro_cql = {"CQL_FILTER": f"{ATRIBUTO_INDICE}='{indice.replace(chr(39), chr(39) * 2)}'"}
+        filtro_ogc = {"FILTER": (
+            '<Filter xmlns="http://www.opengis.net/ogc"><PropertyIsEqualTo>'
+            f"<PropertyName>{ATRIBUTO_INDICE}</PropertyName><Literal>{escape(indice)}</Literal>"
+            "</PropertyIsEqualTo></Filter>"
+        )}
+        url = _url_wfs(camada["url"])
+        try:
+            dados = self._consultar(url, {**base, **filtro_cql})
+        except ErroOgcSisctm as e:
+            logger.debug(f"WFS sem CQL_FILTER ({e}) - tentando o filtro OGC padrão.")
+            dados = self._consultar(url, {**base, **filtro_ogc})
+        if not dados["features"]:
+            raise ErroOgcSisctm(f"nenhuma feição do IPTU CTM GEO com {ATRIBUTO_INDICE}={indice}")
+        return dados["features"][0]
+
+    def feicoes_no_ponto(self, chave: str, x: float, y: float, tolerancia: float) -> List[Dict[str, Any]]:
+        """Feições de uma camada no ponto (x, y) - WMS GetFeatureInfo, como o clique no mapa."""
+        camada = self.servicos.camada(chave)
+        if not camada:
+            raise ErroOgcSisctm(f"camada {chave} não descoberta")
+        centro = PIXELS_CONSULTA // 2
+        dados = self._consultar(camada["url"], {
+            "SERVICE": "WMS", "VERSION": "1.1.1", "REQUEST": "GetFeatureInfo",
+            "LAYERS": camada["nome"], "QUERY_LAYERS": camada["nome"], "STYLES": "",
+            "SRS": self.servicos.crs, "BBOX": f"{x - tolerancia},{y - tolerancia},{x + tolerancia},{y + tolerancia}",
+            "WIDTH": PIXELS_CONSULTA, "HEIGHT": PIXELS_CONSULTA, "X": centro, "Y": centro,
+            "INFO_FORMAT": "application/json", "FEATURE_COUNT": 5, "FORMAT": "image/png",
+        })
+        return dados["features"]
+
+    def atributos(self, indice: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Dict[str, Any]]:
+        """(atributos do IPTU CTM GEO, atributos do Lote CP - ATIVO ou None, geometria do lote)."""
+        feicao = self.feicao_lote(indice)
+        geometria = feicao.get("geometry") or {}
+        xmin, ymin, xmax, ymax = caixa_geometria(geometria)
+        x, y = _ponto_interno(geometria)
+        # Uma fração do menor lado do lote: o ponto consultado não escapa para o lote vizinho
+        tolerancia = max(min(xmax - xmin, ymax - ymin) / 20, 1e-7)
+        lotes_cp = self.feicoes_no_ponto("lote_cp", x, y, tolerancia)
+        lote_cp = lotes_cp[0].get("properties") if lotes_cp else None
+        return feicao.get("properties") or {}, lote_cp, geometria
+
+    def consultar(self, indice: str) -> Dict[str, Optional[str]]:
+        """
+        Áreas e endereço do lote pelos serviços do mapa.
+
+        :return: O mesmo dicionário de SisctmAuto.capturar_areas(...).
+        :raises ErroOgcSisctm: Se os serviços falharem ou os atributos esperados não vierem (a interface lê o painel).
+        """
+        iptu, lote_cp, _geometria = self.atributos(indice)
+        chaves = {campo: _chave_atributo(iptu, atributo) for campo, atributo in self.servicos.campos("iptu").items()}
+        # O complemento pode nunca ter sido aprendido (vazio no painel): os demais precisam existir na camada
+        ausentes = [campo for campo, chave in chaves.items() if chave is None and campo != "complemento"]
+        if ausentes:
+            raise ErroOgcSisctm(f"atributos do IPTU CTM GEO não reconhecidos: {', '.join(ausentes)}")
+        valores = {campo: _texto(iptu.get(chave)) if chave else "" for campo, chave in chaves.items()}
+
+        resultado: Dict[str, Optional[str]] = {
+            "iptu_ctm_geo_area": valores["area"] or None,
+            "iptu_ctm_geo_area_terreno": valores["area_terreno"] or None,
+            "endereco_ctmgeo": montar_endereco(valores),
+        }
+        if lote_cp is not None:
+            chave = _chave_atributo(lote_cp, self.servicos.campos("lote_cp")["area_informada"])
+            if chave is None:
+                raise ErroOgcSisctm("atributo de área do Lote CP - ATIVO não reconhecido")
+            resultado["lote_cp_ativo_area_informada"] = _texto(lote_cp[chave]) or None
+        else:
+            logger.warning("Nenhum Lote CP - ATIVO no ponto do lote (serviço do mapa).")
+        return resultado
+
+    def aprender_campos(self, indice: str, lidos: Dict[str, Dict[str, str]]) -> None:
+        """
+        Confirma qual atributo de cada camada guarda cada campo: procura os valores lidos no painel pela interface
+        entre os atributos devolvidos pelos serviços para o mesmo índice.
+
+        :param lidos: {"iptu": {campo: texto lido}, "lote_cp": {campo: texto lido}} (campos de CAMPOS_PADRAO).
+        """
+        iptu, lote_cp, _geometria = self.atributos(indice)
+        aprendidos = dict(self.servicos.dados.get("campos") or {})
+        for chave, propriedades in (("iptu", iptu), ("lote_cp", lote_cp)):
+            if not propriedades:
+                continue
+            campos = self.servicos.campos(chave)
+            for campo, lido in lidos.get(chave, {}).items():
+                if not lido:
+                    continue
+                # O atributo atual (padrão ou aprendido) tem prioridade: campos com o mesmo valor (área = área do terreno)
+                atuais = [a for a in propriedades if _normalizar(a) == _normalizar(campos[campo])]
+                for atributo in atuais + [a for a in propriedades if a not in atuais]:
+                    if _mesmo_valor(lido, propriedades[atributo]):
+                        aprendidos.setdefault(chave, {})[campo] = atributo
+                        break
+        self.servicos.atualizar(campos=aprendidos)
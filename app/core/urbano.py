@@ -1,7 +1,18 @@
-import time
 import os
 
 from utils import logger
+from .urbano_api import UrbanoApiClient, AprendizRotasUrbano, ErroApiUrbano
+from utils.esperas import (
+    esperar,
+    elemento_visivel,
+    elemento_presente,
+    angular_ocioso,
+    rede_ociosa,
+    sem_spinner,
+    url_diferente,
+    arquivo_novo,
+    arquivos_na_pasta,
+)
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -28,6 +39,7 @@ class UrbanoAuto:
         self.senha = senha
         self.pasta_download = pasta_download
         self.wait = WebDriverWait(self.driver, timeout=5)
+        self.api = UrbanoApiClient(driver, pasta_download)     # Pesquisa pela API JSON (ver app/core/urbano_api.py)
 
     def _click(self, element):
         """Tenta clicar diretamente, se falhar usa JavaScript."""
@@ -88,21 +100,47 @@ class UrbanoAuto:
             logger.error("Erro no login do Urbano: %s", e)
             return False
 
+    def sessao_valida(self) -> bool:
+        """
+        Checagem barata de sessão (usada pelo cofre de sessões): reabre o Urbano e confere se o formulário
+        de pesquisa de projetos (só visível logado) aparece em poucos segundos.
+        """
+        try:
+            self.driver.get(self.url)
+            WebDriverWait(self.driver, 8).until(
+                EC.presence_of_element_located((By.NAME, "zonaFiscal"))
+            )
+            return True
+        except Exception:
+            return False
+
     def download_projeto(self, indice: str):
         """
         Pesquisa o projeto no Urbano e retorna a quantidade de projetos encontrados.
         Também salva prints e tenta baixar certidão de baixa, alvará ou projeto se existirem.
+
+        Com as rotas da API já aprendidas, pesquisa e baixa pela API JSON (UrbanoApiClient) e só usa a interface
+        quando a API falha ou o caso precisa de print/pranchas. Pela interface, as rotas são (re)aprendidas.
         """
+        aprendiz = None
         try:
             logger.info("Iniciando pesquisa de projeto para índice: %s", indice)
             indice = indice.strip()
             if len(indice) < 11:
                 raise ValueError(f"Índice inválido: {indice}")
 
+            if self.api.disponivel():
+                try:
+                    return self.api.consultar(indice)
+                except ErroApiUrbano as e:
+                    logger.info("URBANO pela API: %s. Seguindo pela interface.", e)
+
             # Divisão do índice
             parte1, parte2, parte3 = indice[0:3], indice[3:7], indice[7:11]
+            aprendiz = AprendizRotasUrbano(self.driver)
+            marca = aprendiz.marcar()
 
-            time.sleep(5)
+            esperar(self.driver, "URBANO formulário", elemento_visivel((By.NAME, "zonaFiscal")), angular_ocioso(), teto=5)
 
             # Preenche campos
             campo1 = self.wait.until(
@@ -126,13 +164,25 @@ class UrbanoAuto:
                 EC.element_to_be_clickable((By.ID, "btnPesquisar"))
             )
             self._click(btn_pesquisar)
-            time.sleep(15)
+            # Respiro mínimo para o AngularJS disparar a pesquisa antes de checar se ela terminou
+            esperar(
+                self.driver, "URBANO pesquisa",
+                angular_ocioso(), rede_ociosa(), sem_spinner(),
+                minimo=0.5, teto=15,
+            )
+            aprendiz.aprender_pesquisa(parte1, parte2, parte3, desde=marca)
 
             # Scroll para o print (caso necessário)
             self.driver.execute_script(
                 "window.scrollTo(0, document.body.scrollHeight);"
             )
-            time.sleep(2)
+            esperar(
+                self.driver, "URBANO scroll",
+                lambda d: d.execute_script(
+                    "return window.scrollY + window.innerHeight >= document.body.scrollHeight - 2;"
+                ),
+                teto=2,
+            )
 
             # Verifica a tabela e conta projetos
             try:
@@ -160,9 +210,16 @@ class UrbanoAuto:
 
                 # Clica no primeiro projeto para tentar baixar documentos
                 primeiro_projeto = linhas[0].find_element(By.TAG_NAME, "a")
+                url_pesquisa = self.driver.current_url
+                marca = aprendiz.marcar()
                 self._click(primeiro_projeto)
                 logger.info("Clicado no primeiro projeto da lista")
-                time.sleep(20)
+                esperar(
+                    self.driver, "URBANO projeto",
+                    url_diferente(url_pesquisa), angular_ocioso(), rede_ociosa(), sem_spinner(),
+                    minimo=0.5, teto=20,
+                )
+                aprendiz.aprender_projeto(desde=marca)
 
             except NoSuchElementException:
                 logger.info("Projetos não encontrados na pesquisa")
@@ -183,12 +240,16 @@ class UrbanoAuto:
                 "//a[contains(@href,'certidao-de-baixa') and text()='visualizar']",
             )
             if certidao:
+                arquivos_antes = arquivos_na_pasta(self.pasta_download)
+                marca = aprendiz.marcar()
                 certidao[0].click()
                 logger.info("Certidão de baixa baixada (clique realizado)")
-                time.sleep(10)
+                esperar(self.driver, "URBANO certidão", arquivo_novo(self.pasta_download, arquivos_antes), teto=10)
+                aprendiz.aprender_documento("certidao", desde=marca)
                 dados_projeto = self._capturar_dados_projeto(
                     nome_arquivo="Certidão de Baixa"
                 )
+                aprendiz.aprender_campos(dados_projeto)
                 return qtd_projetos, dados_projeto
 
             # Tenta baixar alvará
@@ -197,17 +258,21 @@ class UrbanoAuto:
                 "//a[contains(text(),'visualizar') and @ng-click='statusCtrl.abrirAlvara()']",
             )
             if alvara:
+                arquivos_antes = arquivos_na_pasta(self.pasta_download)
+                marca = aprendiz.marcar()
                 alvara[0].click()
                 logger.info("Alvará baixado (clique realizado)")
-                time.sleep(10)
+                esperar(self.driver, "URBANO alvará", arquivo_novo(self.pasta_download, arquivos_antes), teto=10)
+                aprendiz.aprender_documento("alvara", desde=marca)
                 dados_projeto = self._capturar_dados_projeto(
                     nome_arquivo="Alvará de Contrução"
                 )
+                aprendiz.aprender_campos(dados_projeto)
                 return qtd_projetos, dados_projeto
 
             # Se nenhum documento encontrado, salva print e acessa "Documentos Anexos"
             if not certidao and not alvara:
-                time.sleep(10)
+                esperar(self.driver, "URBANO print sem documento", angular_ocioso(), sem_spinner(), teto=10)
                 screenshot_sem_doc = os.path.join(
                     self.pasta_download, "Sem Alvara-Baixa.png"
                 )
@@ -233,7 +298,11 @@ class UrbanoAuto:
 
                 # Aguarda aparecer o painel "Pranchas do Projeto"
                 try:
-                    time.sleep(15)
+                    esperar(
+                        self.driver, "URBANO documentos anexos",
+                        elemento_presente((By.XPATH, "//h3[contains(text(),'Pranchas do Projeto')]")), angular_ocioso(),
+                        teto=15,
+                    )
                     self.wait.until(
                         EC.presence_of_element_located(
                             (By.XPATH, "//h3[contains(text(),'Pranchas do Projeto')]")
@@ -263,6 +332,7 @@ class UrbanoAuto:
                     )
 
                     nome_arquivo = primeiro_arquivo.text.strip()
+                    arquivos_antes = arquivos_na_pasta(self.pasta_download)
                     try:
                         primeiro_arquivo.click()
                     except Exception:
@@ -272,9 +342,10 @@ class UrbanoAuto:
                         )
 
                     logger.info("Download iniciado para: %s", nome_arquivo)
-                    time.sleep(10)
+                    esperar(self.driver, "URBANO prancha", arquivo_novo(self.pasta_download, arquivos_antes), teto=10)
 
                     dados_projeto = self._capturar_dados_projeto(nome_arquivo="Projeto")
+                    aprendiz.aprender_campos(dados_projeto)
                     return qtd_projetos, dados_projeto
                 except TimeoutException:
                     logger.warning("Nenhum arquivo encontrado na tabela de anexos")
@@ -286,6 +357,9 @@ class UrbanoAuto:
             logger.error("Erro ao pesquisar projeto no Urbano (%s): %s", indice, e)
             dados_projeto = self._capturar_dados_projeto(nome_arquivo=nome_arquivo)
             return 0, dados_projeto
+        finally:
+            if aprendiz is not None:
+                aprendiz.encerrar()
 
     def _capturar_dados_projeto(self, nome_arquivo=None):
         """
@@ -296,7 +370,7 @@ class UrbanoAuto:
         Caso algum campo não seja encontrado, retorna 'Não informado'.
         """
         dados = {}
-        time.sleep(2)
+        esperar(self.driver, "URBANO dados do projeto", angular_ocioso(), teto=2)
 
         # Tipo: nome do arquivo
         dados["tipo"] = nome_arquivo if nome_arquivo else "Não informado"
@@ -0,0 +1,507 @@
+import base64
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from utils import logger, parse_area, formatar_area
+from utils import http_direto_habilitado, sessao_http, baixar, ErroDownloadHttp
+from utils.pastas import pasta_dados
+from utils.rede import eventos_devtools
+
+'''
+==================================================================================================================================
+Cliente da API JSON do Urbano (Portal de Edificações), no lugar da pesquisa pela interface.
+
+O portal é um app AngularJS: a pesquisa de projetos (zonaFiscal/quart/lote) e o detalhe do projeto vêm de endpoints
+JSON, mas o UrbanoAuto dirigia a interface (preencher, pesquisar, esperar o Angular, clicar no projeto...).
+
+Os endpoints não são documentados, então as rotas são APRENDIDAS da própria interface, sem URL fixa no código:
+
+    - AprendizRotasUrbano acompanha os eventos de rede (DevTools) de uma pesquisa feita pela interface e descobre:
+        * pesquisa:    a requisição JSON que levou os valores zona/quarteirão/lote (URL e/ou corpo) e a lista do retorno;
+        * projeto:     a requisição JSON aberta ao clicar no projeto, e qual campo do item da pesquisa é o id dele;
+        * campos:      onde estão, no JSON do projeto, a área do(s) lote(s) e a área construída lidas na tela - cada
+                       campo é um candidato até a interface de um SEGUNDO IC confirmar o mesmo caminho (campos de
+                       mesmo valor, como área do lote = área construída, são ambíguos e não ensinam nada);
+        * documentos:  as URLs de certidão de baixa / alvará que dependem só do id do projeto;
+        * cabeçalhos:  cabeçalhos de autenticação (ex: Authorization, X-XSRF-TOKEN) e de onde vem o valor
+                       (localStorage, sessionStorage ou cookie).
+      As rotas ficam em disco (RotasUrbano, <pasta de dados>/urbano/rotas_api.json) e valem para as próximas triagens.
+    - UrbanoApiClient usa as rotas com a sessão HTTP do navegador autenticado (utils/cliente_http.py): pesquisa, detalhe
+      e download da certidão/alvará, sem tocar na interface. Retorna o mesmo (qtd_projetos, dados_projeto).
+
+A interface continua sendo o caminho de referência: sem rotas completas, com o modo HTTP desligado (AUTOTRI_HTTP_DIRETO=0)
+ou em qualquer resposta inesperada da API (ErroApiUrbano - inclusive um campo confirmado que sumiu do JSON do projeto),
+o UrbanoAuto pesquisa pela interface - e reaprende as rotas. Se a interface discordar de um campo confirmado, ele volta a
+ser candidato.
+O print de evidência (pesquisa sem projetos, projeto sem certidão/alvará) só é necessário nesses casos, e é tirado pela
+interface.
+==================================================================================================================================
+'''
+
+ARQUIVO_ROTAS = "rotas_api.json"
+TEMPO_API = 20          # Segundos para cada chamada da API
+CAMPOS_AREA = ("area_lotes", "area_construida")
+TOLERANCIA_AREA = 0.005 # Diferença máxima (m²) entre o valor do JSON e o da tela
+_AUSENTE = object()     # Caminho inexistente no JSON (diferente de um campo presente com valor null)
+CABECALHOS_PADRAO = {
+    "accept", "accept-encoding", "accept-language", "cache-control", "connection", "content-length", "content-type",
+    "cookie", "host", "origin", "pragma", "referer", "user-agent",
+}
+
+
+class ErroApiUrbano(Exception):
+    """A consulta pela API não pôde ser concluída - o UrbanoAuto segue pela interface."""
+
+
+# ------------------------------------------------------------------------------------------- rotas aprendidas
+class RotasUrbano:
+    """Rotas da API aprendidas da interface, guardadas em disco. Existe uma única instância (rotas_urbano)."""
+
+    def __init__(self, caminho: Optional[str] = None):
+        self._caminho = caminho
+        self._dados: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def caminho(self) -> str:
+        return self._caminho or os.path.join(str(pasta_dados("urbano")), ARQUIVO_ROTAS)
+
+    @property
+    def dados(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._dados is None:
+                try:
+                    with open(self.caminho, encoding="utf-8") as f:
+                        self._dados = json.load(f)
+                except (OSError, ValueError):
+                    self._dados = {}
+            return self._dados
+
+    def atualizar(self, **novas: Any) -> None:
+        """Grava as rotas aprendidas (as não informadas, ou None, continuam as de antes)."""
+        dados = dict(self.dados)
+        dados.update({chave: valor for chave, valor in novas.items() if valor is not None})
+        with self._lock:
+            self._dados = dados
+            try:
+                temporario = self.caminho + ".tmp"
+                with open(temporario, "w", encoding="utf-8") as f:
+                    json.dump(dados, f, ensure_ascii=False, indent=2)
+                os.replace(temporario, self.caminho)
+            except OSError as e:
+                logger.warning(f"Não foi possível guardar as rotas da API do Urbano: {e}")
+
+    @property
+    def completas(self) -> bool:
+        """True se já dá para pesquisar, abrir o projeto e ler as duas áreas (campos confirmados) pela API."""
+        dados = self.dados
+        confirmados = dados.get("campos_confirmados") or {}
+        return all(dados.get(chave) for chave in ("pesquisa", "projeto", "id")) \
+            and all(confirmados.get(chave) for chave in CAMPOS_AREA)
+
+
+rotas_urbano = RotasUrbano()
+
+
+# ------------------------------------------------------------------------------------------- JSON
+def _achatar(obj: Any, prefixo: str = "") -> Iterator[Tuple[str, Any]]:
+    """(caminho, valor) de cada valor escalar de um JSON. Caminhos no formato "a.0.b"."""
+    if isinstance(obj, dict):
+        for chave, valor in obj.items():
+            yield from _achatar(valor, f"{prefixo}{chave}.")
+    elif isinstance(obj, list):
+        for i, valor in enumerate(obj):
+            yield from _achatar(valor, f"{prefixo}{i}.")
+    else:
+        yield prefixo[:-1], obj
+
+
+def _obter(obj: Any, caminho: str, padrao: Any = None) -> Any:
+    """Valor do JSON no caminho "a.0.b" (ou 'padrao' se o caminho não existe; caminho vazio é o próprio objeto)."""
+    for parte in caminho.split(".") if caminho else []:
+        if isinstance(obj, list) and parte.isdigit() and int(parte) < len(obj):
+            obj = obj[int(parte)]
+        elif isinstance(obj, dict) and parte in obj:
+            obj = obj[parte]
+        else:
+            return padrao
+    return obj
+
+
+def _numero(valor: Any) -> Optional[float]:
+    """Área de um valor do JSON: número ou texto no formato da tela (ver parse_area). None se não for uma área."""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    return parse_area(valor)
+
+
+def _primeira_lista(obj: Any, caminho: str = "") -> Optional[str]:
+    """Caminho da primeira lista (de objetos ou vazia) do JSON, em largura - a lista de resultados da pesquisa."""
+    fila = [(caminho, obj)]
+    while fila:
+        atual, valor = fila.pop(0)
+        if isinstance(valor, list) and (not valor or isinstance(valor[0], dict)):
+            return atual
+        if isinstance(valor, dict):
+            fila.extend((f"{atual}.{k}" if atual else k, v) for k, v in valor.items())
+    return None
+
+
+def _marcar_valor(texto: str, valor: str, marcador: str) -> Tuple[str, bool]:
+    """Troca as ocorrências isoladas (sem dígitos colados) de 'valor' em 'texto' pelo marcador %%nome%%."""
+    padrao = rf"(?<![0-9]){re.escape(valor)}(?![0-9])"
+    novo, trocas = re.subn(padrao, f"%%{marcador}%%", texto)
+    return novo, trocas > 0
+
+
+def _preencher(modelo: Optional[str], valores: Dict[str, str]) -> Optional[str]:
+    if modelo is None:
+        return None
+    for nome, valor in valores.items():
+        modelo = modelo.replace(f"%%{nome}%%", valor)
+    return modelo
+
+
+def _variantes_indice(zona: str, quarteirao: str, lote: str) -> Dict[str, str]:
+    """Valores do índice como podem aparecer na API: com e sem zeros à esquerda."""
+    valores = {"zona": zona, "quarteirao": quarteirao, "lote": lote}
+    for nome, valor in list(valores.items()):
+        valores[f"{nome}_num"] = valor.lstrip("0") or "0"
+    return valores
+
+
+# ------------------------------------------------------------------------------------------- aprendizado
+class AprendizRotasUrbano:
+    """
+    Acompanha a rede do driver durante uma pesquisa pela interface e aprende as rotas da API (ver RotasUrbano).
+    Tudo aqui é "melhor esforço": falhas no aprendizado só significam que a próxima pesquisa também vai pela interface.
+    """
+
+    def __init__(self, driver, rotas: RotasUrbano = rotas_urbano):
+        self.driver = driver
+        self.rotas = rotas
+        self._requisicoes: Dict[str, Dict[str, Any]] = {}   # requestId -> url, método, corpo, cabeçalhos, tipo, json
+        self._ordem: List[str] = []
+        self._item: Optional[Dict[str, Any]] = None         # Primeiro item da pesquisa (para achar o id do projeto)
+        self._indice: Optional[str] = None                  # IC pesquisado (um campo só é confirmado por outro IC)
+        self._id_projeto: Optional[str] = None
+        self._id_requisicao_projeto: Optional[str] = None
+        self._leitor = eventos_devtools(driver)
+        self._leitor.assinar("Network.", self._registrar)
+
+    def _registrar(self, metodo: str, params: dict, instante: float) -> None:
+        id_requisicao = params.get("requestId")
+        if metodo == "Network.requestWillBeSent":
+            pedido = params.get("request", {})
+            self._requisicoes[id_requisicao] = {
+                "url": pedido.get("url", ""),
+                "metodo": pedido.get("method", "GET"),
+                "corpo": pedido.get("postData"),
+                "cabecalhos": pedido.get("headers", {}),
+                "tipo": params.get("type", ""),
+                "json": False,
+            }
+            self._ordem.append(id_requisicao)
+        elif metodo == "Network.responseReceived" and id_requisicao in self._requisicoes:
+            if "json" in params.get("response", {}).get("mimeType", "").lower():
+                self._requisicoes[id_requisicao]["json"] = True
+
+    def encerrar(self) -> None:
+        """Para de acompanhar a rede do driver (o driver volta ao pool e atende outros ICs)."""
+        self._leitor.cancelar(self._registrar)
+
+    def marcar(self) -> int:
+        """Posição atual no histórico de requisições (antes de uma ação da interface)."""
+        self._leitor.ler()
+        return len(self._ordem)
+
+    def _corpo_json(self, id_requisicao: str) -> Any:
+        resposta = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": id_requisicao})
+        corpo = resposta.get("body", "")
+        if resposta.get("base64Encoded"):
+            corpo = base64.b64decode(corpo).decode("utf-8")
+        return json.loads(corpo)
+
+    def _jsons(self, desde: int = 0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        self._leitor.ler()
+        for id_requisicao in self._ordem[desde:]:
+            requisicao = self._requisicoes[id_requisicao]
+            if requisicao["json"] and requisicao["tipo"] in ("XHR", "Fetch"):
+                yield id_requisicao, requisicao
+
+    def _cabecalhos(self, requisicao: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+        """Para cada cabeçalho de autenticação da requisição, de onde vem o valor (armazenamento + chave) e o formato."""
+        armazenado = self.driver.execute_script(
+            "var r = {localStorage: {}, sessionStorage: {}};"
+            "['localStorage', 'sessionStorage'].forEach(function (a) {"
+            "  for (var i = 0; i < window[a].length; i++) { var k = window[a].key(i); r[a][k] = window[a].getItem(k); }"
+            "});"
+            "return r;"
+        ) or {}
+        armazenado["cookie"] = {c["name"]: c["value"] for c in self.driver.get_cookies()}
+
+        origens = {}
+        for nome, valor in requisicao["cabecalhos"].items():
+            if nome.lower() in CABECALHOS_PADRAO or nome.lower().startswith("sec-") or not valor:
+                continue
+            for armazenamento, itens in armazenado.items():
+                # O valor pode estar guardado puro ou dentro de um JSON (ex: {"token": "..."}) - procura o trecho
+                for chave, guardado in (itens or {}).items():
+                    candidatos = [guardado] + [str(v) for _c, v in _achatar(_json_ou_nada(guardado))]
+                    token = next((c for c in candidatos if c and len(c) >= 8 and c in valor), None)
+                    if token:
+                        caminho = next((c for c, v in _achatar(_json_ou_nada(guardado)) if str(v) == token), "")
+                        origens[nome] = {"armazenamento": armazenamento, "chave": chave, "caminho": caminho,
+                                         "formato": valor.replace(token, "%%valor%%")}
+                        break
+                if nome in origens:
+                    break
+        return origens
+
+    def aprender_pesquisa(self, zona: str, quarteirao: str, lote: str, desde: int = 0) -> None:
+        """Depois da pesquisa pela interface: acha a requisição que levou zona/quarteirão/lote e guarda o modelo."""
+        self._indice = f"{zona}{quarteirao}{lote}"
+        try:
+            valores = _variantes_indice(zona, quarteirao, lote)
+            for id_requisicao, requisicao in self._jsons(desde):
+                url, corpo = requisicao["url"], requisicao["corpo"] or ""
+                modelo_url, modelo_corpo, achou = url, corpo, True
+                for nome in ("zona", "quarteirao", "lote"):
+                    trocou = False
+                    for variante in (nome, f"{nome}_num"):
+                        modelo_url, em_url = _marcar_valor(modelo_url, valores[variante], variante)
+                        modelo_corpo, em_corpo = _marcar_valor(modelo_corpo, valores[variante], variante)
+                        if em_url or em_corpo:
+                            trocou = True
+                            break
+                    achou = achou and trocou
+                if not achou:
+                    continue
+                retorno = self._corpo_json(id_requisicao)
+                lista = _primeira_lista(retorno)
+                if lista is None:
+                    continue
+                itens = _obter(retorno, lista)
+                self._item = itens[0] if itens else None
+                tipo_corpo = next((v for k, v in requisicao["cabecalhos"].items() if k.lower() == "content-type"), None)
+                self.rotas.atualizar(
+                    pesquisa={"metodo": requisicao["metodo"], "url": modelo_url, "corpo": modelo_corpo or None,
+                              "tipo_corpo": tipo_corpo, "lista": lista},
+                    cabecalhos=self._cabecalhos(requisicao) or None,
+                )
+                logger.info("URBANO: rota da pesquisa aprendida da interface.")
+                return
+        except Exception as e:
+            logger.debug(f"URBANO: rota da pesquisa não aprendida: {e}")
+
+    def aprender_projeto(self, desde: int) -> None:
+        """Depois de abrir o projeto pela interface: acha a requisição do detalhe (pelo id do item da pesquisa)."""
+        if not self._item:
+            return
+        try:
+            candidatos = [(c, str(v)) for c, v in _achatar(self._item)
+                          if isinstance(v, (int, str)) and not isinstance(v, bool) and len(str(v)) >= 3]
+            for id_requisicao, requisicao in self._jsons(desde):
+                for campo, valor in candidatos:
+                    modelo, achou = _marcar_valor(requisicao["url"], valor, "id")
+                    if achou:
+                        self._id_projeto, self._id_requisicao_projeto = valor, id_requisicao
+                        self.rotas.atualizar(projeto={"metodo": requisicao["metodo"], "url": modelo}, id=campo)
+                        logger.info("URBANO: rota do projeto aprendida da interface.")
+                        return
+        except Exception as e:
+            logger.debug(f"URBANO: rota do projeto não aprendida: {e}")
+
+    def aprender_campos(self, dados_projeto: Dict[str, Any]) -> None:
+        """
+        Acha, no JSON do projeto, os campos com as mesmas áreas lidas na tela.
+
+        O caminho achado vira candidato; o mesmo caminho achado de novo noutro IC confirma o campo (só os confirmados são
+        usados pelo UrbanoApiClient). Um caminho diferente do confirmado derruba a confirmação: a interface é a referência.
+        """
+        if not self._id_requisicao_projeto:
+            return
+        try:
+            alvos = {chave: parse_area(dados_projeto.get(chave)) for chave in CAMPOS_AREA}
+            if None not in alvos.values() and abs(alvos["area_lotes"] - alvos["area_construida"]) < TOLERANCIA_AREA:
+                logger.debug("URBANO: áreas do lote e construída iguais, campos do projeto ambíguos (não aprendidos).")
+                return
+
+            detalhe = self._corpo_json(self._id_requisicao_projeto)
+            achados: Dict[str, str] = {}
+            for chave, alvo in alvos.items():
+                if alvo is None:
+                    continue
+                caminho = next((c for c, v in _achatar(detalhe) if c not in achados.values()
+                                and _numero(v) is not None and abs(_numero(v) - alvo) < TOLERANCIA_AREA), None)
+                if caminho is not None:
+                    achados[chave] = caminho
+            if not achados:
+                return
+
+            confirmados = dict(self.rotas.dados.get("campos_confirmados") or {})
+            candidatos = dict(self.rotas.dados.get("campos_candidatos") or {})
+            for chave, caminho in achados.items():
+                if confirmados.get(chave) == caminho:
+                    continue
+                candidato = candidatos.get(chave) or {}
+                if candidato.get("caminho") == caminho and candidato.get("indice") != self._indice:
+                    confirmados[chave] = caminho
+                    candidatos.pop(chave, None)
+                    logger.info(f"URBANO: campo '{chave}' do projeto confirmado pela interface.")
+                else:
+                    confirmados.pop(chave, None)
+                    candidatos[chave] = {"caminho": caminho, "indice": self._indice}
+            self.rotas.atualizar(campos_confirmados=confirmados, campos_candidatos=candidatos)
+        except Exception as e:
+            logger.debug(f"URBANO: campos do projeto não aprendidos: {e}")
+
+    def aprender_documento(self, tipo: str, desde: int) -> None:
+        """Depois do clique num documento (certidão/alvará): guarda a URL baixada se ela depende só do id do projeto."""
+        if not self._id_projeto:
+            return
+        self._leitor.ler()
+        for id_requisicao in reversed(self._ordem[desde:]):
+            requisicao = self._requisicoes[id_requisicao]
+            if requisicao["tipo"] in ("Document", "Other") and requisicao["metodo"] == "GET":
+                modelo, achou = _marcar_valor(requisicao["url"], self._id_projeto, "id")
+                if achou:
+                    documentos = dict(self.rotas.dados.get("documentos") or {})
+                    documentos[tipo] = modelo
+                    self.rotas.atualizar(documentos=documentos)
+                    logger.info(f"URBANO: rota do documento '{tipo}' aprendida da interface.")
+                    return
+
+
+def _json_ou_nada(texto: Any) -> Any:
+    try:
+        return json.loads(texto) if isinstance(texto, str) else None
+    except ValueError:
+        return None
+
+
+# ------------------------------------------------------------------------------------------- cliente
+# (tipo da rota, "tipo" em dados_projeto, nome do arquivo se o servidor não sugerir um) - na ordem da interface
+DOCUMENTOS = (
+    ("certidao", "Certidão de Baixa", "Certidao_Baixa.pdf"),
+    ("alvara", "Alvará de Contrução", "Alvara_Construcao.pdf"),
+)
+
+
+class UrbanoApiClient:
+    """
+    Pesquisa de projetos do Urbano pelas rotas JSON aprendidas (RotasUrbano), com a sessão do navegador autenticado.
+
+    Parâmetros:
+        driver (selenium.webdriver): Driver já autenticado no Urbano (fonte dos cookies e dos tokens).
+        pasta_download (str): Pasta onde os documentos são gravados.
+    """
+
+    def __init__(self, driver, pasta_download: str, rotas: RotasUrbano = rotas_urbano):
+        self.driver = driver
+        self.pasta_download = pasta_download
+        self.rotas = rotas
+        self._http = None
+
+    def disponivel(self) -> bool:
+        return http_direto_habilitado() and self.rotas.completas
+
+    def _sessao(self):
+        if self._http is None:
+            self._http = sessao_http(self.driver)
+            for nome, origem in (self.rotas.dados.get("cabecalhos") or {}).items():
+                valor = self._valor_armazenado(origem)
+                if valor:
+                    self._http.headers[nome] = origem["formato"].replace("%%valor%%", valor)
+        return self._http
+
+    def _valor_armazenado(self, origem: Dict[str, str]) -> Optional[str]:
+        """Valor atual de um token guardado no navegador (localStorage, sessionStorage ou cookie)."""
+        if origem["armazenamento"] == "cookie":
+            cookie = self.driver.get_cookie(origem["chave"])
+            guardado = cookie["value"] if cookie else None
+        else:
+            guardado = self.driver.execute_script(
+                f"return window.{origem['armazenamento']}.getItem(arguments[0]);", origem["chave"]
+            )
+        if guardado and origem.get("caminho"):
+            guardado = _obter(_json_ou_nada(guardado), origem["caminho"])
+        return str(guardado) if guardado else None
+
+    def _chamar(self, rota: Dict[str, Any], valores: Dict[str, str]) -> Any:
+        try:
+            corpo = _preencher(rota.get("corpo"), valores)
+            resposta = self._sessao().request(
+                rota["metodo"], _preencher(rota["url"], valores),
+                data=corpo.encode("utf-8") if corpo else None,
+                headers={"Content-Type": rota.get("tipo_corpo") or "application/json"} if corpo else None,
+                timeout=TEMPO_API,
+            )
+            resposta.raise_for_status()
+            return resposta.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ErroApiUrbano(f"chamada à API falhou: {e}") from e
+
+    def _areas_projeto(self, detalhe: Any) -> Dict[str, Any]:
+        """
+        As áreas do dict do UrbanoAuto._capturar_dados_projeto(...), a partir do JSON do projeto (campos confirmados).
+
+        :raises ErroApiUrbano: Se um campo não está mapeado, sumiu do JSON ou não é uma área - a interface lê as áreas.
+        """
+        confirmados = self.rotas.dados.get("campos_confirmados") or {}
+        areas = {}
+        for chave in CAMPOS_AREA:
+            if not confirmados.get(chave):
+                raise ErroApiUrbano(f"campo '{chave}' do projeto não confirmado")
+            valor = _obter(detalhe, confirmados[chave], _AUSENTE)
+            if valor is _AUSENTE:
+                raise ErroApiUrbano(f"campo '{chave}' ausente no JSON do projeto")
+            numero = _numero(valor)
+            if numero is None and valor not in (None, ""):
+                raise ErroApiUrbano(f"campo '{chave}' do projeto não é uma área ({valor!r})")
+            areas[chave] = formatar_area(numero) if numero is not None else "Não informado"
+        return areas
+
+    def consultar(self, indice: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        Pesquisa o IC, abre o primeiro projeto e baixa a certidão de baixa ou o alvará.
+
+        :return: (qtd_projetos, dados_projeto) - como UrbanoAuto.download_projeto(...).
+        :raises ErroApiUrbano: Se a API falhar ou se o caso precisa da interface (print de evidência, pranchas).
+        """
+        rotas = self.rotas.dados
+        valores = _variantes_indice(indice[0:3], indice[3:7], indice[7:11])
+
+        itens = _obter(self._chamar(rotas["pesquisa"], valores), rotas["pesquisa"]["lista"])
+        if not isinstance(itens, list):
+            raise ErroApiUrbano("resposta da pesquisa sem a lista de projetos")
+        qtd_projetos = len(itens)
+        logger.info("%d projeto(s) encontrado(s) (API)", qtd_projetos)
+        if qtd_projetos == 0:
+            raise ErroApiUrbano("nenhum projeto - o print da pesquisa é tirado pela interface")
+
+        id_projeto = _obter(itens[0], rotas["id"])
+        if id_projeto is None:
+            raise ErroApiUrbano("item da pesquisa sem o id do projeto")
+        valores["id"] = str(id_projeto)
+        areas = self._areas_projeto(self._chamar(rotas["projeto"], valores))     # Antes dos downloads: pode cair na interface
+
+        for tipo_rota, tipo, nome_padrao in DOCUMENTOS:
+            modelo = (rotas.get("documentos") or {}).get(tipo_rota)
+            if not modelo:
+                continue
+            try:
+                caminho = baixar(self._sessao(), _preencher(modelo, valores), self.pasta_download, nome_padrao)
+            except ErroDownloadHttp:
+                continue    # Projeto sem este documento: tenta o próximo
+            logger.info("%s baixado(a) pela API: %s", tipo, os.path.basename(caminho))
+            return qtd_projetos, {"tipo": tipo, **areas}
+
+        raise ErroApiUrbano("projeto sem certidão/alvará por URL - pranchas e print pela interface")
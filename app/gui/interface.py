@@ -168,7 +168,7 @@ class InterfaceApp:
         ttk.Separator(self.root, orient='horizontal').grid(row=8, column=0, columnspan=2, sticky="ew", pady=2)
 
         # --- Status e Progresso ---
-        self.status_label = tk.Label(self.root,  height=2, text="Aguardando entrada...")
+        self.status_label = tk.Label(self.root,  height=3, text="Aguardando entrada...")   # 3ª linha: sistemas indisponíveis
         self.status_label.grid(row=9, column=0, sticky="ew", columnspan=2, padx=5, pady=0)
 
         self.progress_bar = ttk.Progressbar(self.root, orient="horizontal", length=500, mode="determinate")
@@ -1,9 +1,17 @@
 import os
 import shutil
+import threading
 from datetime import datetime
-from pipeline import processar_indice, processar_protocolo
-from utils import logger, log_path, section_log, reset_log_file
-from utils import abrir_pasta, criar_pasta_resultados
+from pipeline import processar_indice, processar_protocolo, PoolICs, TarefaIC
+from pipeline import avancar_progresso, atualizar_status, pesos_etapas
+from pipeline import DiarioTriagem, localizar_triagem_interrompida, retomada_habilitada, ic_ja_triado
+from pipeline import replicar_ic, resultados_do_diario
+from pipeline import verificar_sistemas, verificacao_habilitada
+from utils import logger, log_path, section_log, reset_log_file, contexto_log
+from utils import abrir_pasta, criar_pasta_resultados, pool_sessoes, resolver_chromedriver
+from utils import chave_indice
+from utils import estatisticas_esperas, resumo_esperas, limitador_sistemas, resumo_limites, cache_resultados
+from utils import disjuntores, resumo_disjuntores
 from gui import iniciar_interface
 
 
@@ -14,10 +22,15 @@ def main():
 
         reset_log_file() # Limpa o arquivo de LOG (Detalhes da Última Triagem)
 
+        # Modo retomada: se o mesmo lote foi interrompido (queda ou cancelamento), continua na pasta dele (ver pipeline/diario.py)
+        pasta_retomada = localizar_triagem_interrompida(protocolos, ics_avulsos) if retomada_habilitada() else None
+
         # Cria pasta_resultados - neste método o momento 'agora' das Time Stamps são definidos
         # NOTE: a Time Stamp da pasta resultados será propagada para o início do Logger e demais coisas.
-        pasta_resultados = criar_pasta_resultados()
-        
+        pasta_resultados = pasta_retomada or criar_pasta_resultados()
+        # Diário append-only da triagem: SIGEDE, etapas concluídas de cada IC e fim do lote
+        diario = DiarioTriagem(pasta_resultados)
+        diario.iniciar_lote(protocolos, ics_avulsos)
         
         # Extrai o nome da pasta para usar no cabeçalho
         # Ex: "Resultados - 08 de janeiro de 2026 14h25"
@@ -30,6 +43,8 @@ def main():
         # TODO: Modificar os separadores hardcoded para usar a função section_log() definida em logger.py
         #logger.info(f"======= Triagem iniciada em {timestamp_legivel} =======")
         section_log(f" Triagem iniciada em {timestamp_legivel} ",'=',60)
+        if pasta_retomada:
+            logger.info(f"Retomando a triagem interrompida em '{pasta_retomada}': etapas já concluídas serão puladas.")
         
         # --- Formata a lista  de PROTOCOLOS para ficar mais legível [sem colchetes nem áspas simples] -----
         # Quebra a lista em pedaços (chunks) de 3 itens
@@ -110,7 +125,66 @@ def main():
         progressBarDict["n_cadastrais_associados"] = 1  # um contador de ICs associados ao protocolo (útil para calcular increment em protocolos reais)
 
         
+        # Ativa o pool de sessões: um navegador (autenticado) por sistema é reaproveitado entre os ICs da triagem
+        pool_sessoes.iniciar()
+        estatisticas_esperas.limpar()   # Zera o tempo acumulado nas esperas dos bots (resumido no fim da triagem)
+        limitador_sistemas.limpar()     # Zera as filas/esperas por sistema do limitador (resumidas no fim da triagem)
+        cache_resultados.limpar()       # Zera os acertos/faltas do cache de resultados (ver utils/cache.py)
+        disjuntores.limpar()            # Todos os sistemas começam disponíveis (ver utils/disjuntor.py)
+
+        falhas = []     # ICs com erro: o lote não é marcado como concluído no diário (pode ser retomado)
+        motivo_abortar = None   # Preenchido se a verificação inicial concluir que não há o que triar
+
+        # Processa um IC retirado da fila por um worker do pool de ICs (ver app/pipeline/fila.py)
+        def processar_tarefa(tarefa: TarefaIC):
+            try:
+                section_log(f"[ Indice: {tarefa.indice} ({tarefa.posicao}/{tarefa.total}) ] ",'_') # Adiciona seção pra cada índice nos LOGS
+
+                # Define o um status dinâmico para o Status Text - Ex: "ETAPA 1/2: 700... ◀ [IC 1/5]"
+                status_dinamico = f"{tarefa.titulo_status}\n[IC {tarefa.posicao}/{tarefa.total}]"
+
+                resultados_ics[chave_indice(tarefa.indice)] = processar_indice(
+                    tarefa.indice,
+                    credenciais,
+                    tarefa.protocolo,
+                    pasta_resultados,
+                    status_title=status_dinamico,                   # Passa  status_dinamico no 'status_title' para maior granularidade
+                    statusUpdater=atualizar_status_gui,             # Método para atualizar o status da gui (um método da classe InterfaceApp)
+                    progressBarUpdater = atualizar_progresso_gui,   # Método para atualizar a barra de progresso (um método da classe InterfaceApp)
+                    progressBarDict= progressBarDict,               # Dicionário contendo info sobre a progressBar
+                    VIRTUAL_PRTCL=tarefa.virtual,                   # O IC atual está num protocolo Virtual?
+                    n_cadastrais_associados=tarefa.n_cadastrais_associados,  # Nº de ICs do protocolo DESTE IC
+                    diario=diario,                                  # Registra as etapas concluídas (e pula as já feitas numa retomada)
+                )
+            except Exception as e:
+                falhas.append(tarefa.indice)
+                logger.error(f"Erro no índice {tarefa.indice}: {e}")
+
+        # Deduplicação: o mesmo IC pode aparecer em vários protocolos do lote (e nos avulsos). Cada IC é triado uma única vez
+        # e o resultado é replicado (cópia + relatório do próprio protocolo) nas pastas dos outros protocolos que o
+        # referenciam, no fim da triagem.
+        ics_triados = {}    # chave canônica do IC (utils/formatters.py) -> pasta do IC triado
+        resultados_ics = {} # chave canônica do IC -> (resultados das etapas, sistemas indisponíveis), para os relatórios das réplicas
+        replicas = []       # (chave do IC, pasta do IC triado, pasta do mesmo IC em outro protocolo, protocolo virtual?)
+
+        # Pool de workers: vários ICs triados ao mesmo tempo, cada um com os seus navegadores
+        pool_ics = PoolICs(processar_tarefa, cancelar_event)
+        pool_ics.iniciar()
+
         try:
+            # Verificação inicial: alcance e login de todos os sistemas em paralelo, antes do primeiro IC (ver pipeline/verificacao.py)
+            # Sistemas indisponíveis têm o disjuntor aberto (o lote roda em modo degradado); sem nada a triar o lote é abortado
+            if verificacao_habilitada():
+                atualizar_status(atualizar_status_gui, "Verificando os sistemas...")
+                verificacao = verificar_sistemas(
+                    credenciais, pasta_resultados, exige_sigede=bool(protocolos), tem_ics_avulsos=bool(ics_avulsos)
+                )
+                motivo_abortar = verificacao.motivo_abortar
+                if motivo_abortar:
+                    logger.error(f"Triagem abortada: {motivo_abortar}.")
+                    atualizar_status(atualizar_status_gui, f"Triagem abortada:\n{motivo_abortar}")
+                    process_queue = []
+
             # Usa enumarate para tornar 'protocolos' iterável. o '1' indica indexação partindo de 1 (não zero)
             # i: mero indexador (one-based); task: place holder p/ os dicts de protocolos em process_queue
             for i, task in enumerate(process_queue, 1):
@@ -139,7 +213,7 @@ def main():
                 separador: str = "=" * 55 
                 
                 # Atualiza StatusText e Loga o bloco formatado do início do processamento de um novo protocolo
-                atualizar_status_gui(msg_status)
+                atualizar_status(atualizar_status_gui, msg_status)
                 logger.info(separador)
                 logger.info(titulo_log.center( len(separador) )) # .center() centraliza o texto na linha (de acordo com o tamanho separador)
                 logger.info(separador + "\n")
@@ -162,9 +236,18 @@ def main():
                     if tipo == 'REAL':  # Se é um protocolo REAL
                         # Normaliza e processa (chama SIGEDE p/ obter índices e criar pastas)
                         proto_normalizado = id_atual.replace("-", "").replace("/", "").replace(".", "")
-                        indices_para_processar = processar_protocolo(proto_normalizado, credenciais, pasta_resultados)
-                        progressBarDict["atual"] += progressBarDict["peso_tarefa"]*0.1  #Calcula o progresso da barra após o SIGEDE
-                        atualizar_progresso_gui(progressBarDict["atual"])
+                        indices_diario = diario.indices_do_protocolo(id_atual)
+                        if indices_diario is not None:
+                            # Retomada: os ICs do protocolo já foram resolvidos pelo SIGEDE
+                            indices_para_processar = indices_diario
+                            logger.info(f"Retomada: {len(indices_diario)} ICs do protocolo {id_atual} lidos do diário (SIGEDE pulado).")
+                        else:
+                            # Enquanto o SIGEDE roda, os workers seguem triando os ICs dos protocolos anteriores
+                            with contexto_log(f"SIGEDE {id_atual}"):
+                                indices_para_processar = processar_protocolo(proto_normalizado, credenciais, pasta_resultados)
+                            if indices_para_processar:
+                                diario.registrar_protocolo(id_atual, indices_para_processar)
+                        avancar_progresso(progressBarDict, progressBarDict["peso_tarefa"]*0.1, atualizar_progresso_gui)  #Calcula o progresso da barra após o SIGEDE
                         progressBarDict["n_cadastrais_associados"] = len(indices_para_processar)     #Define qtos ICs o protocolo tem
 
                     else:               # Se é um protocolo VIRTUAL (triagem por índices)
@@ -180,45 +263,77 @@ def main():
                     logger.error(f"Erro na etapa de obtenção de índices para {id_atual}: {e}")
                     indices_para_processar = []
 
-                # Processamento dos Índices daquele Protocolo
+                # Processamento dos Índices daquele Protocolo: enfileira os ICs para o pool de workers (vários ICs ao mesmo tempo)
+                # A main não espera os ICs terminarem: segue para o SIGEDE do próximo protocolo (produtor/consumidor, ver app/pipeline/fila.py)
                 if indices_para_processar:
                     total_ics = len(indices_para_processar)
-                    j: int = 1 # se tem índices, tem pelo menos 1 (j é nosso índice de índices usado no log ^^)
-                    for indice in indices_para_processar:
+                    VIRTUAL_PRTCL: bool = (task['tipo'] != 'REAL')              # True se protocolo VIRTUAL' (False qdo 'REAL')
+                    # j é nosso índice de índices (one-based) usado no log e no status ^^
+                    for j, indice in enumerate(indices_para_processar, 1):
                         if cancelar_event.is_set():
                             break
-                        count_IC += 1
                         indice_normalizado = indice.replace("-", "")
-                        try:
-                            
-                            section_log(f"[ Indice: {indice} ({j}/{total_ics}) ] ",'_') # Adiciona seção SIATU pra cada índice nos LOGS
-                            VIRTUAL_PRTCL: bool = (task['tipo'] != 'REAL')              # True se protocolo VIRTUAL' (False qdo 'REAL')
-                            
-                            # Define o um status dinâmico para o Status Text - Ex: "ETAPA 1/2: 700... ◀ [IC 1/5]"
-                            status_dinamico = f"{titulo_status}\n[IC {j}/{total_ics}]" # Ex: "ETAPA 1/2: 700... ◀ [IC 1/5]"
-                            
-                            processar_indice(
-                                indice_normalizado,
-                                credenciais,
-                                id_atual,
-                                pasta_resultados,
-                                status_title=status_dinamico,                   # Passa  status_dinamico no 'status_title' para maior granularidade
-                                statusUpdater=atualizar_status_gui,             # Método para atualizar o status da gui (um método da classe InterfaceApp)
-                                progressBarUpdater = atualizar_progresso_gui,   # Método para atualizar a barra de progresso (um método da classe InterfaceApp)
-                                progressBarDict= progressBarDict,               # Dicionário contendo info sobre a progressBar
-                                VIRTUAL_PRTCL=VIRTUAL_PRTCL,                    # O IC atual está num protocolo Virtual?         
-                            )
-                            j += 1      # incrementa o contador de ICs (Index de índices ^^)
-                            
-                        except Exception as e:
-                            logger.error(f"Erro no índice {indice}: {e}")
-                        
+                        pasta_ic = os.path.join(pasta_resultados, id_atual, indice_normalizado)
+                        chave = chave_indice(indice)
+                        if chave in ics_triados:
+                            # IC já triado (ou na fila) por outro protocolo: só replica o resultado no fim
+                            if os.path.abspath(ics_triados[chave]) != os.path.abspath(pasta_ic):
+                                replicas.append((chave, ics_triados[chave], pasta_ic, VIRTUAL_PRTCL))
+                            logger.info(f"IC {indice} ({j}/{total_ics}) já triado neste lote: o resultado será reaproveitado.")
+                            fracao_ic = sum(pesos_etapas(VIRTUAL_PRTCL).values()) / max(1, progressBarDict["n_cadastrais_associados"])
+                            avancar_progresso(progressBarDict, progressBarDict["peso_tarefa"]*fracao_ic, atualizar_progresso_gui)
+                            continue
+                        ics_triados[chave] = pasta_ic
+                        if ic_ja_triado(diario, id_atual, indice_normalizado):
+                            # Retomada: IC concluído (relatório gerado e arquivos intactos) na execução interrompida
+                            logger.info(f"Retomada: IC {indice} ({j}/{total_ics}) já concluído, pulando.")
+                            resultados_ics[chave] = resultados_do_diario(diario, id_atual, indice_normalizado)
+                            fracao_ic = sum(pesos_etapas(VIRTUAL_PRTCL).values()) / max(1, progressBarDict["n_cadastrais_associados"])
+                            avancar_progresso(progressBarDict, progressBarDict["peso_tarefa"]*fracao_ic, atualizar_progresso_gui)
+                            continue
+                        pool_ics.submeter(TarefaIC(
+                            indice_normalizado,
+                            id_atual,
+                            j,
+                            total_ics,
+                            titulo_status,
+                            VIRTUAL_PRTCL,
+                            progressBarDict["n_cadastrais_associados"],
+                        ))
+
                 # Se não achou índices pra processar no Sigede
                 elif not indices_para_processar:
-                    progressBarDict["atual"] += progressBarDict["peso_tarefa"]*0.9  #Adiciona o resto da porcentagem daquela etapa
-
-
-            if not cancelar_event.is_set():
+                    avancar_progresso(progressBarDict, progressBarDict["peso_tarefa"]*0.9)  #Adiciona o resto da porcentagem daquela etapa
+
+            # Todos os protocolos resolvidos: espera os workers terminarem os ICs que ainda estão na fila
+            pool_ics.aguardar()
+
+            # Materializa os ICs repetidos nas pastas dos outros protocolos que os referenciam (menos os que falharam:
+            # esses ficam para a retomada, que tria o IC de novo no primeiro protocolo e replica o resultado)
+            chaves_falhas = {chave_indice(indice) for indice in falhas}
+            replicados = 0
+            for chave, origem, destino, virtual in replicas:
+                if chave in chaves_falhas or chave not in resultados_ics:
+                    logger.warning(f"IC de {origem} não triado: não replicado em {destino}.")
+                    continue
+                resultados, indisponiveis = resultados_ics[chave]
+                replicados += replicar_ic(origem, destino, resultados, indisponiveis, credenciais["usuario"], virtual)
+            if replicas:
+                logger.info(f"ICs repetidos no lote: {replicados} de {len(replicas)} resultados reaproveitados "
+                            f"({len(replicas)} triagens economizadas).")
+
+
+            # O lote só é marcado como concluído sem cancelamento, ICs com erro nem etapas sem resultado (falhas que os
+            # adapters tratam sozinhos, sistemas indisponíveis) - senão rodar o mesmo lote de novo o retoma
+            pendencias = diario.pendencias()
+            if not cancelar_event.is_set() and not falhas and not pendencias and not motivo_abortar:
+                diario.registrar_fim()
+            else:
+                if pendencias:
+                    logger.warning(f"Etapas sem resultado nesta triagem: {', '.join(pendencias)}.")
+                logger.info("Triagem incompleta: inicie o mesmo lote novamente para retomar de onde parou.")
+
+            if not cancelar_event.is_set() and not motivo_abortar:
                 if os.path.exists(pasta_resultados):
                     logger.info(f"\nAbrindo pasta de resultados: {pasta_resultados}")
                     abrir_pasta(pasta_resultados)
@@ -231,12 +346,29 @@ def main():
             logger.error(f"Erro crítico no loop de triagem principal: {e}")
 
         finally:
+            pool_ics.encerrar()         # Espera os ICs em andamento e encerra os workers
+            count_IC = pool_ics.processados
+            pool_sessoes.encerrar()     # Fecha os navegadores mantidos vivos durante a triagem
             duracao = datetime.now() - inicio_exec
             minutos, segundos = divmod(duracao.total_seconds(), 60)
             final_log_total_protocol = count_protocol if not ics_avulsos else count_protocol-1
             logger.info(f"Protocolos processados: {final_log_total_protocol}")
             logger.info(f"ICs processados: {count_IC}")
             logger.info(f"Tempo: {int(minutos)} min {int(segundos)} seg")
+            # Onde os bots passaram mais tempo esperando (ver utils/esperas.py) - ajuda a calibrar os tetos das esperas
+            linhas_esperas = resumo_esperas()
+            if linhas_esperas:
+                logger.info("Esperas que mais consumiram tempo:\n\t" + "\n\t".join(linhas_esperas))
+            # Fila e espera por sistema no limitador (ver utils/limites.py) - ajuda a calibrar LIMITES contra a saúde dos servidores
+            linhas_limites = resumo_limites()
+            if linhas_limites:
+                logger.info("Sessões por sistema (limitador):\n\t" + "\n\t".join(linhas_limites))
+            # Sistemas que ficaram indisponíveis (disjuntor aberto) durante a triagem
+            linhas_disjuntores = resumo_disjuntores()
+            if linhas_disjuntores:
+                logger.warning("Sistemas indisponíveis na triagem:\n\t" + "\n\t".join(linhas_disjuntores))
+            if cache_resultados.acertos:
+                logger.info(f"Etapas servidas pelo cache: {cache_resultados.acertos} (executadas: {cache_resultados.faltas})")
             if progressBarDict["atual"] != 100.0:
                 progressBarDict["atual"] = 100.0
                 atualizar_progresso_gui(progressBarDict['atual'])
@@ -250,8 +382,13 @@ def main():
                     novo_nome = f"Detalhes da Triagem - {nome_pasta.replace('Resultados - ', '')}.txt"
                     
                     destino = os.path.join(pasta_resultados, novo_nome)
-                    # Usa shutil.copy() para fazer uma cópia do arquivo na pasta raíz pra pasta destino (Resultados - ...)
-                    shutil.copy(log_path, destino)
+                    if pasta_retomada and os.path.exists(destino):
+                        # Retomada: acrescenta o LOG desta execução ao da execução interrompida
+                        with open(log_path, "rb") as origem, open(destino, "ab") as arquivo_destino:
+                            shutil.copyfileobj(origem, arquivo_destino)
+                    else:
+                        # Usa shutil.copy() para fazer uma cópia do arquivo na pasta raíz pra pasta destino (Resultados - ...)
+                        shutil.copy(log_path, destino)
                     logger.info(f"Log persistente salvo na pasta de Resultados:\n{destino}\n\n")
                 except Exception as e:
                     logger.error(f"Erro ao salvar cópia do log persistente na pasta destino:\n({destino})\n{e}\n\n")
@@ -259,6 +396,10 @@ def main():
             root.after(0, resetar_interface) # A main está resetando a interface (não interface.py)
             # Reseta a interface DEPOIS de mover o log pra past de Resultados
 
+    # Resolve o ChromeDriver uma única vez, em segundo plano, enquanto o usuário preenche a interface.
+    # (criar_driver(...) reaproveita o resultado em memória - ou espera esta thread terminar, se ainda estiver rodando)
+    threading.Thread(target=resolver_chromedriver, daemon=True).start()
+
     root, resetar_interface, _, iniciar_timer = iniciar_interface(processar)
     root.mainloop()
 
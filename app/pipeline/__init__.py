@@ -1,8 +1,25 @@
-from .process import processar_indice, processar_protocolo
+from .process import processar_indice, processar_protocolo, avancar_progresso, atualizar_status, pesos_etapas, ic_ja_triado
+from .process import replicar_ic, resultados_do_diario
+from .fila import PoolICs, TarefaIC
+from .diario import DiarioTriagem, localizar_triagem_interrompida, retomada_habilitada
+from .verificacao import verificar_sistemas, verificacao_habilitada
 # importa as funções processa_indice e processar_protocolo do módulo process.py no mesmo diertório
 
 """ Traz os métodos importados para o namespace do pacote pipeline - resolvendo as funções (útil na hora de importar no arquivo main.py)"""
 __all__ = [
     "processar_indice",
     "processar_protocolo",
+    "avancar_progresso",
+    "atualizar_status",
+    "pesos_etapas",
+    "ic_ja_triado",
+    "replicar_ic",
+    "resultados_do_diario",
+    "PoolICs",
+    "TarefaIC",
+    "DiarioTriagem",
+    "localizar_triagem_interrompida",
+    "retomada_habilitada",
+    "verificar_sistemas",
+    "verificacao_habilitada",
 ]
@@ -0,0 +1,228 @@
+from utils import logger, hash_arquivo
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+'''
+==================================================================================================================================
+Diário (journal) da triagem: permite retomar um lote interrompido na mesma pasta de resultados.
+
+Se o processo morre ou o usuário cancela no IC 37 de 60, a próxima execução começava do zero numa nova pasta
+"Resultados - ...". Agora cada pasta de resultados tem um diário (DiarioTriagem.ARQUIVO), só de acréscimo (append-only,
+uma linha JSON por registro, gravada com fsync), com:
+
+    - lote:       os protocolos e ICs avulsos pedidos (identifica o lote na hora de retomar);
+    - protocolo:  os ICs que o SIGEDE encontrou para o protocolo (na retomada o SIGEDE não roda de novo);
+    - etapa:      cada etapa concluída de cada IC (SIATU, URBANO, ...), com o resultado e as impressões digitais
+                  (sha256) dos arquivos que ela gerou;
+    - fim:        o lote terminou sem cancelamento.
+
+Modo retomada (main.processar): um lote igual ao de uma pasta com diário sem 'fim' continua nessa pasta - as etapas
+já concluídas (com os arquivos intactos) são puladas e só as que faltam rodam. Uma etapa cujo arquivo sumiu ou mudou
+roda de novo, assim como as etapas que dependem dela. Uma linha truncada no fim do arquivo (queda no meio da gravação)
+é ignorada na leitura.
+==================================================================================================================================
+'''
+
+VARIAVEL_RETOMAR = "AUTOTRI_RETOMAR"
+SUFIXOS_TEMPORARIOS = (".crdownload", ".part", ".tmp")  # Downloads em andamento e cópias pela metade: nunca são saídas de uma etapa
+
+
+def retomada_habilitada() -> bool:
+    """Modo retomada: ligado por padrão; AUTOTRI_RETOMAR=0 força sempre uma nova pasta de resultados."""
+    return os.environ.get(VARIAVEL_RETOMAR, "1") not in ("0", "")
+
+
+class DiarioTriagem:
+    """
+    Diário append-only de uma pasta de resultados. Seguro para várias threads (workers de ICs e etapas em paralelo).
+
+    Parâmetros:
+        pasta_resultados (str): Pasta "Resultados - ..." do lote.
+    """
+
+    ARQUIVO = ".diario_triagem.jsonl"
+
+    def __init__(self, pasta_resultados: str):
+        self.pasta_resultados = pasta_resultados
+        self.caminho = os.path.join(pasta_resultados, self.ARQUIVO)
+        self.lote: Optional[Dict[str, Any]] = None
+        self.finalizado: bool = False
+        self._protocolos: Dict[str, List[str]] = {}
+        self._etapas: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._pendentes: set = set()    # Etapas que falharam NESTA execução (só em memória): impedem o registro do 'fim'
+        self._lock = threading.Lock()
+        self._linha_aberta = False      # Última linha do arquivo sem '\n' (truncada): a próxima gravação começa numa linha nova
+        self._carregar()
+
+    # ------------------------------------------------------------------ leitura
+    def _carregar(self) -> None:
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, encoding="utf-8") as f:
+            for linha in f:
+                self._linha_aberta = not linha.endswith("\n")
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue    # Linha truncada por uma queda no meio da gravação
+                self._aplicar(registro)
+
+    def _aplicar(self, registro: Dict[str, Any]) -> None:
+        tipo = registro.get("tipo")
+        if tipo == "lote":
+            self.lote = registro
+            self.finalizado = False     # Uma retomada reabre o lote
+        elif tipo == "protocolo":
+            self._protocolos[registro["protocolo"]] = registro["indices"]
+        elif tipo == "etapa":
+            self._etapas[(registro["protocolo"], registro["indice"], registro["etapa"])] = registro
+        elif tipo == "fim":
+            self.finalizado = True
+
+    def mesmo_lote(self, protocolos: List[str], ics_avulsos: List[str]) -> bool:
+        """True se o diário é de um lote com os mesmos protocolos e ICs avulsos."""
+        return bool(self.lote) and self.lote["protocolos"] == list(protocolos) \
+            and self.lote["ics_avulsos"] == list(ics_avulsos or [])
+
+    def indices_do_protocolo(self, protocolo: str) -> Optional[List[str]]:
+        """ICs do protocolo já resolvidos pelo SIGEDE neste lote, ou None."""
+        with self._lock:
+            return self._protocolos.get(protocolo)
+
+    def etapa_concluida(self, protocolo: str, indice: str, etapa: str) -> Optional[Dict[str, Any]]:
+        """
+        Registro da etapa se ela já foi concluída e todos os arquivos que gerou continuam intactos; senão None.
+
+        :return: O registro (com o 'resultado' da etapa) ou None se a etapa precisa rodar (de novo).
+        """
+        with self._lock:
+            registro = self._etapas.get((protocolo, indice, etapa))
+        if registro is None:
+            return None
+        impressoes_pastas: Dict[str, set] = {}     # Cada pasta é lida (e seus arquivos hasheados) no máximo uma vez
+        for relativo, impressao in registro["arquivos"].items():
+            caminho = os.path.join(self.pasta_resultados, relativo)
+            if os.path.isfile(caminho) and hash_arquivo(caminho) == impressao:
+                continue
+            # O relatório renomeia os anexos para nomes seguros (normalizar_nome): aceita o mesmo conteúdo com outro nome
+            pasta = os.path.dirname(caminho)
+            if pasta not in impressoes_pastas:
+                impressoes_pastas[pasta] = self._impressoes_da_pasta(pasta)
+            if impressao in impressoes_pastas[pasta]:
+                continue
+            logger.warning(f"Retomada: '{relativo}' ausente ou alterado, a etapa {etapa} do IC {indice} roda de novo.")
+            return None
+        return registro
+
+    @staticmethod
+    def _impressoes_da_pasta(pasta: str) -> set:
+        """sha256 de todos os arquivos de uma pasta (não recursivo)."""
+        if not os.path.isdir(pasta):
+            return set()
+        return {hash_arquivo(os.path.join(pasta, nome)) for nome in os.listdir(pasta)
+                if os.path.isfile(os.path.join(pasta, nome))}
+
+    def pendencias(self) -> List[str]:
+        """Etapas desta execução que falharam ou ficaram sem resultado ("IC/etapa"). Com alguma, o lote não terminou."""
+        with self._lock:
+            return sorted(f"{indice}/{etapa}" for _protocolo, indice, etapa in self._pendentes)
+
+    def ic_concluido(self, protocolo: str, indice: str, etapas: List[str]) -> bool:
+        """True se todas as 'etapas' do IC foram registradas e continuam intactas (uma etapa pulada - sistema
+        indisponível - não é registrada, então o IC volta a rodar numa retomada)."""
+        return all(self.etapa_concluida(protocolo, indice, e) is not None for e in etapas)
+
+    # ------------------------------------------------------------------ escrita
+    def _gravar(self, registro: Dict[str, Any]) -> None:
+        registro["t"] = time.time()
+        linha = json.dumps(registro, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._linha_aberta:
+                linha = "\n" + linha
+                self._linha_aberta = False
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())    # O registro sobrevive a uma queda do processo logo em seguida
+            self._aplicar(registro)
+
+    def iniciar_lote(self, protocolos: List[str], ics_avulsos: List[str]) -> None:
+        self._gravar({"tipo": "lote", "protocolos": list(protocolos), "ics_avulsos": list(ics_avulsos or [])})
+
+    def registrar_protocolo(self, protocolo: str, indices: List[str]) -> None:
+        self._gravar({"tipo": "protocolo", "protocolo": protocolo, "indices": list(indices)})
+
+    def registrar_etapa(self, protocolo: str, indice: str, etapa: str, resultado: Any, arquivos: List[str]) -> None:
+        """
+        Registra a conclusão de uma etapa de um IC.
+
+        :param resultado: O retorno da etapa (precisa ser serializável em JSON - tuplas voltam como listas).
+        :param arquivos: Caminhos dos arquivos que a etapa gerou (as impressões digitais são calculadas aqui).
+        """
+        impressoes = {}
+        for caminho in arquivos:
+            try:
+                impressoes[os.path.relpath(caminho, self.pasta_resultados)] = hash_arquivo(caminho)
+            except OSError:
+                continue    # Movido ou apagado por uma etapa vizinha depois da listagem: não é saída desta etapa
+        try:
+            self._gravar({"tipo": "etapa", "protocolo": protocolo, "indice": indice, "etapa": etapa,
+                          "resultado": resultado, "arquivos": impressoes})
+        except (TypeError, ValueError) as e:
+            # Resultado não serializável: a etapa só não poderá ser pulada numa retomada
+            logger.warning(f"Etapa {etapa} do IC {indice} não registrada no diário: {e}")
+
+    def anotar_pendente(self, protocolo: str, indice: str, etapa: str) -> None:
+        """Anota uma etapa que falhou ou ficou sem resultado (não é gravada: numa retomada ela simplesmente roda de novo)."""
+        with self._lock:
+            self._pendentes.add((protocolo, indice, etapa))
+
+    def registrar_fim(self) -> None:
+        self._gravar({"tipo": "fim"})
+
+
+def localizar_triagem_interrompida(protocolos: List[str], ics_avulsos: List[str], raiz: str = ".") -> Optional[str]:
+    """
+    Procura a pasta de resultados mais recente com um lote igual que não chegou ao fim.
+
+    :param raiz: Onde as pastas "Resultados - ..." são criadas (ver criar_pasta_resultados em utils/pastas.py).
+    :return: O caminho da pasta ou None.
+    """
+    candidatas = glob.glob(os.path.join(raiz, "Resultados - *", DiarioTriagem.ARQUIVO))
+    for caminho in sorted(candidatas, key=os.path.getmtime, reverse=True):
+        pasta = os.path.dirname(caminho)
+        try:
+            diario = DiarioTriagem(pasta)
+        except OSError:
+            continue
+        if not diario.finalizado and diario.mesmo_lote(protocolos, ics_avulsos):
+            return pasta
+    return None
+
+
+def arquivos_da_pasta(pasta: str) -> Dict[str, float]:
+    """
+    Arquivos (recursivo) de uma pasta com o mtime de cada um - usado para descobrir o que uma etapa gerou.
+
+    As subpastas ocultas (".siatu", ".urbano", ... - onde as etapas com cache gravam enquanto rodam, ver utils/cache.py)
+    e os arquivos temporários ficam de fora: são arquivos ainda não concluídos de uma etapa vizinha, que depois são
+    movidos para a pasta do IC (e só então contam).
+    """
+    arquivos = {}
+    for raiz, pastas, nomes in os.walk(pasta):
+        pastas[:] = [p for p in pastas if not p.startswith(".")]
+        for nome in nomes:
+            if nome.endswith(SUFIXOS_TEMPORARIOS):
+                continue
+            caminho = os.path.join(raiz, nome)
+            try:
+                arquivos[caminho] = os.path.getmtime(caminho)
+            except OSError:
+                pass
+    return arquivos
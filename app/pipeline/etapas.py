@@ -0,0 +1,146 @@
+from utils import logger
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+'''
+==================================================================================================================================
+Executor das etapas de um IC como um grafo de dependências (DAG).
+
+Antes, app/pipeline/process.py rodava SIATU → URBANO → SISCTM → Google Maps → relatório estritamente em sequência, mas só
+o Google Maps (usa dados_sisctm e dados_pb) e o relatório (usa tudo) dependem de etapas anteriores. Cada etapa aqui declara
+de quais outras depende; as que já têm suas entradas prontas rodam em paralelo (cada bot com o seu próprio driver), e as
+dependentes começam assim que a última dependência termina. O tempo do IC cai para algo perto do sistema mais lento.
+
+    grafo = GrafoEtapas([
+        Etapa("SIATU", lambda r: ...),
+        Etapa("SISCTM", lambda r: ...),
+        Etapa("G-MAPS", lambda r: usar(r["SIATU"], r["SISCTM"]), depende=("SIATU", "SISCTM")),
+    ])
+    resultados = grafo.executar()       # {"SIATU": ..., "SISCTM": ..., "G-MAPS": ...}
+
+NOTE: Os callbacks ao_iniciar / ao_concluir (status e progress bar da interface) rodam sempre na thread que chamou
+      executar(...) - nunca nas threads das etapas - então os callbacks de um mesmo IC nunca rodam ao mesmo tempo.
+NOTE: Se uma etapa falha, as que dependem dela não rodam; as independentes terminam normalmente (devolvendo os drivers
+      ao pool) e a primeira exceção é relançada ao fim - como no fluxo sequencial, o IC é registrado como erro.
+==================================================================================================================================
+'''
+
+
+class Etapa:
+    """
+    Uma etapa do processamento de um IC.
+
+    Parâmetros:
+        nome (str): Nome único da etapa (chave do resultado e texto do status).
+        funcao (Callable): Recebe o dict {nome: resultado} das etapas já concluídas e retorna o resultado desta.
+        depende (Iterable[str]): Nomes das etapas que precisam terminar antes desta começar.
+        peso (float): Fração da progress bar do IC que a etapa representa.
+    """
+
+    def __init__(self, nome: str, funcao: Callable[[Dict[str, Any]], Any], depende: Iterable[str] = (), peso: float = 0.0):
+        self.nome = nome
+        self.funcao = funcao
+        self.depende = tuple(depende)
+        self.peso = peso
+
+    def __repr__(self) -> str:
+        return f"Etapa({self.nome!r}, depende={self.depende})"
+
+
+class GrafoEtapas:
+    """
+    Executa um conjunto de etapas respeitando as dependências entre elas, com até 'max_paralelas' ao mesmo tempo.
+
+    Parâmetros:
+        etapas (List[Etapa]): Etapas do grafo. A ordem da lista desempata quem começa primeiro.
+        max_paralelas (int): Nº máximo de etapas rodando ao mesmo tempo (1 = fluxo sequencial, na ordem da lista).
+        ao_iniciar (Callable): [OPCIONAL] Chamado com (etapa, nomes das etapas em andamento) quando uma etapa começa.
+        ao_concluir (Callable): [OPCIONAL] Chamado com (etapa, nomes das etapas em andamento) quando uma etapa termina bem.
+    """
+
+    def __init__(
+        self,
+        etapas: List[Etapa],
+        max_paralelas: int = 3,
+        ao_iniciar: Optional[Callable[[Etapa, List[str]], None]] = None,
+        ao_concluir: Optional[Callable[[Etapa, List[str]], None]] = None,
+    ):
+        self.etapas = list(etapas)
+        self.max_paralelas = max(1, max_paralelas)
+        self.ao_iniciar = ao_iniciar
+        self.ao_concluir = ao_concluir
+        self._validar()
+
+    def _validar(self) -> None:
+        """Garante nomes únicos, dependências existentes e ausência de ciclos (ValueError caso contrário)."""
+        nomes = [e.nome for e in self.etapas]
+        if len(set(nomes)) != len(nomes):
+            raise ValueError(f"Etapas com nome repetido: {nomes}")
+        for etapa in self.etapas:
+            desconhecidas = [d for d in etapa.depende if d not in nomes]
+            if desconhecidas:
+                raise ValueError(f"Etapa {etapa.nome} depende de etapas inexistentes: {desconhecidas}")
+
+        # Ordenação topológica: se sobrar etapa sem poder ser liberada, há um ciclo
+        liberadas: set = set()
+        restantes = list(self.etapas)
+        while restantes:
+            prontas = [e for e in restantes if set(e.depende) <= liberadas]
+            if not prontas:
+                raise ValueError(f"Dependência circular entre as etapas: {[e.nome for e in restantes]}")
+            liberadas.update(e.nome for e in prontas)
+            restantes = [e for e in restantes if e.nome not in liberadas]
+
+    def executar(self) -> Dict[str, Any]:
+        """
+        Roda o grafo até o fim.
+
+        :return: Dicionário {nome da etapa: resultado}.
+        :raises Exception: A primeira exceção lançada por uma etapa (depois que todas as etapas em andamento terminarem).
+        """
+        resultados: Dict[str, Any] = {}
+        pendentes: List[Etapa] = list(self.etapas)
+        em_andamento: Dict[Future, Etapa] = {}
+        falhas: set = set()              # Etapas que falharam ou foram puladas por dependerem de uma que falhou
+        primeiro_erro: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=self.max_paralelas, thread_name_prefix="etapa") as executor:
+            while pendentes or em_andamento:
+                # Pula as etapas cujas dependências falharam
+                for etapa in [e for e in pendentes if falhas.intersection(e.depende)]:
+                    logger.warning("Etapa %s não executada: depende de etapa que falhou.", etapa.nome)
+                    falhas.add(etapa.nome)
+                    pendentes.remove(etapa)
+
+                # Dispara as etapas prontas (todas as dependências concluídas), na ordem da lista
+                for etapa in [e for e in pendentes if all(d in resultados for d in e.depende)]:
+                    if len(em_andamento) >= self.max_paralelas:
+                        break
+                    pendentes.remove(etapa)
+                    contexto = contextvars.copy_context()   # A etapa herda a marca do IC no log (utils/logger.py)
+                    em_andamento[executor.submit(contexto.run, etapa.funcao, dict(resultados))] = etapa
+                    if self.ao_iniciar:
+                        self.ao_iniciar(etapa, [e.nome for e in em_andamento.values()])
+
+                if not em_andamento:
+                    break
+
+                concluidas, _ = wait(list(em_andamento), return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    etapa = em_andamento.pop(futuro)
+                    try:
+                        resultados[etapa.nome] = futuro.result()
+                    except Exception as e:
+                        logger.error("Erro na etapa %s: %s", etapa.nome, e)
+                        falhas.add(etapa.nome)
+                        primeiro_erro = primeiro_erro or e
+                        continue
+                    if self.ao_concluir:
+                        self.ao_concluir(etapa, [e.nome for e in em_andamento.values()])
+
+        if primeiro_erro is not None:
+            raise primeiro_erro
+        return resultados
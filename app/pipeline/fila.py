@@ -0,0 +1,139 @@
+from utils import logger, contexto_log
+
+import os
+import queue
+import threading
+from typing import Callable, List, Optional
+
+
+'''
+==================================================================================================================================
+Pool de workers que triam vários ICs ao mesmo tempo.
+
+Antes, a main percorria os ICs de cada protocolo um a um - um protocolo com 9 ICs levava ~9 vezes o tempo de um IC.
+Agora a main só enfileira os ICs (TarefaIC) numa fila compartilhada e N workers (threads) os retiram e processam, cada
+um com os seus próprios navegadores (emprestados do pool de sessões, utils/sessoes.py). Cada IC continua gravando na
+sua pasta pasta_resultados/<protocolo>/<indice>, então os workers nunca disputam arquivos.
+
+    - Nº de workers: ICS_PARALELOS (variável de ambiente AUTOTRI_ICS_PARALELOS ou, sem ela, ~1 worker a cada 3 núcleos,
+      limitado a MAX_ICS_PARALELOS). Cada IC abre até 3 navegadores ao mesmo tempo (ver app/pipeline/etapas.py).
+    - Cancelamento: o cancelar_event da interface é global - com ele ligado os workers descartam os ICs ainda na fila
+      (os ICs em andamento terminam normalmente).
+    - Log: cada linha emitida durante um IC recebe a marca [IC <indice>] (ver contexto_log em utils/logger.py).
+    - Produtor/consumidor: a main (produtora) resolve os protocolos no SIGEDE e enfileira os ICs sem esperar os do
+      protocolo anterior terminarem. A fila é limitada (ICS_ADIANTADOS por worker): o SIGEDE anda no máximo alguns
+      ICs à frente, e o primeiro IC do protocolo seguinte começa assim que um worker fica livre.
+==================================================================================================================================
+'''
+
+VARIAVEL_ICS_PARALELOS = "AUTOTRI_ICS_PARALELOS"
+MAX_ICS_PARALELOS = 6
+ICS_ADIANTADOS = 2      # ICs na fila (resolvidos pelo SIGEDE e ainda não iniciados) por worker
+
+
+def ics_paralelos_configurados() -> int:
+    """Nº de workers do pool de ICs: variável de ambiente ou ~1 worker a cada 3 núcleos (entre 1 e MAX_ICS_PARALELOS)."""
+    configurado = os.environ.get(VARIAVEL_ICS_PARALELOS)
+    if configurado:
+        try:
+            return max(1, int(configurado))
+        except ValueError:
+            logger.warning(f"{VARIAVEL_ICS_PARALELOS} inválida ({configurado}), usando o padrão.")
+    return max(1, min(MAX_ICS_PARALELOS, (os.cpu_count() or 1) // 3))
+
+
+ICS_PARALELOS = ics_paralelos_configurados()
+
+
+class TarefaIC:
+    """
+    Um IC a ser triado por um worker.
+
+    Parâmetros:
+        indice (str): Índice cadastral normalizado (sem '-').
+        protocolo (str): Id do protocolo (nome da pasta do protocolo).
+        posicao (int): Posição do IC no protocolo (one-based, para o status e o log).
+        total (int): Nº de ICs do protocolo.
+        titulo_status (str): Título do protocolo no StatusText da interface.
+        virtual (bool): True se o IC pertence ao protocolo virtual (triagem por ICs avulsos).
+        n_cadastrais_associados (int): Nº de ICs que dividem a fatia do protocolo na progress bar.
+    """
+
+    def __init__(self, indice: str, protocolo: str, posicao: int, total: int, titulo_status: str, virtual: bool,
+                 n_cadastrais_associados: int = 1):
+        self.indice = indice
+        self.protocolo = protocolo
+        self.posicao = posicao
+        self.total = total
+        self.titulo_status = titulo_status
+        self.virtual = virtual
+        self.n_cadastrais_associados = n_cadastrais_associados
+
+    def __repr__(self) -> str:
+        return f"TarefaIC({self.indice!r}, protocolo={self.protocolo!r}, {self.posicao}/{self.total})"
+
+
+class PoolICs:
+    """
+    Fila de ICs consumida por N workers.
+
+    Parâmetros:
+        processar (Callable[[TarefaIC], None]): Processa um IC (as exceções são logadas e não derrubam o worker).
+        cancelar_event (threading.Event): Evento global de cancelamento da triagem.
+        n_workers (int): Nº de ICs triados ao mesmo tempo.
+        adiantados (int): ICs que podem esperar na fila por worker (submeter(...) bloqueia com a fila cheia).
+    """
+
+    _FIM = None     # Sentinela que encerra um worker
+
+    def __init__(self, processar: Callable[[TarefaIC], None], cancelar_event: threading.Event, n_workers: int = ICS_PARALELOS,
+                 adiantados: int = ICS_ADIANTADOS):
+        self.processar = processar
+        self.cancelar_event = cancelar_event
+        self.n_workers = max(1, n_workers)
+        self.processados: int = 0   # ICs que chegaram a ser iniciados (o antigo count_IC da main)
+        self._fila: "queue.Queue[Optional[TarefaIC]]" = queue.Queue(maxsize=self.n_workers * max(1, adiantados))
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def iniciar(self) -> None:
+        """Dispara os workers."""
+        for n in range(self.n_workers):
+            worker = threading.Thread(target=self._trabalhar, name=f"worker_ic_{n + 1}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Pool de ICs iniciado com {self.n_workers} worker(s).")
+
+    def submeter(self, tarefa: TarefaIC) -> None:
+        """Enfileira um IC. Bloqueia enquanto a fila estiver cheia (o produtor não se adianta demais)."""
+        self._fila.put(tarefa)
+
+    def aguardar(self) -> None:
+        """Bloqueia até todos os ICs enfileirados até agora terem sido processados (ou descartados pelo cancelamento)."""
+        self._fila.join()
+
+    def encerrar(self) -> None:
+        """Encerra os workers depois que os ICs já enfileirados terminarem."""
+        for _ in self._workers:
+            self._fila.put(self._FIM)
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+
+    def _trabalhar(self) -> None:
+        """Corpo de um worker: retira ICs da fila até receber a sentinela."""
+        while True:
+            tarefa = self._fila.get()
+            try:
+                if tarefa is self._FIM:
+                    return
+                if self.cancelar_event.is_set():
+                    continue    # Triagem cancelada: descarta o IC (mas marca como feito para não travar aguardar())
+                with self._lock:
+                    self.processados += 1
+                with contexto_log(f"IC {tarefa.indice}"):
+                    self.processar(tarefa)
+            except Exception as e:
+                logger.error(f"Erro no índice {getattr(tarefa, 'indice', '?')}: {e}")
+            finally:
+                self._fila.task_done()
@@ -1,10 +1,18 @@
 from abc import ABC, abstractmethod
 #ABC = Abstract Base Class - permite definir classes abstratas em python
+from concurrent.futures import Future
+from typing import Dict, Optional
+from utils import pool_sessoes, PerfilDriver, disjuntores
 
 # Define um contrato para qualquer classe que herde de SistemaAutomação (que por sua vez herda de ABC, para implementar métodos abstratos)
 # Todo bot que herde de SistemaAutomação deve ter pelo menos o método executar(...) implementado com essa assinatura de argumentos
 # - a definição do método pode diferir de bot para bot
 class SistemaAutomacao(ABC):
+
+    SISTEMA: Optional[str] = None   # Chave do sistema no pool de sessões (ex: "SIATU"). Definida em cada classe filha.
+    ADD_CONFIG: Optional[bool] = None   # Flag experimental do criar_driver(...) usada pelo sistema (ver app/utils/web_driver.py)
+    PERFIL_DRIVER: Optional[PerfilDriver] = None    # Estratégia de carregamento e timeouts do driver do sistema (ver app/utils/perfis.py)
+
     # TODO: Padronizar os parâmetros da interface executar para contemplar todas as classes definidas em app/pipeline/sistemas.py 
     # (GoogleMaps usa mais parâmetros que o definido aqui.) Princípio da Substituição de Liskov
     @abstractmethod # Este decorator, aplicado ao método executar(...) força que qualquer classe filha defina seu próprio método executar
@@ -12,8 +20,32 @@ class SistemaAutomacao(ABC):
         """Executa coleta de dados e retorna os resultados do sistema"""
         pass  # Não implementa nada pois isso é como um método virtal da classe SistemaAutomação
 
+    def preparar_sessao(self, driver, credenciais: Dict[str, str]) -> bool:
+        """Faz o login do sistema num driver recém-aberto (usado no pré-aquecimento).
+        Por padrão não faz nada (sistemas sem login, como o Google Maps).
+
+        :return: True se o driver ficou autenticado.
+        """
+        return False
+
+    def pre_aquecer(self, credenciais: Dict[str, str], pasta_download: str) -> Optional[Future]:
+        """Pede ao pool de sessões que abra (e autentique) o navegador deste sistema em segundo plano,
+        para que a etapa do sistema não pague o custo de inicialização do Chrome quando chegar a sua vez.
+        Com o disjuntor do sistema aberto (utils/disjuntor.py) não abre nada: a etapa vai ser pulada.
+
+        :return: O Future do navegador sendo aberto (ver PoolSessoes.pre_aquecer) ou None."""
+        if self.SISTEMA in disjuntores.abertos():
+            return None
+        return pool_sessoes.pre_aquecer(
+            self.SISTEMA,
+            pasta_download,
+            add_config=self.ADD_CONFIG,
+            preparar=lambda driver: self.preparar_sessao(driver, credenciais),
+            perfil_driver=self.PERFIL_DRIVER,
+        )
+
 
 '''
 Decorators em pythons (@abstractmethod, por exemplo) são açucares sintáticos para alterar classes ou funções de forma legível e reversível.
 Neste caso, funciona como uma função de alta ordem (função capaz de receber funções como parâmetro e/ou retorná-las)
-'''
\ No newline at end of file
+'''
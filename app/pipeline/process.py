@@ -1,12 +1,17 @@
 from utils import logger, section_log # importa o objetor logger e a funçõa section_log (de utils/logger.py)
+from utils import executar_com_cache
 from core import gerar_relatorio
 from .sistemas import Siatu
 from .sistemas import Urbano
 from .sistemas import Sisctm
 from .sistemas import GoogleMaps
 from .sistemas import Sigede
+from .etapas import Etapa, GrafoEtapas
+from .diario import DiarioTriagem, arquivos_da_pasta
+from utils import disjuntores, SistemaIndisponivel, replicar_pasta_ic
 
 import os
+import threading
 from typing import Tuple, Dict, List, Any, Callable, Optional
 
 
@@ -15,9 +20,186 @@ from typing import Tuple, Dict, List, Any, Callable, Optional
 Este módulo, app/pipeline/process.py, funciona como um sub-orquestrador do pipeline da automação. 
 Aqui as classes de serviço definidas em app/pipiline/sistemas.py são instanciadas e utilizadas para executar a automação em uma sequência lógica.
 Este módulo gerencia os caminhos de arquivos e pastas (checando a existência dos diretórios para previnir exceções) e aciona a geração do relatório da automação.
+As etapas de cada IC rodam como um grafo de dependências (app/pipeline/etapas.py): SIATU, URBANO e SISCTM em paralelo.
 ==================================================================================================================================
 '''
 
+ETAPA_RELATORIO = "GERANDO RELATÓRIO"     # Última etapa de um IC
+ETAPAS_IC = ["SIATU", "URBANO", "SISCTM", "G-MAPS", ETAPA_RELATORIO]   # Todas registradas no diário = IC concluído
+
+# Resultado de uma etapa pulada porque o sistema está indisponível (disjuntor aberto, ver utils/disjuntor.py) -
+# o mesmo que o adapter devolve quando falha
+RESULTADO_INDISPONIVEL = {"SIATU": ({}, 0, 0), "URBANO": ({}, 0), "SISCTM": {}, "G-MAPS": None}
+# Os adapters tratam as próprias falhas e devolvem um resultado vazio: só um resultado que passa por esta verificação é
+# guardado no cache (utils/cache.py) e registrado no diário - uma falha nunca é dada como etapa concluída.
+# O SIATU só vale com todos os anexos encontrados baixados: (dados_pb, anexos baixados, anexos encontrados)
+RESULTADO_VALIDO: Dict[str, Callable[[Any], bool]] = {
+    "SIATU": lambda r: len(r) == 3 and bool(r[0]) and r[1] == r[2],
+    "URBANO": lambda r: bool(r[0]),
+    "SISCTM": bool,
+}
+MAX_ETAPAS_PARALELAS = 3    # Nº de etapas (navegadores) de um mesmo IC rodando ao mesmo tempo - 1 = fluxo sequencial antigo
+
+# Vários ICs podem estar em processamento ao mesmo tempo (app/pipeline/fila.py): o acumulador da progress bar
+# e as chamadas à interface são serializados por este lock
+_lock_interface = threading.Lock()
+
+
+def pesos_etapas(VIRTUAL_PRTCL: bool = False) -> Dict[str, float]:
+    """Fração do peso da tarefa (progress bar) de cada etapa de um IC. O custo da etapa SISCTM é um pouco maior em protocolos virtuais."""
+    return {"SIATU": 0.2, "URBANO": 0.2, "SISCTM": 0.4 if VIRTUAL_PRTCL else 0.3, "G-MAPS": 0.2}
+
+
+def avancar_progresso(progressBarDict: Optional[Dict[str, float]], incremento: float,
+                      progressBarUpdater: Optional[Callable[[float], None]] = None) -> None:
+    """Soma 'incremento' ao acumulador da progress bar e atualiza a interface (seguro entre threads)."""
+    if not progressBarDict:
+        return
+    with _lock_interface:
+        progressBarDict["atual"] += incremento
+        if progressBarUpdater:
+            progressBarUpdater(progressBarDict["atual"])
+
+
+def atualizar_status(statusUpdater: Optional[Callable[[str], None]], status: str) -> None:
+    """Atualiza o StatusText da interface (seguro entre threads). Sistemas indisponíveis aparecem numa linha extra."""
+    if statusUpdater:
+        alerta = disjuntores.resumo()
+        if alerta:
+            status = f"{status}\n{alerta}"
+        with _lock_interface:
+            statusUpdater(status)
+
+
+def tolerar_indisponiveis(etapas: List[Etapa], indisponiveis: List[str]) -> List[Etapa]:
+    """
+    Envolve as etapas dos sistemas externos: se o sistema está indisponível (SistemaIndisponivel), a etapa devolve o
+    resultado vazio de RESULTADO_INDISPONIVEL em vez de derrubar o IC, e o sistema é anotado em 'indisponiveis'
+    (para o aviso do relatório).
+    """
+    def envolver(etapa: Etapa) -> Callable[[Dict[str, Any]], Any]:
+        def executar(resultados: Dict[str, Any]) -> Any:
+            try:
+                return etapa.funcao(resultados)
+            except SistemaIndisponivel as e:
+                logger.warning(f"{e}: etapa {etapa.nome} pulada.")
+                indisponiveis.append(e.sistema)
+                return RESULTADO_INDISPONIVEL[etapa.nome]
+        return executar
+
+    return [Etapa(e.nome, envolver(e), depende=e.depende, peso=e.peso) if e.nome in RESULTADO_INDISPONIVEL else e
+            for e in etapas]
+
+
+def registrar_no_diario(etapas: List[Etapa], diario: DiarioTriagem, protocolo: str, indice: str, pasta_indice: str) -> List[Etapa]:
+    """
+    Envolve as etapas de um IC no diário da triagem: cada etapa concluída é registrada (resultado + arquivos gerados) e,
+    numa retomada, uma etapa já concluída devolve o resultado registrado sem rodar - a não ser que os arquivos dela
+    tenham mudado ou que alguma etapa da qual depende tenha rodado de novo.
+    Uma etapa que falhou (exceção ou resultado reprovado por RESULTADO_VALIDO) não é registrada e fica pendente no
+    diário: o lote não é marcado como concluído e a etapa roda de novo numa retomada.
+
+    :return: As etapas (novas instâncias, com os mesmos nomes, dependências e pesos).
+    """
+    reexecutadas = set()    # Etapas deste IC que rodaram nesta execução (as dependentes delas também rodam)
+    lock = threading.Lock()
+
+    def envolver(etapa: Etapa) -> Callable[[Dict[str, Any]], Any]:
+        valido = RESULTADO_VALIDO.get(etapa.nome, lambda _r: True)
+
+        def executar(resultados: Dict[str, Any]) -> Any:
+            with lock:
+                dependencia_refeita = any(d in reexecutadas for d in etapa.depende)
+            registro = None if dependencia_refeita else diario.etapa_concluida(protocolo, indice, etapa.nome)
+            if registro is not None and not valido(registro["resultado"]):
+                registro = None     # Registrado por uma versão com outra regra de validade (ex: SIATU sem a contagem de anexos)
+            if registro is not None:
+                logger.info(f"Retomada: etapa {etapa.nome} do IC {indice} já concluída, pulando.")
+                return registro["resultado"]
+
+            with lock:
+                reexecutadas.add(etapa.nome)
+            antes = arquivos_da_pasta(pasta_indice)
+            try:
+                resultado = etapa.funcao(resultados)
+            except BaseException:
+                diario.anotar_pendente(protocolo, indice, etapa.nome)
+                raise
+            if not valido(resultado):
+                logger.warning(f"Etapa {etapa.nome} do IC {indice} sem resultado: não registrada no diário (roda de novo numa retomada).")
+                diario.anotar_pendente(protocolo, indice, etapa.nome)
+                return resultado
+            # Arquivos novos ou modificados desde o início da etapa, fora das subpastas de trabalho das vizinhas (com etapas
+            # em paralelo pode incluir o que uma vizinha já concluiu e moveu - a verificação na retomada só fica mais rigorosa)
+            gerados = [c for c, mtime in arquivos_da_pasta(pasta_indice).items() if antes.get(c) != mtime]
+            diario.registrar_etapa(protocolo, indice, etapa.nome, resultado, gerados)
+            return resultado
+        return executar
+
+    return [Etapa(e.nome, envolver(e), depende=e.depende, peso=e.peso) for e in etapas]
+
+
+def ic_ja_triado(diario: Optional[DiarioTriagem], protocolo: str, indice: str) -> bool:
+    """True se o diário (numa retomada) já tem o IC concluído, com todos os arquivos intactos."""
+    return diario is not None and diario.ic_concluido(protocolo, indice, ETAPAS_IC)
+
+
+def resultados_do_diario(diario: DiarioTriagem, protocolo: str, indice: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Resultados das etapas de um IC concluído numa execução anterior (ic_ja_triado), no formato de processar_indice."""
+    resultados = {}
+    for etapa in ETAPAS_IC:
+        registro = diario.etapa_concluida(protocolo, indice, etapa)
+        resultados[etapa] = registro["resultado"] if registro else RESULTADO_INDISPONIVEL.get(etapa)
+    return resultados, []
+
+
+def gerar_relatorio_ic(indice: str, pasta_indice: str, resultados: Dict[str, Any], usuario: str, ic_avulso: bool,
+                       sistemas_indisponiveis: List[str]) -> str:
+    """
+    Gera o relatório de triagem (PDF) de um IC a partir dos resultados das etapas.
+    Os links e a seção do SIGEDE vêm da pasta: 'pasta_indice' precisa ser a pasta do IC no protocolo do relatório.
+
+    :return: O caminho do PDF gerado.
+    """
+    dados_pb, anexos_count, _ = resultados["SIATU"]
+    dados_projeto, projetos_count = resultados["URBANO"]
+
+    # O caminho para o relatório de Triagem (PDF)
+    pdf_path = os.path.join(pasta_indice, f"1. Relatório de Triagem - {indice}.pdf")
+    # Gera o relatório pdf com todos os dados acumulados (e links pra arquivos locais) em pdf
+    gerar_relatorio(
+        indice_cadastral=indice,
+        anexos_count=anexos_count,
+        projetos_count=projetos_count,
+        pasta_anexos=pasta_indice,
+        prps_trabalhador=usuario,                   # identifica o trabalhador sem passar credenciais críticas (senhas)
+        nome_pdf=pdf_path,
+        dados_planta=dados_pb,
+        dados_projeto=dados_projeto,
+        dados_sisctm=resultados["SISCTM"],
+        ic_avulso=ic_avulso,                        # Avisa pro gerador se o IC está associado à um Protocolo Virtual (triagem por IC)
+        sistemas_indisponiveis=sistemas_indisponiveis,  # Sistemas pulados (disjuntor aberto): o relatório avisa
+    )
+    return pdf_path
+
+
+def replicar_ic(origem: str, destino: str, resultados: Dict[str, Any], sistemas_indisponiveis: List[str], usuario: str,
+                ic_avulso: bool) -> bool:
+    """
+    Materializa um IC já triado na pasta de outro protocolo: copia os arquivos e gera o relatório do próprio protocolo
+    (origem da demanda, IC avulso ou não e links para os arquivos da cópia) no lugar do relatório copiado.
+
+    :return: True se o IC foi replicado.
+    """
+    if not replicar_pasta_ic(origem, destino):
+        return False
+    try:
+        gerar_relatorio_ic(os.path.basename(destino), destino, resultados, usuario, ic_avulso, sistemas_indisponiveis)
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao gerar o relatório do IC replicado em {destino}: {e}")
+        return False
+
 
 def processar_protocolo(protocolo: str, credenciais: Dict[str, str], pasta_resultados: str) -> List[str]:
     """
@@ -34,6 +216,7 @@ def processar_protocolo(protocolo: str, credenciais: Dict[str, str], pasta_resul
     os.makedirs(pasta_protocolo, exist_ok=True)
 
     section_log(f"< SIGEDE  - Protocolo: {protocolo} >") # Adiciona, nos LOGs, o separador de seção do SIGEDE
+    Siatu().pre_aquecer(credenciais, pasta_protocolo)   # Abre (e autentica) o SIATU em segundo plano enquanto o SIGEDE roda
     indices: List[str] = Sigede().executar(protocolo, credenciais, pasta_protocolo)
     return indices      # Retorna Lista de Índices Cadastrais (IC) a serem processados
 
@@ -41,7 +224,9 @@ def processar_protocolo(protocolo: str, credenciais: Dict[str, str], pasta_resul
 def processar_indice(indice: str, credenciais: Dict[str, str], protocolo: str, pasta_resultados: str,           # Param. obrigatórios pra triagem de índices
                      status_title: Optional[str] = "", statusUpdater: Optional[Callable[[str],None]] = None,    # Param. opcionais - pra texto  da interface
                      progressBarUpdater: Optional [Callable[[float], None]] = None, progressBarDict: Dict[str, float] = None, # param. opcionais - progressBar
-                     VIRTUAL_PRTCL: bool = False) -> None:                                                      # param. opcionais - triagem de ic
+                     VIRTUAL_PRTCL: bool = False,                                                               # param. opcionais - triagem de ic
+                     n_cadastrais_associados: Optional[int] = None,                                             # param. opcionais - progressBar
+                     diario: Optional[DiarioTriagem] = None) -> Tuple[Dict[str, Any], List[str]]:               # param. opcionais - retomada
     """
     Execução dos módulos SIATU, URBANO e SISCTM para UM ÚNICO índice especificado, Gera relatório e Cria a pasta do IC.
     
@@ -54,13 +239,19 @@ def processar_indice(indice: str, credenciais: Dict[str, str], protocolo: str, p
     :param statusUpdater: função de atualização do StatusText da interface - OPICIONAL
     :param progressBarUpdater: função de atualização da Progres Bar da interface - OPICIONAL
     :param progressBarDict: um dicionário [str, int] contendo info sobre o estado da progressbar.
-    :return: None
+    :param n_cadastrais_associados: Nº de ICs do protocolo deste IC. Se omitido, usa progressBarDict["n_cadastrais_associados"]
+                                    (com protocolos sobrepostos o dict já pode se referir ao protocolo seguinte) - OPCIONAL
+    :param diario: Diário da triagem (app/pipeline/diario.py). Registra cada etapa concluída e, numa retomada,
+                   pula as etapas já concluídas deste IC - OPCIONAL
+    :return: (resultados das etapas, sistemas indisponíveis) - o bastante para gerar o relatório do IC em outro protocolo
     """
 
     # porção_de_progresso é o múltiplicador associados ao número de ICs naquele protocolo
     porcao_de_progresso =  1.0 
-    if (progressBarDict["n_cadastrais_associados"] > 0):
-        porcao_de_progresso = 1.0 / progressBarDict["n_cadastrais_associados"] 
+    if n_cadastrais_associados is None:
+        n_cadastrais_associados = progressBarDict["n_cadastrais_associados"]
+    if (n_cadastrais_associados > 0):
+        porcao_de_progresso = 1.0 / n_cadastrais_associados
     else:
         porcao_de_progresso = 0         # pelo if da main (if indices_processar), não entra aqui se for zero
     
@@ -77,94 +268,76 @@ def processar_indice(indice: str, credenciais: Dict[str, str], protocolo: str, p
     # A mesma str status_title será usada no começo de todos os statusUpdater
     status_title = status_title if (status_title) else f"Protocolo : {protocolo}"  #Poderia ser feito na assinatura da função, mas é bom deixar explícito o comportamento
 
-    # ------- STATUS, LOG e EXECUÇÃO :: SIATU ------
-    if statusUpdater:
-        status =  f"{status_title}  -  SIATU  :  ({indice})"
-        statusUpdater(status)                         
-    section_log(f"< SIATU  -  IC: {indice} >")    # Adiciona seção SIATU pra cada índice nos LOGS
-
-    # Instancia variáveis e exectua Siatu
-    dados_pb: Dict[str, Any]
-    anexos_count: int
-    (dados_pb, anexos_count) = Siatu().executar(indice, credenciais, pasta_indice)
-    
-    # Calcula e atualiza a progress bar para após o Siatu
-    if progressBarUpdater and progressBarDict:  # Calcula
-        increment = (progressBarDict["peso_tarefa"]*0.2)*porcao_de_progresso
-        progressBarDict["atual"] += increment
-        progressBarUpdater(progressBarDict["atual"])
-            
-
-    # ------ STATUS, LOG e EXECUÇÃO :: URBANO ------
-    if statusUpdater:
-        status =  f"{status_title}  -  URBANO  :  ({indice})"
-        statusUpdater(status)                         
-    section_log(f"< URBANO  -  IC: {indice} >")    # Adiciona seção SIATU pra cada índice nos LOGS
+    # Pré-aquecimento: enquanto SIATU, URBANO e SISCTM rodam, o navegador do Google Maps é aberto em segundo plano.
+    # Se o pool já tiver um navegador livre do sistema (ICs seguintes), nada é feito. Ver app/utils/sessoes.py
+    GoogleMaps().pre_aquecer(credenciais, pasta_indice)
 
-    # Instancia variáveis e executa Urbano.executar(...)
-    # Adiciona seção URBANO pra cada índice nos LOGS
-    dados_projeto: Dict[str, Any]
-    projetos_count: int
-    (dados_projeto, projetos_count) = Urbano().executar(indice, credenciais, pasta_indice)
+    # ------ ETAPAS DO IC (cada uma roda na sua thread, com o seu próprio driver) ------
+    # Os nomes das etapas são as chaves dos resultados e aparecem no StatusText da interface
 
-    # Calcula e atualiza a progress bar para após o Urbano
-    if progressBarUpdater and progressBarDict:  # Calcula
-        increment = (progressBarDict["peso_tarefa"]*0.2)*porcao_de_progresso
-        progressBarDict["atual"] += increment
-        progressBarUpdater(progressBarDict["atual"])
+    def etapa_siatu(_resultados: Dict[str, Any]) -> Tuple[Dict[str, Any], int, int]:
+        section_log(f"< SIATU  -  IC: {indice} >")    # Adiciona seção SIATU pra cada índice nos LOGS
+        # Com o cache (app/utils/cache.py) um IC triado há poucos dias não abre o navegador; o JSON devolve listas
+        dados_pb, anexos_count, anexos_encontrados = executar_com_cache("SIATU", indice, pasta_indice,
+                                                    lambda pasta: Siatu().executar(indice, credenciais, pasta),
+                                                    valido=RESULTADO_VALIDO["SIATU"])
+        return dados_pb, anexos_count, anexos_encontrados     # (dados_pb, anexos_count, anexos_encontrados)
 
+    def etapa_urbano(_resultados: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        section_log(f"< URBANO  -  IC: {indice} >")    # Adiciona seção URBANO pra cada índice nos LOGS
+        dados_projeto, projetos_count = executar_com_cache("URBANO", indice, pasta_indice,
+                                                           lambda pasta: Urbano().executar(indice, credenciais, pasta),
+                                                           valido=RESULTADO_VALIDO["URBANO"])
+        return dados_projeto, projetos_count    # (dados_projeto, projetos_count)
 
-    # ------ STATUS, LOG e EXECUÇÃO :: SISTM ------
-    if statusUpdater:
-        status =  f"{status_title}  -  SISCTM  :  ({indice})"
-        statusUpdater(status)                         
-    section_log(f"< SISCTM  -  IC: {indice} >")   # Adiciona seção SIATU pra cada índice nos LOGS
-    print("DEBUG SISCTM:")
-    print (indice)
-    print (credenciais)
-    print (pasta_indice)
-    dados_sisctm: Dict[str, Any] = Sisctm().executar(indice, credenciais, pasta_indice)
-
-    # Calcula e atualiza a progress bar para após o Sisctm
-    if progressBarUpdater and progressBarDict:  # Calcula
-            taxa = 0.4 if VIRTUAL_PRTCL else 0.3        # os custo da etapa SICTM é um pouco maior em protocolso virtuais
-            increment =  (progressBarDict["peso_tarefa"]*taxa)*porcao_de_progresso
-            progressBarDict["atual"] += increment
-            progressBarUpdater(progressBarDict["atual"])
+    def etapa_sisctm(_resultados: Dict[str, Any]) -> Dict[str, Any]:
+        section_log(f"< SISCTM  -  IC: {indice} >")   # Adiciona seção SISCTM pra cada índice nos LOGS
+        logger.debug(f"SISCTM: índice {indice}, pasta {pasta_indice}")
+        return executar_com_cache("SISCTM", indice, pasta_indice,
+                                  lambda pasta: Sisctm().executar(indice, credenciais, pasta),
+                                  valido=RESULTADO_VALIDO["SISCTM"])
 
-    # ------ STATUS, LOG e EXECUÇÃO :: GOOGLE MAPS ------
-    if statusUpdater:
-        status =  f"{status_title}  -  G-MAPS  :  ({indice})"
-        statusUpdater(status)                         
-    section_log(f"< GOOGLE MAPS  -  IC: {indice} >")   # Adiciona seção SIATU pra cada índice nos LOGS
-    GoogleMaps().executar(indice, dados_sisctm, dados_pb, pasta_indice)
-
-     # Calcula e atualiza a progress bar para após o Google Maps
-    if progressBarUpdater and progressBarDict:  # Calcula
-        increment = (progressBarDict["peso_tarefa"]*0.2)*porcao_de_progresso
-        progressBarDict["atual"] += increment
-        progressBarUpdater(progressBarDict["atual"])
-
-    # ------ GERANDO RELATÓRIO ------ :
-    if statusUpdater:
-        status =  f"{status_title}  -  GERANDO RELATÓRIO  :  ({indice})"
-        statusUpdater(status)                         
-    section_log(f"<  RELATÓRIO do IC: {indice} >")   # Adiciona seção RELATÓRIO pra cada índice nos LOGS
-    # Não calcula progresso na progress bar apra gerar relatório pq é geralmente feito em menos de um segundo
+    def etapa_google_maps(resultados: Dict[str, Any]) -> None:
+        section_log(f"< GOOGLE MAPS  -  IC: {indice} >")   # Adiciona seção GOOGLE MAPS pra cada índice nos LOGS
+        dados_pb = resultados["SIATU"][0]
+        GoogleMaps().executar(indice, resultados["SISCTM"], dados_pb, pasta_indice)
 
-    # O caminho para o relatório de Triagem (PDF)
-    pdf_path = os.path.join(pasta_indice, f"1. Relatório de Triagem - {indice}.pdf")
-    # Gera o relatório pdf com todos os dados acumulados (e links pra arquivos locais) em pdf
-    gerar_relatorio(
-        indice_cadastral=indice,
-        anexos_count=anexos_count,
-        projetos_count=projetos_count,
-        pasta_anexos=pasta_indice,
-        prps_trabalhador=credenciais["usuario"],    # identifica o trabalhador sem passar credenciais críticas (senhas)
-        nome_pdf=pdf_path,
-        dados_planta=dados_pb,
-        dados_projeto=dados_projeto,
-        dados_sisctm=dados_sisctm,
-        ic_avulso = VIRTUAL_PRTCL,                  # Avisa pro gerador se o IC está associado à um Protocolo Virtual (triagem por IC)
-    )
-    logger.info(f"Relatório gerado!\n\n")
+    def etapa_relatorio(resultados: Dict[str, Any]) -> None:
+        section_log(f"<  RELATÓRIO do IC: {indice} >")   # Adiciona seção RELATÓRIO pra cada índice nos LOGS
+        gerar_relatorio_ic(indice, pasta_indice, resultados, credenciais["usuario"], VIRTUAL_PRTCL, sorted(set(indisponiveis)))
+        logger.info(f"Relatório gerado!\n\n")
+
+    # Peso de cada etapa na progress bar do IC. O custo da etapa SISCTM é um pouco maior em protocolos virtuais.
+    # Não calcula progresso para gerar relatório pq é geralmente feito em menos de um segundo
+    pesos = pesos_etapas(VIRTUAL_PRTCL)
+    indisponiveis: List[str] = []   # Sistemas pulados neste IC por estarem indisponíveis (preenchido por tolerar_indisponiveis)
+
+    # SIATU, URBANO e SISCTM são independentes entre si; G-MAPS precisa do endereço (SIATU) e do mapa (SISCTM);
+    # o relatório precisa de tudo (inclusive dos prints do G-MAPS, referenciados no PDF)
+    etapas = [
+        Etapa("SIATU", etapa_siatu, peso=pesos["SIATU"]),
+        Etapa("URBANO", etapa_urbano, peso=pesos["URBANO"]),
+        Etapa("SISCTM", etapa_sisctm, peso=pesos["SISCTM"]),
+        Etapa("G-MAPS", etapa_google_maps, depende=("SIATU", "SISCTM"), peso=pesos["G-MAPS"]),
+        Etapa(ETAPA_RELATORIO, etapa_relatorio, depende=("SIATU", "URBANO", "SISCTM", "G-MAPS")),
+    ]
+
+    if diario is not None:
+        etapas = registrar_no_diario(etapas, diario, protocolo, indice, pasta_indice)
+    # Por fora do diário: uma etapa pulada por indisponibilidade não é registrada (roda de novo numa retomada)
+    etapas = tolerar_indisponiveis(etapas, indisponiveis)
+
+    # ------ STATUS e PROGRESS BAR (chamados na thread deste IC, ver app/pipeline/etapas.py) ------
+    def ao_iniciar(_etapa: Etapa, em_andamento: List[str]) -> None:
+        atualizar_status(statusUpdater, f"{status_title}  -  {' | '.join(em_andamento)}  :  ({indice})")
+
+    def ao_concluir(etapa: Etapa, em_andamento: List[str]) -> None:
+        # Calcula e atualiza a progress bar para após a etapa
+        if progressBarUpdater and progressBarDict and etapa.peso:
+            increment = (progressBarDict["peso_tarefa"]*etapa.peso)*porcao_de_progresso
+            avancar_progresso(progressBarDict, increment, progressBarUpdater)
+        if em_andamento:
+            atualizar_status(statusUpdater, f"{status_title}  -  {' | '.join(em_andamento)}  :  ({indice})")
+
+    resultados = GrafoEtapas(etapas, max_paralelas=MAX_ETAPAS_PARALELAS, ao_iniciar=ao_iniciar, ao_concluir=ao_concluir).executar()
+    return resultados, sorted(set(indisponiveis))
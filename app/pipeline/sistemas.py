@@ -1,7 +1,9 @@
 from typing import List, Dict, Any, Tuple, Optional  # Importa a biblioteca de tipagem (com Optional)
 from pipeline.interface import SistemaAutomacao      # importa a classe abstrata SistemaAutomação (classe parent)
-from core import SiatuAuto, UrbanoAuto, SisctmAuto, GoogleMapsAuto, SigedeAuto
-from utils import driver_context, logger, retry
+from core import SiatuAuto, UrbanoAuto, SisctmAuto, GoogleMapsAuto, SigedeAuto, AnexosIncompletos
+from utils import driver_context, logger, retry, Passos, autenticar_sessao, PerfilDriver
+from utils import disjuntores, SistemaIndisponivel
+from utils.rede import IMAGENS, FONTES, MIDIA, RASTREADORES  # Grupos de padrões para o bloqueio de rede (BLOQUEIOS_REDE)
 
 '''
 ===========================================================================================================================================================
@@ -10,6 +12,7 @@ Elas integram a classe abstrata definida em app/pipeline/interface/base.py com o
 Uma das principais vantagens destas camadas é gerenciar o contexto e o tempo de vida dos recursos (por exemplo janelas do Chrome, credenciais e etc)
 e interagir com o bot separando a interface dos detalhes internos de navegação (que podem mudar no futuro).
 Algumas dessas classes também usam @retry (definido em app/utils/decorators.py) para aumentar a resiliência da automação via repetição TOTAL da automação do webdriver.
+Todas respeitam o disjuntor do seu sistema (app/utils/disjuntor.py): com o sistema indisponível, executar(...) lança SistemaIndisponivel sem abrir navegador.
 ===========================================================================================================================================================
 '''
 
@@ -26,6 +29,16 @@ De forma a garantir processos não ativos ou não intencionais no chrome. Isso 
 class Sigede(SistemaAutomacao):
     """Adapter para o sistema SIGEDE. Responsável pela busca de protocolos e identificação de índices cadastrais."""
 
+    SISTEMA = "SIGEDE"  # Chave do sistema no pool de sessões (utils/sessoes.py)
+    URL = "https://cas.pbh.gov.br/cas/login?service=https%3A%2F%2Fsigede.pbh.gov.br%2Fsigede%2Flogin%2Fcas"
+    BLOQUEIOS_REDE = MIDIA + RASTREADORES   # As tabelas do SIGEDE são printadas como evidência (no meio da navegação): mantém todas as imagens
+    PERFIL_DRIVER = PerfilDriver(estrategia="normal", timeout_carregamento=60, monitorar_downloads=True)   # Páginas servidas prontas pelo servidor (JSF)
+
+    def preparar_sessao(self, driver, credenciais: Dict[str, str]) -> bool:
+        """Login antecipado do SIGEDE (pré-aquecimento do pool de sessões)."""
+        sigede = SigedeAuto(driver, self.URL, credenciais["usuario_sigede"], credenciais["senha_sigede"], None)
+        return sigede.acessar() and autenticar_sessao(sigede, self.SISTEMA)
+
     def executar(self, protocolo: str, credenciais : Dict[str, str], pasta_protocolo: str) -> List[str]:
         """Executa a automação do SIGEDE para buscar índices vinculados a um protocolo.
 
@@ -39,12 +52,13 @@ class Sigede(SistemaAutomacao):
         # inicializa o contexto driver_context, passando a pasta de download preferencial "pasta_protocolo" 
         # driver_context(pasta) é um método decorado com @contextmanager. Ele adquire e inicializa os recursos (Google Chrome, ChromeDriver e etc) 
         # e libera tais quando sai do contexto.
-        with driver_context(pasta_protocolo) as driver:
+        with disjuntores.protegido(self.SISTEMA) as guarda, driver_context(
+                pasta_protocolo, sistema=self.SISTEMA, bloqueios=self.BLOQUEIOS_REDE, perfil_driver=self.PERFIL_DRIVER) as driver:
             # instancia o objeto da classe SigedAuto (em core/sigede.py)
             # Atenção: as credenciais do sistema Sigede parecem serem diferentes dos outros bots
             sigede = SigedeAuto(
                 driver=driver,
-                url="https://cas.pbh.gov.br/cas/login?service=https%3A%2F%2Fsigede.pbh.gov.br%2Fsigede%2Flogin%2Fcas",
+                url=self.URL,
                 usuario=credenciais["usuario_sigede"],  # Usa credenciais específicas do sistema sigede
                 senha=credenciais["senha_sigede"],
                 pasta_download=pasta_protocolo,         # Define a pasta de download neste contexto
@@ -52,8 +66,12 @@ class Sigede(SistemaAutomacao):
 
             # A objeto da classe SigedeAuto faz toda a automação e,
             #  se todos so passos de navegação deram certos, captura os índices cadastrais associados ao processo
-            if sigede.acessar() and sigede.login() and sigede.navegar(protocolo):
-                indices = sigede.verificar_tabela()
+            # autenticar_sessao(...) só chama o login se o driver (do pool) não estiver autenticado e não houver sessão válida no cofre
+            if sigede.acessar() and autenticar_sessao(sigede, self.SISTEMA):
+                if sigede.navegar(protocolo):
+                    indices = sigede.verificar_tabela()
+            else:
+                guarda.falhou("acesso/login")     # Conta para o disjuntor do SIGEDE
 
         logger.info(f"SIGEDE concluído para protocolo {protocolo}.\n")
         return indices  # retorna a lista de índices
@@ -68,56 +86,91 @@ class Siatu(SistemaAutomacao):
     
     Características:
         - Escopo: Atômico (Processa 1 IC por vez).
-        - Resiliência: Utiliza @retry para mitigar instabilidades de conexão do SIATU.      """
+        - Resiliência: Cada passo (login, consulta, planta básica, cada anexo) é retentado sozinho (Passos) e o @retry,
+          com sessão nova, fica como último recurso para instabilidades de conexão do SIATU.      """
+
+    SISTEMA = "SIATU"
+    URL = "https://siatu-producao.pbh.gov.br/seguranca/login?service=https%3A%2F%2Fsiatu-producao.pbh.gov.br%2Faction%2Fmenu"
+    ADD_CONFIG = True   # Esta variável determinará a flag de segurança do chrome na hora de criar o driver_context (e por consequência o navegador e ChromeDriver).
+                        # Ela ativará a flag: --unsafely-treat-insecure-origin-as-secure. A camada de serviço é a responsável por determinar essa configuração extra de segurança.
+    BLOQUEIOS_REDE = IMAGENS + FONTES + MIDIA + RASTREADORES   # Só o print da aba Alterações precisa da página completa (@sem_bloqueio_rede)
+    PERFIL_DRIVER = PerfilDriver(estrategia="normal", timeout_carregamento=60, monitorar_downloads=True)   # O SIATU às vezes trava: melhor falhar e repetir (@retry)
+
+    def preparar_sessao(self, driver, credenciais: Dict[str, str]) -> bool:
+        """Login antecipado do SIATU (pré-aquecimento do pool de sessões)."""
+        siatu = SiatuAuto(driver, self.URL, credenciais["usuario"], credenciais["senha"], None)
+        return siatu.acessar() and autenticar_sessao(siatu, self.SISTEMA)
     
     # Define o método virtual do contrato (SitemasAutomação - classe pai).
     # indice = Nº do Índice Cadastral a ser buscado no sistema do SIATU
-    def executar(self, indice: str, credenciais: Dict[str, str], pasta_indice: str) -> Tuple[ Dict[str, Any] , int]:
+    def executar(self, indice: str, credenciais: Dict[str, str], pasta_indice: str) -> Tuple[ Dict[str, Any] , int, int]:
         """Executa a automação do SIATU (obter dados cadastrais e documentos) do Índice (único) informado .
 
         :param indice: Índice Cadastral (IC) do imóvel.
         :param credenciais: Dicionário contendo 'usuario' e 'senha' (Siatu/Urbano/Sisctm - o Geral).
         :param pasta_indice: Caminho da pasta do IC para salvar a Planta Básica e Anexos.
-        :return: Uma tupla (dados_pb, anexous_count) contendo:
+        :return: Uma tupla (dados_pb, anexous_count, anexos_encontrados) contendo:
                  1. Dicionário com dados da Planta Básica (área, endereço, etc).
-                 2. Inteiro com a contagem de anexos baixados.      """
+                 2. Inteiro com a contagem de anexos baixados.
+                 3. Inteiro com a contagem de anexos encontrados (diferente da anterior = faltaram anexos).      """
 
-        # Variáveis de Retorno - tupla (dados_pb, anexos_count)
+        # Variáveis de Retorno - tupla (dados_pb, anexos_count, anexos_encontrados)
         dados_pb: Dict[str, Any] = {}   # dicionário contendo dados dados da Planta Básica (área, endereço e etc)
         anexos_count: int = 0           # Contador de anexos baixos
+        anexos_encontrados: int = 0     # Contador de anexos listados no SIATU
 
-        add_config = True   # Esta variável determinará a flag de segurança do chrome na hora de criar o driver_context (e por consequência o navegador e ChromeDriver).
-                            # Ela ativará a flag: --unsafely-treat-insecure-origin-as-secure. A camada de serviço é a responsável por determinar essa configuração extra de segurança.
+        # Cada passo do fluxo (login, navegação, consulta, planta básica e cada anexo) é retentado sozinho, na mesma sessão.
+        # Passos concluídos não rodam de novo - nem quando o @retry abaixo, último recurso, abre uma sessão nova (utils/decorators.py)
+        passos = Passos(f"SIATU {indice}", max_retries=2, delay=2)
 
         # Decorators são funções de alta ordem: basicamente ele está determinando o número de retentativas da função que é aplicado, 
         # o atraso entre as tentativas e tipos de exceções que diparam a repetição. (definido em app/utils/decorators.py)
-        @retry(max_retries=4, delay=5, exceptions=(Exception,))
+        # backoff exponencial com jitter entre as sessões novas; sistema=...: respeita (e alimenta) o disjuntor do SIATU
+        @retry(max_retries=4, delay=5, exceptions=(Exception,), sistema=self.SISTEMA)
         def fluxo_siatu():
+            passos.nova_sessao()    # Login, navegação e consulta valem só para o navegador em que foram feitos
 
             # Gerencia contexto: Incializa, gerencia e libera os recurso do driver_context durante a automação
-            with driver_context(pasta_indice, add_config=add_config) as driver:
+            with driver_context(pasta_indice, add_config=self.ADD_CONFIG, sistema=self.SISTEMA, bloqueios=self.BLOQUEIOS_REDE,
+                                perfil_driver=self.PERFIL_DRIVER) as driver:
                 # Cria o objeto da classe de automação que realmente fará a busca usando o webdriver.
                 # Classe SiatuAuto definida em app/core/siatu
                 siatu = SiatuAuto(
                     driver=driver,
-                    url="https://siatu-producao.pbh.gov.br/seguranca/login?service=https%3A%2F%2Fsiatu-producao.pbh.gov.br%2Faction%2Fmenu",
+                    url=self.URL,
                     usuario=credenciais["usuario"],     # usa as credenciais padrões
                     senha=credenciais["senha"],         # usa as credenciais padrões
                     pasta_download=pasta_indice,
                 )
                 # Se a automação foi bem sucedida no Siato, faz download e retorna os dados planta básica, faz download dos anexos e retorna a quantidade de anexos (daquele Índice Cadastral)
-                if siatu.acessar() and siatu.login() and siatu.navegar():
-                    return siatu.planta_basica(indice), siatu.download_anexos(indice)
+                def entrar():
+                    siatu.acessar()
+                    if not (autenticar_sessao(siatu, self.SISTEMA) and siatu.navegar()):
+                        raise RuntimeError("Login ou navegação do SIATU falhou")
+                    return True
+
+                passos.executar("login e navegação", entrar, por_sessao=True)
+                passos.executar("consulta", lambda: siatu.consultar_indice(indice), por_sessao=True,
+                                reparar=siatu.voltar_ao_menu)
+                dados = passos.executar("planta básica", lambda: siatu.planta_basica(indice, consultar=False),
+                                        reparar=lambda: siatu.reabrir_consulta(indice))
+                return (dados, *siatu.download_anexos(indice, passos=passos))
 
         try:
             # Tenta a execução da função definida (com o decorator), se falhar a última vez (definida no @retry) a exceção é lançada
-            dados_pb, anexos_count = fluxo_siatu()
+            dados_pb, anexos_count, anexos_encontrados = fluxo_siatu()
+        except SistemaIndisponivel:
+            raise   # Disjuntor aberto: a etapa é pulada (e o relatório avisa) em app/pipeline/process.py
+        except AnexosIncompletos as e:
+            # Os anexos que faltaram esgotaram as sessões novas: segue com a Planta Básica (checkpoint) e os anexos salvos
+            logger.error(f"Anexos do SIATU incompletos para índice {indice}: {e}.\n")
+            dados_pb, anexos_count, anexos_encontrados = passos.resultado("planta básica", {}), e.baixados, e.encontrados
         except Exception as e: # Regista a falha no log e continua os processos.
             logger.error(f"Falha no fluxo do SIATU para índice {indice}: {e}.\n")
 
         # Se bem sucedido registra o sucesso (e o índice bem sucedido) e retorna os dados da planta básica e o número de anexos.
         logger.info(f"Siatu concluído para índice {indice}.\n")
-        return (dados_pb, anexos_count) # Retorno da Tupla
+        return (dados_pb, anexos_count, anexos_encontrados) # Retorno da Tupla
 
 
 ''' Define a classe Urbano (camada de serviço) que estende de SistemaAutomação e define o método "virtual" executar(...) - do contrato da classe pai. 
@@ -128,6 +181,16 @@ class Urbano(SistemaAutomacao):
     Focado na extração de dados de projetos de construção, alvarás e baixas
     para um único Índice Cadastral.    """
 
+    SISTEMA = "URBANO"
+    URL = "https://urbano.pbh.gov.br/edificacoes/#/"
+    BLOQUEIOS_REDE = MIDIA + RASTREADORES   # A busca e os projetos sem documento são printados na mesma página carregada: mantém todas as imagens
+    PERFIL_DRIVER = PerfilDriver(estrategia="eager", timeout_carregamento=60, monitorar_rede=True)    # SPA (AngularJS): os dados chegam via XHR, depois do 'load'
+
+    def preparar_sessao(self, driver, credenciais: Dict[str, str]) -> bool:
+        """Login antecipado do Urbano (pré-aquecimento do pool de sessões)."""
+        urbano = UrbanoAuto(driver, self.URL, credenciais["usuario"], credenciais["senha"], None)
+        return urbano.acessar() and autenticar_sessao(urbano, self.SISTEMA)
+
     # Definição do método executar herdado, mas não definido, do contrato de SistemasAutomação
     def executar(self, indice: str, credenciais: Dict[str, str], pasta_indice: str) -> Tuple[Dict[str, Any], int]:
         """
@@ -144,20 +207,23 @@ class Urbano(SistemaAutomacao):
         projetos_count: int = 0
 
         # Gerencia contexto: Incializa, gerencia e libera os recurso do driver_context durante a automação
-        with driver_context(pasta_indice) as driver:
+        with disjuntores.protegido(self.SISTEMA) as guarda, driver_context(
+                pasta_indice, sistema=self.SISTEMA, bloqueios=self.BLOQUEIOS_REDE, perfil_driver=self.PERFIL_DRIVER) as driver:
             # Instancia objeto da Classe UrbanoAuto (onde é implementado o core da automação), passando os parâmetros da automação. 
             # Classe UrbanoAuto definida em app/core/urbano.py
             urbano = UrbanoAuto(
                 driver=driver,
-                url="https://urbano.pbh.gov.br/edificacoes/#/",
+                url=self.URL,
                 usuario=credenciais["usuario"],         # credenciais padrão
                 senha=credenciais["senha"],             # credenciais padrão
                 pasta_download=pasta_indice,
             )
 
             # Se a automação de acessar a página e fazer login foi bem sucedida, faz o download dos dados técnicos e guarda os dados do projeto no dict dados_projeto
-            if urbano.acessar() and urbano.login():
+            if urbano.acessar() and autenticar_sessao(urbano, self.SISTEMA):
                 projetos_count, dados_projeto = urbano.download_projeto(indice)
+            else:
+                guarda.falhou("acesso/login")     # Conta para o disjuntor do URBANO
             # ¬ em caso de falhas na automação, este método não trata falhas de download ou acesso.
             # Internamente urbaano.download_projeto(...), no entanto, loga falhas e implementa tratamento de exceções.
 
@@ -173,6 +239,16 @@ class Sisctm(SistemaAutomacao):
     Responsável pela captura de evidências visuais (Prints) e dados geoespaciais (Áreas)
     do lote correspondente à um único Índice Cadastral.     """
 
+    SISTEMA = "SISCTM"
+    URL = "https://acesso.pbh.gov.br/auth/realms/PBH/protocol/openid-connect/auth?client_id=sisctm-mapa&redirect_uri=https%3A%2F%2Fsisctm.pbh.gov.br%2Fmapa%2Flogin"
+    BLOQUEIOS_REDE = MIDIA + RASTREADORES   # Os tiles do mapa são imagens carregadas antes dos prints: não podem ser bloqueados
+    PERFIL_DRIVER = PerfilDriver(estrategia="eager", timeout_carregamento=60, monitorar_rede=True)    # SPA (Quasar + OpenLayers): o mapa carrega depois do 'load'
+
+    def preparar_sessao(self, driver, credenciais: Dict[str, str]) -> bool:
+        """Login antecipado do SISCTM (pré-aquecimento do pool de sessões)."""
+        sisctm = SisctmAuto(driver, self.URL, credenciais["usuario"], credenciais["senha"], None)
+        return sisctm.acessar() and autenticar_sessao(sisctm, self.SISTEMA)
+
     # Definição da função executar(...) herdada, porém não definida, da classe pai, SistemaAutomacao
     def executar(self, indice: str, credenciais: Dict[str, str], pasta_indice: str) -> Dict[str, Any]:
         """
@@ -186,20 +262,28 @@ class Sisctm(SistemaAutomacao):
         dados_sisctm: Dict[str, Any] = {} # Dicionário que será retornado
 
         # Gerencia contexto: Incializa, gerencia e libera os recurso do driver_context durante a automação
-        with driver_context(pasta_indice) as driver:
+        with disjuntores.protegido(self.SISTEMA) as guarda, driver_context(
+                pasta_indice, sistema=self.SISTEMA, bloqueios=self.BLOQUEIOS_REDE, perfil_driver=self.PERFIL_DRIVER) as driver:
             # Instancia o bot core, SisctmAuto, definindo as variáveis de automação. Classe SisctmAuto definida em app/core/sisctm.py
             sisctm = SisctmAuto(
                 driver=driver,
-                url="https://acesso.pbh.gov.br/auth/realms/PBH/protocol/openid-connect/auth?client_id=sisctm-mapa&redirect_uri=https%3A%2F%2Fsisctm.pbh.gov.br%2Fmapa%2Flogin",
+                url=self.URL,
                 usuario=credenciais["usuario"],     # credenciais padrão
                 senha=credenciais["senha"],         # credenciais padrão
                 pasta_download=pasta_indice,
             )
 
-            # Se a automação for bem sucedida (focar mapa, ativar filtros e etc) os dados da tabela são capturados
+            # Com os serviços do mapa já descobertos, áreas e imagens vêm direto deles (sem mexer na interface).
+            # Senão (ou se falharem), se a automação for bem sucedida (focar mapa, ativar filtros e etc) os dados da tabela são capturados
             # sisctm.ativar_camadas(...) chama _prints_aereo(...), que realiza captura de tela. Imagens estão sendo geradas. 
-            if sisctm.login() and sisctm.ativar_camadas(indice):
-                dados_sisctm = sisctm.capturar_areas()
+            if sisctm.acessar() and autenticar_sessao(sisctm, self.SISTEMA):
+                dados_servicos = sisctm.capturar_por_servicos(indice)
+                if dados_servicos is not None:
+                    dados_sisctm = dados_servicos
+                elif sisctm.ativar_camadas(indice):
+                    dados_sisctm = sisctm.capturar_areas(indice)
+            else:
+                guarda.falhou("acesso/login")     # Conta para o disjuntor do SISCTM
 
         logger.info(f"SISCTM concluído para índice {indice}.\n")
         return dados_sisctm     # os dados retornados nesse método serão utilizados na automação do GoogleMaps
@@ -211,6 +295,11 @@ class GoogleMaps(SistemaAutomacao):
     """ Adapter para o Google Maps.
     Gera evidências visuais (Satélite/Fachada) baseadas em endereços encontrados nos sistemas anteriores.       """
 
+    SISTEMA = "GOOGLE"
+    URL = "https://www.google.com/maps/"
+    BLOQUEIOS_REDE = RASTREADORES   # Toda a navegação no Maps termina em print
+    PERFIL_DRIVER = PerfilDriver(estrategia="eager", timeout_carregamento=60, monitorar_rede=True)    # Os bots esperam os elementos do Maps explicitamente
+
     # TODO: A definição do método executar nessa classe tem mais parâmetros do que na classe de interface. Padronizar.
     # Define o método legado do contrato. Desta vez não são necessárias credenciais mas dados de endereço
     def executar(self, 
@@ -236,12 +325,13 @@ class GoogleMaps(SistemaAutomacao):
             )
             
         # Inicia o contexto driver_context, que será usado para o navegador do Google Maps.
-        with driver_context(pasta_indice) as driver:
+        with disjuntores.protegido(self.SISTEMA) as guarda, driver_context(
+                pasta_indice, sistema=self.SISTEMA, bloqueios=self.BLOQUEIOS_REDE, perfil_driver=self.PERFIL_DRIVER) as driver:
             # Instancia o objeto da classe GoogleMapsAuto (em core/google.py)
             # Injeção de Dependência: Passa o driver, o endereço escolhido e a pasta para salvar os prints.
             google = GoogleMapsAuto(
                 driver,
-                url="https://www.google.com/maps/",
+                url=self.URL,
                 endereco=endereco,
                 pasta_download=pasta_indice,
             )
@@ -249,6 +339,8 @@ class GoogleMaps(SistemaAutomacao):
             # Se o acesso ao G-Maps foi bem sucedido, o bot executa a rotina de busca, ativação de satélite e prints (aéreo e fachada).
             if google.acessar_google_maps():
                 google.navegar()            # Tratamentos de exceções e logging de erros são feitos dentro deste método, navegar().
+            else:
+                guarda.falhou("acesso")           # Conta para o disjuntor do GOOGLE
 
         # Registra a conclusão da automação do G-Maps. Esta classe não retorna nada.
         logger.info(f"Google Maps concluído para índice {indice}.\n")
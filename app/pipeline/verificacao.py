@@ -0,0 +1,170 @@
+from utils import logger, disjuntores
+from .interface import SistemaAutomacao
+from .sistemas import Sigede, Siatu, Urbano, Sisctm, GoogleMaps
+
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TempoEsgotado
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+'''
+==================================================================================================================================
+Verificação inicial (pre-flight) dos sistemas, antes do lote começar.
+
+Com um sistema fora do ar (ou com a senha expirada), a triagem só descobria o problema no primeiro IC - e cada IC ainda
+gastava os timeouts do sistema até o disjuntor abrir. Agora, logo no início do lote, todos os sistemas são verificados AO
+MESMO TEMPO:
+
+    1. Alcance (HTTP): uma requisição leve à página de entrada do sistema, sem navegador. Qualquer resposta HTTP (mesmo
+       401/403/500 de um servidor de pé) conta como alcançável; erro de conexão/DNS/timeout não.
+    2. Login: o navegador do sistema é pré-aquecido no pool de sessões (utils/sessoes.py) - que usa o cofre de sessões
+       (utils/cofre.py) e só preenche o formulário de login se a sessão guardada tiver expirado. O navegador autenticado
+       fica no pool e é o mesmo que a primeira etapa do sistema vai usar: a verificação não desperdiça o login.
+
+Resultado:
+    - Sistema indisponível (inalcançável ou login recusado): o disjuntor dele é aberto (utils/disjuntor.py) e o lote
+      roda em modo degradado - as etapas do sistema são puladas e o relatório registra "<SISTEMA> indisponível".
+    - Login que não terminou a tempo (TEMPO_LOGIN): só um aviso - o sistema está de pé, apenas lento.
+    - Nada a fazer (nenhum sistema de IC disponível, ou SIGEDE indisponível num lote só de protocolos): o lote é abortado.
+
+A verificação pode ser desligada com AUTOTRI_VERIFICAR_SISTEMAS=0.
+==================================================================================================================================
+'''
+
+VARIAVEL_VERIFICAR = "AUTOTRI_VERIFICAR_SISTEMAS"
+TEMPO_HTTP = 8          # Segundos para a página de entrada de um sistema responder
+TEMPO_LOGIN = 60        # Segundos para o navegador de um sistema abrir e autenticar
+
+SISTEMAS_IC = ("SIATU", "URBANO", "SISCTM")     # Sem nenhum destes não há o que triar num IC
+
+
+def verificacao_habilitada() -> bool:
+    """Verificação inicial: ligada por padrão; AUTOTRI_VERIFICAR_SISTEMAS=0 a desliga."""
+    return os.environ.get(VARIAVEL_VERIFICAR, "1") not in ("0", "")
+
+
+class SaudeSistema:
+    """Resultado da verificação de um sistema."""
+
+    def __init__(self, sistema: str):
+        self.sistema = sistema
+        self.alcancavel: bool = False
+        self.autenticado: Optional[bool] = None     # None: sem login (Google Maps) ou login não terminou a tempo
+        self.motivo: str = ""
+        self.duracao: float = 0.0
+
+    @property
+    def disponivel(self) -> bool:
+        return self.alcancavel and self.autenticado is not False
+
+    def __str__(self) -> str:
+        situacao = "OK" if self.disponivel else "INDISPONÍVEL"
+        detalhe = f" - {self.motivo}" if self.motivo else ""
+        return f"{self.sistema}: {situacao} ({self.duracao:.1f}s){detalhe}"
+
+
+class VerificacaoSistemas:
+    """Resultado da verificação de todos os sistemas do lote."""
+
+    def __init__(self, saudes: List[SaudeSistema], exige_sigede: bool, tem_ics_avulsos: bool):
+        self.saudes = saudes
+        self.exige_sigede = exige_sigede
+        self.tem_ics_avulsos = tem_ics_avulsos
+
+    @property
+    def indisponiveis(self) -> List[str]:
+        return [s.sistema for s in self.saudes if not s.disponivel]
+
+    @property
+    def motivo_abortar(self) -> Optional[str]:
+        """Por que o lote não deve nem começar (ou None se dá para rodar, mesmo que em modo degradado)."""
+        indisponiveis = self.indisponiveis
+        if all(sistema in indisponiveis for sistema in SISTEMAS_IC):
+            return "nenhum dos sistemas de triagem de IC (SIATU, URBANO, SISCTM) está disponível"
+        if self.exige_sigede and "SIGEDE" in indisponiveis and not self.tem_ics_avulsos:
+            return "o SIGEDE está indisponível e o lote só tem protocolos"
+        return None
+
+
+def _sondar_http(url: str) -> Optional[str]:
+    """Requisição leve à origem da URL do sistema. Retorna None se o servidor respondeu, ou o motivo da falha."""
+    partes = urlsplit(url)
+    origem = f"{partes.scheme}://{partes.netloc}/"
+    requisicao = urllib.request.Request(origem, method="HEAD", headers={"User-Agent": "AutoTri"})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=TEMPO_HTTP):
+            return None
+    except urllib.error.HTTPError:
+        return None     # O servidor respondeu (401, 403, 405, 500...): está de pé
+    except Exception as e:
+        motivo = getattr(e, "reason", e)
+        return f"sem resposta de {partes.netloc} ({motivo})"
+
+
+def _verificar(sistema: SistemaAutomacao, credenciais: Dict[str, str], pasta_download: str) -> SaudeSistema:
+    """Alcance e login de um sistema (roda numa thread própria). Nunca lança exceção."""
+    saude = SaudeSistema(sistema.SISTEMA)
+    inicio = time.monotonic()
+    try:
+        falha_http = _sondar_http(sistema.URL)
+        saude.alcancavel = falha_http is None
+        if falha_http:
+            saude.motivo = falha_http
+        elif type(sistema).preparar_sessao is not SistemaAutomacao.preparar_sessao:
+            # Sistema com login: o navegador autenticado fica no pool para a primeira etapa do sistema
+            futuro = sistema.pre_aquecer(credenciais, pasta_download)
+            if futuro is None:
+                saude.autenticado = True    # Já há um navegador livre do sistema no pool
+            else:
+                try:
+                    sessao = futuro.result(timeout=TEMPO_LOGIN)
+                except TempoEsgotado:
+                    saude.motivo = f"login não terminou em {TEMPO_LOGIN}s"
+                else:
+                    saude.autenticado = bool(sessao and sessao.autenticado)
+                    if not saude.autenticado:
+                        saude.motivo = "login recusado" if sessao else "navegador não abriu"
+    except Exception as e:
+        saude.motivo = str(e)
+    saude.duracao = time.monotonic() - inicio
+    return saude
+
+
+def verificar_sistemas(
+    credenciais: Dict[str, str],
+    pasta_download: str,
+    exige_sigede: bool = True,
+    tem_ics_avulsos: bool = False,
+) -> VerificacaoSistemas:
+    """
+    Verifica alcance e login de todos os sistemas em paralelo e abre o disjuntor dos indisponíveis.
+    Deve ser chamada com o pool de sessões ativo (pool_sessoes.iniciar()).
+
+    :param credenciais: Credenciais da interface (as mesmas passadas aos adapters).
+    :param pasta_download: Pasta de download inicial dos navegadores pré-aquecidos (trocada no empréstimo).
+    :param exige_sigede: O lote tem protocolos reais (o SIGEDE é verificado).
+    :param tem_ics_avulsos: O lote tem ICs avulsos (sem SIGEDE ainda há o que triar).
+    :return: VerificacaoSistemas com a saúde de cada sistema e se o lote deve ser abortado.
+    """
+    sistemas: List[SistemaAutomacao] = [Siatu(), Urbano(), Sisctm(), GoogleMaps()]
+    if exige_sigede:
+        sistemas.insert(0, Sigede())
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(sistemas), thread_name_prefix="verificacao") as executor:
+        futuros = [executor.submit(_verificar, sistema, credenciais, pasta_download) for sistema in sistemas]
+        saudes = [futuro.result() for futuro in futuros]
+
+    verificacao = VerificacaoSistemas(saudes, exige_sigede, tem_ics_avulsos)
+    logger.info(f"Verificação dos sistemas ({time.monotonic() - inicio:.1f}s):\n\t"
+                + "\n\t".join(str(saude) for saude in saudes))
+    for saude in saudes:
+        if not saude.disponivel:
+            disjuntores.abrir(saude.sistema, f"verificação inicial: {saude.motivo}")
+        elif saude.motivo:
+            logger.warning(f"{saude.sistema} está de pé, mas lento: {saude.motivo}.")
+    return verificacao
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do app são importados como no main.py (from utils import ..., from core import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+import utils.cache as modulo
+from utils.cache import CacheResultados, executar_com_cache
+
+'''
+Cache dos resultados por IC (utils/cache.py): validade por sistema e pela opção AUTOTRI_CACHE_DIAS, revalidação dos
+arquivos guardados, resultados reprovados nunca guardados e arquivos sempre copiados (nunca hardlinks).
+'''
+
+DIA = 86400
+INDICE = "312.016.0001-1"
+
+
+class Relogio:
+    """time falso: time.time() só anda quando o teste manda."""
+
+    def __init__(self):
+        self.agora = 1_800_000_000.0
+
+    def time(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, relogio):
+    monkeypatch.delenv("AUTOTRI_CACHE_DIAS", raising=False)
+    monkeypatch.delenv("AUTOTRI_CACHE_REVALIDAR", raising=False)
+    cache = CacheResultados(str(tmp_path / "cache"))
+    os.makedirs(cache.pasta)
+    monkeypatch.setattr(modulo, "cache_resultados", cache)
+    return cache
+
+
+class Etapa:
+    """Adapter falso: grava um PDF na pasta recebida e devolve 'resultado'."""
+
+    def __init__(self, resultado, arquivo="Planta_Basica.pdf", conteudo=b"%PDF planta"):
+        self.resultado, self.arquivo, self.conteudo, self.chamadas = resultado, arquivo, conteudo, 0
+
+    def __call__(self, pasta):
+        self.chamadas += 1
+        with open(os.path.join(pasta, self.arquivo), "wb") as f:
+            f.write(self.conteudo)
+        return self.resultado
+
+
+def test_resultado_guardado_e_reaproveitado_em_outra_pasta(cache, tmp_path):
+    etapa = Etapa([{"endereco": "RUA A"}, 1, 1])
+    primeira, segunda = tmp_path / "A" / "31201600011", tmp_path / "B" / "31201600011"
+    primeira.mkdir(parents=True)
+    assert executar_com_cache("SIATU", INDICE, str(primeira), etapa) == [{"endereco": "RUA A"}, 1, 1]
+    assert os.listdir(primeira) == ["Planta_Basica.pdf"]    # A subpasta de trabalho (.siatu) some
+
+    assert executar_com_cache("SIATU", "31201600011", str(segunda), etapa) == [{"endereco": "RUA A"}, 1, 1]
+    assert etapa.chamadas == 1
+    assert (segunda / "Planta_Basica.pdf").read_bytes() == b"%PDF planta"
+    assert not os.path.samefile(primeira / "Planta_Basica.pdf", segunda / "Planta_Basica.pdf")
+    assert (cache.acertos, cache.faltas) == (1, 1)
+
+
+def test_validade_por_sistema(cache, tmp_path, relogio):
+    siatu, sisctm = Etapa([{"endereco": "RUA A"}, 0, 0]), Etapa({"area": "360,50"}, "CTM_Aereo.png")
+    executar_com_cache("SIATU", INDICE, str(tmp_path), siatu)
+    executar_com_cache("SISCTM", INDICE, str(tmp_path), sisctm)
+
+    relogio.agora += 8 * DIA        # SIATU vale 7 dias, SISCTM 30
+    assert cache.buscar("SIATU", INDICE) is None
+    assert cache.buscar("SISCTM", INDICE).idade_dias == pytest.approx(8)
+
+
+def test_opcao_de_dias_limita_e_zero_desliga(cache, tmp_path, relogio):
+    executar_com_cache("SISCTM", INDICE, str(tmp_path), Etapa({"area": "360,50"}, "CTM_Aereo.png"))
+    relogio.agora += 3 * DIA
+    cache.idade_maxima_dias = 2
+    assert cache.buscar("SISCTM", INDICE) is None
+    cache.idade_maxima_dias = 0
+    assert not cache.ativo("SISCTM")
+    cache.idade_maxima_dias = None
+    assert cache.buscar("SISCTM", INDICE) is not None
+
+
+def test_revalidacao_descarta_arquivo_corrompido(cache, tmp_path):
+    executar_com_cache("URBANO", INDICE, str(tmp_path), Etapa([{"tipo": "Alvará"}, 1], "Projeto.pdf"))
+    entrada = cache.buscar("URBANO", INDICE)
+    armazenado = cache._caminho_artefato(entrada.artefatos["Projeto.pdf"])
+    with open(armazenado, "wb") as f:
+        f.write(b"corrompido")
+
+    assert cache.buscar("URBANO", INDICE) is not None      # Sem revalidação só a existência é conferida
+    cache.revalidar = True
+    assert cache.buscar("URBANO", INDICE) is None
+    cache.revalidar = False
+    assert cache.buscar("URBANO", INDICE) is None            # A entrada foi descartada
+
+
+def test_resultado_reprovado_nao_e_guardado_nem_usado(cache, tmp_path):
+    todos_baixados = lambda r: r[1] == r[2]    # noqa: E731 - como RESULTADO_VALIDO["SIATU"]
+    incompleto = Etapa([{"endereco": "RUA A"}, 1, 2])
+    executar_com_cache("SIATU", INDICE, str(tmp_path), incompleto, valido=todos_baixados)
+    assert cache.buscar("SIATU", INDICE) is None
+
+    executar_com_cache("SIATU", INDICE, str(tmp_path), incompleto)     # Guardado por uma regra antiga (bool)
+    completo = Etapa([{"endereco": "RUA A"}, 2, 2])
+    assert executar_com_cache("SIATU", INDICE, str(tmp_path), completo, valido=todos_baixados) == [{"endereco": "RUA A"}, 2, 2]
+    assert completo.chamadas == 1
@@ -0,0 +1,64 @@
+from utils.cliente_http import _url_do_link, descobrir_urls
+
+'''
+URLs dos links do SIATU descobertas sem executar o onclick (utils/cliente_http.py): só o href comum e a forma
+exibeDocumento('<URL>') são reconhecidos - o resto dá None e o link é clicado pelo navegador.
+'''
+
+BASE = "https://siatu-producao.pbh.gov.br/siatu/consultaImovel.do?indice=31201600011"
+
+
+class DriverLinks:
+    """Driver falso: execute_script devolve a base da página e os atributos (href, onclick) gravados dos links."""
+
+    def __init__(self, atributos):
+        self.atributos = atributos
+
+    def execute_script(self, _script, elementos):
+        return [BASE, self.atributos[:len(elementos)]]
+
+
+def test_href_comum():
+    assert _url_do_link("planta.pdf", None, BASE) == "https://siatu-producao.pbh.gov.br/siatu/planta.pdf"
+    assert _url_do_link("#", None, BASE) is None
+    assert _url_do_link("javascript:void(0)", None, BASE) is None
+    assert _url_do_link("mailto:atendimento@pbh.gov.br", None, BASE) is None
+
+
+def test_onclick_exibe_documento():
+    esperado = "https://siatu-producao.pbh.gov.br/siatu/documentos/2019/ESCRITURA_48213.pdf"
+    for onclick in (
+        "exibeDocumento('/siatu/documentos/2019/ESCRITURA_48213.pdf')",
+        "exibeDocumento('documentos/2019/ESCRITURA_48213.pdf'); return false;",
+        'javascript:exibeDocumento("/siatu/documentos/2019/ESCRITURA_48213.pdf");',
+        "return exibeDocumento( '/siatu/documentos/2019/ESCRITURA_48213.pdf' )",
+    ):
+        assert _url_do_link("#", onclick, BASE) == esperado, onclick
+    assert _url_do_link("javascript:exibeDocumento('/siatu/documentos/2019/ESCRITURA_48213.pdf')", None, BASE) == esperado
+
+
+def test_onclick_fora_da_forma_conhecida_cai_no_clique():
+    for onclick in (
+        "exibeDocumento(48213)",
+        "exibeDocumento('/siatu/doc.pdf', 'ESCRITURA')",
+        "exibeDocumento(caminho + '.pdf')",
+        "exibeDocumento('/siatu/doc.pdf'); document.forms[0].submit();",
+        "gerarPlantaBasica('31201600011')",
+        "window.open('/siatu/doc.pdf')",
+        "exibeDocumento('javascript:alert(1)')",
+    ):
+        assert _url_do_link("#", onclick, BASE) is None, onclick
+
+
+def test_descobrir_urls_na_ordem_dos_links():
+    driver = DriverLinks([
+        ["#", "exibeDocumento('/siatu/documentos/ALVARA.pdf')"],
+        ["#", "abrirJanela(3)"],
+        ["/siatu/planta.pdf", None],
+    ])
+    assert descobrir_urls(driver, ["a", "b", "c"]) == [
+        "https://siatu-producao.pbh.gov.br/siatu/documentos/ALVARA.pdf",
+        None,
+        "https://siatu-producao.pbh.gov.br/siatu/planta.pdf",
+    ]
+    assert descobrir_urls(driver, []) == []
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from pipeline.diario import DiarioTriagem, arquivos_da_pasta, localizar_triagem_interrompida
+from pipeline.etapas import Etapa
+from pipeline.process import registrar_no_diario
+
+'''
+Diário da triagem (pipeline/diario.py): leitura tolerante a uma linha truncada, etapas concluídas que sobrevivem à
+renomeação dos anexos, arquivos das etapas vizinhas fora do registro e etapas sem resultado nunca dadas como concluídas.
+'''
+
+PROTOCOLO, INDICE = "70070179256", "31201600011"
+
+
+@pytest.fixture
+def pasta_ic(tmp_path):
+    pasta = tmp_path / PROTOCOLO / INDICE
+    pasta.mkdir(parents=True)
+    return pasta
+
+
+def test_linha_truncada_no_fim_e_ignorada(tmp_path):
+    diario = DiarioTriagem(str(tmp_path))
+    diario.iniciar_lote([PROTOCOLO], [])
+    diario.registrar_protocolo(PROTOCOLO, [INDICE])
+    with open(diario.caminho, "a", encoding="utf-8") as f:
+        f.write('{"tipo": "etapa", "protocolo": "7007')     # Queda no meio da gravação
+
+    retomado = DiarioTriagem(str(tmp_path))
+    assert retomado.indices_do_protocolo(PROTOCOLO) == [INDICE]
+    retomado.registrar_etapa(PROTOCOLO, INDICE, "URBANO", [{}, 0], [])
+    with open(diario.caminho, encoding="utf-8") as f:
+        linhas = f.read().splitlines()
+    assert json.loads(linhas[-1])["etapa"] == "URBANO"      # O próximo registro começa numa linha nova
+    assert DiarioTriagem(str(tmp_path)).etapa_concluida(PROTOCOLO, INDICE, "URBANO")["resultado"] == [{}, 0]
+
+
+def test_etapa_concluida_aceita_anexo_renomeado(tmp_path, pasta_ic):
+    anexo = pasta_ic / "Escritura Pública.pdf"
+    anexo.write_bytes(b"%PDF escritura")
+    diario = DiarioTriagem(str(tmp_path))
+    diario.registrar_etapa(PROTOCOLO, INDICE, "SIATU", [{"endereco": "RUA A"}, 1, 1], [str(anexo)])
+
+    anexo.rename(pasta_ic / "Escritura_Publica.pdf")     # normalizar_nome do relatório
+    assert DiarioTriagem(str(tmp_path)).etapa_concluida(PROTOCOLO, INDICE, "SIATU") is not None
+
+    (pasta_ic / "Escritura_Publica.pdf").write_bytes(b"%PDF outro conteudo")
+    assert DiarioTriagem(str(tmp_path)).etapa_concluida(PROTOCOLO, INDICE, "SIATU") is None
+
+
+def test_arquivos_das_etapas_vizinhas_ficam_de_fora(pasta_ic):
+    (pasta_ic / "CTM_Aereo.png").write_bytes(b"png")
+    (pasta_ic / ".siatu").mkdir()
+    (pasta_ic / ".siatu" / "Escritura.pdf").write_bytes(b"%PDF")
+    (pasta_ic / "Alvara.pdf.crdownload").write_bytes(b"%PD")
+    (pasta_ic / "Planta.pdf.part").write_bytes(b"%P")
+    assert list(arquivos_da_pasta(str(pasta_ic))) == [str(pasta_ic / "CTM_Aereo.png")]
+
+
+def test_arquivo_movido_pela_vizinha_nao_derruba_o_registro(tmp_path, pasta_ic):
+    gerado = pasta_ic / "CTM_Aereo.png"
+    gerado.write_bytes(b"png")
+    diario = DiarioTriagem(str(tmp_path))
+    diario.registrar_etapa(PROTOCOLO, INDICE, "SISCTM", {"area": "360,50"}, [str(gerado), str(pasta_ic / "sumiu.pdf")])
+    assert list(diario.etapa_concluida(PROTOCOLO, INDICE, "SISCTM")["arquivos"]) == [
+        os.path.join(PROTOCOLO, INDICE, "CTM_Aereo.png")]
+
+
+def test_etapa_sem_resultado_fica_pendente(tmp_path, pasta_ic):
+    diario = DiarioTriagem(str(tmp_path))
+
+    def siatu(_resultados):
+        (pasta_ic / "Planta_Basica.pdf").write_bytes(b"%PDF")
+        return {"endereco": "RUA A"}, 1, 2          # Um anexo encontrado não foi baixado
+
+    def urbano(_resultados):
+        (pasta_ic / "Projeto.pdf").write_bytes(b"%PDF")
+        return {"tipo": "Alvará"}, 1
+
+    etapas = registrar_no_diario([Etapa("SIATU", siatu), Etapa("URBANO", urbano)], diario, PROTOCOLO, INDICE, str(pasta_ic))
+    for etapa in etapas:
+        etapa.funcao({})
+
+    assert diario.etapa_concluida(PROTOCOLO, INDICE, "SIATU") is None
+    assert list(diario.etapa_concluida(PROTOCOLO, INDICE, "URBANO")["arquivos"]) == [
+        os.path.join(PROTOCOLO, INDICE, "Projeto.pdf")]
+    assert diario.pendencias() == [f"{INDICE}/SIATU"]
+
+
+def test_lote_interrompido_e_localizado_ate_o_fim(tmp_path):
+    pasta = tmp_path / "Resultados - 17-10-2026 09h30"
+    pasta.mkdir()
+    diario = DiarioTriagem(str(pasta))
+    diario.iniciar_lote([PROTOCOLO], [INDICE])
+    assert localizar_triagem_interrompida([PROTOCOLO], [INDICE], raiz=str(tmp_path)) == str(pasta)
+    assert localizar_triagem_interrompida([PROTOCOLO], [], raiz=str(tmp_path)) is None
+
+    diario.registrar_fim()
+    assert localizar_triagem_interrompida([PROTOCOLO], [INDICE], raiz=str(tmp_path)) is None
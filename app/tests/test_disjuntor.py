@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+import utils.disjuntor as modulo
+from utils.disjuntor import ABERTO, FECHADO, SEMIABERTO, DisjuntoresSistemas, SistemaIndisponivel
+
+'''
+Transições do disjuntor por sistema (utils/disjuntor.py): FECHADO -> ABERTO após as falhas seguidas, recusa durante o
+resfriamento, uma única chamada de teste no SEMIABERTO e o resultado dela fechando ou reabrindo o disjuntor.
+'''
+
+
+class Relogio:
+    """time falso: time.monotonic() só anda quando o teste manda."""
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def disjuntores(relogio):
+    return DisjuntoresSistemas(falhas_para_abrir=3, resfriamento=60)
+
+
+def estado(disjuntores, sistema="SIATU"):
+    return disjuntores._de(sistema).estado
+
+
+def em_outra_thread(funcao):
+    """Resultado (ou exceção) de funcao() chamada em outra thread - outro IC do lote."""
+    saida = {}
+
+    def rodar():
+        try:
+            saida["resultado"] = funcao()
+        except Exception as e:
+            saida["erro"] = e
+    thread = threading.Thread(target=rodar)
+    thread.start()
+    thread.join()
+    return saida
+
+
+def test_abre_apos_falhas_seguidas(disjuntores):
+    disjuntores.registrar_falha("SIATU")
+    disjuntores.registrar_falha("SIATU")
+    disjuntores.registrar_sucesso("SIATU")      # Sucesso zera a contagem
+    disjuntores.registrar_falha("SIATU")
+    disjuntores.registrar_falha("SIATU")
+    assert estado(disjuntores) == FECHADO
+    disjuntores.permitir("SIATU")
+
+    disjuntores.registrar_falha("SIATU")
+    assert estado(disjuntores) == ABERTO
+    with pytest.raises(SistemaIndisponivel) as erro:
+        disjuntores.permitir("SIATU")
+    assert erro.value.sistema == "SIATU" and erro.value.restante == 60
+    disjuntores.permitir("URBANO")              # Cada sistema tem o seu disjuntor
+    assert disjuntores.abertos() == ["SIATU"]
+
+
+def test_uma_unica_chamada_de_teste_depois_do_resfriamento(disjuntores, relogio):
+    disjuntores.abrir("SIATU", "fora do ar")
+    relogio.agora += 59
+    with pytest.raises(SistemaIndisponivel):
+        disjuntores.permitir("SIATU")
+
+    relogio.agora += 1
+    disjuntores.permitir("SIATU")               # Esta thread faz a chamada de teste
+    assert estado(disjuntores) == SEMIABERTO
+    disjuntores.permitir("SIATU")               # Novas tentativas da própria chamada de teste
+    assert isinstance(em_outra_thread(lambda: disjuntores.permitir("SIATU"))["erro"], SistemaIndisponivel)
+    assert disjuntores.resumo() == "⚠ SIATU em teste"
+
+
+def test_teste_bem_sucedido_fecha(disjuntores, relogio):
+    disjuntores.abrir("SIATU")
+    relogio.agora += 60
+    with disjuntores.protegido("SIATU"):
+        pass
+    assert estado(disjuntores) == FECHADO
+    assert em_outra_thread(lambda: disjuntores.permitir("SIATU")) == {"resultado": None}
+
+
+def test_teste_que_falha_reabre_na_hora(disjuntores, relogio):
+    disjuntores.abrir("SIATU")
+    relogio.agora += 60
+    with disjuntores.protegido("SIATU") as guarda:
+        guarda.falhou("login recusado")         # Uma falha só no SEMIABERTO já reabre
+    assert estado(disjuntores) == ABERTO
+    with pytest.raises(SistemaIndisponivel):
+        disjuntores.permitir("SIATU")
+    assert disjuntores.indisponibilidades() == ["SIATU: indisponível 2 vez(es), 1 chamada(s) puladas"]
+
+
+def test_protegido_registra_excecao_e_repassa_indisponivel(disjuntores):
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            with disjuntores.protegido("SISCTM"):
+                raise TimeoutError("sem resposta")
+    assert estado(disjuntores, "SISCTM") == ABERTO
+    with pytest.raises(SistemaIndisponivel):
+        with disjuntores.protegido("SISCTM"):
+            pytest.fail("o bloco não pode rodar com o disjuntor aberto")
+
+    disjuntores.limpar()
+    assert disjuntores.abertos() == [] and disjuntores.resumo() == ""
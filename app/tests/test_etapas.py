@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from pipeline.etapas import Etapa, GrafoEtapas
+
+'''
+Grafo de etapas de um IC (pipeline/etapas.py): dependências respeitadas, independentes em paralelo, dependentes de uma
+etapa que falhou puladas e a primeira exceção relançada no fim.
+'''
+
+
+def registrar(ordem, nome, resultado=None, erro=None, esperar=None, avisar=None):
+    """Função de etapa que anota o nome em 'ordem' (e opcionalmente espera um evento antes, avisa um depois ou falha)."""
+    def funcao(resultados):
+        if esperar is not None:
+            assert esperar.wait(5)
+        ordem.append(nome)
+        if avisar is not None:
+            avisar.set()
+        if erro is not None:
+            raise erro
+        return resultado if resultado is not None else dict(resultados)
+    return funcao
+
+
+def test_dependentes_rodam_depois_das_dependencias():
+    ordem = []
+    grafo = GrafoEtapas([
+        Etapa("RELATORIO", registrar(ordem, "RELATORIO"), depende=("G-MAPS", "URBANO")),
+        Etapa("G-MAPS", registrar(ordem, "G-MAPS"), depende=("SIATU", "SISCTM")),
+        Etapa("SIATU", registrar(ordem, "SIATU", "pb")),
+        Etapa("URBANO", registrar(ordem, "URBANO", "projetos")),
+        Etapa("SISCTM", registrar(ordem, "SISCTM", "mapa")),
+    ], max_paralelas=1)
+    resultados = grafo.executar()
+
+    assert ordem == ["SIATU", "URBANO", "SISCTM", "G-MAPS", "RELATORIO"]    # Com 1 por vez: a ordem da lista desempata
+    assert resultados["G-MAPS"] == {"SIATU": "pb", "URBANO": "projetos", "SISCTM": "mapa"}
+    assert set(resultados["RELATORIO"]) == {"SIATU", "URBANO", "SISCTM", "G-MAPS"}
+
+
+def test_independentes_rodam_ao_mesmo_tempo():
+    todas_comecaram = threading.Barrier(3, timeout=5)
+
+    def etapa(nome):
+        def funcao(_resultados):
+            todas_comecaram.wait()      # Só passa se as três estiverem rodando juntas
+            return nome
+        return funcao
+
+    grafo = GrafoEtapas([Etapa(nome, etapa(nome)) for nome in ("SIATU", "URBANO", "SISCTM")], max_paralelas=3)
+    assert grafo.executar() == {"SIATU": "SIATU", "URBANO": "URBANO", "SISCTM": "SISCTM"}
+
+
+def test_falha_pula_as_dependentes_e_e_relancada_no_fim():
+    ordem, siatu_falhou = [], threading.Event()
+    grafo = GrafoEtapas([
+        Etapa("SIATU", registrar(ordem, "SIATU", erro=TimeoutError("SIATU fora do ar"), avisar=siatu_falhou)),
+        Etapa("URBANO", registrar(ordem, "URBANO", "projetos", esperar=siatu_falhou)),
+        Etapa("G-MAPS", registrar(ordem, "G-MAPS"), depende=("SIATU",)),
+        Etapa("RELATORIO", registrar(ordem, "RELATORIO"), depende=("G-MAPS", "URBANO")),
+    ], max_paralelas=2, ao_concluir=lambda etapa, _andamento: ordem.append(f"concluída {etapa.nome}"))
+
+    with pytest.raises(TimeoutError, match="SIATU fora do ar"):
+        grafo.executar()
+    assert ordem == ["SIATU", "URBANO", "concluída URBANO"]     # A independente terminou; as dependentes não rodaram
+
+
+def test_grafo_invalido():
+    nada = lambda _r: None     # noqa: E731
+    with pytest.raises(ValueError, match="repetido"):
+        GrafoEtapas([Etapa("SIATU", nada), Etapa("SIATU", nada)])
+    with pytest.raises(ValueError, match="inexistentes"):
+        GrafoEtapas([Etapa("G-MAPS", nada, depende=("SISCTM",))])
+    with pytest.raises(ValueError, match="circular"):
+        GrafoEtapas([Etapa("A", nada, depende=("B",)), Etapa("B", nada, depende=("A",))])
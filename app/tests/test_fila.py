@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from pipeline.fila import PoolICs, TarefaIC, ics_paralelos_configurados
+from utils import chave_indice
+
+'''
+Deduplicação e pool de ICs (utils/formatters.py e pipeline/fila.py): a chave canônica de um IC em qualquer formatação,
+vários ICs triados ao mesmo tempo, erro de um IC sem derrubar o worker, fila limitada e cancelamento.
+'''
+
+
+def tarefa(indice, posicao=1):
+    return TarefaIC(indice, "70070179256", posicao, 9, "▶ ETAPA 1/1:  PROTOCOLO:  70070179256 ◀", False)
+
+
+@pytest.mark.parametrize("indice", ["312.016-007-0011", "312016 007 0011", "3120160070011", " 312/016.007-0011 "])
+def test_chave_indice_ignora_a_formatacao(indice):
+    assert chave_indice(indice) == "3120160070011"
+
+
+def test_chave_indice_vazia():
+    assert chave_indice(None) == chave_indice("") == chave_indice("--") == ""
+    assert chave_indice("312.016-007-0011") != chave_indice("312.016-007-0012")
+
+
+def test_numero_de_workers_configurado(monkeypatch):
+    monkeypatch.setenv("AUTOTRI_ICS_PARALELOS", "4")
+    assert ics_paralelos_configurados() == 4
+    monkeypatch.setenv("AUTOTRI_ICS_PARALELOS", "0")
+    assert ics_paralelos_configurados() == 1
+    monkeypatch.setenv("AUTOTRI_ICS_PARALELOS", "muitos")
+    assert 1 <= ics_paralelos_configurados() <= 6
+
+
+def test_workers_triam_ao_mesmo_tempo_e_sobrevivem_a_erros():
+    juntos = threading.Barrier(2, timeout=5)
+    triados, lock = [], threading.Lock()
+
+    def processar(t):
+        if t.indice == "00000000000":
+            raise RuntimeError("IC inexistente")
+        if t.posicao <= 2:
+            juntos.wait()       # Os dois primeiros só passam se estiverem rodando ao mesmo tempo
+        with lock:
+            triados.append(t.indice)
+
+    pool = PoolICs(processar, threading.Event(), n_workers=2)
+    pool.iniciar()
+    for posicao, indice in enumerate(["31201600011", "10503200027", "00000000000", "20100400003"], 1):
+        pool.submeter(tarefa(indice, posicao))
+    pool.aguardar()
+    pool.encerrar()
+
+    assert sorted(triados) == ["10503200027", "20100400003", "31201600011"]
+    assert pool.processados == 4
+
+
+def test_fila_limitada_segura_o_produtor():
+    liberar, iniciou = threading.Event(), threading.Event()
+
+    def processar(_t):
+        iniciou.set()
+        assert liberar.wait(5)
+
+    pool = PoolICs(processar, threading.Event(), n_workers=1, adiantados=1)
+    pool.iniciar()
+    pool.submeter(tarefa("31201600011"))
+    assert iniciou.wait(5)
+    pool.submeter(tarefa("10503200027"))        # Ocupa a única vaga da fila
+
+    produtor = threading.Thread(target=pool.submeter, args=(tarefa("20100400003"),))
+    produtor.start()
+    produtor.join(0.2)
+    assert produtor.is_alive()                  # Fila cheia: o SIGEDE não se adianta mais
+    liberar.set()
+    produtor.join(5)
+    pool.aguardar()
+    pool.encerrar()
+    assert pool.processados == 3
+
+
+def test_cancelamento_descarta_os_ics_da_fila():
+    cancelar, liberar = threading.Event(), threading.Event()
+    triados = []
+
+    def processar(t):
+        triados.append(t.indice)
+        cancelar.set()              # Usuário cancela durante o primeiro IC
+        assert liberar.wait(5)
+
+    pool = PoolICs(processar, cancelar, n_workers=1, adiantados=3)
+    pool.iniciar()
+    for posicao, indice in enumerate(["31201600011", "10503200027", "20100400003"], 1):
+        pool.submeter(tarefa(indice, posicao))
+    liberar.set()
+    pool.aguardar()                 # Não trava: os descartados também contam como feitos
+    pool.encerrar()
+    assert triados == ["31201600011"] and pool.processados == 1
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+import utils.limites as modulo
+from utils.limites import LimitadorSistemas, LimiteSistema
+
+'''
+Limitador por sistema (utils/limites.py): espaçamento mínimo entre aberturas de sessão, vagas simultâneas com fila e as
+métricas de espera resumidas no fim da triagem.
+'''
+
+
+class Relogio:
+    """time falso: sleep(...) só anda o relógio (e anota a espera)."""
+
+    def __init__(self):
+        self.agora = 500.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo, "time", relogio)
+    return relogio
+
+
+def test_aberturas_espacadas(relogio):
+    limitador = LimitadorSistemas({"SIATU": LimiteSistema(max_sessoes=3, espacamento=2.0)})
+    for _ in range(3):
+        limitador.espacar("SIATU")
+    assert relogio.esperas == [2.0, 2.0]    # A primeira abertura não espera
+
+    relogio.agora += 1.5                    # Só 0,5 s faltando para o próximo horário liberado
+    limitador.espacar("SIATU")
+    assert relogio.esperas[-1] == pytest.approx(0.5)
+
+    relogio.agora += 10                     # Depois de um tempo parado o espaçamento não acumula
+    limitador.espacar("SIATU")
+    assert len(relogio.esperas) == 3
+
+
+def test_sistemas_sem_limite_nao_esperam(relogio):
+    limitador = LimitadorSistemas({"SIATU": LimiteSistema(max_sessoes=1, espacamento=2.0),
+                                   "URBANO": LimiteSistema(max_sessoes=1)})
+    for sistema in ("URBANO", "URBANO", "SISCTM", None):
+        limitador.espacar(sistema)
+        with limitador.sessao(sistema):
+            pass
+    assert relogio.esperas == []
+    assert limitador.situacao("SISCTM") == {}
+
+
+def test_sessoes_alem_das_vagas_esperam_na_fila():
+    limitador = LimitadorSistemas({"SIATU": LimiteSistema(max_sessoes=1)})
+    entrou, liberar, aguardando = threading.Event(), threading.Event(), threading.Event()
+    ordem = []
+
+    def primeira():
+        with limitador.sessao("SIATU"):
+            ordem.append("primeira")
+            entrou.set()
+            assert liberar.wait(5)
+
+    def segunda():
+        with limitador.sessao("SIATU"):
+            ordem.append("segunda")
+
+    threads = [threading.Thread(target=primeira), threading.Thread(target=segunda)]
+    threads[0].start()
+    assert entrou.wait(5)
+    threads[1].start()
+    while limitador.situacao("SIATU")["na_fila"] != 1:
+        aguardando.wait(0.01)
+    assert ordem == ["primeira"] and limitador.situacao("SIATU")["em_uso"] == 1
+
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    situacao = limitador.situacao("SIATU")
+    assert ordem == ["primeira", "segunda"]
+    assert (situacao["em_uso"], situacao["na_fila"], situacao["pico_fila"], situacao["sessoes"]) == (0, 0, 1, 2)
+
+    limitador.limpar()
+    assert limitador.situacao("SIATU")["pico_fila"] == 0
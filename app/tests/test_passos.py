@@ -0,0 +1,90 @@
+import pytest
+
+from utils.decorators import Passos, retry
+
+'''
+Retentativa por passo com checkpoints (Passos em utils/decorators.py): passo concluído não roda de novo, só o passo que
+falhou é repetido, desfazer(...) o libera e nova_sessao() descarta apenas os passos por sessão.
+'''
+
+
+class Falhas:
+    """Passo falso: falha nas primeiras 'falhas' chamadas e depois devolve 'valor'."""
+
+    def __init__(self, valor, falhas=0):
+        self.valor, self.falhas, self.chamadas = valor, falhas, 0
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas:
+            raise RuntimeError(f"falha {self.chamadas}")
+        return self.valor
+
+
+@pytest.fixture
+def passos():
+    return Passos("SIATU 31201600011", max_retries=3, delay=0)
+
+
+def test_checkpoint_devolve_o_resultado_sem_rodar(passos):
+    planta = Falhas({"endereco": "RUA DOS GOITACAZES, 1234"})
+    assert passos.executar("planta basica", planta) == {"endereco": "RUA DOS GOITACAZES, 1234"}
+    assert passos.executar("planta basica", planta) == {"endereco": "RUA DOS GOITACAZES, 1234"}
+    assert planta.chamadas == 1
+    assert passos.concluido("planta basica")
+    assert passos.resultado("anexo 1: escritura.pdf", "nenhum") == "nenhum"
+
+
+def test_so_o_passo_que_falhou_e_repetido(passos):
+    reparos = []
+    anexo = Falhas(["Escritura.pdf"], falhas=2)
+    assert passos.executar("anexo 1: escritura.pdf", anexo, reparar=lambda: reparos.append("voltar")) == ["Escritura.pdf"]
+    assert anexo.chamadas == 3
+    assert reparos == ["voltar", "voltar"]     # Antes de cada nova tentativa, nunca antes da primeira
+
+
+def test_passo_que_esgota_as_tentativas_sobe_sem_checkpoint(passos):
+    anexo = Falhas(["Alvara.pdf"], falhas=5)
+    with pytest.raises(RuntimeError):
+        passos.executar("anexo 2: alvara.pdf", anexo, max_retries=2)
+    assert anexo.chamadas == 2
+    assert not passos.concluido("anexo 2: alvara.pdf")
+
+
+def test_desfazer_faz_o_passo_rodar_de_novo(passos):
+    anexo = Falhas(["Escritura.pdf"])
+    passos.executar("anexo 1: escritura.pdf", anexo)
+    passos.desfazer("anexo 1: escritura.pdf")        # Download começou mas não terminou
+    passos.desfazer("anexo 9: inexistente.pdf")
+    passos.executar("anexo 1: escritura.pdf", anexo)
+    assert anexo.chamadas == 2
+
+
+def test_nova_sessao_descarta_so_os_passos_por_sessao(passos):
+    login, planta = Falhas(True), Falhas({"area": "360,50"})
+    passos.executar("login", login, por_sessao=True)
+    passos.executar("planta basica", planta)
+
+    passos.nova_sessao()
+    assert not passos.concluido("login")
+    assert passos.concluido("planta basica")
+    passos.executar("login", login, por_sessao=True)
+    passos.executar("planta basica", planta)
+    assert (login.chamadas, planta.chamadas) == (2, 1)
+
+
+def test_retry_de_fora_retoma_so_os_passos_que_faltam(passos):
+    login, planta, anexo = Falhas(True), Falhas({"area": "360,50"}), Falhas(["Escritura.pdf"], falhas=3)
+    sessoes = []
+
+    @retry(max_retries=2, delay=0, jitter=0)
+    def fluxo():
+        passos.nova_sessao()
+        sessoes.append(len(sessoes) + 1)
+        passos.executar("login", login, por_sessao=True)
+        dados = passos.executar("planta basica", planta)
+        return dados, passos.executar("anexo 1: escritura.pdf", anexo)
+
+    assert fluxo() == ({"area": "360,50"}, ["Escritura.pdf"])
+    assert sessoes == [1, 2]
+    assert (login.chamadas, planta.chamadas, anexo.chamadas) == (2, 1, 4)
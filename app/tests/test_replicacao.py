@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import pipeline.process as process
+from pipeline import replicar_ic
+
+'''
+Replicação de um IC repetido no lote (pipeline/process.py): os arquivos são copiados para a pasta do outro protocolo e o
+relatório é gerado de novo ali, com a origem da demanda do próprio protocolo.
+'''
+
+RESULTADOS = {"SIATU": ({"endereco": "RUA DOS GOITACAZES, 1234"}, 2, 2), "URBANO": ({}, 0), "SISCTM": {"area": "360,50"}}
+
+
+@pytest.fixture
+def relatorios(monkeypatch):
+    gerados = []
+
+    def gerar_relatorio(**kwargs):
+        with open(kwargs["nome_pdf"], "w") as f:
+            f.write(f"relatório de {kwargs['pasta_anexos']}")
+        gerados.append(kwargs)
+
+    monkeypatch.setattr(process, "gerar_relatorio", gerar_relatorio)
+    return gerados
+
+
+@pytest.fixture
+def ic_triado(tmp_path):
+    origem = tmp_path / "70070179256" / "00701230001"
+    (origem / ".siatu").mkdir(parents=True)
+    (origem / ".siatu" / "Escritura.pdf.crdownload").write_text("pela metade")
+    (origem / "Escritura.pdf").write_text("escritura")
+    (origem / "1. Relatório de Triagem - 00701230001.pdf").write_text("relatório do protocolo 70070179256")
+    return origem
+
+
+def test_copia_os_arquivos_e_gera_o_relatorio_do_protocolo(tmp_path, ic_triado, relatorios):
+    destino = tmp_path / "TRIAGEM_AVULSA" / "00701230001"
+    assert replicar_ic(str(ic_triado), str(destino), RESULTADOS, ["URBANO"], "pr123456", True)
+
+    assert sorted(os.listdir(destino)) == ["1. Relatório de Triagem - 00701230001.pdf", "Escritura.pdf"]
+    assert not os.path.samefile(destino / "Escritura.pdf", ic_triado / "Escritura.pdf")     # Cópia, não hardlink
+    assert (destino / "1. Relatório de Triagem - 00701230001.pdf").read_text() == f"relatório de {destino}"
+    assert (ic_triado / "1. Relatório de Triagem - 00701230001.pdf").read_text() == "relatório do protocolo 70070179256"
+
+    relatorio, = relatorios
+    assert relatorio["ic_avulso"] is True
+    assert relatorio["pasta_anexos"] == str(destino)
+    assert relatorio["anexos_count"] == 2
+    assert relatorio["sistemas_indisponiveis"] == ["URBANO"]
+
+
+def test_origem_sem_resultado_nao_replica(tmp_path, relatorios):
+    origem, destino = tmp_path / "A" / "00701230001", tmp_path / "B" / "00701230001"
+    origem.mkdir(parents=True)
+    assert not replicar_ic(str(origem), str(destino), RESULTADOS, [], "pr123456", False)
+    assert not destino.exists()
+    assert not relatorios
@@ -0,0 +1,155 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from core.sisctm_mapa import descobrir_vista
+from core.sisctm_ogc import ErroOgcSisctm, ServicosSisctm, SisctmOgcClient, montar_endereco
+
+'''
+Consulta do SISCTM pelos serviços OGC (core/sisctm_ogc.py) contra um servidor local no lugar do GeoServer: WFS GetFeature
+(só com o filtro OGC padrão - o CQL_FILTER devolve uma ServiceException, como num servidor que não é GeoServer) e WMS
+GetFeatureInfo (o Lote CP só existe dentro do lote em "L").
+'''
+
+INDICE = "007012300010"
+LOTE_EM_L = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 2], [2, 2], [2, 10], [0, 10], [0, 0]]]}
+ATRIBUTOS_PADRAO = {
+    "_INDICE_CADASTRAL": INDICE, "ÁREA": 360.5, "AREA_TERRENO": 400, "TIPO_LOGRADOURO": "RUA",
+    "NOME_LOGRADOURO": "DOS GOITACAZES", "NUMERO_IMOVEL": "1.234", "COMPLEMENTO": None, "CEP": "30190-050",
+}
+ATRIBUTOS_OUTROS_NOMES = {
+    "_INDICE_CADASTRAL": INDICE, "AREA_CONST": 360.5, "AREA_TERRENO": 400, "TIPO_LOGR": "RUA",
+    "NOME_LOGR": "DOS GOITACAZES", "NUM_IMOVEL": 1234, "COMPL": "AP 101", "CEP": "30190-050",
+}
+
+
+class ServidorOgc(BaseHTTPRequestHandler):
+    atributos = ATRIBUTOS_PADRAO
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, corpo, tipo="application/json"):
+        dados = corpo.encode() if isinstance(corpo, str) else json.dumps(corpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        caminho = urlsplit(self.path)
+        q = {k: v[0] for k, v in parse_qs(caminho.query, keep_blank_values=True).items()}
+        if caminho.path.endswith("/wfs"):
+            if "CQL_FILTER" in q:
+                return self._json("<ServiceExceptionReport/>", "text/xml")
+            feicoes = [{"type": "Feature", "geometry": LOTE_EM_L, "properties": self.atributos}] if INDICE in q.get("FILTER", "") else []
+            return self._json({"type": "FeatureCollection", "features": feicoes})
+        x1, y1, x2, y2 = map(float, q["BBOX"].split(","))
+        x, y = (x1 + x2) / 2, (y1 + y2) / 2
+        dentro = (0 <= x <= 10 and 0 <= y <= 2) or (0 <= x <= 2 and 0 <= y <= 10)
+        feicoes = [{"type": "Feature", "properties": {"AREA_INFORMADA": "372,10"}}] if dentro else []
+        return self._json({"type": "FeatureCollection", "features": feicoes})
+
+
+@pytest.fixture
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorOgc)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_port}/geoserver/wms"
+    servidor.shutdown()
+    ServidorOgc.atributos = ATRIBUTOS_PADRAO
+
+
+@pytest.fixture
+def servicos(tmp_path, servidor, monkeypatch):
+    monkeypatch.delenv("AUTOTRI_SISCTM_OGC_URL", raising=False)
+    monkeypatch.delenv("AUTOTRI_HTTP_DIRETO", raising=False)
+    servicos = ServicosSisctm(caminho=str(tmp_path / "servicos_ogc.json"))
+    servicos.atualizar(crs="EPSG:31983", camadas={
+        "iptu": {"url": servidor, "nome": "fazenda:iptu_ctm_geo"},
+        "lote_cp": {"url": servidor, "nome": "fazenda:lote_cp_ativo"},
+    })
+    return servicos
+
+
+def test_consulta_areas_e_endereco(servicos):
+    cliente = SisctmOgcClient(requests.Session(), servicos)
+    assert cliente.disponivel()
+    assert cliente.consultar(INDICE) == {
+        "iptu_ctm_geo_area": "360.5",
+        "iptu_ctm_geo_area_terreno": "400",
+        "endereco_ctmgeo": "RUA DOS GOITACAZES, 1234 - Belo Horizonte - MG, 30190-050",
+        "lote_cp_ativo_area_informada": "372,10",
+    }
+
+
+def test_indice_sem_lote_levanta_erro(servicos):
+    with pytest.raises(ErroOgcSisctm):
+        SisctmOgcClient(requests.Session(), servicos).consultar("999999999999")
+
+
+def test_servidor_fora_do_ar_levanta_erro(tmp_path):
+    servicos = ServicosSisctm(caminho=str(tmp_path / "servicos_ogc.json"))
+    servicos.atualizar(camadas={"iptu": {"url": "http://127.0.0.1:9/wms", "nome": "a"},
+                                "lote_cp": {"url": "http://127.0.0.1:9/wms", "nome": "b"}})
+    with pytest.raises(ErroOgcSisctm):
+        SisctmOgcClient(requests.Session(), servicos).consultar(INDICE)
+
+
+def test_atributos_desconhecidos_sao_aprendidos_do_painel(servicos):
+    ServidorOgc.atributos = ATRIBUTOS_OUTROS_NOMES
+    cliente = SisctmOgcClient(requests.Session(), servicos)
+    with pytest.raises(ErroOgcSisctm):
+        cliente.consultar(INDICE)   # O SisctmAuto lê o painel e chama aprender_campos(...) com o que leu
+
+    cliente.aprender_campos(INDICE, {
+        "iptu": {"area": "360.5", "area_terreno": "400", "tipo_logradouro": "RUA", "nome_logradouro": "DOS GOITACAZES",
+                 "numero_imovel": "1.234", "complemento": "AP 101", "cep": "30190-050"},
+        "lote_cp": {"area_informada": "372,10"},
+    })
+    assert servicos.campos("iptu")["numero_imovel"] == "NUM_IMOVEL"
+    assert ServicosSisctm(caminho=servicos.caminho).campos("iptu")["area"] == "AREA_CONST"     # Gravado em disco
+    assert cliente.consultar(INDICE)["endereco_ctmgeo"] == "RUA DOS GOITACAZES, 1234 AP 101 - Belo Horizonte - MG, 30190-050"
+
+
+def test_url_do_servidor_por_variavel_de_ambiente(tmp_path, servidor, monkeypatch):
+    servicos = ServicosSisctm(caminho=str(tmp_path / "servicos_ogc.json"))
+    servicos.atualizar(camadas={"iptu": {"url": "https://sisctm.invalido/wms", "nome": "fazenda:iptu_ctm_geo"},
+                                "lote_cp": {"url": "https://sisctm.invalido/wms", "nome": "fazenda:lote_cp_ativo"}})
+    monkeypatch.setenv("AUTOTRI_SISCTM_OGC_URL", servidor)
+    assert SisctmOgcClient(requests.Session(), servicos).consultar(INDICE)["iptu_ctm_geo_area"] == "360.5"
+
+
+def test_montar_endereco():
+    assert montar_endereco({"tipo_logradouro": "AV", "nome_logradouro": "AFONSO PENA", "numero_imovel": "1.212",
+                            "complemento": "", "cep": "30130-003"}) == "AV AFONSO PENA, 1212 - Belo Horizonte - MG, 30130-003"
+
+
+class DriverMapa:
+    """Driver falso: execute_script devolve as fontes do mapa gravadas (o que JS_FONTES_MAPA leria do OpenLayers)."""
+
+    def __init__(self, mapa):
+        self.mapa = mapa
+
+    def execute_script(self, _script):
+        return self.mapa
+
+
+def test_vista_ignora_camadas_transparentes(tmp_path):
+    servicos = ServicosSisctm(caminho=str(tmp_path / "servicos_ogc.json"))
+    wms = {"tipo": "wms", "visivel": True, "urls": ["https://bhmap.pbh.gov.br/geoserver/wms"], "params": {"LAYERS": "base"}}
+    mapa = {"crs": "EPSG:31983", "fontes": [
+        {**wms, "titulo": "Ortofoto", "opacidade": 0.0},
+        {**wms, "titulo": "Quadras", "opacidade": 0.4},
+        {**wms, "titulo": "Base", "opacidade": None},
+    ]}
+    assert descobrir_vista(DriverMapa(mapa), "orto", servicos)
+    assert [f["titulo"] for f in servicos.dados["vistas"]["orto"]] == ["Quadras", "Base"]
+
+    so_transparente = {"crs": "EPSG:31983", "fontes": [{**wms, "titulo": "Ortofoto", "opacidade": 0}]}
+    assert not descobrir_vista(DriverMapa(so_transparente), "aereo", servicos)
@@ -1,14 +1,33 @@
-from .logger import logger, log_queue, log_path, section_log, reset_log_file
-from .formatters import format_by_pattern, format_by_pattern2
-from .pastas import abrir_pasta, criar_pasta_resultados
+from .logger import logger, log_queue, log_path, section_log, reset_log_file, contexto_log
+from .formatters import format_by_pattern, format_by_pattern2, chave_indice
+from .pastas import abrir_pasta, criar_pasta_resultados, replicar_pasta_ic, hash_arquivo
 from .web_driver import driver_context
+from .chromedriver import resolver_chromedriver
+from .sessoes import pool_sessoes, autenticar_sessao, sessao_autenticada
+from .cofre import cofre_sessoes
+from .rede import sem_bloqueio_rede
+from .perfis import PerfilDriver, definir_timeout_comando
+from .esperas import esperar, resumo_esperas, estatisticas_esperas
+from .downloads import rastreador_downloads
+from .limites import limitador_sistemas, resumo_limites
+from .cache import cache_resultados, executar_com_cache
 from .relatorio import (
     normalizar_nome,
     extrair_elementos_do_endereco_para_comparacao,
     parse_area,
     formatar_area,
 )
-from .decorators import retry
+from .decorators import retry, Passos
+from .disjuntor import disjuntores, SistemaIndisponivel, resumo_disjuntores
+from .cliente_http import (
+    http_direto_habilitado,
+    descobrir_urls,
+    sessao_http,
+    baixar,
+    baixar_em_paralelo,
+    baixar_em_segundo_plano,
+    ErroDownloadHttp,
+)
 
 # O que é importado (variáveis, classes e métodos)
 __all__ = [
@@ -18,14 +37,45 @@ __all__ = [
     "log_path",
     "section_log",
     "reset_log_file",
+    "contexto_log",
     "format_by_pattern",
     "format_by_pattern2",
+    "chave_indice",
     "abrir_pasta",
+    "replicar_pasta_ic",
+    "hash_arquivo",
     "driver_context",
+    "resolver_chromedriver",
+    "pool_sessoes",
+    "autenticar_sessao",
+    "sessao_autenticada",
+    "cofre_sessoes",
+    "sem_bloqueio_rede",
+    "PerfilDriver",
+    "definir_timeout_comando",
+    "esperar",
+    "resumo_esperas",
+    "estatisticas_esperas",
+    "rastreador_downloads",
+    "limitador_sistemas",
+    "resumo_limites",
+    "cache_resultados",
+    "executar_com_cache",
     "criar_pasta_resultados",
     "normalizar_nome",
     "extrair_elementos_do_endereco_para_comparacao",
     "parse_area",
     "formatar_area",
     "retry",
+    "Passos",
+    "disjuntores",
+    "SistemaIndisponivel",
+    "resumo_disjuntores",
+    "http_direto_habilitado",
+    "descobrir_urls",
+    "sessao_http",
+    "baixar",
+    "baixar_em_paralelo",
+    "baixar_em_segundo_plano",
+    "ErroDownloadHttp",
 ]
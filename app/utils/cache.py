@@ -0,0 +1,287 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .logger import logger
+from .pastas import pasta_dados, hash_arquivo
+from .formatters import chave_indice
+
+'''
+==================================================================================================================================
+Cache local (em disco) dos resultados de SIATU, URBANO e SISCTM por IC, com validade por sistema.
+
+Dados da Planta Básica, projetos do Urbano e áreas do SISCTM raramente mudam de uma semana para outra, mas cada triagem
+os raspava de novo. Agora o resultado de cada etapa (o retorno do executar(...) do adapter) é guardado num SQLite, com
+chave sistema + IC normalizado (chave_indice), e os arquivos gerados pela etapa (PDFs, prints) são guardados pelo hash
+do conteúdo (sha256) - o mesmo arquivo nunca é guardado duas vezes. Num IC já triado dentro da validade, a etapa não
+abre navegador: os dados vêm do SQLite e os arquivos são copiados para a pasta do IC.
+
+Os arquivos são sempre COPIADOS (na entrada e na saída do armazenamento), nunca vinculados por hardlink: com um hardlink,
+editar um arquivo de uma pasta de resultados alteraria em silêncio o arquivo guardado (e todas as outras cópias dele).
+
+    - Validade por sistema: VALIDADE_DIAS. A opção de execução AUTOTRI_CACHE_DIAS (variável de ambiente) limita a idade
+      aceita em todos os sistemas ("usar o cache só se tiver menos de N dias"); 0 desliga a leitura do cache
+      (as etapas rodam sempre, mas continuam atualizando o cache).
+    - Revalidação (AUTOTRI_CACHE_REVALIDAR=1): antes de usar uma entrada, confere o hash de cada arquivo guardado;
+      entrada com arquivo ausente ou corrompido é descartada e a etapa roda de novo.
+    - Só resultados com dados (etapa bem sucedida) são guardados: uma falha nunca fica "presa" no cache.
+
+Para saber exatamente quais arquivos cada etapa gerou (as etapas de um IC rodam em paralelo na mesma pasta), com o cache
+ativo a etapa grava numa subpasta temporária da pasta do IC; ao fim os arquivos são movidos para a pasta do IC e guardados.
+==================================================================================================================================
+'''
+
+VALIDADE_DIAS: Dict[str, float] = {
+    "SIATU": 7,
+    "URBANO": 7,
+    "SISCTM": 30,   # Áreas e prints do mapa quase nunca mudam
+}
+
+VARIAVEL_CACHE_DIAS = "AUTOTRI_CACHE_DIAS"
+VARIAVEL_CACHE_REVALIDAR = "AUTOTRI_CACHE_REVALIDAR"
+
+
+def _ler_opcao_dias() -> Optional[float]:
+    """Idade máxima (dias) configurada para a execução, ou None (usa só VALIDADE_DIAS)."""
+    configurado = os.environ.get(VARIAVEL_CACHE_DIAS)
+    if not configurado:
+        return None
+    try:
+        return max(0.0, float(configurado))
+    except ValueError:
+        logger.warning(f"{VARIAVEL_CACHE_DIAS} inválida ({configurado}), usando a validade padrão de cada sistema.")
+        return None
+
+
+class EntradaCache:
+    """Um resultado guardado: os dados da etapa, os arquivos ({nome: hash}) e a data de criação."""
+
+    def __init__(self, sistema: str, chave: str, dados: Any, artefatos: Dict[str, str], criado: float):
+        self.sistema = sistema
+        self.chave = chave
+        self.dados = dados
+        self.artefatos = artefatos
+        self.criado = criado
+
+    @property
+    def idade_dias(self) -> float:
+        return (time.time() - self.criado) / 86400
+
+
+class CacheResultados:
+    """
+    Cache SQLite + armazenamento de arquivos por conteúdo. Existe uma única instância (cache_resultados).
+
+    Parâmetros:
+        pasta (str): [OPCIONAL] Pasta do cache. Padrão: <pasta de dados>/cache.
+    """
+
+    def __init__(self, pasta: Optional[str] = None):
+        self._pasta = pasta
+        self.idade_maxima_dias: Optional[float] = _ler_opcao_dias()
+        self.revalidar: bool = os.environ.get(VARIAVEL_CACHE_REVALIDAR, "") not in ("", "0")
+        self.acertos: int = 0
+        self.faltas: int = 0
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    # ------------------------------------------------------------------ armazenamento
+    @property
+    def pasta(self) -> str:
+        return self._pasta or str(pasta_dados("cache"))
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(os.path.join(self.pasta, "resultados.sqlite3"), timeout=30)
+        if not self._iniciado:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                " sistema TEXT NOT NULL, chave TEXT NOT NULL, dados TEXT NOT NULL,"
+                " artefatos TEXT NOT NULL, criado REAL NOT NULL, PRIMARY KEY (sistema, chave))"
+            )
+            self._iniciado = True
+        return conexao
+
+    def _caminho_artefato(self, hash_conteudo: str) -> str:
+        return os.path.join(self.pasta, "artefatos", hash_conteudo[:2], hash_conteudo)
+
+    def limpar(self) -> None:
+        """Zera os contadores de acertos/faltas (início de uma nova triagem)."""
+        with self._lock:
+            self.acertos = 0
+            self.faltas = 0
+
+    def ativo(self, sistema: str) -> bool:
+        """True se a leitura do cache está ligada para o sistema."""
+        return sistema in VALIDADE_DIAS and self.idade_maxima_dias != 0
+
+    # ------------------------------------------------------------------ leitura
+    def buscar(self, sistema: str, indice: str) -> Optional[EntradaCache]:
+        """
+        Retorna o resultado guardado do IC no sistema, se estiver dentro da validade (e íntegro, com revalidação).
+
+        :param sistema: Nome do sistema (ex: "SIATU").
+        :param indice: Índice cadastral (qualquer formatação).
+        """
+        if not self.ativo(sistema):
+            return None
+        chave = chave_indice(indice)
+        validade = VALIDADE_DIAS[sistema]
+        if self.idade_maxima_dias is not None:
+            validade = min(validade, self.idade_maxima_dias)
+
+        try:
+            with self._lock, self._conectar() as conexao:
+                linha = conexao.execute(
+                    "SELECT dados, artefatos, criado FROM resultados WHERE sistema = ? AND chave = ?", (sistema, chave)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache de resultados indisponível: {e}")
+            return None
+
+        if linha is None or time.time() - linha[2] > validade * 86400:
+            self._contar(acerto=False)
+            return None
+
+        entrada = EntradaCache(sistema, chave, json.loads(linha[0]), json.loads(linha[1]), linha[2])
+        for nome, hash_conteudo in entrada.artefatos.items():
+            caminho = self._caminho_artefato(hash_conteudo)
+            if not os.path.isfile(caminho) or (self.revalidar and hash_arquivo(caminho) != hash_conteudo):
+                logger.warning(f"Cache de {sistema} do IC {indice}: arquivo '{nome}' ausente ou corrompido, descartando.")
+                self.invalidar(sistema, indice)
+                self._contar(acerto=False)
+                return None
+
+        self._contar(acerto=True)
+        return entrada
+
+    def _contar(self, acerto: bool) -> None:
+        """Conta um acerto ou uma falta (as etapas de vários ICs consultam o cache ao mesmo tempo)."""
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.faltas += 1
+
+    def materializar(self, entrada: EntradaCache, pasta_destino: str) -> None:
+        """Copia os arquivos da entrada para a pasta do IC, com os nomes originais."""
+        os.makedirs(pasta_destino, exist_ok=True)
+        for nome, hash_conteudo in entrada.artefatos.items():
+            destino = os.path.join(pasta_destino, nome)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            if not os.path.exists(destino):
+                _copiar(self._caminho_artefato(hash_conteudo), destino)
+
+    # ------------------------------------------------------------------ escrita
+    def guardar(self, sistema: str, indice: str, dados: Any, pasta_base: str, arquivos: List[str]) -> None:
+        """
+        Guarda o resultado de uma etapa bem sucedida.
+
+        :param sistema: Nome do sistema.
+        :param indice: Índice cadastral.
+        :param dados: Retorno do executar(...) do adapter (precisa ser serializável em JSON).
+        :param pasta_base: Pasta do IC (os nomes dos arquivos são guardados relativos a ela).
+        :param arquivos: Caminhos dos arquivos gerados pela etapa.
+        """
+        if sistema not in VALIDADE_DIAS:
+            return
+        try:
+            artefatos: Dict[str, str] = {}
+            for caminho in arquivos:
+                hash_conteudo = hash_arquivo(caminho)
+                armazenado = self._caminho_artefato(hash_conteudo)
+                if not os.path.exists(armazenado):
+                    os.makedirs(os.path.dirname(armazenado), exist_ok=True)
+                    _copiar(caminho, armazenado)
+                artefatos[os.path.relpath(caminho, pasta_base)] = hash_conteudo
+
+            with self._lock, self._conectar() as conexao:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO resultados (sistema, chave, dados, artefatos, criado) VALUES (?, ?, ?, ?, ?)",
+                    (sistema, chave_indice(indice), json.dumps(dados, ensure_ascii=False), json.dumps(artefatos), time.time()),
+                )
+        except (OSError, TypeError, ValueError, sqlite3.Error) as e:
+            # Sem cache a próxima triagem só fica mais lenta - nunca deve derrubar a automação
+            logger.warning(f"Não foi possível guardar o resultado de {sistema} do IC {indice} no cache: {e}")
+
+    def invalidar(self, sistema: str, indice: str) -> None:
+        """Remove o resultado guardado do IC no sistema (os arquivos ficam no armazenamento)."""
+        try:
+            with self._lock, self._conectar() as conexao:
+                conexao.execute("DELETE FROM resultados WHERE sistema = ? AND chave = ?", (sistema, chave_indice(indice)))
+        except sqlite3.Error as e:
+            logger.warning(f"Não foi possível invalidar o cache de {sistema}: {e}")
+
+
+cache_resultados = CacheResultados()
+
+
+def executar_com_cache(
+    sistema: str,
+    indice: str,
+    pasta_indice: str,
+    executar: Callable[[str], Any],
+    valido: Callable[[Any], bool] = bool,
+) -> Any:
+    """
+    Roda uma etapa consultando o cache antes e guardando o resultado depois.
+
+    :param sistema: Nome do sistema (chave do cache e de VALIDADE_DIAS).
+    :param indice: Índice cadastral.
+    :param pasta_indice: Pasta do IC.
+    :param executar: Recebe a pasta onde a etapa deve gravar os arquivos e retorna o resultado da etapa.
+    :param valido: Diz se o resultado pode ser guardado (padrão: resultado "verdadeiro"). Uma entrada guardada que não
+                   passa por ele (regra de validade mais nova que a entrada) é descartada e a etapa roda.
+    :return: O resultado da etapa (do cache ou da execução). Listas JSON voltam como listas.
+    """
+    if sistema not in VALIDADE_DIAS:
+        return executar(pasta_indice)
+
+    entrada = cache_resultados.buscar(sistema, indice)
+    if entrada is not None and not valido(entrada.dados):
+        cache_resultados.invalidar(sistema, indice)
+        entrada = None
+    if entrada is not None:
+        cache_resultados.materializar(entrada, pasta_indice)
+        logger.info(f"{sistema}: resultado do cache ({entrada.idade_dias:.1f} dias) para o índice {indice}.")
+        return entrada.dados
+
+    # A etapa grava numa subpasta própria: assim se sabe exatamente quais arquivos ela gerou
+    pasta_etapa = os.path.join(pasta_indice, f".{sistema.lower()}")
+    os.makedirs(pasta_etapa, exist_ok=True)
+    try:
+        resultado = executar(pasta_etapa)
+    finally:
+        arquivos = _mover_para(pasta_etapa, pasta_indice)
+
+    if valido(resultado):
+        cache_resultados.guardar(sistema, indice, resultado, pasta_indice, arquivos)
+    return resultado
+
+
+def _copiar(origem: str, destino: str) -> None:
+    """Cópia independente (nunca hardlink), gravada num temporário e renomeada: ninguém vê um arquivo pela metade."""
+    temporario = destino + ".tmp"
+    try:
+        shutil.copyfile(origem, temporario)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _mover_para(origem: str, destino: str) -> List[str]:
+    """Move os arquivos de 'origem' para 'destino' (mantendo subpastas), apaga 'origem' e retorna os caminhos finais."""
+    movidos = []
+    for raiz, _pastas, arquivos in os.walk(origem):
+        for nome in arquivos:
+            de = os.path.join(raiz, nome)
+            para = os.path.join(destino, os.path.relpath(de, origem))
+            os.makedirs(os.path.dirname(para), exist_ok=True)
+            os.replace(de, para)
+            movidos.append(para)
+    shutil.rmtree(origem, ignore_errors=True)
+    return movidos
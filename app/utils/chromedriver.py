@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+from .logger import logger
+from .pastas import pasta_dados
+
+'''
+==================================================================================================================================
+Resolução do binário do ChromeDriver UMA VEZ por processo.
+
+Antes, criar_driver(...) chamava ChromeDriverManager().install() a cada navegador criado (checagem de versão, varredura de
+pastas e, às vezes, consultas de rede - que travam atrás do proxy das estações da PBH).
+Agora o caminho é resolvido uma única vez e guardado em memória e em disco (chromedriver.json), indexado pela versão
+principal do Chrome instalado. Depois da primeira resolução bem sucedida tudo funciona offline.
+
+Ordem de resolução:
+    1. Caminho configurado na variável de ambiente AUTOTRI_CHROMEDRIVER;
+    2. Cache em disco para a versão principal do Chrome instalado;
+    3. webdriver-manager (com tempo limite, para não travar atrás do proxy);
+    4. None -> o Service() do Selenium usa o Selenium Manager (embutido no Selenium 4.6+).
+==================================================================================================================================
+'''
+
+VARIAVEL_CAMINHO = "AUTOTRI_CHROMEDRIVER"   # Caminho fixo para o chromedriver (estações sem acesso à internet)
+TIMEOUT_WEBDRIVER_MANAGER = 60              # Segundos máximos esperando o webdriver-manager
+
+_lock = threading.Lock()
+_resolvido = False                  # A resolução já rodou neste processo?
+_caminho: Optional[str] = None      # Resultado da resolução (None = Selenium Manager)
+
+
+def versao_chrome() -> Optional[str]:
+    """
+    Descobre a versão do Google Chrome instalado sem abrir o navegador.
+
+    :return: A versão completa (ex: "131.0.6778.86") ou None se não foi possível descobrir.
+    """
+    if sys.platform.startswith("win"):
+        try:
+            import winreg
+
+            for raiz in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+                try:
+                    with winreg.OpenKey(raiz, r"Software\Google\Chrome\BLBeacon") as chave:
+                        return winreg.QueryValueEx(chave, "version")[0]
+                except OSError:
+                    continue
+        except Exception as e:
+            logger.debug(f"Não foi possível ler a versão do Chrome no registro: {e}")
+        return None
+
+    for executavel in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        try:
+            saida = subprocess.run(
+                [executavel, "--version"], capture_output=True, text=True, timeout=5
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        encontrado = re.search(r"(\d+\.\d+\.\d+\.\d+)", saida)
+        if encontrado:
+            return encontrado.group(1)
+    return None
+
+
+def _ler_cache(arquivo) -> dict:
+    try:
+        with open(arquivo, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_cache(arquivo, cache: dict) -> None:
+    try:
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache do ChromeDriver: {e}")
+
+
+def _instalar_via_webdriver_manager() -> Optional[str]:
+    """Roda o ChromeDriverManager().install() numa thread com tempo limite (pode travar atrás do proxy)."""
+    resultado = {}
+
+    def instalar():
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            resultado["caminho"] = ChromeDriverManager().install()
+        except Exception as e:
+            resultado["erro"] = e
+
+    thread = threading.Thread(target=instalar, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT_WEBDRIVER_MANAGER)
+
+    if thread.is_alive():
+        logger.warning(f"webdriver-manager não respondeu em {TIMEOUT_WEBDRIVER_MANAGER}s (proxy/rede?).")
+        return None
+    if "erro" in resultado:
+        logger.warning(f"webdriver-manager falhou: {resultado['erro']}")
+        return None
+    return resultado.get("caminho")
+
+
+def resolver_chromedriver() -> Optional[str]:
+    """
+    Resolve (uma única vez por processo) o caminho do ChromeDriver.
+    Chamadas seguintes devolvem o resultado em memória. Thread-safe.
+
+    :return: Caminho do executável do ChromeDriver, ou None para deixar o Selenium Manager resolver.
+    """
+    global _resolvido, _caminho
+
+    with _lock:
+        if _resolvido:
+            return _caminho
+
+        _caminho = _resolver()
+        _resolvido = True
+        return _caminho
+
+
+def _resolver() -> Optional[str]:
+    # 1. Caminho configurado
+    configurado = os.environ.get(VARIAVEL_CAMINHO)
+    if configurado:
+        if os.path.isfile(configurado):
+            logger.info(f"ChromeDriver configurado em {VARIAVEL_CAMINHO}: {configurado}")
+            return configurado
+        logger.warning(f"{VARIAVEL_CAMINHO} aponta para um arquivo inexistente: {configurado}")
+
+    # 2. Cache em disco, indexado pela versão principal do Chrome (o ChromeDriver é compatível dentro da mesma versão principal)
+    versao = versao_chrome()
+    versao_principal = versao.split(".")[0] if versao else None
+    arquivo_cache = pasta_dados("chromedriver") / "chromedriver.json"
+    cache = _ler_cache(arquivo_cache)
+
+    if versao_principal and os.path.isfile(cache.get(versao_principal, "")):
+        logger.info(f"ChromeDriver do cache para o Chrome {versao_principal}: {cache[versao_principal]}")
+        return cache[versao_principal]
+
+    # 3. webdriver-manager (rede). Se funcionar, grava no cache para as próximas execuções rodarem offline.
+    caminho = _instalar_via_webdriver_manager()
+    if caminho:
+        logger.info(f"ChromeDriver resolvido pelo webdriver-manager: {caminho}")
+        if versao_principal:
+            cache[versao_principal] = caminho
+            _gravar_cache(arquivo_cache, cache)
+        return caminho
+
+    # 4. Selenium Manager
+    logger.warning("ChromeDriver não resolvido localmente. Usando o Selenium Manager.")
+    return None
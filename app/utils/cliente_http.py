@@ -0,0 +1,246 @@
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional, Union
+from urllib.parse import unquote, urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .logger import logger
+
+'''
+==================================================================================================================================
+Downloads por HTTP direto, reaproveitando a sessão (cookies) do navegador autenticado.
+
+Clicar num link, esperar a janela/aba abrir, acompanhar o download no Chrome e fechar a janela custa segundos por arquivo -
+e os arquivos baixam um de cada vez. Num IC com 20+ anexos no SIATU eram minutos para o que são GETs independentes.
+
+Modo híbrido: o navegador continua fazendo o login e descobrindo os links (descobrir_urls(...) lê o href ou, nos anexos
+do SIATU, a URL do exibeDocumento('...') do onclick - sem executá-lo nem abrir janela nenhuma).
+Os arquivos são baixados por um cliente HTTP (requests) com os cookies do navegador (sessao_http(...)), com pool de
+conexões, vários ao mesmo tempo (baixar_em_paralelo(...)) ou em segundo plano enquanto o bot segue navegando
+(baixar_em_segundo_plano(...)), e gravação em streaming:
+
+    - o arquivo é gravado em pedaços num temporário (.part, ignorado pelas esperas de download) e só é renomeado para o
+      nome final (os.replace, atômico) depois de completo;
+    - o tamanho recebido é conferido com o Content-Length;
+    - resposta HTML no lugar do arquivo (sessão expirada, página de erro) conta como falha.
+
+Qualquer falha (URL não descoberta, erro HTTP, HTML, tamanho errado) levanta ErroDownloadHttp: o bot cai no caminho antigo
+(clique pelo navegador) só para aquele arquivo. O modo híbrido pode ser desligado com AUTOTRI_HTTP_DIRETO=0.
+==================================================================================================================================
+'''
+
+VARIAVEL_HTTP_DIRETO = "AUTOTRI_HTTP_DIRETO"
+TAMANHO_PEDACO = 256 * 1024     # Bytes gravados por vez no streaming
+MAX_DOWNLOADS_PARALELOS = 6     # Downloads simultâneos por sessão HTTP (e tamanho do pool de conexões)
+TEMPO_CONEXAO = 10              # Segundos para conectar ao servidor
+TEMPO_LEITURA = 120             # Segundos sem receber nenhum byte até desistir do download
+
+# Atributos crus (href/onclick) de cada link e a base da página: a URL é montada em Python (_url_do_link), sem executar nada
+JS_ATRIBUTOS_LINKS = """
+return [document.baseURI, arguments[0].map(function (link) {
+    return [link.getAttribute('href'), link.getAttribute('onclick')];
+})];
+"""
+
+# onclick dos anexos do SIATU: exibeDocumento('<URL do documento>') - opcionalmente com 'javascript:' e/ou '; return false;'.
+# Só essa forma é reconhecida: qualquer outra (argumentos a mais, expressão, outra função) dá None e o link é clicado.
+PADRAO_EXIBE_DOCUMENTO = re.compile(
+    r"""^\s*(?:javascript:\s*)?(?:return\s+)?exibeDocumento\(\s*(?P<aspas>['"])(?P<url>[^'"\\]+)(?P=aspas)\s*\)"""
+    r"""\s*;?\s*(?:return\s+false\s*;?\s*)?$"""
+)
+PADRAO_HREF_SEM_URL = re.compile(r"^\s*(?:#|javascript:)", re.IGNORECASE)
+
+
+class ErroDownloadHttp(Exception):
+    """O download por HTTP direto falhou - quem chamou deve cair no caminho pelo navegador."""
+
+
+def http_direto_habilitado() -> bool:
+    """Modo híbrido (downloads por HTTP direto): ligado por padrão; AUTOTRI_HTTP_DIRETO=0 o desliga."""
+    return os.environ.get(VARIAVEL_HTTP_DIRETO, "1") not in ("0", "")
+
+
+def _url_do_link(href: Optional[str], onclick: Optional[str], base: str) -> Optional[str]:
+    """URL absoluta que o link abriria: o href comum ou a URL do exibeDocumento('...') do SIATU; None em qualquer outro caso."""
+    if href and not onclick and not PADRAO_HREF_SEM_URL.match(href):
+        url = urljoin(base, href.strip())
+    else:
+        m = PADRAO_EXIBE_DOCUMENTO.match(onclick or href or "")
+        if not m:
+            return None
+        url = urljoin(base, m.group("url").strip())
+    return url if url.lower().startswith(("http://", "https://")) else None
+
+
+def descobrir_urls(driver, elementos: list) -> List[Optional[str]]:
+    """
+    URL absoluta que cada link abriria (na mesma ordem), ou None para os links cuja URL não pôde ser descoberta.
+    Não executa o onclick dos links: não navega, não abre janelas nem altera a página.
+    """
+    if not elementos:
+        return []
+    try:
+        base, atributos = driver.execute_script(JS_ATRIBUTOS_LINKS, elementos)
+    except Exception as e:
+        logger.warning(f"Não foi possível descobrir as URLs dos links: {e}")
+        return [None] * len(elementos)
+    return [_url_do_link(href, onclick, base) for href, onclick in atributos]
+
+
+def sessao_http(driver, max_conexoes: int = MAX_DOWNLOADS_PARALELOS) -> requests.Session:
+    """
+    Sessão HTTP (requests) com os cookies, o User-Agent e o Referer do navegador: as requisições saem autenticadas
+    como se fossem do próprio navegador.
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+
+    try:
+        # Todos os cookies do navegador (inclusive os de outros domínios, como o do SSO); o get_cookies() só traz os da página
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    except Exception:
+        cookies = driver.get_cookies()
+    for cookie in cookies:
+        sessao.cookies.set(
+            cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+        )
+
+    try:
+        sessao.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+        sessao.headers["Referer"] = driver.current_url
+    except Exception:
+        pass
+    return sessao
+
+
+def _nome_do_servidor(resposta: requests.Response) -> Optional[str]:
+    """Nome do arquivo sugerido no Content-Disposition (filename* tem prioridade), ou None."""
+    disposicao = resposta.headers.get("Content-Disposition", "")
+    estendido = re.search(r"filename\*\s*=\s*[^']*'[^']*'([^;]+)", disposicao, re.IGNORECASE)
+    if estendido:
+        return unquote(estendido.group(1).strip().strip('"'))
+    simples = re.search(r'filename\s*=\s*"([^"]+)"|filename\s*=\s*([^;]+)', disposicao, re.IGNORECASE)
+    if not simples:
+        return None
+    nome = (simples.group(1) or simples.group(2)).strip()
+    try:
+        return nome.encode("latin-1").decode("utf-8")   # Servidores que mandam UTF-8 cru no cabeçalho
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return nome
+
+
+def _nome_seguro(nome: str) -> str:
+    """Remove caracteres inválidos em nomes de arquivos no Windows (e qualquer caminho embutido no nome)."""
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", os.path.basename(nome.replace("\\", "/"))).strip() or "arquivo"
+
+
+_lock_nomes = threading.Lock()
+
+
+def _reservar_caminho(pasta: str, nome: str) -> str:
+    """Caminho livre para o arquivo: como o Chrome, acrescenta " (1)", " (2)"... se o nome já existe na pasta."""
+    base, extensao = os.path.splitext(nome)
+    with _lock_nomes:
+        caminho, n = os.path.join(pasta, nome), 0
+        while os.path.exists(caminho) or os.path.exists(caminho + ".part"):
+            n += 1
+            caminho = os.path.join(pasta, f"{base} ({n}){extensao}")
+        open(caminho + ".part", "wb").close()   # Reserva o nome enquanto o download corre
+    return caminho
+
+
+def baixar(sessao: requests.Session, url: str, pasta: str, nome_padrao: Optional[str] = None) -> str:
+    """
+    Baixa um arquivo em streaming para a pasta: temporário .part, conferência do Content-Length e renomeação atômica.
+
+    :param sessao: Sessão de sessao_http(...).
+    :param url: URL do arquivo.
+    :param pasta: Pasta de destino.
+    :param nome_padrao: [OPCIONAL] Nome do arquivo se o servidor não sugerir um (padrão: o fim da URL).
+    :return: O caminho final do arquivo.
+    :raises ErroDownloadHttp: Em qualquer falha (o temporário é apagado).
+    """
+    temporario = None
+    try:
+        with sessao.get(url, stream=True, timeout=(TEMPO_CONEXAO, TEMPO_LEITURA)) as resposta:
+            resposta.raise_for_status()
+            if "text/html" in resposta.headers.get("Content-Type", "").lower():
+                raise ErroDownloadHttp(f"o servidor devolveu uma página HTML no lugar do arquivo ({url})")
+
+            nome = _nome_do_servidor(resposta) or nome_padrao or unquote(os.path.basename(urlsplit(url).path))
+            caminho = _reservar_caminho(pasta, _nome_seguro(nome))
+            temporario = caminho + ".part"
+
+            recebidos = 0
+            with open(temporario, "wb") as arquivo:
+                for pedaco in resposta.iter_content(chunk_size=TAMANHO_PEDACO):
+                    arquivo.write(pedaco)
+                    recebidos += len(pedaco)
+
+            esperado = resposta.headers.get("Content-Length")
+            # Com Content-Encoding (gzip) o Content-Length é do corpo comprimido: não dá para comparar
+            if esperado and not resposta.headers.get("Content-Encoding") and int(esperado) != recebidos:
+                raise ErroDownloadHttp(f"download incompleto: {recebidos} de {esperado} bytes ({nome})")
+            if recebidos == 0:
+                raise ErroDownloadHttp(f"arquivo vazio ({nome})")
+
+        os.replace(temporario, caminho)
+        return caminho
+    except ErroDownloadHttp:
+        raise
+    except (requests.RequestException, OSError, ValueError) as e:
+        raise ErroDownloadHttp(f"{e}") from e
+    finally:
+        if temporario and os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def baixar_em_paralelo(
+    sessao: requests.Session,
+    pedidos: Dict[Hashable, tuple],
+    max_paralelos: int = MAX_DOWNLOADS_PARALELOS,
+) -> Dict[Hashable, Union[str, ErroDownloadHttp]]:
+    """
+    Baixa vários arquivos ao mesmo tempo pela mesma sessão.
+
+    :param pedidos: chave -> (url, pasta, nome_padrao).
+    :return: chave -> caminho do arquivo baixado ou o ErroDownloadHttp daquele arquivo (um erro não interrompe os demais).
+    """
+    if not pedidos:
+        return {}
+    resultados: Dict[Hashable, Union[str, ErroDownloadHttp]] = {}
+    with ThreadPoolExecutor(max_workers=min(max_paralelos, len(pedidos)), thread_name_prefix="download_http") as executor:
+        futuros = {chave: executor.submit(baixar, sessao, *pedido) for chave, pedido in pedidos.items()}
+        for chave, futuro in futuros.items():
+            try:
+                resultados[chave] = futuro.result()
+            except ErroDownloadHttp as e:
+                resultados[chave] = e
+    return resultados
+
+
+_executor_segundo_plano: Optional[ThreadPoolExecutor] = None
+_lock_executor = threading.Lock()
+
+
+def baixar_em_segundo_plano(
+    sessao: requests.Session, url: str, pasta: str, nome_padrao: Optional[str] = None
+) -> Future:
+    """
+    Inicia baixar(...) numa thread de fundo e retorna na hora: o bot segue navegando enquanto o arquivo baixa.
+
+    :return: Future com o caminho do arquivo (future.result() levanta ErroDownloadHttp se o download falhou).
+    """
+    global _executor_segundo_plano
+    with _lock_executor:
+        if _executor_segundo_plano is None:
+            _executor_segundo_plano = ThreadPoolExecutor(
+                max_workers=MAX_DOWNLOADS_PARALELOS, thread_name_prefix="download_http_fundo"
+            )
+    return _executor_segundo_plano.submit(baixar, sessao, url, pasta, nome_padrao)
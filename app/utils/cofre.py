@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .logger import logger
+from .pastas import PASTA_DADOS, pasta_dados
+
+'''
+==================================================================================================================================
+Cofre de sessões autenticadas (cookies + localStorage) por sistema e usuário.
+
+Depois de um login bem sucedido o estado da sessão do navegador é capturado e guardado CRIPTOGRAFADO em disco.
+Num navegador novo (outro driver, ou outra execução do AutoTri) o estado é reinjetado via DevTools, a sessão é validada
+com uma checagem barata do próprio bot e o formulário de login só é preenchido se a sessão tiver expirado.
+
+Criptografia em repouso (são credenciais municipais):
+    - Windows: DPAPI (CryptProtectData) - a chave é a do usuário logado no Windows, nada é guardado em arquivo;
+    - Outros SOs: Fernet (pacote 'cryptography') com a chave da variável de ambiente AUTOTRI_COFRE_CHAVE ou, sem ela,
+      de um arquivo acessível apenas ao usuário na pasta de configuração dele (~/.config/autotri) - NUNCA ao lado das
+      sessões cifradas: a pasta .autotri acompanha o projeto/executável e quem a copiasse levaria a chave junto;
+    - Sem nenhum dos dois: o cofre funciona apenas em memória (nada é gravado em disco).
+==================================================================================================================================
+'''
+
+VALIDADE_COFRE = 8 * 60 * 60    # Segundos que uma sessão guardada é considerada reaproveitável (depois disso nem tenta)
+VARIAVEL_CHAVE = "AUTOTRI_COFRE_CHAVE"  # Chave Fernet (urlsafe base64) fornecida pelo ambiente, sem arquivo de chave
+
+
+# ------------------------------------------------------------------------------------------- criptografia
+class _CifraDPAPI:
+    """Criptografia via DPAPI do Windows (chave atrelada ao usuário do Windows)."""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class DATA_BLOB(ctypes.Structure):
+            _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+        self._ctypes = ctypes
+        self._blob = DATA_BLOB
+        self._crypt32 = ctypes.windll.crypt32
+        self._kernel32 = ctypes.windll.kernel32
+
+    def _executar(self, dados: bytes, proteger: bool) -> bytes:
+        ctypes = self._ctypes
+        buffer = ctypes.create_string_buffer(dados, len(dados))
+        entrada = self._blob(len(dados), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+        saida = self._blob()
+        SEM_INTERFACE = 0x1     # CRYPTPROTECT_UI_FORBIDDEN
+
+        if proteger:
+            ok = self._crypt32.CryptProtectData(
+                ctypes.byref(entrada), ctypes.c_wchar_p("AutoTri"), None, None, None, SEM_INTERFACE, ctypes.byref(saida)
+            )
+        else:
+            ok = self._crypt32.CryptUnprotectData(
+                ctypes.byref(entrada), None, None, None, None, SEM_INTERFACE, ctypes.byref(saida)
+            )
+        if not ok:
+            raise ctypes.WinError()
+        try:
+            return ctypes.string_at(saida.pbData, saida.cbData)
+        finally:
+            self._kernel32.LocalFree(saida.pbData)
+
+    def cifrar(self, dados: bytes) -> bytes:
+        return self._executar(dados, proteger=True)
+
+    def decifrar(self, dados: bytes) -> bytes:
+        return self._executar(dados, proteger=False)
+
+
+def _arquivo_chave() -> Path:
+    """Arquivo da chave Fernet, na pasta de configuração do usuário (fora da pasta de dados com as sessões cifradas)."""
+    pasta = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config") / "autotri"
+    pasta.mkdir(mode=0o700, parents=True, exist_ok=True)
+    arquivo = pasta / "cofre.key"
+    antigo = PASTA_DADOS / "cofre" / "chave.key"   # Versões anteriores guardavam a chave junto das sessões
+    if antigo.exists() and not arquivo.exists():
+        shutil.move(str(antigo), str(arquivo))
+        os.chmod(arquivo, 0o600)
+    return arquivo
+
+
+class _CifraFernet:
+    """Criptografia via Fernet (pacote 'cryptography') com a chave do ambiente ou de um arquivo legível apenas pelo usuário."""
+
+    def __init__(self):
+        from cryptography.fernet import Fernet
+
+        chave = os.environ.get(VARIAVEL_CHAVE, "").strip()
+        if not chave:
+            arquivo_chave = _arquivo_chave()
+            if not arquivo_chave.exists():
+                descritor = os.open(arquivo_chave, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(descritor, "wb") as f:
+                    f.write(Fernet.generate_key())
+            chave = arquivo_chave.read_bytes()
+        self._fernet = Fernet(chave)
+
+    def cifrar(self, dados: bytes) -> bytes:
+        return self._fernet.encrypt(dados)
+
+    def decifrar(self, dados: bytes) -> bytes:
+        return self._fernet.decrypt(dados)
+
+
+def _criar_cifra():
+    """Escolhe a criptografia disponível no SO. Retorna None se nenhuma estiver disponível."""
+    try:
+        if sys.platform.startswith("win"):
+            return _CifraDPAPI()
+        return _CifraFernet()
+    except Exception as e:
+        logger.warning(f"Cofre de sessões sem criptografia disponível ({e}). Sessões ficarão apenas em memória.")
+        return None
+
+
+# ------------------------------------------------------------------------------------------- cofre
+class CofreSessoes:
+    """
+    Guarda e restaura o estado autenticado (cookies e localStorage) dos navegadores, por sistema e usuário.
+    """
+
+    def __init__(self):
+        self._memoria: Dict[str, dict] = {}     # chave -> estado (cache em memória das sessões desta execução)
+        self._cifra = None
+        self._cifra_carregada = False
+        self._lock = threading.Lock()
+
+    def _chave(self, sistema: str, usuario: str) -> str:
+        # O nome do arquivo não expõe o usuário
+        return hashlib.sha256(f"{sistema}|{usuario}".encode("utf-8")).hexdigest()[:32]
+
+    def _arquivo(self, chave: str):
+        return pasta_dados("cofre") / f"{chave}.sessao"
+
+    def _obter_cifra(self):
+        if not self._cifra_carregada:
+            self._cifra = _criar_cifra()
+            self._cifra_carregada = True
+        return self._cifra
+
+    # ---------------------------------------------------------------- captura / restauração
+    def capturar(self, driver, sistema: str, usuario: str) -> bool:
+        """
+        Captura cookies (de todos os domínios, inclusive do SSO) e o localStorage da origem atual e os guarda no cofre.
+
+        :return: True se o estado foi guardado.
+        """
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            origem = driver.execute_script("return window.location.origin;")
+            local_storage = driver.execute_script(
+                "var d = {}; for (var i = 0; i < localStorage.length; i++) {"
+                " var k = localStorage.key(i); d[k] = localStorage.getItem(k); } return d;"
+            ) or {}
+        except Exception as e:
+            logger.warning(f"Não foi possível capturar a sessão {sistema} para o cofre: {e}")
+            return False
+
+        if not cookies:
+            return False
+
+        estado = {
+            "capturado_em": time.time(),
+            "cookies": cookies,
+            "local_storage": {origem: local_storage} if origem and origem.startswith("http") else {},
+        }
+        chave = self._chave(sistema, usuario)
+        with self._lock:
+            self._memoria[chave] = estado
+            cifra = self._obter_cifra()
+            if cifra:
+                try:
+                    dados = cifra.cifrar(json.dumps(estado).encode("utf-8"))
+                    temporario = self._arquivo(chave).with_suffix(".tmp")
+                    with open(temporario, "wb") as f:
+                        f.write(dados)
+                    os.replace(temporario, self._arquivo(chave))
+                except Exception as e:
+                    logger.warning(f"Não foi possível gravar a sessão {sistema} no cofre: {e}")
+        logger.debug(f"Sessão {sistema} guardada no cofre ({len(cookies)} cookies).")
+        return True
+
+    def _carregar(self, sistema: str, usuario: str) -> Optional[dict]:
+        """Lê o estado do cofre (memória primeiro, depois disco). Descarta estados vencidos ou corrompidos."""
+        chave = self._chave(sistema, usuario)
+        with self._lock:
+            estado = self._memoria.get(chave)
+            if estado is None:
+                arquivo = self._arquivo(chave)
+                cifra = self._obter_cifra()
+                if cifra and arquivo.exists():
+                    try:
+                        estado = json.loads(cifra.decifrar(arquivo.read_bytes()).decode("utf-8"))
+                        self._memoria[chave] = estado
+                    except Exception as e:
+                        logger.warning(f"Sessão {sistema} do cofre ilegível, descartando: {e}")
+                        arquivo.unlink(missing_ok=True)
+                        return None
+
+        if estado and time.time() - estado.get("capturado_em", 0) > VALIDADE_COFRE:
+            self.descartar(sistema, usuario)
+            return None
+        return estado
+
+    def restaurar(self, driver, sistema: str, usuario: str) -> bool:
+        """
+        Reinjeta no driver os cookies e o localStorage guardados. Não navega - quem chama deve (re)abrir a página depois.
+
+        :return: True se havia uma sessão guardada e ela foi injetada.
+        """
+        estado = self._carregar(sistema, usuario)
+        if not estado:
+            return False
+
+        try:
+            # Apenas os campos aceitos pelo Network.setCookies (o getAllCookies devolve campos extras)
+            campos = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+            cookies = [
+                {k: c[k] for k in campos if k in c and not (k == "expires" and c[k] in (-1, 0))}
+                for c in estado["cookies"]
+            ]
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+            if estado.get("local_storage"):
+                driver.execute_cdp_cmd("DOMStorage.enable", {})
+                for origem, itens in estado["local_storage"].items():
+                    for nome, valor in itens.items():
+                        driver.execute_cdp_cmd(
+                            "DOMStorage.setDOMStorageItem",
+                            {"storageId": {"securityOrigin": origem, "isLocalStorage": True}, "key": nome, "value": valor},
+                        )
+            logger.info(f"Sessão {sistema} restaurada do cofre.")
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao restaurar a sessão {sistema} do cofre: {e}")
+            return False
+
+    def descartar(self, sistema: str, usuario: str) -> None:
+        """Remove a sessão guardada (memória e disco)."""
+        chave = self._chave(sistema, usuario)
+        with self._lock:
+            self._memoria.pop(chave, None)
+            self._arquivo(chave).unlink(missing_ok=True)
+
+    def reaproveitar(
+        self, driver, sistema: str, usuario: str, validar: Callable[[], bool], reabrir: Callable[[], bool]
+    ) -> bool:
+        """
+        Tenta autenticar o driver sem login: restaura a sessão guardada e a valida com a checagem barata do bot.
+        Se a sessão não for mais válida ela é descartada do cofre, os cookies velhos são apagados do driver
+        e a página inicial do sistema é reaberta (pronta para o login completo).
+
+        :param validar: Checagem do bot (reabre a página do sistema e confere se está logado).
+        :param reabrir: Método que reabre a página inicial do sistema (bot.acessar).
+        :return: True se o driver ficou autenticado com a sessão do cofre.
+        """
+        if not self.restaurar(driver, sistema, usuario):
+            return False
+        try:
+            if validar():
+                logger.info(f"Sessão {sistema} do cofre válida - login dispensado.")
+                return True
+        except Exception as e:
+            logger.warning(f"Erro ao validar a sessão {sistema} do cofre: {e}")
+        logger.info(f"Sessão {sistema} do cofre expirada, será feito login completo.")
+        self.descartar(sistema, usuario)
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            pass
+        reabrir()
+        return False
+
+
+# Instância única do cofre usada por toda a aplicação
+cofre_sessoes = CofreSessoes()
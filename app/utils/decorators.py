@@ -1,9 +1,70 @@
+import random
 import time
+import threading
 from functools import wraps
+from typing import Any, Callable, Dict, Optional, Set
 from .logger import logger
+from .disjuntor import disjuntores, SistemaIndisponivel
 
+ESPERA_MAXIMA = 60.0    # Teto (segundos) da espera entre tentativas com backoff exponencial
 
-def retry(max_retries=3, delay=5, exceptions=(Exception,)):
+
+def espera_com_jitter(delay: float, tentativa: int, backoff: float = 2.0, jitter: float = 0.5) -> float:
+    """
+    Espera antes da tentativa seguinte: delay × backoff^(tentativa-1), limitada a ESPERA_MAXIMA, menos um sorteio
+    de até 'jitter' (fração) - assim vários workers que falharam juntos não voltam todos no mesmo segundo.
+    """
+    base = min(ESPERA_MAXIMA, delay * backoff ** (tentativa - 1))
+    return base * (1 - jitter * random.random())
+
+
+def _tentar(nome: str, func: Callable[[], Any], max_retries: int, delay: float, exceptions: tuple,
+            antes_de_repetir: Optional[Callable[[], None]] = None, backoff: float = 1.0, jitter: float = 0.0,
+            sistema: Optional[str] = None) -> Any:
+    """
+    Laço de tentativas compartilhado por @retry e Passos: chama func() até dar certo ou esgotar as tentativas.
+
+    :param antes_de_repetir: [OPCIONAL] Chamado antes de cada nova tentativa (ex: devolver o navegador a um estado conhecido).
+    :param backoff: Multiplicador da espera a cada tentativa (1 = espera fixa).
+    :param jitter: Fração sorteada a menos na espera (0 = sem sorteio).
+    :param sistema: [OPCIONAL] Sistema externo usado por func: respeita o disjuntor (utils/disjuntor.py) antes de cada
+                    tentativa e registra o sucesso / a falha definitiva.
+    """
+    for attempt in range(1, max_retries + 1):
+        disjuntores.permitir(sistema)   # Disjuntor aberto: SistemaIndisponivel na hora, sem gastar as tentativas
+        try:
+            resultado = func()
+            disjuntores.registrar_sucesso(sistema)
+            return resultado
+        except SistemaIndisponivel:
+            raise
+        except exceptions as e:
+            logger.error(
+                "Erro na execução de %s (tentativa %d/%d): %s",
+                nome,
+                attempt,
+                max_retries,
+                e,
+            )
+            if attempt < max_retries:
+                espera = espera_com_jitter(delay, attempt, backoff, jitter)
+                logger.info(
+                    f"Aguardando {espera:.1f}s antes da próxima tentativa..."
+                )
+                time.sleep(espera)
+                if antes_de_repetir is not None:
+                    antes_de_repetir()
+            else:
+                logger.error(
+                    "Falha definitiva em %s após %d tentativas",
+                    nome,
+                    max_retries,
+                )
+                disjuntores.registrar_falha(sistema, e)
+                raise
+
+
+def retry(max_retries=3, delay=5, exceptions=(Exception,), backoff=2.0, jitter=0.5, sistema=None):
     """
     Decorador para repetir a execução de uma função em caso de erro.
     Nesse contexto, não é necessário refresh do Selenium, porque
@@ -11,37 +72,106 @@ def retry(max_retries=3, delay=5, exceptions=(Exception,)):
 
     Args:
         max_retries (int): número máximo de tentativas.
-        delay (int): tempo (segundos) para esperar entre tentativas.
+        delay (int): tempo (segundos) da primeira espera entre tentativas.
         exceptions (tuple): exceções que devem disparar retry.
+        backoff (float): multiplicador da espera a cada nova tentativa (backoff exponencial, até ESPERA_MAXIMA).
+        jitter (float): fração da espera sorteada a menos, para as retentativas de vários workers não coincidirem.
+        sistema (str): sistema externo da função - com ele a função respeita o disjuntor do sistema (utils/disjuntor.py).
     """
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            for attempt in range(1, max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    logger.error(
-                        "Erro na execução de %s (tentativa %d/%d): %s",
-                        func.__name__,
-                        attempt,
-                        max_retries,
-                        e,
-                    )
-                    if attempt < max_retries:
-                        logger.info(
-                            f"Aguardando {delay}s antes da próxima tentativa..."
-                        )
-                        time.sleep(delay)
-                    else:
-                        logger.error(
-                            "Falha definitiva em %s após %d tentativas",
-                            func.__name__,
-                            max_retries,
-                        )
-                        raise
+            return _tentar(func.__name__, lambda: func(*args, **kwargs), max_retries, delay, exceptions,
+                           backoff=backoff, jitter=jitter, sistema=sistema)
 
         return wrapper
 
     return decorator
+
+
+class Passos:
+    """
+    Retentativa por passo (login, navegar, planta básica, cada anexo...) com checkpoints.
+
+    O @retry repete a função inteira: no SIATU, uma falha no último anexo reabria o Chrome, refazia o login, regerava
+    todas as Plantas Básicas e clicava de novo em todos os anexos. Com Passos, cada passo é uma unidade retentável:
+
+        passos = Passos(f"SIATU {indice}")
+
+        @retry(max_retries=4, delay=5)           # Último recurso: sessão nova (só roda os passos que faltam)
+        def fluxo():
+            passos.nova_sessao()
+            with driver_context(...) as driver:
+                passos.executar("login", lambda: ..., por_sessao=True)
+                dados = passos.executar("planta_basica", lambda: ..., reparar=lambda: ...)
+
+    - Só o passo que falhou é repetido, na sessão (navegador) viva - 'reparar' devolve a página a um estado conhecido
+      antes da nova tentativa. Se o passo esgota as tentativas, a exceção sobe (e o @retry de fora abre uma sessão nova).
+    - Passos concluídos guardam o resultado (checkpoint) e não rodam de novo - nem numa sessão nova. Passos 'por_sessao'
+      (login, navegação) valem só para a sessão atual: nova_sessao() os descarta.
+
+    Parâmetros:
+        nome (str): Nome do fluxo (aparece no log).
+        max_retries (int): Tentativas de cada passo na mesma sessão.
+        delay (float): Espera (segundos) entre as tentativas de um passo.
+        exceptions (tuple): Exceções que disparam a retentativa do passo.
+    """
+
+    def __init__(self, nome: str, max_retries: int = 2, delay: float = 2, exceptions: tuple = (Exception,),
+                 backoff: float = 2.0, jitter: float = 0.5):
+        self.nome = nome
+        self.max_retries = max_retries
+        self.delay = delay
+        self.exceptions = exceptions
+        self.backoff = backoff
+        self.jitter = jitter
+        self._resultados: Dict[str, Any] = {}
+        self._por_sessao: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def concluido(self, passo: str) -> bool:
+        """True se o passo já tem checkpoint."""
+        with self._lock:
+            return passo in self._resultados
+
+    def resultado(self, passo: str, padrao: Any = None) -> Any:
+        """Resultado guardado do passo (ou 'padrao')."""
+        with self._lock:
+            return self._resultados.get(passo, padrao)
+
+    def executar(self, passo: str, func: Callable[[], Any], por_sessao: bool = False,
+                 reparar: Optional[Callable[[], None]] = None, max_retries: Optional[int] = None) -> Any:
+        """
+        Roda o passo (com retentativas na sessão atual) ou, se já concluído, devolve o resultado guardado.
+
+        :param passo: Nome único do passo no fluxo (ex: "login", "anexo 3: escritura.pdf").
+        :param func: O passo em si.
+        :param por_sessao: O checkpoint vale só até a próxima nova_sessao() (login, navegação, consulta).
+        :param reparar: [OPCIONAL] Chamado antes de cada nova tentativa do passo.
+        :param max_retries: [OPCIONAL] Tentativas deste passo (padrão: as do objeto).
+        """
+        with self._lock:
+            if passo in self._resultados:
+                return self._resultados[passo]
+
+        resultado = _tentar(f"{self.nome} / {passo}", func, max_retries or self.max_retries, self.delay,
+                            self.exceptions, antes_de_repetir=reparar, backoff=self.backoff, jitter=self.jitter)
+        with self._lock:
+            self._resultados[passo] = resultado
+            if por_sessao:
+                self._por_sessao.add(passo)
+        return resultado
+
+    def desfazer(self, passo: str) -> None:
+        """Descarta o checkpoint de um passo (ex: download que começou mas não terminou) - ele roda de novo."""
+        with self._lock:
+            self._resultados.pop(passo, None)
+            self._por_sessao.discard(passo)
+
+    def nova_sessao(self) -> None:
+        """Descarta os checkpoints 'por_sessao' (chamar no início de cada sessão/navegador novo)."""
+        with self._lock:
+            for passo in self._por_sessao:
+                self._resultados.pop(passo, None)
+            self._por_sessao.clear()
@@ -0,0 +1,208 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .logger import logger
+
+'''
+==================================================================================================================================
+Disjuntor (circuit breaker) por sistema externo (SIGEDE, SIATU, URBANO, SISCTM, GOOGLE).
+
+Com o SIATU fora do ar, cada IC ainda gastava 4 tentativas × (abrir o Chrome + timeout do login + espera) antes de
+desistir - e isso para todos os ICs do lote. Agora cada sistema tem um disjuntor:
+
+    - FECHADO:    normal. Cada falha definitiva (tentativas esgotadas, login recusado, exceção) conta uma falha seguida;
+                  um sucesso zera a contagem.
+    - ABERTO:     depois de FALHAS_PARA_ABRIR falhas seguidas o sistema é considerado indisponível por RESFRIAMENTO
+                  segundos: quem tentar usá-lo recebe SistemaIndisponivel na hora, sem abrir navegador. A etapa do IC
+                  é pulada e o relatório registra "<SISTEMA> indisponível".
+    - SEMIABERTO: passado o resfriamento, UMA chamada de teste é liberada. Sucesso fecha o disjuntor; falha o reabre.
+
+Os valores podem ser ajustados pelas variáveis de ambiente AUTOTRI_DISJUNTOR_FALHAS e AUTOTRI_DISJUNTOR_RESFRIAMENTO.
+O estado dos disjuntores abertos aparece no StatusText da interface (ver atualizar_status em app/pipeline/process.py).
+==================================================================================================================================
+'''
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+SEMIABERTO = "semiaberto"
+
+
+def _ler_configuracao(variavel: str, padrao: float) -> float:
+    configurado = os.environ.get(variavel)
+    if configurado:
+        try:
+            return max(1.0, float(configurado))
+        except ValueError:
+            logger.warning(f"{variavel} inválida ({configurado}), usando o padrão ({padrao}).")
+    return padrao
+
+
+FALHAS_PARA_ABRIR = int(_ler_configuracao("AUTOTRI_DISJUNTOR_FALHAS", 3))
+RESFRIAMENTO = _ler_configuracao("AUTOTRI_DISJUNTOR_RESFRIAMENTO", 300.0)     # segundos
+
+
+class SistemaIndisponivel(Exception):
+    """O disjuntor do sistema está aberto: a chamada foi recusada sem tentar o sistema."""
+
+    def __init__(self, sistema: str, restante: float):
+        super().__init__(f"{sistema} indisponível (nova tentativa em {restante:.0f}s)")
+        self.sistema = sistema
+        self.restante = restante
+
+
+class _Disjuntor:
+    """Estado do disjuntor de um sistema."""
+
+    def __init__(self, sistema: str):
+        self.sistema = sistema
+        self.estado: str = FECHADO
+        self.falhas_seguidas: int = 0
+        self.aberto_ate: float = 0.0                # time.monotonic() em que o resfriamento termina
+        self.teste: Optional[int] = None            # Thread da chamada de teste (SEMIABERTO)
+        self.aberturas: int = 0
+        self.recusadas: int = 0
+
+
+class Guarda:
+    """Devolvida por DisjuntoresSistemas.protegido(...): permite marcar como falha um resultado que não é exceção."""
+
+    def __init__(self):
+        self.motivo: Optional[str] = None
+
+    def falhou(self, motivo: str) -> None:
+        self.motivo = motivo
+
+
+class DisjuntoresSistemas:
+    """Disjuntores de todos os sistemas. Existe uma única instância (disjuntores)."""
+
+    def __init__(self, falhas_para_abrir: int = FALHAS_PARA_ABRIR, resfriamento: float = RESFRIAMENTO):
+        self.falhas_para_abrir = max(1, falhas_para_abrir)
+        self.resfriamento = resfriamento
+        self._disjuntores: Dict[str, _Disjuntor] = {}
+        self._lock = threading.Lock()
+
+    def _de(self, sistema: str) -> _Disjuntor:
+        if sistema not in self._disjuntores:
+            self._disjuntores[sistema] = _Disjuntor(sistema)
+        return self._disjuntores[sistema]
+
+    def permitir(self, sistema: Optional[str]) -> None:
+        """Lança SistemaIndisponivel se o disjuntor do sistema está aberto (chamar antes de usar o sistema)."""
+        if not sistema:
+            return
+        with self._lock:
+            d = self._de(sistema)
+            if d.estado == FECHADO:
+                return
+            agora = time.monotonic()
+            thread = threading.get_ident()
+            if d.estado == ABERTO and agora >= d.aberto_ate:
+                d.estado = SEMIABERTO
+                d.teste = thread
+                logger.info(f"{sistema}: resfriamento encerrado, liberando uma chamada de teste.")
+                return
+            if d.estado == SEMIABERTO and d.teste == thread:
+                return      # Novas tentativas da própria chamada de teste
+            d.recusadas += 1
+            raise SistemaIndisponivel(sistema, max(0.0, d.aberto_ate - agora))
+
+    def registrar_sucesso(self, sistema: Optional[str]) -> None:
+        if not sistema:
+            return
+        with self._lock:
+            d = self._de(sistema)
+            if d.estado != FECHADO:
+                logger.info(f"{sistema}: chamada de teste bem sucedida, sistema disponível novamente.")
+            d.estado = FECHADO
+            d.falhas_seguidas = 0
+            d.teste = None
+
+    def registrar_falha(self, sistema: Optional[str], motivo: object = None) -> None:
+        if not sistema:
+            return
+        with self._lock:
+            d = self._de(sistema)
+            d.falhas_seguidas += 1
+            if d.estado == SEMIABERTO or (d.estado == FECHADO and d.falhas_seguidas >= self.falhas_para_abrir):
+                d.estado = ABERTO
+                d.aberto_ate = time.monotonic() + self.resfriamento
+                d.teste = None
+                d.aberturas += 1
+                logger.error(f"{sistema} INDISPONÍVEL após {d.falhas_seguidas} falhas seguidas ({motivo}). "
+                             f"Os próximos ICs pulam o sistema por {math.ceil(self.resfriamento / 60)} min.")
+
+    def abrir(self, sistema: str, motivo: object = None) -> None:
+        """Abre o disjuntor na hora, sem esperar FALHAS_PARA_ABRIR falhas (ex: sistema fora do ar na verificação inicial)."""
+        with self._lock:
+            d = self._de(sistema)
+            d.estado = ABERTO
+            d.falhas_seguidas = max(d.falhas_seguidas, self.falhas_para_abrir)
+            d.aberto_ate = time.monotonic() + self.resfriamento
+            d.teste = None
+            d.aberturas += 1
+        logger.error(f"{sistema} INDISPONÍVEL ({motivo}). "
+                     f"Os ICs pulam o sistema por {math.ceil(self.resfriamento / 60)} min.")
+
+    @contextmanager
+    def protegido(self, sistema: Optional[str]):
+        """
+        Bloco que usa o sistema: recusa na entrada se o disjuntor está aberto; registra falha se o bloco lança exceção
+        ou chama guarda.falhou(...), e sucesso caso contrário.
+        """
+        self.permitir(sistema)
+        guarda = Guarda()
+        try:
+            yield guarda
+        except SistemaIndisponivel:
+            raise
+        except Exception as e:
+            self.registrar_falha(sistema, e)
+            raise
+        if guarda.motivo:
+            self.registrar_falha(sistema, guarda.motivo)
+        else:
+            self.registrar_sucesso(sistema)
+
+    # ------------------------------------------------------------------ consulta
+    def abertos(self) -> List[str]:
+        """Sistemas com o disjuntor aberto ou em teste."""
+        with self._lock:
+            return [s for s, d in self._disjuntores.items() if d.estado != FECHADO]
+
+    def resumo(self) -> str:
+        """Uma linha para o StatusText da interface (vazia se todos os sistemas estão disponíveis)."""
+        partes = []
+        with self._lock:
+            agora = time.monotonic()
+            for sistema, d in self._disjuntores.items():
+                if d.estado == ABERTO:
+                    partes.append(f"{sistema} indisponível ({math.ceil(max(0, d.aberto_ate - agora) / 60)} min)")
+                elif d.estado == SEMIABERTO:
+                    partes.append(f"{sistema} em teste")
+        return ("⚠ " + " | ".join(partes)) if partes else ""
+
+    def indisponibilidades(self) -> List[str]:
+        """Uma linha por sistema que ficou indisponível ao menos uma vez na triagem (aberturas e chamadas puladas)."""
+        with self._lock:
+            return [
+                f"{sistema}: indisponível {d.aberturas} vez(es), {d.recusadas} chamada(s) puladas"
+                for sistema, d in self._disjuntores.items() if d.aberturas
+            ]
+
+    def limpar(self) -> None:
+        """Fecha todos os disjuntores (início de uma nova triagem)."""
+        with self._lock:
+            self._disjuntores.clear()
+
+
+disjuntores = DisjuntoresSistemas()
+
+
+def resumo_disjuntores() -> List[str]:
+    """Linhas legíveis com os sistemas que ficaram indisponíveis na triagem (para o log do fim da triagem)."""
+    return disjuntores.indisponibilidades()
@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from .logger import logger
+from .rede import eventos_devtools
+from .esperas import esperar, arquivos_na_pasta, TEMPORARIOS_DOWNLOAD
+
+'''
+==================================================================================================================================
+Acompanhamento de downloads pelos eventos do navegador (DevTools), sem varrer a pasta do IC.
+
+Antes, SIATU e SIGEDE tinham cada um o seu _esperar_download_concluir(...): listavam a pasta inteira (os.listdir + getsize)
+a cada 200 ms por até 120 s e davam o download por concluído quando QUALQUER arquivo mudava de tamanho - o que podia
+acontecer com o PDF ainda pela metade.
+
+Agora o Chrome avisa: com a pasta definida por definir_pasta_download(...) e o log 'performance' habilitado
+(PerfilDriver(monitorar_downloads=True), ver utils/perfis.py), cada download gera os eventos
+    - downloadWillBegin: guid, url e nome sugerido do arquivo;
+    - downloadProgress:  bytes recebidos/total e estado ('inProgress', 'completed' ou 'canceled').
+O RastreadorDownloads (um por driver, ver rastreador_downloads(driver)) guarda cada download pelo guid, então vários
+podem estar em andamento ao mesmo tempo. Uso nos bots:
+
+    downloads = rastreador_downloads(self.driver)
+    marca = downloads.marcar()                  # ANTES do clique
+    self._click(link)
+    concluidos = downloads.aguardar(marca, "SIGEDE inteiro teor", teto=120)     # Lista de Download concluídos
+    if concluidos:
+        caminho = concluidos[0].caminho
+
+NOTE: Se o driver não tem o log 'performance' ou o Chrome não emite os eventos de download (nenhum evento em
+      ESPERA_EVENTOS segundos), o rastreador cai na verificação da pasta (arquivo novo e completo desde a marca).
+NOTE: O caminho final é pasta + nome sugerido. Se já existir um arquivo com o mesmo nome, o Chrome acrescenta " (1)".
+==================================================================================================================================
+'''
+
+# Estados de um download (Page/Browser.downloadProgress)
+EM_ANDAMENTO = "inProgress"
+CONCLUIDO = "completed"
+CANCELADO = "canceled"
+
+ESPERA_EVENTOS = 10.0   # Segundos sem nenhum evento de download (desde a marca) até cair na verificação da pasta
+
+
+class Download:
+    """
+    Um download do navegador, montado a partir dos eventos DevTools.
+
+    Parâmetros:
+        guid (str): Identificador do download no navegador.
+        url (str): URL de origem.
+        nome (str): Nome do arquivo (nome sugerido pelo servidor).
+        caminho (str): Caminho final do arquivo (pasta de download + nome).
+    """
+
+    def __init__(self, guid: str, url: str, nome: str, caminho: str, sequencia: int = 0):
+        self.guid = guid
+        self.url = url
+        self.nome = nome
+        self.caminho = caminho
+        self.sequencia = sequencia      # Ordem de início no driver (compara com a marca)
+        self.recebidos: int = 0
+        self.total: int = 0
+        self.estado: str = EM_ANDAMENTO
+
+    @property
+    def concluido(self) -> bool:
+        return self.estado == CONCLUIDO
+
+    @property
+    def cancelado(self) -> bool:
+        return self.estado == CANCELADO
+
+    def __repr__(self) -> str:
+        return f"Download({self.nome!r}, estado={self.estado}, {self.recebidos}/{self.total} bytes)"
+
+
+class MarcaDownloads:
+    """Ponto de referência tirado antes do clique: só os downloads iniciados depois dele contam."""
+
+    def __init__(self, sequencia: int, antes: Optional[Set[str]] = None):
+        self.sequencia = sequencia
+        self.antes = antes              # Arquivos da pasta na marca (só quando os eventos ainda não foram confirmados)
+        self.instante = time.monotonic()
+
+
+class RastreadorDownloads:
+    """
+    Downloads de um driver, pelos eventos downloadWillBegin / downloadProgress do log 'performance'.
+    Existe um único rastreador por driver (ver rastreador_downloads(driver)).
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.eventos = eventos_devtools(driver)
+        self.pasta: Optional[str] = None
+        self._downloads: Dict[str, Download] = {}   # guid -> Download
+        self._sequencia: int = 0
+        self._eventos_confirmados: bool = False     # True depois do primeiro evento de download recebido neste driver
+        self._lock = threading.Lock()
+        # O Chrome emite os eventos no domínio Page (gravado pelo ChromeDriver) e, nas versões novas, também no Browser
+        self.eventos.assinar("Page.download", self._registrar)
+        self.eventos.assinar("Browser.download", self._registrar)
+
+    def _registrar(self, metodo: str, params: dict, _instante: float) -> None:
+        guid = params.get("guid")
+        if not guid:
+            return
+        with self._lock:
+            self._eventos_confirmados = True
+            download = self._downloads.get(guid)
+            if metodo.endswith(".downloadWillBegin"):
+                if download is None:    # Com os dois domínios ativos o mesmo download chega duas vezes
+                    self._sequencia += 1
+                    nome = params.get("suggestedFilename", "")
+                    caminho = os.path.join(self.pasta, nome) if self.pasta else nome
+                    self._downloads[guid] = Download(guid, params.get("url", ""), nome, caminho, self._sequencia)
+            elif metodo.endswith(".downloadProgress") and download is not None:
+                download.recebidos = int(params.get("receivedBytes", download.recebidos))
+                download.total = int(params.get("totalBytes", download.total))
+                download.estado = params.get("state", download.estado)
+
+    # ------------------------------------------------------------------ consulta
+    def marcar(self) -> MarcaDownloads:
+        """Marca o momento atual (chamar ANTES do clique que dispara o(s) download(s))."""
+        self.eventos.ler()  # Eventos antigos entram antes da marca
+        with self._lock:
+            antes = None if self._eventos_confirmados else arquivos_na_pasta(self.pasta or "")
+            return MarcaDownloads(self._sequencia, antes)
+
+    def iniciados(self, marca: MarcaDownloads) -> List[Download]:
+        """Downloads iniciados depois da marca, na ordem de início."""
+        with self._lock:
+            novos = [d for d in self._downloads.values() if d.sequencia > marca.sequencia]
+        return sorted(novos, key=lambda d: d.sequencia)
+
+    def _sem_eventos(self, marca: MarcaDownloads) -> bool:
+        """True se é preciso olhar a pasta: sem log 'performance' ou sem nenhum evento de download até agora."""
+        if not self.eventos.disponivel:
+            return True
+        return not self._eventos_confirmados and time.monotonic() - marca.instante > ESPERA_EVENTOS
+
+    def _novos_na_pasta(self, marca: MarcaDownloads, completos: bool = True) -> List[str]:
+        """[Verificação da pasta] Arquivos que apareceram desde a marca."""
+        novos = arquivos_na_pasta(self.pasta or "") - (marca.antes or set())
+        if completos:
+            novos = {f for f in novos if not f.endswith(TEMPORARIOS_DOWNLOAD)}
+        return sorted(novos)
+
+    # ------------------------------------------------------------------ esperas
+    def aguardar_inicio(self, marca: MarcaDownloads, nome: str, qtd: int = 1, teto: float = 10.0) -> bool:
+        """
+        Espera 'qtd' downloads começarem depois da marca (útil para disparar o próximo sem esperar o atual terminar).
+
+        :return: True se os downloads começaram dentro do teto.
+        """
+
+        def iniciou(_driver) -> bool:
+            self.eventos.ler()
+            if len(self.iniciados(marca)) >= qtd:
+                return True
+            if self._sem_eventos(marca) or marca.antes is not None:
+                return len(self._novos_na_pasta(marca, completos=False)) >= qtd
+            return False
+
+        return esperar(self.driver, nome, iniciou, teto=teto, intervalo=0.2)
+
+    def aguardar(self, marca: MarcaDownloads, nome: str, qtd: int = 1, teto: float = 120.0) -> List[Download]:
+        """
+        Espera os 'qtd' primeiros downloads iniciados depois da marca terminarem.
+        Para antes do teto se algum deles for cancelado.
+
+        :param marca: Retorno de marcar(), tirado antes do clique.
+        :param nome: Nome da espera (estatísticas de utils/esperas.py).
+        :param qtd: Nº de downloads esperados.
+        :param teto: Tempo máximo de espera (segundos).
+        :return: Os downloads concluídos (menos que 'qtd' em caso de timeout ou cancelamento).
+        """
+
+        def terminaram(_driver) -> bool:
+            self.eventos.ler()
+            if self._sem_eventos(marca):
+                return len(self._novos_na_pasta(marca)) >= qtd
+            downloads = self.iniciados(marca)[:qtd]
+            if any(d.cancelado for d in downloads):
+                return True
+            return len(downloads) >= qtd and all(d.concluido for d in downloads)
+
+        esperar(self.driver, nome, terminaram, teto=teto, intervalo=0.2)
+
+        if self._sem_eventos(marca):
+            logger.debug("Downloads verificados pela pasta (sem eventos de download no driver).")
+            concluidos = []
+            for arquivo in self._novos_na_pasta(marca)[:qtd]:
+                download = Download(arquivo, "", arquivo, os.path.join(self.pasta or "", arquivo))
+                download.estado = CONCLUIDO
+                concluidos.append(download)
+            return concluidos
+
+        downloads = self.iniciados(marca)[:qtd]
+        for download in downloads:
+            if download.cancelado:
+                logger.warning("Download cancelado pelo navegador: %s", download.nome)
+        return [d for d in downloads if d.concluido]
+
+
+def rastreador_downloads(driver) -> RastreadorDownloads:
+    """Retorna (criando na primeira vez) o rastreador de downloads do driver."""
+    rastreador = getattr(driver, "_rastreador_downloads", None)
+    if rastreador is None:
+        rastreador = RastreadorDownloads(driver)
+        driver._rastreador_downloads = rastreador
+    return rastreador
+
+
+def definir_pasta_download(driver, pasta_download: str) -> None:
+    """
+    Aponta os downloads do driver (já criado) para outra pasta via DevTools, com os eventos de download ligados,
+    e informa a pasta ao rastreador de downloads do driver.
+    """
+    pasta = os.path.abspath(pasta_download)
+    try:
+        driver.execute_cdp_cmd(
+            "Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": pasta, "eventsEnabled": True}
+        )
+    except Exception:
+        # Versões antigas do Chrome só aceitam o comando no domínio Page (que não tem 'eventsEnabled')
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": pasta})
+    rastreador_downloads(driver).pasta = pasta
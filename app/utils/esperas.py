@@ -0,0 +1,371 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .logger import logger
+from .rede import monitor_rede
+
+'''
+==================================================================================================================================
+Esperas por condição (substituem os time.sleep(...) fixos dos bots em app/core).
+
+Antes, cada passo dos bots dormia um tempo fixo calculado para o pior caso (ex: 15 s depois da pesquisa do Urbano).
+Agora cada espera tem um NOME, uma ou mais condições de prontidão e um TETO: esperar(...) retorna assim que todas as
+condições forem verdadeiras ao mesmo tempo - ou quando o teto estoura (e aí o bot segue como seguiria depois do sleep).
+
+Condições disponíveis (cada fábrica devolve uma função driver -> bool):
+    - pagina_carregada():             document.readyState == 'complete';
+    - elemento_presente(loc) / elemento_visivel(loc) / elemento_ausente(loc);
+    - elemento_estavel(loc, janela):  o elemento existe e não muda de posição/tamanho por 'janela' segundos (animações);
+    - sem_spinner(*css):              nenhum indicador de carregamento visível;
+    - angular_ocioso():               AngularJS sem requisições $http pendentes (Urbano);
+    - quasar_ocioso():                nenhum q-loading / q-inner-loading / q-spinner visível (SISCTM);
+    - xhr_ocioso():                   contador de XHR/fetch em andamento == 0 (ver instrumentar_xhr(...));
+    - rede_ociosa(ms):                nenhuma requisição de rede em andamento há 'ms' milissegundos (log 'performance' do Chrome);
+    - elemento_obsoleto(el):          o elemento saiu do DOM (a página recarregou);
+    - arquivo_novo(pasta, antes):     apareceu na pasta um arquivo (completo) que não estava lá antes;
+    - janelas_abertas(n), url_diferente(url), url_contem(trecho), qtd_estavel(loc, janela).
+
+Toda espera é instrumentada: o tempo gasto (e se estourou o teto) é acumulado por nome e resumido no fim da triagem
+(resumo_esperas()), para sabermos onde o tempo ocioso dos bots realmente está.
+==================================================================================================================================
+'''
+
+INTERVALO_PADRAO = 0.25     # Segundos entre duas verificações das condições
+
+Condicao = Callable[[object], bool]
+
+# Seletores dos indicadores de carregamento mais comuns (Quasar, AngularJS/Bootstrap e genéricos)
+SPINNERS_QUASAR = (".q-loading", ".q-inner-loading", ".q-spinner", ".q-linear-progress")
+SPINNERS_PADRAO = SPINNERS_QUASAR + (".spinner", ".loading", ".carregando", "[class*='spinner']")
+
+# Contador de XHR/fetch em andamento. Instalado em cada documento novo (instrumentar_xhr) ou, na falta dele,
+# no documento atual na primeira verificação de xhr_ocioso() - nesse caso só conta as requisições iniciadas depois.
+_JS_CONTADOR_XHR = """
+(function () {
+    if (window.__autotriXhr !== undefined) { return; }
+    window.__autotriXhr = 0;
+    var fim = function () { window.__autotriXhr = Math.max(0, window.__autotriXhr - 1); };
+    var enviar = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__autotriXhr++;
+        this.addEventListener('loadend', fim);
+        return enviar.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var buscar = window.fetch;
+        window.fetch = function () {
+            window.__autotriXhr++;
+            return buscar.apply(this, arguments).finally(fim);
+        };
+    }
+})();
+"""
+
+_JS_VISIVEL = """
+var els = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < els.length; i++) {
+    var r = els[i].getBoundingClientRect();
+    var s = window.getComputedStyle(els[i]);
+    if (r.width > 0 && r.height > 0 && s.visibility !== 'hidden' && s.display !== 'none' && s.opacity !== '0') {
+        return true;
+    }
+}
+return false;
+"""
+
+_JS_ANGULAR_OCIOSO = """
+try {
+    if (!window.angular) { return true; }
+    var alvo = document.querySelector('[ng-app]') || document.body;
+    var injector = window.angular.element(alvo).injector();
+    if (!injector) { return true; }
+    return injector.get('$http').pendingRequests.length === 0;
+} catch (e) { return true; }
+"""
+
+
+# ====================================================================================================== estatísticas
+class _Estatisticas:
+    """Tempo acumulado por nome de espera (thread-safe: os pré-aquecimentos rodam em outras threads)."""
+
+    def __init__(self):
+        self._dados: Dict[str, List[float]] = {}    # nome -> [qtd, total_segundos, estouros_do_teto]
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, duracao: float, estourou: bool) -> None:
+        with self._lock:
+            dados = self._dados.setdefault(nome, [0, 0.0, 0])
+            dados[0] += 1
+            dados[1] += duracao
+            dados[2] += int(estourou)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def itens(self) -> List[Tuple[str, int, float, int]]:
+        with self._lock:
+            return [(nome, int(d[0]), d[1], int(d[2])) for nome, d in self._dados.items()]
+
+
+estatisticas_esperas = _Estatisticas()
+
+
+def resumo_esperas(limite: int = 10) -> List[str]:
+    """
+    Resume as esperas da triagem, da que mais consumiu tempo para a que menos consumiu.
+
+    :param limite: Nº máximo de linhas.
+    :return: Linhas prontas para o log. Ex: "URBANO pesquisa: 12x, 38.4 s no total (3.2 s em média, 1 estouro do teto)"
+    """
+    linhas = []
+    for nome, qtd, total, estouros in sorted(estatisticas_esperas.itens(), key=lambda i: -i[2])[:limite]:
+        linha = f"{nome}: {qtd}x, {total:.1f} s no total ({total / qtd:.1f} s em média"
+        linha += f", {estouros} estouro(s) do teto)" if estouros else ")"
+        linhas.append(linha)
+    return linhas
+
+
+# ====================================================================================================== espera
+def esperar(
+    driver,
+    nome: str,
+    *condicoes: Condicao,
+    teto: float = 10.0,
+    minimo: float = 0.0,
+    intervalo: float = INTERVALO_PADRAO,
+) -> bool:
+    """
+    Espera até que TODAS as condições sejam verdadeiras ao mesmo tempo, ou até o teto.
+    Nunca lança exceção: erros dentro de uma condição contam como "ainda não".
+
+    :param driver: WebDriver passado a cada condição.
+    :param nome: Nome da espera (log e estatísticas). Ex: "SISCTM login".
+    :param condicoes: Funções driver -> bool. Sem condições a espera dura exatamente 'minimo' segundos.
+    :param teto: Segundos máximos de espera (o antigo time.sleep - pior caso).
+    :param minimo: Segundos mínimos de espera (respiros de animação que não têm condição observável).
+    :param intervalo: Segundos entre verificações.
+    :return: True se as condições foram satisfeitas, False se o teto estourou.
+    """
+    inicio = time.monotonic()
+    limite = inicio + teto
+    pronto = False
+
+    if minimo:
+        time.sleep(min(minimo, teto))
+
+    while True:
+        pronto = all(_avaliar(c, driver) for c in condicoes)
+        if pronto or time.monotonic() >= limite:
+            break
+        time.sleep(intervalo)
+
+    duracao = time.monotonic() - inicio
+    estourou = bool(condicoes) and not pronto
+    estatisticas_esperas.registrar(nome, duracao, estourou)
+    if estourou:
+        logger.debug(f"Espera '{nome}' atingiu o teto de {teto:.0f} s sem as condições de prontidão.")
+    else:
+        logger.debug(f"Espera '{nome}' concluída em {duracao:.1f} s (teto {teto:.0f} s).")
+    return pronto or not condicoes
+
+
+def _avaliar(condicao: Condicao, driver) -> bool:
+    try:
+        return bool(condicao(driver))
+    except Exception:
+        return False
+
+
+# ====================================================================================================== condições
+def pagina_carregada() -> Condicao:
+    """document.readyState == 'complete'."""
+    return lambda d: d.execute_script("return document.readyState") == "complete"
+
+
+def elemento_presente(localizador: Tuple[str, str]) -> Condicao:
+    """O elemento existe no DOM."""
+    return lambda d: bool(d.find_elements(*localizador))
+
+
+def elemento_visivel(localizador: Tuple[str, str]) -> Condicao:
+    """Algum elemento do localizador está visível."""
+    return lambda d: any(e.is_displayed() for e in d.find_elements(*localizador))
+
+
+def elemento_ausente(localizador: Tuple[str, str]) -> Condicao:
+    """Nenhum elemento do localizador está visível (ou nem existe)."""
+    return lambda d: not any(e.is_displayed() for e in d.find_elements(*localizador))
+
+
+def elemento_estavel(localizador: Tuple[str, str], janela: float = 0.4) -> Condicao:
+    """
+    O elemento existe e sua posição/tamanho não mudaram por 'janela' segundos (animações de abertura, scroll suave...).
+    A condição guarda estado: crie uma nova a cada espera.
+    """
+    estado = {"rect": None, "desde": 0.0}
+
+    def condicao(d) -> bool:
+        elementos = d.find_elements(*localizador)
+        if not elementos:
+            estado["rect"] = None
+            return False
+        rect = elementos[0].rect
+        agora = time.monotonic()
+        if rect != estado["rect"]:
+            estado["rect"], estado["desde"] = rect, agora
+            return False
+        return agora - estado["desde"] >= janela
+
+    return condicao
+
+
+def qtd_estavel(localizador: Tuple[str, str], janela: float = 1.0, minimo: int = 1) -> Condicao:
+    """
+    Existem pelo menos 'minimo' elementos e a quantidade não mudou por 'janela' segundos (tabelas preenchidas aos poucos).
+    A condição guarda estado: crie uma nova a cada espera.
+    """
+    estado = {"qtd": None, "desde": 0.0}
+
+    def condicao(d) -> bool:
+        qtd = len(d.find_elements(*localizador))
+        agora = time.monotonic()
+        if qtd != estado["qtd"]:
+            estado["qtd"], estado["desde"] = qtd, agora
+            return False
+        return qtd >= minimo and agora - estado["desde"] >= janela
+
+    return condicao
+
+
+def sem_spinner(*seletores_css: str) -> Condicao:
+    """Nenhum indicador de carregamento visível. Sem seletores usa SPINNERS_PADRAO."""
+    seletor = ", ".join(seletores_css or SPINNERS_PADRAO)
+    return lambda d: not d.execute_script(_JS_VISIVEL, seletor)
+
+
+def angular_ocioso() -> Condicao:
+    """AngularJS (Urbano) sem requisições $http pendentes. Páginas sem AngularJS contam como ociosas."""
+    return lambda d: d.execute_script(_JS_ANGULAR_OCIOSO)
+
+
+def quasar_ocioso() -> Condicao:
+    """Nenhum indicador de carregamento do Quasar (SISCTM) visível."""
+    return sem_spinner(*SPINNERS_QUASAR)
+
+
+def xhr_ocioso() -> Condicao:
+    """Nenhum XHR/fetch em andamento na página (contador instalado por instrumentar_xhr)."""
+
+    def condicao(d) -> bool:
+        pendentes = d.execute_script("return window.__autotriXhr;")
+        if pendentes is None:
+            d.execute_script(_JS_CONTADOR_XHR)   # Documento sem contador: instala agora (conta a partir daqui)
+            return False
+        return pendentes == 0
+
+    return condicao
+
+
+def elemento_obsoleto(elemento) -> Condicao:
+    """O elemento (já localizado) não está mais no DOM - a página recarregou ou navegou."""
+
+    def condicao(_d) -> bool:
+        try:
+            elemento.is_enabled()
+            return False
+        except Exception:   # StaleElementReferenceException
+            return True
+
+    return condicao
+
+
+TEMPORARIOS_DOWNLOAD = (".crdownload", ".part", ".tmp")
+
+
+def arquivos_na_pasta(pasta: str) -> set:
+    """Nomes dos arquivos da pasta (conjunto vazio se ela não existe)."""
+    try:
+        return set(os.listdir(pasta))
+    except (FileNotFoundError, TypeError):
+        return set()
+
+
+def arquivo_novo(pasta: str, antes: Iterable[str], completo: bool = True) -> Condicao:
+    """
+    Apareceu na pasta um arquivo que não estava em 'antes' (use arquivos_na_pasta(...) antes do clique).
+
+    :param completo: Se True ignora os temporários do Chrome (.crdownload...) - só conta download concluído.
+    """
+    antes = set(antes)
+
+    def condicao(_d) -> bool:
+        novos = arquivos_na_pasta(pasta) - antes
+        if completo:
+            novos = {f for f in novos if not f.endswith(TEMPORARIOS_DOWNLOAD)}
+        return bool(novos)
+
+    return condicao
+
+
+def rede_ociosa(ociosa_ms: float = 500) -> Condicao:
+    """
+    Nenhuma requisição de rede (XHR, fetch, tiles, scripts...) em andamento há pelo menos 'ociosa_ms' milissegundos.
+
+    Usa os eventos Network.* do log 'performance' do ChromeDriver (ver MonitorRede em utils/rede.py), então também
+    enxerga o que o contador de XHR não vê (imagens/tiles e requisições iniciadas antes da instrumentação).
+    Se o driver não tiver o log 'performance', cai para xhr_ocioso().
+    """
+    reserva = xhr_ocioso()
+
+    def condicao(d) -> bool:
+        monitor = monitor_rede(d)
+        monitor.atualizar()
+        if not monitor.disponivel:
+            return reserva(d)
+        return monitor.ociosa_ha() >= ociosa_ms
+
+    return condicao
+
+
+def janelas_abertas(quantidade: int) -> Condicao:
+    """Há pelo menos 'quantidade' janelas/abas abertas."""
+    return lambda d: len(d.window_handles) >= quantidade
+
+
+def url_diferente(url: str) -> Condicao:
+    """A URL atual é diferente de 'url' (a navegação saiu da página)."""
+    return lambda d: d.current_url != url
+
+
+def url_contem(trecho: str) -> Condicao:
+    """A URL atual contém 'trecho'."""
+    return lambda d: trecho in d.current_url
+
+
+def todas(*condicoes: Condicao) -> Condicao:
+    """Combina condições com E lógico (útil para montar condições reaproveitáveis)."""
+    return lambda d: all(_avaliar(c, d) for c in condicoes)
+
+
+def alguma(*condicoes: Condicao) -> Condicao:
+    """Combina condições com OU lógico."""
+    return lambda d: any(_avaliar(c, d) for c in condicoes)
+
+
+# ====================================================================================================== instrumentação
+def instrumentar_xhr(driver) -> None:
+    """
+    Instala o contador de XHR/fetch em todo documento novo do driver (via DevTools), uma vez por driver.
+    Chamado pelo driver_context(...). Falhas são ignoradas - xhr_ocioso() instala o contador sob demanda.
+    """
+    if getattr(driver, "_xhr_instrumentado", False):
+        return
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _JS_CONTADOR_XHR})
+        driver._xhr_instrumentado = True
+    except Exception as e:
+        logger.debug(f"Não foi possível instrumentar XHR do driver: {e}")
+
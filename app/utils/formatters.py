@@ -103,4 +103,15 @@ def format_by_pattern2(valor: str, mascara: str, placeholder: str = '#') -> str:
     if idx_val < len(val_limpo):
         resultado.append(val_limpo[idx_val:])
             
-    return "".join(resultado)
\ No newline at end of file
+    return "".join(resultado)
+
+
+def chave_indice(indice: str) -> str:
+    """
+    Chave canônica de um índice cadastral: só os caracteres alfanuméricos (mesma sanitização do format_by_pattern).
+    "312.016-007-0011", "312016 007 0011" e "3120160070011" têm a mesma chave.
+
+    :param indice: O índice cadastral em qualquer formatação.
+    :return: A chave canônica (ex: "3120160070011").
+    """
+    return re.sub(r"[^a-zA-Z0-9]", "", str(indice or ""))
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .logger import logger
+
+'''
+==================================================================================================================================
+Limitador de concorrência e ritmo por sistema (SIGEDE, SIATU, URBANO, SISCTM, GOOGLE).
+
+Com vários ICs triados ao mesmo tempo (app/pipeline/fila.py) e as etapas de cada IC em paralelo (app/pipeline/etapas.py),
+nada impediria 6 navegadores de abrirem o SIATU no mesmo segundo - e o SIATU já é instável o bastante para precisar de
+@retry(max_retries=4). Cada sistema tem aqui, num único lugar (LIMITES), dois controles:
+
+    - max_sessoes: nº máximo de driver_context(...) do sistema abertos ao mesmo tempo. O excedente espera na fila.
+    - espacamento: intervalo mínimo (segundos) entre duas aberturas de sessão / dois logins no sistema.
+
+O driver_context(...) (utils/web_driver.py) reserva a vaga do sistema durante todo o bloco e respeita o espaçamento na
+abertura da sessão (o login, se houver, vem logo em seguida); o pré-aquecimento do pool (utils/sessoes.py), que abre
+navegadores fora do driver_context, espaça a abertura do mesmo jeito. O espaçamento é aplicado uma única vez por sessão
+- os adapters de app/pipeline/sistemas.py não precisam fazer nada além de informar o 'sistema'.
+
+Para calibrar a vazão contra a saúde dos servidores, o limitador mede por sistema a fila (quantos esperam agora e o pico)
+e o tempo total/máximo de espera - resumidos no fim da triagem por resumo_limites().
+==================================================================================================================================
+'''
+
+
+class LimiteSistema:
+    """
+    Limites de um sistema.
+
+    Parâmetros:
+        max_sessoes (int): Nº máximo de sessões (driver_context) abertas ao mesmo tempo.
+        espacamento (float): Intervalo mínimo entre duas aberturas de sessão / dois logins (segundos).
+    """
+
+    def __init__(self, max_sessoes: int, espacamento: float = 0.0):
+        self.max_sessoes = max(1, max_sessoes)
+        self.espacamento = max(0.0, espacamento)
+
+    def __repr__(self) -> str:
+        return f"LimiteSistema(max_sessoes={self.max_sessoes}, espacamento={self.espacamento}s)"
+
+
+# Configuração central dos limites. Sistemas fora da tabela não são limitados.
+LIMITES: Dict[str, LimiteSistema] = {
+    "SIGEDE": LimiteSistema(max_sessoes=1, espacamento=1.0),    # Só a main (produtora) usa o SIGEDE
+    "SIATU": LimiteSistema(max_sessoes=3, espacamento=2.0),     # O mais instável: poucas sessões e logins espaçados
+    "URBANO": LimiteSistema(max_sessoes=4, espacamento=0.5),
+    "SISCTM": LimiteSistema(max_sessoes=4, espacamento=0.5),
+    "GOOGLE": LimiteSistema(max_sessoes=3, espacamento=2.0),    # Evita o bloqueio por excesso de buscas do Google Maps
+}
+
+
+class _EstadoSistema:
+    """Semáforo, relógio do espaçamento e métricas de um sistema."""
+
+    def __init__(self, limite: LimiteSistema):
+        self.limite = limite
+        self.vagas = threading.BoundedSemaphore(limite.max_sessoes)
+        self.proximo_inicio: float = 0.0      # time.monotonic() a partir do qual o próximo início está liberado
+        self.em_uso: int = 0
+        self.na_fila: int = 0
+        self.pico_fila: int = 0
+        self.sessoes: int = 0
+        self.espera_total: float = 0.0
+        self.espera_maxima: float = 0.0
+
+
+class LimitadorSistemas:
+    """Aplica LIMITES a todas as threads do processo. Existe uma única instância (limitador_sistemas)."""
+
+    def __init__(self, limites: Optional[Dict[str, LimiteSistema]] = None):
+        self._estados: Dict[str, _EstadoSistema] = {
+            sistema: _EstadoSistema(limite) for sistema, limite in (limites or LIMITES).items()
+        }
+        self._lock = threading.Lock()
+
+    def _reservar_inicio(self, estado: _EstadoSistema) -> float:
+        """Reserva o próximo horário de início do sistema e retorna quanto falta para ele (segundos)."""
+        with self._lock:
+            agora = time.monotonic()
+            inicio = max(agora, estado.proximo_inicio)
+            estado.proximo_inicio = inicio + estado.limite.espacamento
+            return inicio - agora
+
+    def espacar(self, sistema: Optional[str]) -> None:
+        """Espera o espaçamento mínimo do sistema (chamar uma única vez, logo antes de abrir uma sessão ou de uma requisição "cara")."""
+        estado = self._estados.get(sistema or "")
+        if estado is None or not estado.limite.espacamento:
+            return
+        atraso = self._reservar_inicio(estado)
+        if atraso > 0:
+            time.sleep(atraso)
+
+    @contextmanager
+    def sessao(self, sistema: Optional[str]):
+        """
+        Reserva uma vaga do sistema durante o bloco (espera na fila se todas estiverem ocupadas)
+        e respeita o espaçamento mínimo entre aberturas de sessão.
+        """
+        estado = self._estados.get(sistema or "")
+        if estado is None:
+            yield
+            return
+
+        inicio_espera = time.monotonic()
+        if not estado.vagas.acquire(blocking=False):
+            # Todas as vagas ocupadas: entra na fila
+            with self._lock:
+                estado.na_fila += 1
+                estado.pico_fila = max(estado.pico_fila, estado.na_fila)
+            try:
+                estado.vagas.acquire()
+            finally:
+                with self._lock:
+                    estado.na_fila -= 1
+        try:
+            self.espacar(sistema)
+            espera = time.monotonic() - inicio_espera
+            with self._lock:
+                estado.em_uso += 1
+                estado.sessoes += 1
+                estado.espera_total += espera
+                estado.espera_maxima = max(estado.espera_maxima, espera)
+            if espera >= 1.0:
+                logger.info(f"{sistema}: sessão liberada após {espera:.1f}s na fila do limitador.")
+            yield
+        finally:
+            with self._lock:
+                estado.em_uso = max(0, estado.em_uso - 1)
+            estado.vagas.release()
+
+    # ------------------------------------------------------------------ métricas
+    def situacao(self, sistema: str) -> Dict[str, float]:
+        """Métricas atuais do sistema: em_uso, na_fila, pico_fila, sessoes, espera_total e espera_maxima (segundos)."""
+        estado = self._estados.get(sistema)
+        if estado is None:
+            return {}
+        with self._lock:
+            return {
+                "em_uso": estado.em_uso,
+                "na_fila": estado.na_fila,
+                "pico_fila": estado.pico_fila,
+                "sessoes": estado.sessoes,
+                "espera_total": estado.espera_total,
+                "espera_maxima": estado.espera_maxima,
+            }
+
+    def limpar(self) -> None:
+        """Zera as métricas (início de uma nova triagem)."""
+        with self._lock:
+            for estado in self._estados.values():
+                estado.pico_fila = 0
+                estado.sessoes = 0
+                estado.espera_total = 0.0
+                estado.espera_maxima = 0.0
+
+
+limitador_sistemas = LimitadorSistemas()
+
+
+def resumo_limites() -> List[str]:
+    """Linhas legíveis com a fila e o tempo de espera de cada sistema que teve sessões (para o log do fim da triagem)."""
+    linhas = []
+    for sistema in LIMITES:
+        s = limitador_sistemas.situacao(sistema)
+        if not s or not s["sessoes"]:
+            continue
+        media = s["espera_total"] / s["sessoes"]
+        linhas.append(
+            f"{sistema}: {int(s['sessoes'])} sessões, fila máx. {int(s['pico_fila'])}, "
+            f"espera média {media:.1f}s (máx. {s['espera_maxima']:.1f}s, total {s['espera_total']:.0f}s)"
+        )
+    return linhas
@@ -2,6 +2,8 @@ import sys
 from pathlib import Path
 import logging      # Importa o módulo de LOGGING padrão do python
 import queue  # Importa fila
+import contextvars  # Contexto por thread/tarefa (marca do IC nas linhas do log)
+from contextlib import contextmanager
 
 # Detecta se está rodando via PyInstaller
 if getattr(sys, "frozen", False):
@@ -76,11 +78,36 @@ def section_log(titulo: str, separador: str = "-", largura: int = 50):
     logger.info(linha_formatada)
 
 
+# Marca do IC em processamento na thread atual (ex: "IC 700701792560"). Com vários ICs triados ao mesmo tempo
+# (ver app/pipeline/fila.py) as linhas do log se intercalam - a marca identifica de qual IC é cada linha.
+# NOTE: contextvars (e não threading.local) para que a marca possa ser copiada para as threads das etapas do IC.
+_contexto_log: contextvars.ContextVar = contextvars.ContextVar("contexto_log", default="")
+
+@contextmanager
+def contexto_log(marca: str):
+    """
+    Prefixa com [marca] todas as linhas de log emitidas dentro do bloco (na thread atual
+    e nas threads disparadas com o contexto copiado, ver app/pipeline/etapas.py).
+    """
+    token = _contexto_log.set(marca)
+    try:
+        yield
+    finally:
+        _contexto_log.reset(token)
+
+class FiltroContexto(logging.Filter):
+    """Preenche o campo %(contexto)s dos formatters com a marca do contexto atual (vazio fora de um IC)."""
+    def filter(self, record):
+        marca = _contexto_log.get()
+        record.contexto = f"[{marca}] " if marca else ""
+        return True
+
+
 # Formatter para o console e GUI (limpo, sem milissegundos)
-console_formatter = logging.Formatter("%(levelname)s: %(message)s")
+console_formatter = logging.Formatter("%(levelname)s: %(contexto)s%(message)s")
 
 # Formatter para o arquivo (com timestamp completo)
-file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(contexto)s%(message)s")
 
 # Handlers
 console_handler = logging.StreamHandler()
@@ -97,6 +124,7 @@ queue_handler.setFormatter(console_formatter)
 # Logger central
 logger = logging.getLogger("triagem_logger")
 logger.setLevel(logging.INFO)
+logger.addFilter(FiltroContexto())   # Antes dos handlers: todo registro passa a ter o campo 'contexto'
 logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 logger.addHandler(queue_handler) # Adicionamos a GUI como um destino também.
\ No newline at end of file
@@ -1,6 +1,16 @@
 import sys
 import os
+import hashlib
+import shutil
 import subprocess
+from pathlib import Path
+
+from .logger import ROOT, logger
+
+# Pasta (oculta) com dados persistentes da aplicação entre execuções: caches, cofre de sessões e etc.
+# Fica ao lado do arquivo de LOG (raiz do projeto ou pasta do executável) - por isso está no .gitignore: ela guarda
+# sessões autenticadas (mesmo cifradas) e nunca deve ir para o repositório.
+PASTA_DADOS = ROOT / ".autotri"
 
 
 def abrir_pasta(path):
@@ -30,3 +40,47 @@ def criar_pasta_resultados() -> str:
     os.makedirs(pasta_resultados, exist_ok=True)
 
     return pasta_resultados
+
+
+def pasta_dados(*partes: str) -> Path:
+    """Retorna (e cria, se necessário) uma subpasta da pasta de dados persistentes da aplicação.
+
+    :param partes: Subpastas dentro de PASTA_DADOS (ex: "chromedriver").
+    :return: O Path da pasta.
+    """
+    caminho = PASTA_DADOS.joinpath(*partes)
+    caminho.mkdir(parents=True, exist_ok=True)
+    return caminho
+
+
+def hash_arquivo(caminho: str) -> str:
+    """Retorna o sha256 (hexadecimal) do conteúdo de um arquivo - a "impressão digital" usada pelo cache e pelo diário da triagem."""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def replicar_pasta_ic(origem: str, destino: str) -> bool:
+    """Materializa o resultado de um IC já triado na pasta de outro protocolo que também o referencia.
+
+    Os arquivos são copiados (nunca hardlinks): o relatório gerado na cópia renomeia anexos, e editar um arquivo num
+    protocolo não pode alterar o do outro. Pastas ocultas e downloads incompletos não são copiados.
+
+    :param origem: Pasta do IC triado (pasta_resultados/<protocolo>/<indice>).
+    :param destino: Pasta do mesmo IC no outro protocolo.
+    :return: True se a pasta foi replicada.
+    """
+    if os.path.abspath(origem) == os.path.abspath(destino):
+        return True
+    if not os.path.isdir(origem) or not os.listdir(origem):
+        logger.warning(f"Resultado de {origem} não encontrado: IC não replicado em {destino}")
+        return False
+    try:
+        shutil.copytree(origem, destino, ignore=shutil.ignore_patterns(".*", "*.crdownload", "*.part", "*.tmp"),
+                        dirs_exist_ok=True)
+        return True
+    except (OSError, shutil.Error) as e:
+        logger.error(f"Erro ao replicar {origem} em {destino}: {e}")
+        return False
@@ -0,0 +1,108 @@
+from typing import Optional
+
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+from .logger import logger
+
+'''
+==================================================================================================================================
+Perfis de carregamento do driver por bot (estratégia de carregamento de página e timeouts).
+
+Antes, todo navegador usava a estratégia 'normal' do Selenium (espera o evento 'load' da página, com todas as imagens e scripts)
+e o SIATU trocava o timeout GLOBAL do RemoteConnection entre 10 s e 120 s - o que vazava para todos os outros bots.
+Agora cada adapter (app/pipeline/sistemas.py) declara um PERFIL_DRIVER, aplicado pelo driver_context(...) só ao driver dele:
+
+    - estrategia: 'normal' (evento load), 'eager' (DOMContentLoaded) ou 'none' (retorna logo após a navegação).
+                  Os sistemas SPA (Urbano, SISCTM) não precisam esperar o 'load' - os dados chegam depois, via XHR.
+    - timeout_carregamento: segundos máximos de um driver.get(...) / navegação.
+    - timeout_script: segundos máximos de um execute_async_script(...).
+    - timeout_implicito: espera implícita do find_element(...). Os bots usam esperas explícitas, então o padrão é 0.
+    - timeout_comando: segundos máximos de cada comando HTTP enviado ao ChromeDriver (o antigo RemoteConnection.set_timeout).
+    - monitorar_rede: grava os eventos de rede no log 'performance' do Chrome (espera rede_ociosa, utils/esperas.py).
+                      Só faz sentido nos sistemas que carregam dados via XHR - nos outros o log só consumiria memória.
+    - monitorar_downloads: grava os eventos de download no mesmo log (RastreadorDownloads, utils/downloads.py).
+
+NOTE: A estratégia de carregamento só pode ser definida na criação do navegador. Os timeouts são reaplicados a cada
+      driver_context(...) - então um driver reaproveitado do pool nunca herda timeouts alterados por outra etapa.
+==================================================================================================================================
+'''
+
+ESTRATEGIAS = ("normal", "eager", "none")
+
+
+class PerfilDriver:
+    """
+    Estratégia de carregamento e timeouts de um driver.
+
+    Parâmetros:
+        estrategia (str): Estratégia de carregamento de página ('normal', 'eager' ou 'none').
+        timeout_carregamento (float): Timeout de carregamento de página (segundos).
+        timeout_script (float): Timeout de scripts assíncronos (segundos).
+        timeout_implicito (float): Espera implícita na busca de elementos (segundos).
+        timeout_comando (float): Timeout de cada comando enviado ao ChromeDriver (segundos).
+        monitorar_rede (bool): Habilita o log 'performance' (eventos de rede) no navegador.
+        monitorar_downloads (bool): Habilita o log 'performance' (eventos de download) no navegador.
+    """
+
+    def __init__(
+        self,
+        estrategia: str = "normal",
+        timeout_carregamento: float = 120,
+        timeout_script: float = 30,
+        timeout_implicito: float = 0,
+        timeout_comando: float = 120,
+        monitorar_rede: bool = False,
+        monitorar_downloads: bool = False,
+    ):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estratégia de carregamento inválida: {estrategia} (use uma de {ESTRATEGIAS})")
+        self.estrategia = estrategia
+        self.timeout_carregamento = timeout_carregamento
+        self.timeout_script = timeout_script
+        self.timeout_implicito = timeout_implicito
+        self.timeout_comando = timeout_comando
+        self.monitorar_rede = monitorar_rede
+        self.monitorar_downloads = monitorar_downloads
+
+    def __repr__(self) -> str:
+        return f"PerfilDriver(estrategia={self.estrategia!r}, carregamento={self.timeout_carregamento}s)"
+
+
+# Perfil usado quando o adapter não declara um (equivale ao comportamento padrão do Selenium)
+PERFIL_PADRAO = PerfilDriver()
+
+
+def aplicar_perfil(driver, perfil: Optional[PerfilDriver]) -> None:
+    """
+    Aplica os timeouts do perfil ao driver (a estratégia de carregamento é definida no criar_driver(...)).
+
+    :param driver: WebDriver (Chrome).
+    :param perfil: Perfil a aplicar. None = PERFIL_PADRAO.
+    """
+    perfil = perfil or PERFIL_PADRAO
+    try:
+        driver.set_page_load_timeout(perfil.timeout_carregamento)
+        driver.set_script_timeout(perfil.timeout_script)
+        driver.implicitly_wait(perfil.timeout_implicito)
+    except Exception as e:
+        logger.warning(f"Não foi possível aplicar os timeouts do perfil do driver: {e}")
+    definir_timeout_comando(driver, perfil.timeout_comando)
+
+
+def definir_timeout_comando(driver, segundos: float) -> None:
+    """
+    Define o timeout dos comandos HTTP enviados ao ChromeDriver SÓ para este driver.
+
+    Substitui o RemoteConnection.set_timeout(...), que altera o valor de todos os drivers do processo.
+    Em versões do Selenium sem configuração por conexão (ClientConfig, 4.26+) cai no comportamento global antigo.
+
+    :param driver: WebDriver (Chrome).
+    :param segundos: Timeout em segundos.
+    """
+    config = getattr(getattr(driver, "command_executor", None), "_client_config", None)
+    if config is not None:
+        config.timeout = segundos
+        return
+
+    logger.debug("Selenium sem ClientConfig: timeout de comando aplicado globalmente.")
+    RemoteConnection.set_timeout(segundos)
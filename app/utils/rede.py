@@ -0,0 +1,226 @@
+import json
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logger import logger
+
+'''
+==================================================================================================================================
+Bloqueio de recursos de rede por sistema (via DevTools: Network.setBlockedURLs).
+
+A maior parte das páginas navegadas pelos bots só precisa do HTML (formulários, tabelas e links): imagens, fontes e scripts
+de rastreamento só custam banda e tempo de carregamento. Cada adapter (app/pipeline/sistemas.py) declara a sua lista de
+bloqueio em BLOQUEIOS_REDE e o driver_context(...) a aplica ao driver.
+
+As etapas que geram prints (mapas do SISCTM, Google Maps, aba Alterações do SIATU) são decoradas com @sem_bloqueio_rede:
+o bloqueio é desligado logo antes da etapa (as páginas carregadas nela vêm completas) e religado ao final.
+
+Os padrões aceitam o curinga '*' (ex: "*.png" ou "*google-analytics.com*").
+
+Monitor de rede (MonitorRede): acompanha as requisições em andamento de um driver a partir dos eventos Network.* que o
+ChromeDriver grava no log 'performance' (habilitado em criar_driver). É a base da espera rede_ociosa(...) de utils/esperas.py:
+"nenhuma requisição em andamento há X ms" - o tempo de espera passa a acompanhar a resposta real do servidor.
+
+O log 'performance' é lido por um único LeitorEventos por driver (a leitura esvazia o buffer do ChromeDriver), que
+distribui os eventos aos assinantes: o MonitorRede (Network.*) e o RastreadorDownloads de utils/downloads.py (Page.download*).
+==================================================================================================================================
+'''
+
+# Grupos de padrões, combinados por sistema em app/pipeline/sistemas.py
+IMAGENS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico", "*.bmp"]
+FOTOS = ["*.jpg", "*.jpeg", "*.webp"]    # Só imagens pesadas (banners/fotos) - mantém ícones de interface (gif/png)
+FONTES = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+MIDIA = ["*.mp4", "*.webm", "*.mp3"]
+RASTREADORES = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*facebook.net*",
+]
+
+
+def aplicar_bloqueios(driver, padroes: Optional[Iterable[str]]) -> None:
+    """
+    Define a lista de URLs bloqueadas do driver (substitui a anterior; lista vazia desliga o bloqueio).
+    A lista fica anotada no driver para que @sem_bloqueio_rede possa religá-la.
+
+    :param driver: WebDriver (Chrome).
+    :param padroes: Padrões de URL a bloquear. None ou vazio = nenhum bloqueio.
+    """
+    padroes = list(padroes or [])
+    if not padroes and not getattr(driver, "_bloqueios_rede", None):
+        return  # Nada a bloquear e nada bloqueado antes: evita comandos DevTools à toa
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+        driver._bloqueios_rede = padroes
+    except Exception as e:
+        # Sem bloqueio a página só carrega mais devagar - nunca deve derrubar a automação
+        logger.warning(f"Não foi possível aplicar o bloqueio de recursos de rede: {e}")
+
+
+def liberar_bloqueios(driver) -> List[str]:
+    """
+    Desliga o bloqueio de recursos do driver.
+
+    :return: A lista que estava ativa (para ser reaplicada depois).
+    """
+    ativos = list(getattr(driver, "_bloqueios_rede", None) or [])
+    if ativos:
+        aplicar_bloqueios(driver, [])
+    return ativos
+
+
+def sem_bloqueio_rede(func):
+    """
+    Decorador para métodos de bots (que tenham self.driver) que capturam prints:
+    desliga o bloqueio de recursos antes do método e o religa ao final, mesmo em caso de erro.
+    """
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        ativos = liberar_bloqueios(self.driver)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            if ativos:
+                aplicar_bloqueios(self.driver, ativos)
+
+    return wrapper
+
+
+# ====================================================================================================== eventos DevTools
+class LeitorEventos:
+    """
+    Leitor único do log 'performance' de um driver (eventos DevTools gravados pelo ChromeDriver).
+
+    driver.get_log(...) esvazia o buffer a cada leitura, então todos os interessados (monitor de rede, rastreador de
+    downloads em utils/downloads.py) assinam um prefixo de evento aqui e recebem os eventos de qualquer leitura.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.disponivel: bool = True     # False se o driver não foi criado com o log 'performance'
+        self._assinantes: List[Tuple[str, Callable[[str, dict, float], None]]] = []
+        self._lock = threading.RLock()
+
+    def assinar(self, prefixo: str, callback: Callable[[str, dict, float], None]) -> None:
+        """
+        Registra um callback para os eventos cujo método começa com 'prefixo' (ex: "Network.").
+
+        :param callback: Recebe (metodo, params, instante_ms).
+        """
+        with self._lock:
+            self._assinantes.append((prefixo, callback))
+
+    def cancelar(self, callback: Callable[[str, dict, float], None]) -> None:
+        """Remove as assinaturas feitas com o callback."""
+        with self._lock:
+            self._assinantes = [(p, c) for p, c in self._assinantes if c != callback]
+
+    def ler(self) -> None:
+        """Consome os eventos novos do log 'performance' e os entrega aos assinantes."""
+        if not self.disponivel:
+            return
+        with self._lock:
+            try:
+                entradas = self.driver.get_log("performance")
+            except Exception as e:
+                self.disponivel = False
+                logger.debug(f"Log 'performance' indisponível no driver: {e}")
+                return
+
+            for entrada in entradas:
+                try:
+                    mensagem = json.loads(entrada["message"])["message"]
+                except (KeyError, ValueError, TypeError):
+                    continue
+                metodo = mensagem.get("method", "")
+                instante = float(entrada.get("timestamp", time.time() * 1000))
+                for prefixo, callback in self._assinantes:
+                    if metodo.startswith(prefixo):
+                        callback(metodo, mensagem.get("params", {}), instante)
+
+
+def eventos_devtools(driver) -> LeitorEventos:
+    """Retorna (criando na primeira vez) o leitor de eventos DevTools do driver."""
+    leitor = getattr(driver, "_eventos_devtools", None)
+    if leitor is None:
+        leitor = LeitorEventos(driver)
+        driver._eventos_devtools = leitor
+    return leitor
+
+
+# ====================================================================================================== monitor de rede
+# Tipos de recurso que nunca "terminam" (conexões longas) e não devem segurar a espera de rede ociosa
+TIPOS_IGNORADOS = ("WebSocket", "EventSource", "Ping", "Manifest")
+IDADE_MAXIMA_REQUISICAO = 15.0  # Segundos: requisição em andamento há mais tempo que isso é tratada como pendurada (ignorada)
+
+
+class MonitorRede:
+    """
+    Requisições em andamento de um driver, reconstruídas a partir dos eventos Network.* do log 'performance'.
+    Existe um único monitor por driver (ver monitor_rede(driver)).
+    """
+
+    def __init__(self, driver):
+        self.eventos = eventos_devtools(driver)
+        self._pendentes: Dict[str, Tuple[float, str]] = {}   # requestId -> (início em ms, url)
+        self._ultima_atividade: float = time.time() * 1000
+        self._lock = threading.Lock()
+        self.eventos.assinar("Network.", self._registrar)
+
+    @property
+    def disponivel(self) -> bool:
+        return self.eventos.disponivel
+
+    def _registrar(self, metodo: str, params: dict, instante: float) -> None:
+        id_requisicao = params.get("requestId")
+        with self._lock:
+            if metodo == "Network.requestWillBeSent":
+                url = params.get("request", {}).get("url", "")
+                if params.get("type") in TIPOS_IGNORADOS or url.startswith("data:"):
+                    return
+                self._pendentes[id_requisicao] = (instante, url)
+            elif metodo in ("Network.loadingFinished", "Network.loadingFailed"):
+                self._pendentes.pop(id_requisicao, None)
+            else:
+                return
+            self._ultima_atividade = max(self._ultima_atividade, instante)
+
+    def atualizar(self) -> None:
+        """Lê os eventos novos e atualiza as requisições em andamento."""
+        self.eventos.ler()
+
+        # Descarta requisições penduradas (long polling, beacons...) para não segurarem a espera até o teto
+        limite = time.time() * 1000 - IDADE_MAXIMA_REQUISICAO * 1000
+        with self._lock:
+            for id_requisicao, (inicio, _url) in list(self._pendentes.items()):
+                if inicio < limite:
+                    del self._pendentes[id_requisicao]
+
+    def em_andamento(self) -> int:
+        """Nº de requisições em andamento (após atualizar())."""
+        with self._lock:
+            return len(self._pendentes)
+
+    def ociosa_ha(self) -> float:
+        """Milissegundos desde a última atividade de rede (0 se há requisições em andamento)."""
+        with self._lock:
+            if self._pendentes:
+                return 0.0
+            return max(0.0, time.time() * 1000 - self._ultima_atividade)
+
+
+def monitor_rede(driver) -> MonitorRede:
+    """Retorna (criando na primeira vez) o monitor de rede do driver."""
+    monitor = getattr(driver, "_monitor_rede", None)
+    if monitor is None:
+        monitor = MonitorRede(driver)
+        driver._monitor_rede = monitor
+    return monitor
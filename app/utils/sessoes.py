@@ -0,0 +1,323 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .logger import logger
+from .web_driver import criar_driver, _encerrar_driver
+from .downloads import definir_pasta_download
+from .cofre import cofre_sessoes
+from .limites import limitador_sistemas
+
+'''
+==================================================================================================================================
+Pool de sessões de navegador (uma ou mais por sistema) mantidas vivas durante toda a triagem.
+
+Antes, cada chamada de driver_context(...) abria e matava um Chrome novo - e cada bot fazia login de novo.
+Numa triagem de 40 ICs isso significava 160+ navegadores e 160+ logins. Com o pool ativo, o driver de cada sistema
+é emprestado para o IC atual, "resetado" para uma página conhecida na devolução/empréstimo seguinte e só é
+reciclado (encerrado e recriado) após uma falha, após N usos ou após ficar ocioso tempo demais (sessões SSO expiram).
+
+Pré-aquecimento: pre_aquecer(...) abre (e opcionalmente autentica) o navegador de um sistema em segundo plano,
+enquanto outra etapa ainda está rodando. Quando a etapa seguinte pedir o driver_context(...) do sistema, ela recebe
+o navegador já aberto - o custo de inicialização do Chrome (e do login) sai do caminho crítico do IC.
+
+NOTE: O pool só atua quando está ativo (pool_sessoes.iniciar() na main). Fora disso driver_context(...) mantém
+      o comportamento antigo (um Chrome por contexto).
+==================================================================================================================================
+'''
+
+MAX_USOS_SESSAO = 20            # Nº de ICs atendidos por um mesmo driver antes de reciclá-lo
+MAX_OCIOSIDADE_SESSAO = 15 * 60 # Segundos que um driver pode ficar parado no pool antes de ser descartado (expiração do SSO)
+MAX_PRE_AQUECIMENTOS = 4        # Nº de navegadores sendo abertos em segundo plano ao mesmo tempo
+PAGINA_NEUTRA = "about:blank"   # Página conhecida para onde o driver é levado entre um IC e outro
+
+
+class SessaoNavegador:
+    """Um driver mantido pelo pool e os metadados do seu ciclo de vida."""
+
+    def __init__(self, sistema: str, driver, add_config=None, perfil_driver=None):
+        self.sistema = sistema
+        self.driver = driver
+        self.add_config = add_config
+        self.perfil_driver = perfil_driver          # PerfilDriver usado na criação (utils/perfis.py)
+        self.usos: int = 0                          # Quantas vezes o driver já foi emprestado e devolvido com sucesso
+        self.autenticado: bool = False              # O bot já fez login neste driver?
+        self.chave_cofre: Optional[tuple] = None    # (sistema, usuario) da sessão no cofre - atualizada a cada devolução
+        self.ultimo_uso: float = time.monotonic()
+
+
+class PoolSessoes:
+    """
+    Mantém drivers vivos por sistema (SIATU, URBANO, SISCTM, GOOGLE, SIGEDE) durante a triagem.
+
+    Parâmetros:
+        max_usos (int): Nº de usos antes de reciclar o driver.
+        max_ociosidade (float): Segundos de ociosidade tolerados antes de descartar o driver.
+    """
+
+    def __init__(self, max_usos: int = MAX_USOS_SESSAO, max_ociosidade: float = MAX_OCIOSIDADE_SESSAO):
+        self.max_usos = max_usos
+        self.max_ociosidade = max_ociosidade
+        self.ativo: bool = False
+        self._ociosas: Dict[str, List[SessaoNavegador]] = {}     # sistema -> drivers livres
+        self._emprestadas: Dict[int, SessaoNavegador] = {}      # id(driver) -> sessão em uso
+        self._aquecendo: Dict[str, List[Future]] = {}           # sistema -> navegadores sendo abertos em segundo plano
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ ciclo de vida do pool
+    def iniciar(self) -> None:
+        """Ativa o pool (chamado no início da triagem)."""
+        self.ativo = True
+        logger.info("Pool de sessões ativado (reciclagem a cada %d usos).", self.max_usos)
+
+    def encerrar(self) -> None:
+        """Encerra todos os drivers ociosos (e os pré-aquecidos) e desativa o pool (chamado no fim da triagem)."""
+        with self._lock:
+            self.ativo = False
+            executor, self._executor = self._executor, None
+            pendentes = [f for lista in self._aquecendo.values() for f in lista]
+            self._aquecendo.clear()
+
+        # Espera os pré-aquecimentos em andamento para não deixar Chromes órfãos
+        if executor:
+            executor.shutdown(wait=True)
+        with self._lock:
+            sessoes = [s for lista in self._ociosas.values() for s in lista]
+            sessoes += [f.result() for f in pendentes if f.result() is not None]
+            self._ociosas.clear()
+
+        for sessao in sessoes:
+            _encerrar_driver(sessao.driver)
+        if sessoes:
+            logger.info("Pool de sessões encerrado: %d navegador(es) fechado(s).", len(sessoes))
+
+    # ------------------------------------------------------------------ empréstimo / devolução
+    @contextmanager
+    def sessao(self, sistema: str, pasta_download: str, add_config=None, perfil_driver=None):
+        """
+        Empresta um driver do sistema durante o bloco 'with' e o devolve ao pool ao final.
+        Se o bloco lançar exceção o driver é descartado (crash) - o próximo empréstimo cria um novo.
+
+        :param sistema: Nome do sistema (chave do pool). Ex: "SIATU".
+        :param pasta_download: Pasta de download do IC atual (aplicada ao driver reaproveitado).
+        :param add_config: Flag experimental repassada ao criar_driver(...).
+        :param perfil_driver: PerfilDriver repassado ao criar_driver(...) quando um navegador novo é necessário.
+        :yield: O WebDriver emprestado.
+        """
+        sessao = self._emprestar(sistema, pasta_download, add_config, perfil_driver)
+        try:
+            yield sessao.driver
+        except Exception:
+            self._devolver(sessao, falhou=True)
+            raise
+        else:
+            self._devolver(sessao, falhou=False)
+
+    def _emprestar(self, sistema: str, pasta_download: str, add_config=None, perfil_driver=None) -> SessaoNavegador:
+        """Retira um driver ocioso e saudável do pool (ou aguarda um pré-aquecido, ou cria um novo) e o prepara para o IC atual."""
+        while True:
+            with self._lock:
+                livres = self._ociosas.get(sistema, [])
+                sessao = livres.pop() if livres else None
+                aquecendo = self._aquecendo.get(sistema, [])
+                futuro = aquecendo.pop(0) if (sessao is None and aquecendo) else None
+
+            # Nenhum livre, mas há um navegador sendo aberto em segundo plano: esperar por ele é mais rápido que abrir outro
+            if futuro is not None:
+                sessao = futuro.result()
+                if sessao is None:
+                    continue    # O pré-aquecimento falhou - tenta o próximo (ou cria um novo)
+
+            if sessao is None:
+                break
+
+            if time.monotonic() - sessao.ultimo_uso > self.max_ociosidade:
+                logger.info("Sessão %s ociosa há muito tempo, reciclando navegador.", sistema)
+                _encerrar_driver(sessao.driver)
+                continue
+
+            if self._preparar(sessao, pasta_download):
+                logger.info("Reaproveitando navegador do pool para %s (uso %d).", sistema, sessao.usos + 1)
+                break
+
+            # Driver morto ou travado: descarta e tenta o próximo (ou cria um novo)
+            _encerrar_driver(sessao.driver)
+
+        if sessao is None:
+            driver = criar_driver(pasta_download, add_config=add_config, perfil_driver=perfil_driver)
+            sessao = SessaoNavegador(sistema, driver, add_config, perfil_driver)
+            logger.info("Novo navegador criado para o pool (%s).", sistema)
+
+        with self._lock:
+            self._emprestadas[id(sessao.driver)] = sessao
+        return sessao
+
+    def _devolver(self, sessao: SessaoNavegador, falhou: bool) -> None:
+        """Devolve o driver ao pool, ou o encerra se houve falha, se atingiu o limite de usos ou se o pool foi desligado."""
+        with self._lock:
+            self._emprestadas.pop(id(sessao.driver), None)
+
+        if falhou:
+            logger.info("Navegador %s descartado após falha (será recriado no próximo uso).", sessao.sistema)
+            _encerrar_driver(sessao.driver)
+            return
+
+        sessao.usos += 1
+        sessao.ultimo_uso = time.monotonic()
+
+        # Atualiza o cofre com o estado mais recente da sessão (cookies renovados durante o uso)
+        if sessao.autenticado and sessao.chave_cofre:
+            cofre_sessoes.capturar(sessao.driver, *sessao.chave_cofre)
+
+        if sessao.usos >= self.max_usos or not self.ativo:
+            logger.info("Navegador %s reciclado após %d uso(s).", sessao.sistema, sessao.usos)
+            _encerrar_driver(sessao.driver)
+            return
+
+        with self._lock:
+            self._ociosas.setdefault(sessao.sistema, []).append(sessao)
+
+    def _preparar(self, sessao: SessaoNavegador, pasta_download: str) -> bool:
+        """
+        Reseta o driver reaproveitado para um estado conhecido: fecha janelas extras, volta ao documento principal,
+        aponta a pasta de download para o IC atual e navega para a página neutra.
+
+        :return: True se o driver respondeu a todos os comandos (está vivo), False caso contrário.
+        """
+        driver = sessao.driver
+        try:
+            handles = driver.window_handles
+            principal = handles[0]
+            for janela in handles[1:]:
+                driver.switch_to.window(janela)
+                driver.close()
+            driver.switch_to.window(principal)
+            driver.switch_to.default_content()
+
+            definir_pasta_download(driver, pasta_download)
+            driver.get(PAGINA_NEUTRA)
+            return True
+        except Exception as e:
+            logger.warning("Navegador %s do pool não respondeu ao reset: %s", sessao.sistema, e)
+            return False
+
+    # ------------------------------------------------------------------ pré-aquecimento
+    def pre_aquecer(
+        self,
+        sistema: str,
+        pasta_download: str,
+        add_config=None,
+        preparar: Optional[Callable[[object], bool]] = None,
+        perfil_driver=None,
+    ) -> Optional[Future]:
+        """
+        Abre um navegador para o sistema em segundo plano, se não houver um livre nem outro já sendo aberto.
+        Não faz nada com o pool desativado.
+
+        :param sistema: Nome do sistema (chave do pool).
+        :param pasta_download: Pasta de download inicial do navegador (é trocada no empréstimo).
+        :param add_config: Flag experimental repassada ao criar_driver(...).
+        :param preparar: [OPCIONAL] Função que recebe o driver recém-criado e faz o login. Se retornar True
+                         a sessão já entra no pool autenticada.
+        :param perfil_driver: [OPCIONAL] PerfilDriver do sistema, repassado ao criar_driver(...).
+        :return: O Future do navegador sendo aberto (o novo ou o que já estava sendo aberto) - o resultado é a
+                 SessaoNavegador (ou None se a abertura falhou). None se já há um navegador livre ou o pool está desativado.
+        """
+        with self._lock:
+            if not self.ativo or self._ociosas.get(sistema):
+                return None
+            if self._aquecendo.get(sistema):
+                return self._aquecendo[sistema][0]
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_PRE_AQUECIMENTOS, thread_name_prefix="pre_aquecimento"
+                )
+            futuro = self._executor.submit(
+                self._abrir_em_segundo_plano, sistema, pasta_download, add_config, preparar, perfil_driver
+            )
+            self._aquecendo.setdefault(sistema, []).append(futuro)
+            return futuro
+
+    def _abrir_em_segundo_plano(
+        self, sistema, pasta_download, add_config, preparar, perfil_driver=None
+    ) -> Optional[SessaoNavegador]:
+        """Corpo da thread de pré-aquecimento. Nunca lança exceção (devolve None em caso de falha)."""
+        driver = None
+        try:
+            # Fora do driver_context(...): a abertura (e o login logo em seguida) respeita aqui o espaçamento do sistema
+            limitador_sistemas.espacar(sistema)
+            driver = criar_driver(pasta_download, add_config=add_config, perfil_driver=perfil_driver)
+            sessao = SessaoNavegador(sistema, driver, add_config, perfil_driver)
+            if preparar:
+                # Registra a sessão durante o login para que autenticar_sessao(...) a encontre e anote a chave do cofre
+                with self._lock:
+                    self._emprestadas[id(driver)] = sessao
+                try:
+                    sessao.autenticado = bool(preparar(driver))
+                finally:
+                    with self._lock:
+                        self._emprestadas.pop(id(driver), None)
+            logger.info(
+                "Navegador %s pré-aquecido em segundo plano%s.",
+                sistema, " (já autenticado)" if sessao.autenticado else "",
+            )
+            return sessao
+        except Exception as e:
+            logger.warning("Falha ao pré-aquecer navegador %s: %s", sistema, e)
+            if driver:
+                _encerrar_driver(driver)
+            return None
+
+    # ------------------------------------------------------------------ estado de autenticação
+    def sessao_de(self, driver) -> Optional[SessaoNavegador]:
+        """Retorna a SessaoNavegador do driver emprestado (ou None se o driver não é do pool)."""
+        with self._lock:
+            return self._emprestadas.get(id(driver))
+
+
+def autenticar_sessao(bot, sistema: Optional[str] = None) -> bool:
+    """
+    Garante que o driver do bot está autenticado, do jeito mais barato possível:
+        1. Driver do pool que já passou pelo login: nada a fazer;
+        2. Sessão guardada no cofre (utils/cofre.py): reinjeta cookies/localStorage e valida com bot.sessao_valida();
+        3. Login completo (bot.login()) - e a sessão resultante é guardada no cofre.
+
+    O bot precisa ter os atributos 'driver' e 'usuario' e os métodos acessar(), login() e sessao_valida().
+    Deve ser chamado depois de bot.acessar().
+
+    :param bot: Instância do bot-core (SiatuAuto, UrbanoAuto, SisctmAuto, SigedeAuto).
+    :param sistema: Nome do sistema (chave do cofre). Sem ele o cofre não é usado.
+    :return: True se a sessão está autenticada.
+    """
+    driver = bot.driver
+    sessao = pool_sessoes.sessao_de(driver)
+    if sessao and sessao.autenticado:
+        logger.info("Sessão %s já autenticada, pulando login.", sessao.sistema)
+        return True
+
+    autenticado = False
+    if sistema and cofre_sessoes.reaproveitar(driver, sistema, bot.usuario, bot.sessao_valida, bot.acessar):
+        autenticado = True
+    else:
+        # O espaçamento entre logins já foi respeitado na abertura da sessão (driver_context / pré-aquecimento)
+        autenticado = bool(bot.login())
+        if autenticado and sistema:
+            cofre_sessoes.capturar(driver, sistema, bot.usuario)
+
+    if sessao and autenticado:
+        sessao.autenticado = True
+        sessao.chave_cofre = (sistema, bot.usuario) if sistema else None
+    return autenticado
+
+
+def sessao_autenticada(driver) -> bool:
+    """True se o driver pertence ao pool e já passou pelo login."""
+    sessao = pool_sessoes.sessao_de(driver)
+    return bool(sessao and sessao.autenticado)
+
+
+# Instância única do pool usada por toda a aplicação (assim como o logger)
+pool_sessoes = PoolSessoes()
@@ -1,7 +1,6 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import WebDriverException, SessionNotCreatedException
 
 from contextlib import contextmanager
@@ -10,6 +9,12 @@ import time
 import psutil
 
 from .logger import logger
+from .chromedriver import resolver_chromedriver
+from .rede import aplicar_bloqueios, monitor_rede
+from .perfis import PERFIL_PADRAO, aplicar_perfil
+from .esperas import instrumentar_xhr
+from .downloads import definir_pasta_download
+from .limites import limitador_sistemas
 
 
 def _kill_selenium_driver(driver):
@@ -48,15 +53,19 @@ def _kill_selenium_driver(driver):
 
 
 def criar_driver(
-    pasta_indice=None, caminho_perfil=None, nome_perfil="Default", add_config=None
+    pasta_indice=None, caminho_perfil=None, nome_perfil="Default", add_config=None, perfil_driver=None
 ):
     """
     Criação de webdriver chrome.
 
     Parâmetros:
     add_config: flag experimental HTTP.
+    perfil_driver: PerfilDriver com a estratégia de carregamento e os timeouts do bot (ver utils/perfis.py).
     """
+    perfil_driver = perfil_driver or PERFIL_PADRAO
+
     chrome_options = Options()
+    chrome_options.page_load_strategy = perfil_driver.estrategia
     chrome_options.add_argument("--headless=new")  # Executar em segundo plano.¬
     chrome_options.add_argument("--start-maximized")  # Executar navegador maximizdo. ¬
     chrome_options.add_argument("--disable-popup-blocking")
@@ -73,6 +82,14 @@ def criar_driver(
             "--unsafely-treat-insecure-origin-as-secure=http://dividaativaonline.siatu.pbh.gov.br"
         )
 
+    # Eventos no log 'performance': rede (monitor de rede ociosa, utils/rede.py) e/ou página (downloads, utils/downloads.py)
+    if perfil_driver.monitorar_rede or perfil_driver.monitorar_downloads:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option(
+            "perfLoggingPrefs",
+            {"enableNetwork": perfil_driver.monitorar_rede, "enablePage": perfil_driver.monitorar_downloads},
+        )
+
     if caminho_perfil:
         chrome_options.add_argument(f"user-data-dir={caminho_perfil}")
         chrome_options.add_argument(f"--profile-directory={nome_perfil}")
@@ -86,18 +103,80 @@ def criar_driver(
         }
         chrome_options.add_experimental_option("prefs", prefs)
 
-    service = Service(ChromeDriverManager().install())
+    # O caminho do ChromeDriver é resolvido uma única vez por processo (ver utils/chromedriver.py).
+    # Se não houver caminho, Service() sem executável deixa o Selenium Manager resolver.
+    caminho_chromedriver = resolver_chromedriver()
+    service = Service(caminho_chromedriver) if caminho_chromedriver else Service()
     driver = webdriver.Chrome(service=service, options=chrome_options)
+    aplicar_perfil(driver, perfil_driver)
 
     #driver = webdriver.Chrome(options=chrome_options) #¬ duplicidade da instanciação (só essa última que vale, me parece)
     return driver
 
 
+def _encerrar_driver(driver):
+    """
+    Encerra o driver normalmente (driver.quit()) e, se falhar, mata o processo do Chrome.
+    """
+    if driver:
+        try:
+            driver.quit()
+            logger.info(
+                "Driver encerrado normalmente."
+            )
+        except Exception as e:
+            logger.warning(f"driver.quit() falhou: {e}")
+            _kill_selenium_driver(driver)
+    else:
+        logger.info(
+            "Driver não foi criado, mas executando encerramento seguro por precaução."
+        )
+        _kill_selenium_driver(driver)
+
+
 @contextmanager
-def driver_context(pasta_indice, perfil=None, nome_perfil="Default", add_config=None):
+def driver_context(
+    pasta_indice, perfil=None, nome_perfil="Default", add_config=None, sistema=None, bloqueios=None, perfil_driver=None
+):
     """
     Cria, usa e finaliza webdriver.
+
+    Se 'sistema' for informado e o pool de sessões estiver ativo (ver utils/sessoes.py),
+    o driver é emprestado do pool (já aberto e, possivelmente, autenticado) e devolvido ao fim do bloco.
+
+    'bloqueios' é a lista de padrões de URL que o driver não deve carregar (ver utils/rede.py).
+    Drivers reaproveitados do pool têm a lista substituída pela do sistema atual.
+
+    'perfil_driver' define a estratégia de carregamento e os timeouts do driver (ver utils/perfis.py).
+    Os timeouts são reaplicados a cada contexto, então valem só para este driver e para esta etapa.
+    Com perfil_driver.monitorar_downloads, os downloads do driver passam a ser acompanhados por eventos (ver utils/downloads.py).
+
+    Com 'sistema' informado, o bloco ocupa uma vaga do sistema no limitador (ver utils/limites.py): se o sistema já
+    estiver com o máximo de sessões abertas, o contexto espera na fila antes de abrir/emprestar o driver.
     """
+    with limitador_sistemas.sessao(sistema):
+        with _abrir_driver(pasta_indice, perfil, nome_perfil, add_config, sistema, bloqueios, perfil_driver) as driver:
+            yield driver
+
+
+@contextmanager
+def _abrir_driver(pasta_indice, perfil, nome_perfil, add_config, sistema, bloqueios, perfil_driver):
+    """Corpo do driver_context(...): empresta o driver do pool ou cria (e finaliza) um driver próprio."""
+    # Import tardio: sessoes.py importa este módulo (evita import circular)
+    from .sessoes import pool_sessoes
+
+    if sistema and pool_sessoes.ativo and not perfil:
+        with pool_sessoes.sessao(sistema, pasta_indice, add_config=add_config, perfil_driver=perfil_driver) as driver:
+            aplicar_perfil(driver, perfil_driver)
+            aplicar_bloqueios(driver, bloqueios)
+            instrumentar_xhr(driver)    # Contador de XHR usado pelas esperas por condição (utils/esperas.py)
+            if perfil_driver and perfil_driver.monitorar_rede:
+                monitor_rede(driver).atualizar()    # Descarta os eventos de rede acumulados enquanto o driver estava ocioso
+            if perfil_driver and perfil_driver.monitorar_downloads:
+                definir_pasta_download(driver, pasta_indice)    # Liga os eventos de download (utils/downloads.py)
+            yield driver
+        return
+
     driver = None
     try:
         driver = criar_driver(
@@ -105,7 +184,12 @@ def driver_context(pasta_indice, perfil=None, nome_perfil="Default", add_config=
             caminho_perfil=perfil,
             nome_perfil=nome_perfil,
             add_config=add_config,
+            perfil_driver=perfil_driver,
         )
+        aplicar_bloqueios(driver, bloqueios)
+        instrumentar_xhr(driver)
+        if perfil_driver and perfil_driver.monitorar_downloads:
+            definir_pasta_download(driver, pasta_indice)
         yield driver
     except SessionNotCreatedException as e:
         logger.error(f"Falha ao criar sessão do Chrome no driver_context: {e}")
@@ -123,17 +207,4 @@ def driver_context(pasta_indice, perfil=None, nome_perfil="Default", add_config=
         _kill_selenium_driver(driver)
         raise
     finally:
-        if driver:
-            try:
-                driver.quit()
-                logger.info(
-                    "Driver encerrado normalmente no finally do context manager."
-                )
-            except Exception as e:
-                logger.warning(f"driver.quit() falhou no finally: {e}")
-                _kill_selenium_driver(driver)
-        else:
-            logger.info(
-                "Driver não foi criado, mas executando encerramento seguro por precaução."
-            )
-            _kill_selenium_driver(driver)
+        _encerrar_driver(driver)